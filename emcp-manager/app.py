@@ -2,81 +2,265 @@
 """
 Simple Flask API for eMCP tool selection
 """
-from flask import Flask, jsonify, request, send_from_directory
-import subprocess
+from flask import Flask, Response, g, jsonify, request, send_from_directory
+import base64
+import bisect
+import gzip
+import hashlib
 import json
 import os
+import threading
 import time
+from collections import OrderedDict
 import requests
 
+# Brotli is optional — gzip is used when it isn't installed
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
 # Import new modules for server management
 from mcp_detector import detect_server, parse_mcp_url, DetectionError
 from compose_manager import (
-    add_service, remove_service,
-    create_mcp_config, delete_mcp_config,
-    get_container_status, ComposeError,
-    pull_image, start_service, stop_service,
-    write_env_vars, wait_for_mcp_ready
+    get_pull_progress, CONFIGS_DIR, ComposeError, update_limits,
+    host_reservations, server_host
 )
-
-# Infisical is optional — only used if configured via env vars
-try:
-    from infisical_client import (
-        create_secret, is_configured as infisical_configured,
-        InfisicalError
-    )
-except ImportError:
-    def infisical_configured(): return False
-    def create_secret(*a, **kw): raise RuntimeError("Infisical not available")
-    class InfisicalError(Exception): pass
+import docker_hosts
+from provisioner import provision_server, deprovision_server, cancel_provision, server_name, ProvisionError
+from mcpjungle_client import exec_emcp, EMCP_CONTAINER, MCPJUNGLE_API
+from tool_catalog import ToolCatalog, split_tool_name, get_input_schema
+from tool_index import SEARCH_MODES
+from group_optimizer import optimize_selection, OptimizerError
+from group_store import (
+    GroupLocks, VersionHistory, VersionConflict, CONFLICT_POLICIES,
+    DEFAULT_CONFLICT_POLICY, group_version, parse_if_match, version_matches,
+    resolve_conflict, write_json_atomic
+)
+from usage_stats import UsageStore, LogIngester, DEFAULT_WINDOW
+from health_monitor import HealthMonitor, read_server_configs
+from idle_scaler import IdleScaler, IdleError, WAKE_TIMEOUT
+from resource_sampler import ResourceSampler
+from image_gc import GarbageCollector
+from idempotency import (
+    IdempotencyStore, IdempotencyError, fingerprint as request_hash,
+    HEADER as IDEMPOTENCY_HEADER, REPLAYED_HEADER
+)
+from reconciler import reconcile, ReconcileError
+from rolling_restart import (
+    RestartError, select_servers, restart_server, rolling_restart, batch_size_for,
+    RESTART_BATCH_SIZE, RESTART_READY_TIMEOUT
+)
+from diagnostics import run_diagnostics, DiagnosticsError, DIAGNOSTICS_TIMEOUT
+from desired_state import (
+    DesiredStateError, validate_spec, current_servers, plan as plan_changes,
+    execute as execute_plan, server_handlers
+)
+from metrics import (
+    REGISTRY, CONTENT_TYPE as METRICS_CONTENT_TYPE,
+    HTTP_REQUEST_SECONDS, HTTP_REQUESTS_IN_FLIGHT
+)
+from profiler import RequestProfiler, ProfilerError, PROFILE_HEADER
+from secret_resolver import get_provider, infisical_configured
 
 app = Flask(__name__)
 
-EMCP_CONTAINER = "emcp-server"
-MCPJUNGLE_API = os.getenv("MCPJUNGLE_API", "http://emcp-server:8080")
-GROUPS_DIR = "/groups"
+GROUPS_DIR = os.getenv("GROUPS_DIR", "/groups")
 DEFAULT_GROUP = "emcp-global"
 EMCP_GROUP_FILE = os.path.join(GROUPS_DIR, f"{DEFAULT_GROUP}.json")
 PRESETS_DIR = os.path.join(GROUPS_DIR, "presets")
 
+# Cached view of MCPJungle's /api/v0/tools, shared by every endpoint
+catalog = ToolCatalog(MCPJUNGLE_API)
 
-def exec_emcp(cmd):
-    """Execute command in eMCP container"""
-    full_cmd = ["docker", "exec", "-t", EMCP_CONTAINER, "/mcpjungle"] + cmd
-    result = subprocess.run(full_cmd, capture_output=True, text=True)
-    return result
+# Group writes are serialized per group; recent versions serve as merge bases
+group_locks = GroupLocks()
+group_history = VersionHistory()
 
+# Per-tool call statistics, fed from the gateway logs
+usage = UsageStore()
+usage_ingester = LogIngester(usage, container=EMCP_CONTAINER)
 
-def get_all_tools():
-    """Fetch all tools from MCPJungle REST API"""
-    response = requests.get(f"{MCPJUNGLE_API}/api/v0/tools", timeout=10)
-    response.raise_for_status()
+# Recent provision responses by Idempotency-Key
+provision_keys = IdempotencyStore()
 
-    tools_by_server = {}
-    for tool in response.json():
-        # Tool name format: "server__tool_name"
-        parts = tool["name"].split("__", 1)
-        server_name = parts[0] if len(parts) > 1 else "unknown"
+# Only one desired-state apply runs at a time
+_apply_lock = threading.Lock()
 
-        if server_name not in tools_by_server:
-            tools_by_server[server_name] = []
+# Only one bulk restart runs at a time
+_restart_lock = threading.Lock()
 
-        tools_by_server[server_name].append({
-            "name": tool["name"],
-            "description": tool.get("description", ""),
-            "enabled": tool.get("enabled", True)
-        })
+# Background MCP health probes; /api/servers reads its cached state
+health = HealthMonitor(CONFIGS_DIR)
+
+# Opt-in scale-to-zero of idle servers (EMCP_IDLE_POLICY); calls seen in
+# the gateway logs wake sleeping servers
+idle = IdleScaler(CONFIGS_DIR, GROUPS_DIR, usage, health=health)
+usage_ingester.on_call = idle.notify_call
+
+# Per-container CPU/memory/IO history; basis for automatic limits
+resources = ResourceSampler()
+
+# Reclaims images and volumes dynamic servers no longer use
+collector = GarbageCollector()
+
+# Opt-in per-request profiling (EMCP_PROFILING=1 or /api/admin/profiling)
+profiler = RequestProfiler()
+
+# Value given to never-called tools when optimizing by usage
+COLD_TOOL_PRIORITY = 0.1
+
+# Fields a client may select from /api/tools ("name" is always included)
+TOOL_FIELDS = ("name", "description", "enabled", "input_schema", "tokens")
+
+# Fields returned when ?fields= is not given
+DEFAULT_TOOL_FIELDS = ("name", "description", "enabled")
+
+# Responses smaller than this are not worth compressing
+COMPRESS_MIN_BYTES = 1024
+
+# Encoded /api/tools bodies keyed by (etag) — a catalog version, query and
+# encoding fully determine the bytes, so repeat requests skip re-encoding
+_encoded_cache = OrderedDict()
+_encoded_cache_lock = threading.Lock()
+ENCODED_CACHE_SIZE = 32
+
+
+# =============================================================================
+# Metrics
+# =============================================================================
+
+@app.before_request
+def _start_request_timer():
+    g.request_started = time.perf_counter()
+    HTTP_REQUESTS_IN_FLIGHT.labels().inc()
+
+
+@app.after_request
+def _observe_request(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        HTTP_REQUESTS_IN_FLIGHT.labels().dec()
+        HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - started,
+            method=request.method,
+            # Route template, not the raw path, to keep label cardinality bounded
+            route=request.url_rule.rule if request.url_rule else "unmatched",
+            status=response.status_code
+        )
+    return response
+
+
+@app.teardown_request
+def _end_request(exc):
+    # after_request is skipped when a view raises; still balance the gauge
+    if g.pop('request_started', None) is not None:
+        HTTP_REQUESTS_IN_FLIGHT.labels().dec()
+
+
+# =============================================================================
+# Request Profiling
+# =============================================================================
+
+@app.before_request
+def _start_profile():
+    if not profiler.enabled:
+        return
+    g.profile = profiler.start(request.path, request.headers.get(PROFILE_HEADER))
+
+
+@app.after_request
+def _finish_profile(response):
+    active = g.pop('profile', None)
+    if active is not None:
+        profile_id = profiler.finish(
+            active, request.method, request.path,
+            request.url_rule.rule if request.url_rule else None,
+            response.status_code
+        )
+        response.headers['X-EMCP-Profile-Id'] = str(profile_id)
+    return response
+
+
+@app.teardown_request
+def _abandon_profile(exc):
+    # A view that raised skips after_request; keep the profile anyway
+    active = g.pop('profile', None)
+    if active is not None:
+        profiler.finish(active, request.method, request.path,
+                        request.url_rule.rule if request.url_rule else None, 500)
+
+
+@app.route('/api/admin/profiling', methods=['GET'])
+def api_get_profiling():
+    """Get profiler settings and the stored profiles (newest first)."""
+    return jsonify({
+        "success": True,
+        "settings": profiler.settings(),
+        "profiles": profiler.profiles()
+    })
+
+
+@app.route('/api/admin/profiling', methods=['POST'])
+def api_configure_profiling():
+    """
+    Update profiler settings.
+
+    Input: {
+        "enabled": true,
+        "mode": "cprofile" | "sample",
+        "sample_rate": 0.0-1.0,   (fraction of requests profiled without the header)
+        "route_prefix": "/api/servers",
+        "max_per_minute": 10,
+        "keep": 20
+    }
+    """
+    try:
+        data = request.get_json() or {}
+        settings = profiler.configure(
+            enabled=data.get('enabled'),
+            sample_rate=data.get('sample_rate'),
+            mode=data.get('mode'),
+            route_prefix=data.get('route_prefix'),
+            max_per_minute=data.get('max_per_minute'),
+            keep=data.get('keep')
+        )
+        return jsonify({"success": True, "settings": settings})
+    except (ProfilerError, ValueError, TypeError) as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+
+@app.route('/api/admin/profiles/<int:profile_id>', methods=['GET'])
+def api_download_profile(profile_id):
+    """
+    Download a stored profile.
 
-    return tools_by_server
+    Query params:
+        format: pstats | text for cprofile profiles, folded | text for
+                sampled ones (default pstats / folded)
+    """
+    try:
+        body, content_type, filename = profiler.export(profile_id, request.args.get('format'))
+    except KeyError:
+        return jsonify({"success": False, "error": f"Profile {profile_id} not found"}), 404
+    except ProfilerError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    response = Response(body, content_type=content_type)
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics in the text exposition format."""
+    return Response(REGISTRY.render(), mimetype=None, content_type=METRICS_CONTENT_TYPE)
 
 
 def get_all_valid_tool_names():
     """Get set of all valid tool names from MCPJungle"""
     try:
-        response = requests.get(f"{MCPJUNGLE_API}/api/v0/tools", timeout=10)
-        if response.status_code != 200:
-            return set()
-        return {tool["name"] for tool in response.json()}
+        return {tool["name"] for tool in catalog.tools()}
     except requests.RequestException:
         return set()
 
@@ -152,6 +336,13 @@ def get_group(group_name):
         return json.load(f)
 
 
+def _remember_version(safe_name, config):
+    """Compute a group's version and keep it as a possible merge base."""
+    version = group_version(config)
+    group_history.remember(safe_name, version, config.get("included_tools", []))
+    return version
+
+
 def create_group(group_name, description=None, tools=None):
     """
     Create a new group with optional initial tools.
@@ -161,9 +352,6 @@ def create_group(group_name, description=None, tools=None):
     safe_name = sanitize_group_name(group_name)
     group_file = get_group_file(safe_name)
 
-    if os.path.exists(group_file):
-        raise ValueError(f"Group '{safe_name}' already exists")
-
     # Validate tools if provided
     if tools:
         valid, invalid_tools = validate_tool_names(tools)
@@ -176,18 +364,28 @@ def create_group(group_name, description=None, tools=None):
         "included_tools": tools or []
     }
 
-    # Write config file
-    with open(group_file, 'w') as f:
-        json.dump(config, f, indent=2)
+    with group_locks.hold(safe_name):
+        if os.path.exists(group_file):
+            raise ValueError(f"Group '{safe_name}' already exists")
+
+        # Write config file
+        write_json_atomic(group_file, config)
+
+        # Only register with MCPJungle if group has tools
+        # (MCPJungle requires at least one tool per group)
+        if tools:
+            result = exec_emcp(["create", "group", "-c", f"/groups/{safe_name}.json"])
+            if result.returncode != 0:
+                os.remove(group_file)
+                error_msg = result.stderr.strip() or result.stdout.strip() or "Unknown error"
+                raise Exception(f"Failed to register group with MCPJungle: {error_msg}")
+
+        version = _remember_version(safe_name, config)
 
-    # Only register with MCPJungle if group has tools
-    # (MCPJungle requires at least one tool per group)
+    config["version"] = version
+    # Start sleeping servers the group now references
+    idle.wake_for_tools(tools)
     if tools:
-        result = exec_emcp(["create", "group", "-c", f"/groups/{safe_name}.json"])
-        if result.returncode != 0:
-            os.remove(group_file)
-            error_msg = result.stderr.strip() or result.stdout.strip() or "Unknown error"
-            raise Exception(f"Failed to register group with MCPJungle: {error_msg}")
         config["registered"] = True
     else:
         config["registered"] = False
@@ -196,10 +394,19 @@ def create_group(group_name, description=None, tools=None):
     return config
 
 
-def delete_group(group_name):
+def delete_group(group_name, if_match=None):
     """
     Delete a group by name via MCPJungle CLI.
     Prevents deletion of the default global group.
+
+    Args:
+        group_name: The group to delete
+        if_match: Versions from an If-Match header; the delete is refused
+            unless the group is still at one of them
+
+    Raises:
+        ValueError: If the group is protected or missing
+        VersionConflict: If the group changed since if_match was read
     """
     safe_name = sanitize_group_name(group_name)
 
@@ -209,69 +416,110 @@ def delete_group(group_name):
 
     group_file = get_group_file(safe_name)
 
-    if not os.path.exists(group_file):
-        raise ValueError(f"Group '{safe_name}' not found")
+    with group_locks.hold(safe_name):
+        if not os.path.exists(group_file):
+            raise ValueError(f"Group '{safe_name}' not found")
+
+        if if_match is not None:
+            with open(group_file, 'r') as f:
+                version = group_version(json.load(f))
+            if not version_matches(if_match, version):
+                raise VersionConflict(f"Group '{safe_name}' has changed (current version {version})", version)
 
-    # Delete from MCPJungle via CLI (no REST API for groups)
-    exec_emcp(["delete", "group", safe_name])
-    # Ignore return code - file cleanup is more important
+        # Delete from MCPJungle via CLI (no REST API for groups)
+        exec_emcp(["delete", "group", safe_name])
+        # Ignore return code - file cleanup is more important
 
-    # Remove the file
-    os.remove(group_file)
+        # Remove the file
+        os.remove(group_file)
+        group_history.forget(safe_name)
 
     return True
 
 
-def update_group_tools(group_name, selected_tools):
+def update_group_tools(group_name, selected_tools, if_match=None, on_conflict=None):
     """
     Update tools for any group with safe UPDATE-first pattern.
     Handles lazy registration for groups that weren't registered on creation.
+
+    The read, write and MCPJungle update happen under the group's lock. If
+    if_match is given and the group has moved on, the write is rebased onto
+    the current tools ("merge") or refused ("reject").
+
+    Args:
+        group_name: The group to update
+        selected_tools: The complete new tool list
+        if_match: Versions from an If-Match header, or None for an unconditional write
+        on_conflict: "merge" or "reject" (default: EMCP_GROUP_CONFLICT_POLICY)
+
+    Returns:
+        dict: {"tools": tools written, "version": new version, "merged": bool}
+
+    Raises:
+        ValueError: If the group is missing or a tool name is invalid
+        VersionConflict: If a stale write is rejected or cannot be merged
     """
     safe_name = sanitize_group_name(group_name)
     group_file = get_group_file(safe_name)
 
-    if not os.path.exists(group_file):
-        raise ValueError(f"Group '{safe_name}' not found")
+    with group_locks.hold(safe_name):
+        if not os.path.exists(group_file):
+            raise ValueError(f"Group '{safe_name}' not found")
 
-    # SAFETY: Validate all tool names BEFORE any operation
-    valid, invalid_tools = validate_tool_names(selected_tools)
-    if not valid:
-        raise ValueError(f"Invalid tool names (group NOT modified): {', '.join(invalid_tools)}")
+        # Read existing config to preserve description
+        with open(group_file, 'r') as f:
+            existing = json.load(f)
+
+        merged = False
+        current_version = _remember_version(safe_name, existing)
+        if not version_matches(if_match, current_version):
+            selected_tools = resolve_conflict(
+                safe_name, group_history, if_match, current_version,
+                existing.get("included_tools", []), selected_tools,
+                on_conflict or DEFAULT_CONFLICT_POLICY
+            )
+            merged = True
 
-    # Read existing config to preserve description
-    with open(group_file, 'r') as f:
-        existing = json.load(f)
+        # SAFETY: Validate all tool names BEFORE any operation
+        valid, invalid_tools = validate_tool_names(selected_tools)
+        if not valid:
+            raise ValueError(f"Invalid tool names (group NOT modified): {', '.join(invalid_tools)}")
 
-    group_config = {
-        "name": safe_name,
-        "description": existing.get("description", f"Tools for {safe_name}"),
-        "included_tools": selected_tools
-    }
+        group_config = {
+            "name": safe_name,
+            "description": existing.get("description", f"Tools for {safe_name}"),
+            "included_tools": selected_tools
+        }
 
-    # Write updated config
-    with open(group_file, 'w') as f:
-        json.dump(group_config, f, indent=2)
+        # Write updated config
+        write_json_atomic(group_file, group_config)
 
-    # SAFE: Try UPDATE first (atomic, no downtime)
-    config_path = f"/groups/{safe_name}.json"
-    result = exec_emcp(["update", "group", "-c", config_path])
+        # SAFE: Try UPDATE first (atomic, no downtime)
+        config_path = f"/groups/{safe_name}.json"
+        result = exec_emcp(["update", "group", "-c", config_path])
 
-    if result.returncode != 0:
-        # Group might not be registered yet (lazy registration)
-        # Only try CREATE if we have tools (MCPJungle requirement)
-        if selected_tools:
-            result = exec_emcp(["create", "group", "-c", config_path])
-            if result.returncode != 0:
-                error_msg = result.stderr.strip() or result.stdout.strip() or "Unknown error"
-                raise Exception(f"Failed to update/create group: {error_msg}")
+        if result.returncode != 0:
+            # Group might not be registered yet (lazy registration)
+            # Only try CREATE if we have tools (MCPJungle requirement)
+            if selected_tools:
+                result = exec_emcp(["create", "group", "-c", config_path])
+                if result.returncode != 0:
+                    # Keep the file in step with what MCPJungle serves
+                    write_json_atomic(group_file, existing)
+                    error_msg = result.stderr.strip() or result.stdout.strip() or "Unknown error"
+                    raise Exception(f"Failed to update/create group: {error_msg}")
 
-    return True
+        version = _remember_version(safe_name, group_config)
+
+    # Start sleeping servers the group now references
+    idle.wake_for_tools(selected_tools)
+    return {"tools": selected_tools, "version": version, "merged": merged}
 
 
 # Backwards-compatible alias for default group
-def update_emcp_group(selected_tools):
+def update_emcp_group(selected_tools, if_match=None, on_conflict=None):
     """Update the default global group (backwards compatibility)"""
-    return update_group_tools(DEFAULT_GROUP, selected_tools)
+    return update_group_tools(DEFAULT_GROUP, selected_tools, if_match, on_conflict)
 
 
 def _get_group_tools(group_name=None):
@@ -292,53 +540,76 @@ def _get_current_tools():
     return _get_group_tools(DEFAULT_GROUP)
 
 
-def _modify_group_tool(group_name, tool_name, action):
+def _modify_group_tool(group_name, tool_name, action, if_match=None, on_conflict=None):
     """
     Modify tool selection for a specific group.
 
+    Runs under the group's lock, so concurrent edits are never lost. With a
+    stale if_match, "enable" and "disable" still apply to the current tools
+    (unless the policy is "reject"); "toggle" flips the tool relative to the
+    version the client saw, so a toggle is never applied twice.
+
     Args:
         group_name: The group to modify
         tool_name: The tool to modify (e.g., "github__search_code")
         action: One of "enable", "disable", "toggle"
+        if_match: Versions from an If-Match header, or None
+        on_conflict: "merge" or "reject" (default: EMCP_GROUP_CONFLICT_POLICY)
 
     Returns:
-        tuple: (current_tools, message, is_now_enabled)
+        tuple: (current_tools, message, is_now_enabled, version)
+
+    Raises:
+        VersionConflict: If a stale edit is rejected or its base is unknown
     """
     if not tool_name:
         raise ValueError("Tool name required")
+    if action not in ("enable", "disable", "toggle"):
+        raise ValueError(f"Unknown action: {action}")
+    policy = on_conflict or DEFAULT_CONFLICT_POLICY
+    if policy not in CONFLICT_POLICIES:
+        raise ValueError(f"on_conflict must be one of {', '.join(CONFLICT_POLICIES)}")
 
     safe_name = sanitize_group_name(group_name)
-    current = _get_group_tools(safe_name)
-    was_present = tool_name in current
-
-    if action == "enable":
-        if not was_present:
-            current.append(tool_name)
-            update_group_tools(safe_name, current)
-        return current, f"Tool '{tool_name}' {'enabled' if not was_present else 'already enabled'}", True
-
-    elif action == "disable":
-        if was_present:
-            current.remove(tool_name)
-            update_group_tools(safe_name, current)
-        return current, f"Tool '{tool_name}' {'disabled' if was_present else 'already disabled'}", False
-
-    elif action == "toggle":
-        if was_present:
-            current.remove(tool_name)
+    with group_locks.hold(safe_name):
+        group = get_group(safe_name)
+        if group is None:
+            raise ValueError(f"Group '{safe_name}' not found")
+        current = group.get("included_tools", [])
+        version = _remember_version(safe_name, group)
+        was_present = tool_name in current
+
+        if version_matches(if_match, version):
+            enable = not was_present if action == "toggle" else action == "enable"
+        elif policy == "reject":
+            raise VersionConflict(f"Group '{safe_name}' has changed (current version {version})", version)
+        elif action == "toggle":
+            base = next((tools for tools in (group_history.get(safe_name, v) for v in if_match)
+                         if tools is not None), None)
+            if base is None:
+                raise VersionConflict(
+                    f"Group '{safe_name}' has changed and version {', '.join(if_match)} is too old to merge",
+                    version
+                )
+            enable = tool_name not in base
+        else:
+            enable = action == "enable"
+
+        if enable != was_present:
+            tools = current + [tool_name] if enable else [t for t in current if t != tool_name]
+            result = update_group_tools(safe_name, tools)
+            current, version = result["tools"], result["version"]
+            message = f"Tool '{tool_name}' {'enabled' if enable else 'disabled'}"
         else:
-            current.append(tool_name)
-        update_group_tools(safe_name, current)
-        is_enabled = not was_present
-        return current, f"Tool '{tool_name}' {'enabled' if is_enabled else 'disabled'}", is_enabled
+            message = f"Tool '{tool_name}' {'already enabled' if enable else 'already disabled'}"
 
-    raise ValueError(f"Unknown action: {action}")
+    return current, message, enable, version
 
 
 # Backwards-compatible alias
-def _modify_tool_selection(tool_name, action):
+def _modify_tool_selection(tool_name, action, if_match=None, on_conflict=None):
     """Modify tool selection in default group (backwards compatibility)"""
-    return _modify_group_tool(DEFAULT_GROUP, tool_name, action)
+    return _modify_group_tool(DEFAULT_GROUP, tool_name, action, if_match, on_conflict)
 
 
 @app.route('/')
@@ -347,21 +618,203 @@ def index():
     return send_from_directory('.', 'index.html')
 
 
+def _encode_cursor(tool_name):
+    return base64.urlsafe_b64encode(tool_name.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor):
+    padded = cursor + "=" * (-len(cursor) % 4)
+    return base64.urlsafe_b64decode(padded.encode()).decode()
+
+
+def _pick_encoding():
+    """Choose a response encoding from Accept-Encoding (br > gzip > identity)"""
+    accepted = request.headers.get("Accept-Encoding", "")
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return "identity"
+
+
+def _cached_json_response(build_payload, version_seed):
+    """
+    Serve a JSON body with a strong ETag, conditional GET and compression.
+
+    Args:
+        build_payload: Callable producing the JSON-serializable body
+        version_seed: String that changes whenever the body would change
+
+    Returns:
+        Response: 304 if the client's copy is current, otherwise the body
+    """
+    encoding = _pick_encoding()
+    etag = hashlib.sha256(f"{version_seed}|{encoding}".encode()).hexdigest()[:32]
+
+    headers = {
+        "ETag": f'"{etag}"',
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding",
+    }
+
+    if request.if_none_match.contains(etag):
+        return Response(status=304, headers=headers)
+
+    with _encoded_cache_lock:
+        cached = _encoded_cache.get(etag)
+        if cached is not None:
+            _encoded_cache.move_to_end(etag)
+
+    if cached is None:
+        body = json.dumps(build_payload(), separators=(",", ":")).encode()
+        used = "identity"
+        if len(body) >= COMPRESS_MIN_BYTES:
+            if encoding == "br":
+                body, used = brotli.compress(body, quality=5), "br"
+            elif encoding == "gzip":
+                body, used = gzip.compress(body, compresslevel=6), "gzip"
+        cached = (body, used)
+        with _encoded_cache_lock:
+            _encoded_cache[etag] = cached
+            while len(_encoded_cache) > ENCODED_CACHE_SIZE:
+                _encoded_cache.popitem(last=False)
+
+    body, used = cached
+    if used != "identity":
+        headers["Content-Encoding"] = used
+    return Response(body, mimetype="application/json", headers=headers)
+
+
 @app.route('/api/tools', methods=['GET'])
 def api_get_tools():
-    """API endpoint to get all available tools"""
+    """
+    API endpoint to get all available tools, grouped by server.
+
+    Query params (all optional):
+        server: Comma-separated server names to include
+        fields: Comma-separated fields (name, description, enabled,
+            input_schema, tokens); default name, description, enabled
+        limit: Page size; enables cursor pagination
+        cursor: Opaque cursor from a previous page's next_cursor
+
+    Responses carry a strong ETag derived from the catalog version, so an
+    unchanged catalog answers If-None-Match with 304.
+    """
+    servers = {s for s in request.args.get('server', '').split(',') if s}
+    fields_arg = request.args.get('fields')
+    fields = DEFAULT_TOOL_FIELDS
+    if fields_arg:
+        fields = tuple(f for f in TOOL_FIELDS if f in fields_arg.split(',') or f == "name")
+        unknown = set(fields_arg.split(',')) - set(TOOL_FIELDS)
+        if unknown:
+            return jsonify({
+                "success": False,
+                "error": f"Unknown fields: {', '.join(sorted(unknown))}"
+            }), 400
+
+    limit = None
+    after = None
     try:
-        tools = get_all_tools()
-        return jsonify({
-            "success": True,
-            "servers": tools
-        })
+        if request.args.get('limit'):
+            limit = min(max(int(request.args['limit']), 1), 5000)
+        if request.args.get('cursor'):
+            after = _decode_cursor(request.args['cursor'])
+    except (ValueError, UnicodeDecodeError):
+        return jsonify({"success": False, "error": "Invalid limit or cursor"}), 400
+
+    try:
+        tools, version = catalog.snapshot()
     except Exception as e:
         return jsonify({
             "success": False,
             "error": str(e)
         }), 500
 
+    tokens = catalog.tool_tokens() if "tokens" in fields else {}
+
+    def build():
+        selected = sorted(
+            (t for t in tools if not servers or split_tool_name(t["name"]) in servers),
+            key=lambda t: t["name"]
+        )
+        start = 0
+        if after is not None:
+            start = bisect.bisect_right([t["name"] for t in selected], after)
+        page = selected[start:start + limit] if limit else selected[start:]
+
+        tools_by_server = {}
+        for tool in page:
+            entry = {"name": tool["name"]}
+            if "description" in fields:
+                entry["description"] = tool.get("description", "")
+            if "enabled" in fields:
+                entry["enabled"] = tool.get("enabled", True)
+            if "input_schema" in fields:
+                entry["input_schema"] = get_input_schema(tool)
+            if "tokens" in fields:
+                entry["tokens"] = tokens.get(tool["name"], 0)
+            tools_by_server.setdefault(split_tool_name(tool["name"]), []).append(entry)
+
+        payload = {"success": True, "version": version, "servers": tools_by_server}
+        if limit:
+            has_more = start + limit < len(selected)
+            payload["next_cursor"] = _encode_cursor(page[-1]["name"]) if has_more and page else None
+            payload["total"] = len(selected)
+        return payload
+
+    seed = "|".join([
+        version, ",".join(sorted(servers)), ",".join(fields),
+        str(limit), request.args.get('cursor', '')
+    ])
+    return _cached_json_response(build, seed)
+
+
+@app.route('/api/tools/search', methods=['GET'])
+def api_search_tools():
+    """
+    Search the tool catalog server-side.
+
+    Query params:
+        q: Search text (required)
+        mode: ranked (default) | prefix | fuzzy
+        server: Restrict to one server
+        offset, limit: Pagination (limit max 200)
+    """
+    query = request.args.get('q', '').strip()
+    mode = request.args.get('mode', 'ranked')
+    server = request.args.get('server') or None
+
+    if not query:
+        return jsonify({"success": False, "error": "Query parameter 'q' is required"}), 400
+    if mode not in SEARCH_MODES:
+        return jsonify({
+            "success": False,
+            "error": f"Invalid mode '{mode}' (expected one of: {', '.join(SEARCH_MODES)})"
+        }), 400
+
+    try:
+        offset = max(int(request.args.get('offset', 0)), 0)
+        limit = min(max(int(request.args.get('limit', 50)), 1), 200)
+    except ValueError:
+        return jsonify({"success": False, "error": "offset and limit must be integers"}), 400
+
+    try:
+        catalog.tools()  # Syncs the index if the catalog changed
+        total, results = catalog.index.search(
+            query, mode=mode, server=server, offset=offset, limit=limit
+        )
+        return jsonify({
+            "success": True,
+            "query": query,
+            "mode": mode,
+            "total": total,
+            "offset": offset,
+            "limit": limit,
+            "results": results
+        })
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
 
 @app.route('/api/update', methods=['POST'])
 def api_update_group():
@@ -376,13 +829,15 @@ def api_update_group():
                 "error": "Invalid tools format"
             }), 400
 
-        update_emcp_group(selected_tools)
+        result = update_emcp_group(selected_tools, *_conditional_write())
 
-        return jsonify({
+        return _with_etag(jsonify({
             "success": True,
-            "message": f"Updated eMCP group with {len(selected_tools)} tools",
-            "tools": selected_tools
-        })
+            "message": f"Updated eMCP group with {len(result['tools'])} tools",
+            "tools": result["tools"]
+        }), result["version"])
+    except VersionConflict as e:
+        return _conflict_response(e)
     except Exception as e:
         return jsonify({
             "success": False,
@@ -394,7 +849,16 @@ def api_update_group():
 def api_get_current():
     """API endpoint to get current eMCP group selection"""
     try:
-        return jsonify({"success": True, "group": DEFAULT_GROUP, "tools": _get_current_tools()})
+        group = get_group(DEFAULT_GROUP)
+        if group is None:
+            return jsonify({"success": True, "group": DEFAULT_GROUP, "tools": []})
+        version = _remember_version(DEFAULT_GROUP, group)
+        return _with_etag(jsonify({
+            "success": True,
+            "group": DEFAULT_GROUP,
+            "tools": group.get("included_tools", []),
+            "version": version
+        }), version)
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
@@ -520,6 +984,28 @@ def api_delete_preset():
 # Group API Endpoints
 # =============================================================================
 
+def _conditional_write():
+    """
+    If-Match versions and conflict policy of the current request.
+
+    Returns:
+        tuple: (if_match, on_conflict)
+    """
+    return parse_if_match(request.headers.get('If-Match')), request.args.get('on_conflict')
+
+
+def _with_etag(response, version):
+    """Attach a group version to a JSON response as its ETag."""
+    response.headers['ETag'] = f'"{version}"'
+    return response
+
+
+def _conflict_response(e):
+    """409 for a group write that lost a race."""
+    response = jsonify({"success": False, "error": str(e), "current_version": e.current_version})
+    return _with_etag(response, e.current_version) if e.current_version else response, 409
+
+
 @app.route('/api/groups', methods=['GET'])
 def api_list_groups():
     """API endpoint to list all available groups"""
@@ -536,15 +1022,29 @@ def api_list_groups():
 
 @app.route('/api/groups/<group_name>', methods=['GET'])
 def api_get_group(group_name):
-    """API endpoint to get a specific group's configuration"""
+    """
+    API endpoint to get a specific group's configuration.
+
+    Includes the group's estimated token footprint (description + input
+    schema of every included tool), broken down per server. The footprint
+    is omitted if the catalog is unreachable.
+    """
     try:
         group = get_group(group_name)
         if group is None:
             return jsonify({"success": False, "error": f"Group '{group_name}' not found"}), 404
-        return jsonify({
+
+        version = _remember_version(sanitize_group_name(group_name), group)
+        response = {
             "success": True,
-            "group": group
-        })
+            "group": group,
+            "version": version
+        }
+        try:
+            response["tokens"] = catalog.footprint(group.get("included_tools", []))
+        except requests.RequestException:
+            response["tokens"] = None
+        return _with_etag(jsonify(response), version)
     except ValueError as e:
         return jsonify({"success": False, "error": str(e)}), 400
     except Exception as e:
@@ -561,11 +1061,11 @@ def api_create_group(group_name):
 
         config = create_group(group_name, description=description, tools=tools)
 
-        return jsonify({
+        return _with_etag(jsonify({
             "success": True,
             "message": f"Group '{config['name']}' created",
             "group": config
-        }), 201
+        }), config["version"]), 201
     except ValueError as e:
         return jsonify({"success": False, "error": str(e)}), 400
     except Exception as e:
@@ -574,13 +1074,15 @@ def api_create_group(group_name):
 
 @app.route('/api/groups/<group_name>', methods=['DELETE'])
 def api_delete_group(group_name):
-    """API endpoint to delete a group"""
+    """API endpoint to delete a group (honors If-Match)"""
     try:
-        delete_group(group_name)
+        delete_group(group_name, if_match=parse_if_match(request.headers.get('If-Match')))
         return jsonify({
             "success": True,
             "message": f"Group '{group_name}' deleted"
         })
+    except VersionConflict as e:
+        return _conflict_response(e)
     except ValueError as e:
         return jsonify({"success": False, "error": str(e)}), 400
     except Exception as e:
@@ -595,8 +1097,16 @@ def api_delete_group(group_name):
 def api_get_group_tools(group_name):
     """API endpoint to get tools for a specific group"""
     try:
-        tools = _get_group_tools(group_name)
-        return jsonify({"success": True, "group": group_name, "tools": tools})
+        group = get_group(group_name)
+        if group is None:
+            return jsonify({"success": True, "group": group_name, "tools": []})
+        version = _remember_version(sanitize_group_name(group_name), group)
+        return _with_etag(jsonify({
+            "success": True,
+            "group": group_name,
+            "tools": group.get("included_tools", []),
+            "version": version
+        }), version)
     except ValueError as e:
         return jsonify({"success": False, "error": str(e)}), 400
     except Exception as e:
@@ -605,7 +1115,12 @@ def api_get_group_tools(group_name):
 
 @app.route('/api/groups/<group_name>/tools', methods=['POST'])
 def api_update_group_tools(group_name):
-    """API endpoint to update tools for a specific group"""
+    """
+    API endpoint to update tools for a specific group.
+
+    With If-Match, a write based on a stale version is merged into the
+    current tools or, with ?on_conflict=reject, refused with 409.
+    """
     try:
         data = request.get_json()
         selected_tools = data.get('tools', [])
@@ -613,14 +1128,19 @@ def api_update_group_tools(group_name):
         if not isinstance(selected_tools, list):
             return jsonify({"success": False, "error": "Invalid tools format"}), 400
 
-        update_group_tools(group_name, selected_tools)
+        if_match, on_conflict = _conditional_write()
+        result = update_group_tools(group_name, selected_tools, if_match, on_conflict)
 
-        return jsonify({
+        return _with_etag(jsonify({
             "success": True,
-            "message": f"Updated group '{group_name}' with {len(selected_tools)} tools",
+            "message": f"Updated group '{group_name}' with {len(result['tools'])} tools",
             "group": group_name,
-            "tools": selected_tools
-        })
+            "tools": result["tools"],
+            "version": result["version"],
+            "merged": result["merged"]
+        }), result["version"])
+    except VersionConflict as e:
+        return _conflict_response(e)
     except ValueError as e:
         return jsonify({"success": False, "error": str(e)}), 400
     except Exception as e:
@@ -632,8 +1152,13 @@ def api_enable_group_tool(group_name):
     """API endpoint to enable a tool in a specific group"""
     try:
         data = request.get_json()
-        tools, message, _ = _modify_group_tool(group_name, data.get('tool'), "enable")
-        return jsonify({"success": True, "message": message, "group": group_name, "tools": tools})
+        tools, message, _, version = _modify_group_tool(
+            group_name, data.get('tool'), "enable", *_conditional_write())
+        return _with_etag(jsonify({
+            "success": True, "message": message, "group": group_name, "tools": tools, "version": version
+        }), version)
+    except VersionConflict as e:
+        return _conflict_response(e)
     except ValueError as e:
         return jsonify({"success": False, "error": str(e)}), 400
     except Exception as e:
@@ -645,8 +1170,13 @@ def api_disable_group_tool(group_name):
     """API endpoint to disable a tool in a specific group"""
     try:
         data = request.get_json()
-        tools, message, _ = _modify_group_tool(group_name, data.get('tool'), "disable")
-        return jsonify({"success": True, "message": message, "group": group_name, "tools": tools})
+        tools, message, _, version = _modify_group_tool(
+            group_name, data.get('tool'), "disable", *_conditional_write())
+        return _with_etag(jsonify({
+            "success": True, "message": message, "group": group_name, "tools": tools, "version": version
+        }), version)
+    except VersionConflict as e:
+        return _conflict_response(e)
     except ValueError as e:
         return jsonify({"success": False, "error": str(e)}), 400
     except Exception as e:
@@ -658,13 +1188,193 @@ def api_toggle_group_tool(group_name):
     """API endpoint to toggle a tool in a specific group"""
     try:
         data = request.get_json()
-        tools, message, enabled = _modify_group_tool(group_name, data.get('tool'), "toggle")
-        return jsonify({
+        tools, message, enabled, version = _modify_group_tool(
+            group_name, data.get('tool'), "toggle", *_conditional_write())
+        return _with_etag(jsonify({
             "success": True,
             "message": message,
             "group": group_name,
             "tools": tools,
-            "enabled": enabled
+            "enabled": enabled,
+            "version": version
+        }), version)
+    except VersionConflict as e:
+        return _conflict_response(e)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@app.route('/api/groups/<group_name>/optimize', methods=['POST'])
+def api_optimize_group(group_name):
+    """
+    Compute a group tool selection that fits a token budget.
+
+    Input: {
+        "budget": 8000,
+        "candidates": "group" | "all" | ["tool", ...],   (default "group")
+        "must_keep": ["server__tool", ...],
+        "priorities": {"server__tool": 3, "server": 2, ...} | "usage",
+        "window": 604800,   (seconds of call history used by "usage")
+        "apply": false
+    }
+
+    With "priorities": "usage" each tool is valued by its recent call count,
+    so rarely used tools are the first to be dropped.
+
+    Returns the selection, its token total and a diff against the group's
+    current tools. With "apply": true the selection is written through
+    update_group_tools, and only if the group has not changed meanwhile
+    (409 otherwise).
+    """
+    try:
+        data = request.get_json() or {}
+        budget = data.get('budget')
+        if not isinstance(budget, int) or budget <= 0:
+            return jsonify({"success": False, "error": "budget must be a positive integer"}), 400
+
+        current = get_group(group_name)
+        if current is None:
+            return jsonify({"success": False, "error": f"Group '{group_name}' not found"}), 404
+        current_tools = current.get("included_tools", [])
+        current_version = _remember_version(sanitize_group_name(group_name), current)
+
+        tool_tokens = catalog.tool_tokens()
+        candidates = data.get('candidates', 'group')
+        if candidates == 'group':
+            candidates = current_tools
+        elif candidates == 'all':
+            candidates = list(tool_tokens)
+        elif not isinstance(candidates, list):
+            return jsonify({"success": False, "error": "Invalid candidates"}), 400
+
+        priorities = data.get('priorities', {})
+        if priorities == 'usage':
+            window = _parse_window(data.get('window'))
+            priorities = {
+                name: calls or COLD_TOOL_PRIORITY
+                for name, calls in usage.calls_in_window(candidates, window).items()
+            }
+        elif not isinstance(priorities, dict):
+            return jsonify({"success": False, "error": "Invalid priorities"}), 400
+
+        result = optimize_selection(
+            tool_tokens,
+            candidates,
+            budget,
+            must_keep=data.get('must_keep', []),
+            priorities=priorities
+        )
+
+        selected = result["selected"]
+        before = catalog.footprint(current_tools)["total"]
+        applied = False
+        if data.get('apply') and set(selected) != set(current_tools):
+            update_group_tools(group_name, selected, if_match=[current_version], on_conflict="reject")
+            applied = True
+
+        return jsonify({
+            "success": True,
+            "group": group_name,
+            "budget": budget,
+            "method": result["method"],
+            "elapsed_ms": result["elapsed_ms"],
+            "selected": selected,
+            "tokens": {"before": before, "after": result["total_tokens"]},
+            "diff": {
+                "added": sorted(set(selected) - set(current_tools)),
+                "removed": sorted(set(current_tools) - set(selected))
+            },
+            "applied": applied
+        })
+    except VersionConflict as e:
+        return _conflict_response(e)
+    except (ValueError, OptimizerError) as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+# =============================================================================
+# Usage Statistics Endpoints
+# =============================================================================
+
+def _parse_window(value):
+    """Parse a window in seconds (default: one week)."""
+    if value is None:
+        return DEFAULT_WINDOW
+    window = int(value)
+    if window <= 0:
+        raise ValueError("window must be a positive number of seconds")
+    return window
+
+
+@app.route('/api/usage', methods=['GET'])
+def api_get_usage():
+    """
+    Get tool call statistics parsed from the gateway logs.
+
+    Query params:
+        window: Seconds counted in calls_in_window (default one week)
+        server: Only include tools of this server
+    """
+    try:
+        window = _parse_window(request.args.get('window'))
+        server = request.args.get('server')
+        tools = usage.tools(window)
+        if server:
+            tools = {n: s for n, s in tools.items() if split_tool_name(n) == server}
+
+        return jsonify({
+            "success": True,
+            "window": window,
+            "tools": tools,
+            "groups": usage.groups(window),
+            "ingester": usage_ingester.status()
+        })
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@app.route('/api/groups/<group_name>/usage', methods=['GET'])
+def api_get_group_usage(group_name):
+    """
+    Get call statistics for a group's tools, including cold tools.
+
+    Cold tools are those with no calls within the window; their token cost
+    is what the group would save by dropping them.
+
+    Query params:
+        window: Seconds of history to consider (default one week)
+    """
+    try:
+        window = _parse_window(request.args.get('window'))
+        group = get_group(group_name)
+        if group is None:
+            return jsonify({"success": False, "error": f"Group '{group_name}' not found"}), 404
+
+        tools = group.get("included_tools", [])
+        stats = usage.tools(window, names=tools)
+        cold = sorted(n for n, s in stats.items() if s["calls_in_window"] == 0)
+
+        try:
+            tool_tokens = catalog.tool_tokens()
+        except requests.RequestException:
+            tool_tokens = {}
+        for name, entry in stats.items():
+            entry["tokens"] = tool_tokens.get(name)
+
+        return jsonify({
+            "success": True,
+            "group": group_name,
+            "window": window,
+            "tools": stats,
+            "cold_tools": cold,
+            "cold_tokens": sum(tool_tokens.get(n, 0) for n in cold),
+            "ingester": usage_ingester.status()
         })
     except ValueError as e:
         return jsonify({"success": False, "error": str(e)}), 400
@@ -681,8 +1391,11 @@ def api_enable_tool():
     """API endpoint to enable a specific tool in default group"""
     try:
         data = request.get_json()
-        tools, message, _ = _modify_tool_selection(data.get('tool'), "enable")
-        return jsonify({"success": True, "message": message, "tools": tools})
+        tools, message, _, version = _modify_tool_selection(
+            data.get('tool'), "enable", *_conditional_write())
+        return _with_etag(jsonify({"success": True, "message": message, "tools": tools}), version)
+    except VersionConflict as e:
+        return _conflict_response(e)
     except ValueError as e:
         return jsonify({"success": False, "error": str(e)}), 400
     except Exception as e:
@@ -694,8 +1407,11 @@ def api_disable_tool():
     """API endpoint to disable a specific tool"""
     try:
         data = request.get_json()
-        tools, message, _ = _modify_tool_selection(data.get('tool'), "disable")
-        return jsonify({"success": True, "message": message, "tools": tools})
+        tools, message, _, version = _modify_tool_selection(
+            data.get('tool'), "disable", *_conditional_write())
+        return _with_etag(jsonify({"success": True, "message": message, "tools": tools}), version)
+    except VersionConflict as e:
+        return _conflict_response(e)
     except ValueError as e:
         return jsonify({"success": False, "error": str(e)}), 400
     except Exception as e:
@@ -707,8 +1423,13 @@ def api_toggle_tool():
     """API endpoint to toggle a specific tool"""
     try:
         data = request.get_json()
-        tools, message, enabled = _modify_tool_selection(data.get('tool'), "toggle")
-        return jsonify({"success": True, "message": message, "tools": tools, "enabled": enabled})
+        tools, message, enabled, version = _modify_tool_selection(
+            data.get('tool'), "toggle", *_conditional_write())
+        return _with_etag(jsonify({
+            "success": True, "message": message, "tools": tools, "enabled": enabled
+        }), version)
+    except VersionConflict as e:
+        return _conflict_response(e)
     except ValueError as e:
         return jsonify({"success": False, "error": str(e)}), 400
     except Exception as e:
@@ -772,150 +1493,98 @@ def api_provision_server():
         "image": "docker-image:tag",
         "command": ["cmd", "args"],
         "env_vars": {"KEY": "value", ...},
-        "description": "optional description"
+        "description": "optional description",
+        "bake": false,
+        "limits": {"memory": "256m", "cpus": 0.5},
+        "host": "optional Docker host (default: most free capacity)",
+        "timeout": 900
     }
 
-    Pipeline:
-    1. Validate input
-    2. Pull docker image
-    3. Write env vars to .env
-    4. Add service to docker-compose.yaml (for persistence)
-    5. Start the container directly via docker socket
-    6. Wait for MCP server readiness (not just container running)
-    7. Register tools with MCPJungle
-    8. Verify tool discovery
-
-    Rolls back on failure at any step.
-    """
-    try:
-        data = request.get_json()
-
-        # --- Step 1: Validate input ---
-        name = data.get('name', '').strip()
-        image = data.get('image', '').strip()
-        command = data.get('command', [])
-        env_vars = data.get('env_vars', {})
-        description = data.get('description', '')
+    "timeout" is the overall deadline in seconds (default:
+    EMCP_PROVISION_DEADLINE). A run that passes it, or is cancelled with
+    POST /api/servers/<name>/cancel, stops its current step and rolls back
+    (504 and 409 respectively).
 
-        if not name:
-            return jsonify({"success": False, "error": "Server name is required"}), 400
-        if not image:
-            return jsonify({"success": False, "error": "Docker image is required"}), 400
+    "limits": "auto" derives the limits from usage sampled while a server
+    of the same name ran before; without enough samples the server is
+    provisioned without limits and a warning says so.
 
-        # Sanitize name
-        safe_name = "".join(c for c in name.lower() if c.isalnum() or c == '-').strip('-')
-        if not safe_name or len(safe_name) > 50:
-            return jsonify({"success": False, "error": "Invalid server name"}), 400
+    Runs the provisioner pipeline (pull, secrets, compose entry, config,
+    start, readiness, registration), rolling back on failure at any step,
+    then verifies tool discovery.
 
-        container_name = f"{safe_name}-mcp"
-
-        # Detect host paths in command for volume mounts
-        volumes = []
-        skip_paths = {'/dev/null', '/dev/stdin', '/dev/stdout', '/dev/stderr'}
-        for arg in command:
-            if arg.startswith('/') and not arg.startswith('//') and arg not in skip_paths:
-                volumes.append(f"{arg}:{arg}:rw")
-
-        # --- Step 2: Pull docker image ---
-        try:
-            pull_image(image)
-        except ComposeError as e:
-            return jsonify({"success": False, "error": str(e)}), 500
-
-        # --- Step 3: Write env vars to .env ---
-        env_var_names = []
-        if env_vars:
-            try:
-                env_var_names = write_env_vars(env_vars)
-            except Exception as e:
-                return jsonify({
-                    "success": False,
-                    "error": f"Failed to write env vars: {str(e)}"
-                }), 500
-
-        # --- Step 4: Add service to docker-compose.yaml ---
-        try:
-            add_service(
-                name=safe_name,
-                image=image,
-                command=command if command else [],
-                env_vars=env_var_names,
-                description=description,
-                volumes=volumes if volumes else None
-            )
-        except ComposeError as e:
-            return jsonify({
-                "success": False,
-                "error": f"Failed to add service: {str(e)}"
-            }), 500
+    With an Idempotency-Key header, a retry with the same key and body
+    returns the first response instead of provisioning again (see
+    idempotency); a retry while the first is running waits for it.
+    """
+    data = request.get_json(silent=True) or {}
+    key = request.headers.get(IDEMPOTENCY_HEADER)
+    if not key:
+        payload, status, _ = _run_provision(data)
+        return jsonify(payload), status
 
-        # --- Step 5: Create MCP config file ---
-        try:
-            create_mcp_config(
-                name=safe_name,
-                container_name=container_name,
-                command=command if command else ["stdio"],
-                description=description
-            )
-        except ComposeError as e:
-            remove_service(safe_name)  # Rollback step 4
-            return jsonify({
-                "success": False,
-                "error": f"Failed to create config: {str(e)}"
-            }), 500
+    try:
+        entry, owner = provision_keys.begin(key, request_hash(data))
+    except IdempotencyError as e:
+        return jsonify({"success": False, "error": str(e)}), e.status
+    if owner:
+        payload, status, retryable = _run_provision(data)
+        provision_keys.finish(key, entry, payload, status, retryable=retryable)
+        return jsonify(payload), status
+
+    replay = provision_keys.wait(entry)
+    if replay is None:
+        return jsonify({"success": False,
+                        "error": f"Request with {IDEMPOTENCY_HEADER} '{key}' is still in progress"}), 409
+    response = jsonify(replay[0])
+    response.headers[REPLAYED_HEADER] = "true"
+    return response, replay[1]
+
+
+def _run_provision(data: dict):
+    """
+    Run a provision request.
 
-        # --- Step 6: Start the container directly ---
+    Returns:
+        tuple: (response payload, status, retryable); retryable is True if
+        the run was cancelled or clashed with another run of the server
+    """
+    try:
+        warnings = []
         try:
-            start_service(
-                service_name=container_name,
-                image=image,
-                command=command if command else [],
-                env_vars=env_vars if env_vars else None,
-                volumes=volumes if volumes else None,
-                timeout=60
+            limits = data.get('limits')
+            if limits == "auto":
+                limits = resources.recommend(server_name(data.get('name', '')))
+                if limits is None:
+                    warnings.append("Not enough resource samples for automatic limits; "
+                                    "provisioned without limits.")
+                else:
+                    limits = {"memory": limits["memory"], "cpus": limits["cpus"]}
+
+            result = provision_server(
+                name=data.get('name', ''),
+                image=data.get('image', ''),
+                command=data.get('command', []),
+                env_vars=data.get('env_vars', {}),
+                description=data.get('description', ''),
+                bake=bool(data.get('bake', False)),
+                limits=limits,
+                host=data.get('host') or None,
+                timeout=data.get('timeout')
             )
-        except ComposeError as e:
-            delete_mcp_config(safe_name)  # Rollback step 5
-            remove_service(safe_name)      # Rollback step 4
-            return jsonify({
-                "success": False,
-                "error": f"Container failed to start: {str(e)}"
-            }), 500
-
-        # --- Step 7: Wait for MCP server readiness ---
-        mcp_ready = wait_for_mcp_ready(
-            container_name=container_name,
-            command=command if command else [],
-            timeout=90
-        )
+        except ProvisionError as e:
+            return {"success": False, "error": str(e)}, e.status, e.retryable
 
-        if not mcp_ready:
-            # Container is running but MCP server isn't responding.
-            # Don't roll back — the container might still come up.
-            # But warn the user clearly.
-            pass
-
-        # --- Step 8: Register with MCPJungle ---
-        register_result = exec_emcp(["register", "-c", f"/configs/{safe_name}.json"])
-        if register_result.returncode != 0:
-            error_msg = register_result.stderr.strip() or register_result.stdout.strip()
-            # Rollback everything
-            stop_service(container_name)
-            delete_mcp_config(safe_name)
-            remove_service(safe_name)
-            return jsonify({
-                "success": False,
-                "error": f"Failed to register with MCPJungle: {error_msg}"
-            }), 500
+        safe_name = result["name"]
+        container_name = result["container_name"]
+        health.invalidate()
 
         # --- Count discovered tools ---
         tool_count = 0
         try:
-            tools_response = requests.get(f"{MCPJUNGLE_API}/api/v0/tools", timeout=10)
-            if tools_response.ok:
-                all_tools = tools_response.json()
-                tool_count = len([t for t in all_tools
-                                  if t.get("name", "").startswith(f"{safe_name}__")])
+            all_tools = catalog.tools(refresh=True)
+            tool_count = len([t for t in all_tools
+                              if t.get("name", "").startswith(f"{safe_name}__")])
         except Exception:
             pass  # Tool count is informational
 
@@ -927,21 +1596,65 @@ def api_provision_server():
             "container_name": container_name,
             "container_running": True,
             "tool_count": tool_count,
+            "pull": {k: v for k, v in result["pull"].items() if k != "layers"},
+            "image": result["image"],
+            "secrets": {"provider": get_provider().name, "keys": result["env_var_names"]},
+            "limits": result["limits"],
+            "host": result["host"],
+            "placement": result["placement"],
+            "deduplicated": result["deduplicated"],
         }
+        if result["url"]:
+            response["url"] = result["url"]
 
-        if not mcp_ready:
-            response["warning"] = (
+        warnings.extend(result["warnings"])
+        if not result["mcp_ready"]:
+            warnings.append(
                 f"Container is running but MCP server did not respond to readiness check. "
                 f"Tools may still be loading. Check 'docker logs {container_name}'."
             )
+        if warnings:
+            response["warning"] = " ".join(warnings)
 
-        return jsonify(response)
+        return response, 200, False
 
     except Exception as e:
-        return jsonify({
+        return {
             "success": False,
             "error": f"Provisioning failed: {str(e)}"
-        }), 500
+        }, 500, False
+
+
+@app.route('/api/servers/pulls', methods=['GET'])
+def api_list_pulls():
+    """
+    Progress of in-flight image pulls.
+
+    Optional ?image= (and ?host= for a pull on another Docker host) narrows
+    the result to one image. Each entry reports per-layer bytes, layers
+    already present locally, and throughput.
+    """
+    image = request.args.get('image')
+    if image:
+        pull = get_pull_progress(image, host=request.args.get('host'))
+        if pull is None:
+            return jsonify({"success": False, "error": f"No pull in progress for '{image}'"}), 404
+        return jsonify({"success": True, "pull": pull})
+    return jsonify({"success": True, "pulls": get_pull_progress()})
+
+
+@app.route('/api/servers/<name>/cancel', methods=['POST'])
+def api_cancel_provision(name):
+    """
+    Cancel the provisioning of a server in progress.
+
+    The run stops its current step (killing its docker process or closing
+    its pull stream), rolls back, and answers the provision request with
+    409. Returns 202 once the cancel is requested.
+    """
+    if not cancel_provision(name):
+        return jsonify({"success": False, "error": f"No provisioning in progress for '{name}'"}), 404
+    return jsonify({"success": True, "message": f"Cancelling provisioning of '{name}'"}), 202
 
 
 @app.route('/api/servers', methods=['GET'])
@@ -954,48 +1667,33 @@ def api_list_servers():
     - container_name: Docker container name
     - running: Whether container is running
     - tool_count: Number of tools from this server
+    - health: Latest background probe results (see health_monitor)
+    - resources: Sampled CPU/memory/IO summary, null until first sampled
+
+    Served from the health monitor's cache; container states are re-listed
+    at most every EMCP_HEALTH_STATUS_TTL seconds, in a single call.
     """
     try:
-        servers = []
-
         # Get all tools to count per server
         tool_counts = {}
         try:
-            tools_response = requests.get(f"{MCPJUNGLE_API}/api/v0/tools", timeout=10)
-            if tools_response.ok:
-                for tool in tools_response.json():
-                    server_name = tool.get("name", "").split("__")[0]
-                    tool_counts[server_name] = tool_counts.get(server_name, 0) + 1
+            for tool in catalog.tools():
+                server_name = tool.get("name", "").split("__")[0]
+                tool_counts[server_name] = tool_counts.get(server_name, 0) + 1
         except Exception:
             pass
 
-        # Get servers from configs directory
-        configs_dir = "/configs"
-        if os.path.exists(configs_dir):
-            for filename in os.listdir(configs_dir):
-                if filename.endswith('.json'):
-                    config_path = os.path.join(configs_dir, filename)
-                    try:
-                        with open(config_path) as f:
-                            config = json.load(f)
-                            name = config.get("name", filename[:-5])
-                            container_name = f"{name}-mcp"
-
-                            status = get_container_status(container_name)
-                            servers.append({
-                                "name": name,
-                                "container_name": container_name,
-                                "description": config.get("description", ""),
-                                "running": status.get("running", False),
-                                "status": status.get("status", "unknown"),
-                                "tool_count": tool_counts.get(name, 0)
-                            })
-                    except Exception:
-                        continue
+        servers = health.servers()
+        usage_summaries = resources.summaries()
+        for server in servers:
+            server["tool_count"] = tool_counts.get(server["name"], 0)
+            server["resources"] = usage_summaries.get(server["name"])
 
         return jsonify({
             "success": True,
-            "servers": servers
+            "servers": servers,
+            "monitor": health.status(),
+            "sampler": resources.status()
         })
 
     except Exception as e:
@@ -1005,6 +1703,120 @@ def api_list_servers():
         }), 500
 
 
+@app.route('/api/hosts', methods=['GET'])
+def api_list_hosts():
+    """
+    Docker hosts servers can be placed on, with their free capacity.
+
+    Memory is reserved by each server's memory limit (or the placement
+    default); placement picks the reachable host with the most free memory.
+    """
+    try:
+        report = {entry["host"]: entry for entry in docker_hosts.capacity(host_reservations())}
+        return jsonify({
+            "success": True,
+            "hosts": [{**host.to_dict(), **report[host.name]} for host in docker_hosts.hosts()],
+        })
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@app.route('/api/gc', methods=['GET'])
+def api_gc_status():
+    """
+    Image and volume garbage collection: settings and the last sweep.
+
+    The report lists every unreferenced image and volume of a dynamic
+    server with its size and whether the policies remove it.
+    """
+    try:
+        return jsonify({"success": True, **collector.status(), "report": collector.report()})
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@app.route('/api/gc', methods=['POST'])
+def api_gc_sweep():
+    """
+    Start a garbage collection sweep in the background.
+
+    Input (optional): {"dry_run": false}
+
+    Returns 202 at once; GET /api/gc has the result when the sweep is done.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        started = collector.trigger(dry_run=bool(data.get('dry_run', False)))
+        if not started:
+            return jsonify({"success": False, "error": "A sweep is already running"}), 409
+        return jsonify({"success": True, "started": True}), 202
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@app.route('/api/servers/<name>/health', methods=['GET'])
+def api_server_health(name):
+    """
+    Health of one server with its recent probe results.
+
+    ?probe=1 runs a probe now instead of returning the cached state.
+    """
+    try:
+        server = health.server(name, probe=request.args.get('probe') in ('1', 'true'))
+        if server is None:
+            return jsonify({"success": False, "error": f"Server '{name}' not found"}), 404
+        return jsonify({"success": True, "server": server})
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@app.route('/api/servers/<name>/resources', methods=['GET'])
+def api_server_resources(name):
+    """
+    Sampled resource usage of one server with its history and the limits
+    recommended from it (null until enough samples were taken).
+    """
+    try:
+        summary = resources.summary(name, history=True)
+        if summary is None:
+            return jsonify({"success": False, "error": f"No resource samples for '{name}'"}), 404
+        return jsonify({"success": True, "name": name, "resources": summary,
+                        "recommended_limits": resources.recommend(name)})
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@app.route('/api/servers/<name>/limits', methods=['POST'])
+def api_set_server_limits(name):
+    """
+    Change the memory/CPU limits of a running server in place.
+
+    Input: {"memory": "512m", "cpus": 1.5} or {"auto": true}
+
+    Limits are applied to the container and persisted in
+    docker-compose.yaml. A limit left out is kept as it is.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        if data.get('auto'):
+            recommended = resources.recommend(name)
+            if recommended is None:
+                return jsonify({"success": False,
+                                "error": f"Not enough resource samples for '{name}' yet"}), 409
+            limits = {"memory": recommended["memory"], "cpus": recommended["cpus"]}
+        else:
+            limits = {key: data.get(key) for key in ("memory", "cpus")}
+
+        try:
+            applied = update_limits(name, limits)
+        except ComposeError as e:
+            status = 404 if "not found" in str(e) else 400
+            return jsonify({"success": False, "error": str(e)}), status
+        return jsonify({"success": True, "name": name, "limits": applied})
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
 @app.route('/api/servers/<name>', methods=['DELETE'])
 def api_delete_server(name):
     """
@@ -1017,20 +1829,12 @@ def api_delete_server(name):
     4. Remove from docker-compose.yaml
     """
     try:
-        container_name = f"{name}-mcp"
-
-        # Deregister from MCPJungle first
-        exec_emcp(["deregister", name])
-        # Ignore errors - server might not be registered
-
-        # Stop and remove the container directly
-        stop_service(container_name)
-
-        # Delete config file
-        delete_mcp_config(name)
-
-        # Remove from docker-compose.yaml
-        removed = remove_service(name)
+        removed = deprovision_server(name)
+        idle.forget(name)
+        catalog.invalidate()
+        health.invalidate()
+        # Refresh the reclaimable report; the policies decide what goes
+        collector.trigger()
 
         if not removed:
             return jsonify({
@@ -1053,36 +1857,37 @@ def api_delete_server(name):
 @app.route('/api/servers/<name>/restart', methods=['POST'])
 def api_restart_server(name):
     """
-    Restart an MCP server container.
+    Restart an MCP server container and wait until it answers again.
 
-    Uses docker restart directly (works via socket).
+    Input (optional): {"timeout": 90}
+
+    Returns once the server responds to an MCP initialize request and is
+    re-registered with MCPJungle (see rolling_restart), with the time it
+    took; 504 if it does not answer within the timeout.
     """
     try:
-        container_name = f"{name}-mcp"
-
-        result = subprocess.run(
-            ["docker", "restart", container_name],
-            capture_output=True,
-            text=True,
-            timeout=60
+        data = request.get_json(silent=True) or {}
+        timeout = float(data.get('timeout', RESTART_READY_TIMEOUT))
+        config = read_server_configs(CONFIGS_DIR).get(name)
+        # A container without a config is restarted but not probed
+        result = restart_server(
+            name, config or {"container": f"{name}-mcp", "command": None, "url": None},
+            host=server_host(name), ready_timeout=timeout, reregister=config is not None
         )
+        idle.forget(name)
+        health.invalidate()
+        catalog.invalidate()
 
-        if result.returncode == 0:
+        if result["status"] == "ready":
             return jsonify({
                 "success": True,
-                "message": f"Server '{name}' restarted"
+                "message": f"Server '{name}' restarted",
+                **result
             })
-        else:
-            return jsonify({
-                "success": False,
-                "error": result.stderr or "Failed to restart container"
-            }), 500
+        return jsonify({"success": False, **result}), 504 if result["status"] == "not_ready" else 500
 
-    except subprocess.TimeoutExpired:
-        return jsonify({
-            "success": False,
-            "error": "Timeout waiting for container to restart"
-        }), 500
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
     except Exception as e:
         return jsonify({
             "success": False,
@@ -1090,12 +1895,239 @@ def api_restart_server(name):
         }), 500
 
 
+@app.route('/api/servers/restart', methods=['POST'])
+def api_rolling_restart():
+    """
+    Restart many servers in batches, each gated on MCP readiness.
+
+    Input: {
+        "servers": "all" | "unhealthy" | ["name", ...],
+        "batch_size": 4,
+        "timeout": 90,
+        "stop_on_failure": true,
+        "dry_run": false
+    }
+
+    Batches never include every selected server, so some stay up while
+    the rest restart. A dry run only returns the batches.
+    """
+    try:
+        data = request.get_json() or {}
+        if 'servers' not in data:
+            return jsonify({"success": False, "error": "servers is required"}), 400
+        batch_size = int(data.get('batch_size', RESTART_BATCH_SIZE))
+        timeout = float(data.get('timeout', RESTART_READY_TIMEOUT))
+        if batch_size < 1 or timeout <= 0:
+            return jsonify({"success": False, "error": "batch_size and timeout must be positive"}), 400
+        servers = health.servers(max_age=0)
+        names, skipped = select_servers(data['servers'], servers)
+
+        if data.get('dry_run'):
+            size = batch_size_for(len(names), batch_size)
+            return jsonify({"success": True, "dry_run": True, "skipped": skipped, "batch_size": size,
+                            "batches": [names[i:i + size] for i in range(0, len(names), size)]})
+
+        if not _restart_lock.acquire(blocking=False):
+            return jsonify({"success": False, "error": "Another restart is in progress"}), 409
+        try:
+            hosts = {server["name"]: server["host"] for server in servers}
+            report = rolling_restart(
+                names, read_server_configs(CONFIGS_DIR),
+                hosts={name: hosts.get(name) or server_host(name) for name in names},
+                batch_size=batch_size, ready_timeout=timeout,
+                stop_on_failure=bool(data.get('stop_on_failure', True))
+            )
+        finally:
+            _restart_lock.release()
+            for name in names:
+                idle.forget(name)
+            health.invalidate()
+            catalog.invalidate()
+
+        return jsonify({
+            "success": all(server["status"] == "ready" for server in report["servers"]),
+            "dry_run": False,
+            "skipped": skipped,
+            **report
+        })
+    except RestartError as e:
+        return jsonify({"success": False, "error": str(e)}), e.status
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@app.route('/api/servers/<name>/wake', methods=['POST'])
+def api_wake_server(name):
+    """
+    Start a server stopped by the idle policy and wait until it answers.
+
+    Input (optional): {"timeout": 30}
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        result = idle.wake(name, trigger="manual", timeout=float(data.get('timeout', WAKE_TIMEOUT)))
+        health.invalidate()
+        return jsonify({"success": result["ready"], **result}), 200 if result["ready"] else 504
+    except IdleError as e:
+        return jsonify({"success": False, "error": str(e)}), e.status
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@app.route('/api/servers/idle', methods=['GET'])
+def api_idle_status():
+    """
+    Idle policy settings and the servers it has stopped.
+
+    ?candidates=1 also lists the running servers the next sweep would stop.
+    """
+    try:
+        status = idle.status()
+        if request.args.get('candidates') in ('1', 'true'):
+            status["candidates"] = idle.candidates()
+        return jsonify({"success": True, **status})
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@app.route('/api/servers/reconcile', methods=['POST'])
+def api_reconcile_servers():
+    """
+    Reconcile MCPJungle registrations with the configs directory.
+
+    Input: {"dry_run": false, "prune": true, "force": false}
+
+    Registers new configs, re-registers changed ones and deregisters servers
+    without a config, in parallel; unchanged servers are not touched unless
+    "force" is set.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        result = reconcile(
+            CONFIGS_DIR,
+            prune=data.get('prune', True),
+            dry_run=data.get('dry_run', False),
+            force=data.get('force', False)
+        )
+        if not result["dry_run"]:
+            catalog.invalidate()
+            health.invalidate()
+        return jsonify({"success": not result["failed"], **result})
+    except ReconcileError as e:
+        return jsonify({"success": False, "error": str(e)}), 502
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@app.route('/api/diagnostics', methods=['GET'])
+def api_diagnostics():
+    """
+    Run the troubleshooting checks concurrently and return a report.
+
+    Query params:
+        check: Comma-separated check names (default: all)
+        timeout: Seconds before unfinished checks report "timeout" (max 60)
+        fresh: 1 to probe every server instead of reusing health monitor results
+
+    Returns 200 with the report whatever the checks found; "status" is the
+    worst check status.
+    """
+    try:
+        checks = [c.strip() for c in request.args.get('check', '').split(',') if c.strip()]
+        timeout = min(max(float(request.args.get('timeout', DIAGNOSTICS_TIMEOUT)), 1), 60)
+        report = run_diagnostics(
+            checks or None,
+            timeout=timeout,
+            fresh=request.args.get('fresh') == '1',
+            configs_dir=CONFIGS_DIR,
+            groups_dir=GROUPS_DIR,
+            tools=lambda: catalog.tools(refresh=True),
+            health=health
+        )
+        return jsonify({"success": True, **report})
+    except (DiagnosticsError, ValueError) as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@app.route('/api/apply', methods=['POST'])
+def api_apply():
+    """
+    Apply a declarative spec of servers and groups.
+
+    Input: {
+        "spec": {"servers": {...}, "groups": {...}},
+        "dry_run": false,
+        "prune": false
+    }
+
+    Computes the minimal plan against the current compose file and group
+    files, then runs it as a dependency graph with independent steps in
+    parallel (see desired_state). A dry run only returns the plan.
+    """
+    try:
+        data = request.get_json() or {}
+        spec = validate_spec(data.get('spec'), group_name=sanitize_group_name)
+        prune = bool(data.get('prune', False))
+        dry_run = bool(data.get('dry_run', False))
+
+        if not _apply_lock.acquire(blocking=False):
+            return jsonify({"success": False, "error": "Another apply is in progress"}), 409
+        try:
+            groups = {name: get_group(name) for name in list_groups()}
+            servers = current_servers()
+            planned = plan_changes(spec, servers, groups, prune=prune,
+                                   protected_groups=(DEFAULT_GROUP,))
+            if dry_run:
+                return jsonify({"success": True, "dry_run": True, **planned})
+
+            def create(step):
+                catalog.invalidate()
+                group = spec["groups"][step["target"]]
+                config = create_group(step["target"], group["description"], group["tools"])
+                return {"version": config["version"]}
+
+            def update(step):
+                catalog.invalidate()
+                result = update_group_tools(step["target"], spec["groups"][step["target"]]["tools"])
+                return {"version": result["version"]}
+
+            def delete(step):
+                delete_group(step["target"])
+
+            started = time.perf_counter()
+            handlers = {**server_handlers(spec, servers), "create-group": create,
+                        "update-group": update, "delete-group": delete}
+            steps = execute_plan(planned["steps"], handlers)
+        finally:
+            _apply_lock.release()
+
+        if any(step["action"] in ("provision", "remove", "deprovision") for step in steps):
+            catalog.invalidate()
+            health.invalidate()
+
+        return jsonify({
+            "success": all(step["status"] == "ok" for step in steps),
+            "dry_run": False,
+            "steps": steps,
+            "unchanged": planned["unchanged"],
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)
+        })
+    except DesiredStateError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
 @app.route('/api/servers/secrets-status', methods=['GET'])
 def api_secrets_status():
     """Check secret management configuration."""
     return jsonify({
         "success": True,
-        "method": "infisical" if infisical_configured() else "env_file",
+        "method": get_provider().name,
         "infisical_configured": infisical_configured()
     })
 
@@ -1105,5 +2137,24 @@ if __name__ == '__main__':
     os.makedirs(GROUPS_DIR, exist_ok=True)
     os.makedirs(PRESETS_DIR, exist_ok=True)
 
+    # Follow gateway logs for tool usage statistics
+    if os.getenv("EMCP_USAGE_INGEST", "1") != "0":
+        usage_ingester.start()
+
+    # Probe registered servers and restart unhealthy ones
+    if os.getenv("EMCP_HEALTH_MONITOR", "1") != "0":
+        health.start()
+
+    # Stop idle servers (only with EMCP_IDLE_POLICY set)
+    idle.start()
+
+    # Sample container resource usage
+    if os.getenv("EMCP_RESOURCE_SAMPLER", "1") != "0":
+        resources.start()
+
+    # Reclaim unused images and volumes of dynamic servers
+    if os.getenv("EMCP_GC", "1") != "0":
+        collector.start()
+
     # Run Flask server
     app.run(host='0.0.0.0', port=5000, debug=False)
@@ -0,0 +1,8 @@
+"""
+eMCP Manager benchmarks.
+
+Run from the emcp-manager directory:
+
+    python -m bench.harness --scales 10,100,1000 --output baseline.json
+    python -m bench.harness --compare baseline.json
+"""
@@ -0,0 +1,670 @@
+"""
+Stand-ins for MCPJungle, Docker and Infisical
+
+In-process fakes with configurable latencies and catalog sizes, so the
+manager can be benchmarked without a gateway, a Docker daemon or any MCP
+servers:
+
+- FakeMCPJungle: HTTP server for /api/v0/tools and /api/v0/servers, plus the
+  state behind the `mcpjungle` CLI (register, deregister, create/update/delete
+  group)
+- FakeDocker: Docker Engine API subset on a unix socket (ping, info,
+  container create/inspect/list/stats/update, image pull stream, system df,
+  image and volume removal), which also
+  executes Docker CLI invocations forwarded by the `docker` shim written by
+  write_docker_shim(); several instances can stand in for a pool of hosts
+- FakeInfisical: the Infisical v3 raw secrets API (single and batch
+  get/create/update/delete, list), counting calls per endpoint so the
+  client's batching and caching can be checked (see bench.infisical_check)
+
+`docker exec <gateway> /mcpjungle ...` is routed to FakeMCPJungle; any other
+`docker exec -i` answers an MCP initialize request, which is what
+wait_for_mcp_ready() sends.
+"""
+
+import json
+import os
+import re
+import socketserver
+import stat
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+def _sleep_ms(ms: float) -> None:
+    if ms > 0:
+        time.sleep(ms / 1000)
+
+
+def _bench_server_config(name: str) -> dict:
+    """Registered definition matching the config BenchEnvironment writes."""
+    return {
+        "name": name,
+        "transport": "stdio",
+        "description": f"Dynamic MCP server: {name}",
+        "command": "docker",
+        "args": ["exec", "-i", f"{name}-mcp", "npx", "-y", f"@bench/{name}"],
+    }
+
+
+def make_tool(server: str, index: int) -> dict:
+    """A realistic-looking tool entry with a small input schema."""
+    return {
+        "name": f"{server}__tool_{index:04d}",
+        "description": f"Tool {index} of {server}: performs operation {index} on a resource",
+        "enabled": True,
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "path": {"type": "string", "description": "Resource path"},
+                "limit": {"type": "integer", "description": "Maximum results"},
+            },
+            "required": ["path"],
+        },
+    }
+
+
+class _JSONHandler(BaseHTTPRequestHandler):
+    """Base handler: quiet logging and JSON helpers."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def handle(self):
+        try:
+            super().handle()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # The client gave up (cancelled or timed out); nothing to report
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FakeMCPJungle:
+    """MCPJungle REST API and CLI state."""
+
+    def __init__(self, latency_ms: float = 0, cli_latency_ms: float = 0,
+                 tools_per_server: int = 5):
+        self.latency_ms = latency_ms
+        self.cli_latency_ms = cli_latency_ms
+        self.tools_per_server = tools_per_server
+        self.servers = {}   # name -> {"config": dict, "tools": [tool, ...]}
+        self.groups = {}    # name -> group config
+        self.calls = {"rest": 0, "cli": 0}
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def seed(self, server_count: int, tools_per_server: int = None) -> None:
+        """Replace the catalog with server_count servers of generated tools."""
+        per_server = tools_per_server or self.tools_per_server
+        with self._lock:
+            self.servers = {
+                f"bench{i:04d}": {
+                    "config": _bench_server_config(f"bench{i:04d}"),
+                    "tools": [make_tool(f"bench{i:04d}", t) for t in range(per_server)],
+                }
+                for i in range(server_count)
+            }
+            self.groups = {}
+
+    def tools(self) -> list[dict]:
+        with self._lock:
+            return [tool for server in self.servers.values() for tool in server["tools"]]
+
+    def cli(self, args: list[str], read_file) -> tuple[int, str, str]:
+        """
+        Execute a `mcpjungle` CLI invocation.
+
+        Args:
+            args: Arguments after /mcpjungle
+            read_file: Callable mapping a gateway-side path to parsed JSON
+
+        Returns:
+            tuple: (returncode, stdout, stderr)
+        """
+        _sleep_ms(self.cli_latency_ms)
+        with self._lock:
+            self.calls["cli"] += 1
+
+        def config_arg():
+            return read_file(args[args.index("-c") + 1])
+
+        try:
+            if args[:1] == ["register"]:
+                config = config_arg()
+                name = config["name"]
+                with self._lock:
+                    if name in self.servers:
+                        return 1, "", f"server {name} already exists"
+                    self.servers[name] = {
+                        "config": config,
+                        "tools": [make_tool(name, t) for t in range(self.tools_per_server)],
+                    }
+                return 0, f"Server {name} registered successfully\n", ""
+            if args[:1] == ["deregister"]:
+                with self._lock:
+                    if self.servers.pop(args[1], None) is None:
+                        return 1, "", f"server {args[1]} not found"
+                return 0, f"Server {args[1]} deregistered\n", ""
+            if args[:2] in (["create", "group"], ["update", "group"]):
+                config = config_arg()
+                with self._lock:
+                    exists = config["name"] in self.groups
+                    if args[0] == "create" and exists:
+                        return 1, "", f"group {config['name']} already exists"
+                    if args[0] == "update" and not exists:
+                        return 1, "", f"group {config['name']} not found"
+                    self.groups[config["name"]] = config
+                return 0, f"Group {config['name']} {args[0]}d\n", ""
+            if args[:2] == ["delete", "group"]:
+                with self._lock:
+                    self.groups.pop(args[2], None)
+                return 0, "", ""
+            if args[:2] == ["list", "tools"]:
+                return 0, "\n".join(t["name"] for t in self.tools()) + "\n", ""
+        except (OSError, ValueError, KeyError, IndexError) as e:
+            return 1, "", f"Error: {e}"
+        return 1, "", f"unknown command: {' '.join(args)}"
+
+    def start(self, host: str = "127.0.0.1", port: int = 0) -> "FakeMCPJungle":
+        fake = self
+
+        class Handler(_JSONHandler):
+            def do_GET(self):
+                _sleep_ms(fake.latency_ms)
+                with fake._lock:
+                    fake.calls["rest"] += 1
+                path = urlparse(self.path).path
+                if path == "/api/v0/tools":
+                    self._send_json(fake.tools())
+                elif path == "/api/v0/servers":
+                    with fake._lock:
+                        self._send_json([s["config"] for s in fake.servers.values()])
+                elif path == "/health":
+                    self._send_json({"status": "ok"})
+                else:
+                    self._send_json({"error": "not found"}, 404)
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+
+class FakeInfisical:
+    """Infisical v3 raw secrets API, with per-endpoint call counts."""
+
+    ENDPOINTS = ("get", "list", "create", "update", "delete", "batch_create", "batch_update")
+
+    def __init__(self, token: str = "bench-token", latency_ms: float = 0):
+        self.token = token
+        self.latency_ms = latency_ms
+        self.secrets = {}   # (path, key) -> value
+        self.calls = dict.fromkeys(self.ENDPOINTS, 0)
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def reset_calls(self) -> None:
+        with self._lock:
+            self.calls = dict.fromkeys(self.ENDPOINTS, 0)
+
+    def _handle(self, method: str, path: str, query: dict, body: dict):
+        """Returns (status, payload)."""
+        secret_path = body.get("secretPath") or (query.get("secretPath") or ["/"])[0]
+        match = re.match(r"^/api/v3/secrets/raw/([^/]+)$", path)
+        with self._lock:
+            if path == "/api/v3/secrets/batch/raw" and method in ("POST", "PATCH"):
+                items = body.get("secrets") or []
+                keys = [(secret_path, item["secretKey"]) for item in items]
+                if method == "POST":
+                    self.calls["batch_create"] += 1
+                    if any(key in self.secrets for key in keys):
+                        return 400, {"message": "Secret already exists"}
+                else:
+                    self.calls["batch_update"] += 1
+                    if any(key not in self.secrets for key in keys):
+                        return 404, {"message": "Secret not found"}
+                for key, item in zip(keys, items):
+                    self.secrets[key] = item["secretValue"]
+                return 200, {"secrets": items}
+            if path == "/api/v3/secrets/raw" and method == "GET":
+                self.calls["list"] += 1
+                return 200, {"secrets": [{"secretKey": k, "secretValue": v}
+                                         for (p, k), v in self.secrets.items() if p == secret_path]}
+            if not match:
+                return 404, {"message": "not found"}
+            key = (secret_path, match.group(1))
+            if method == "GET":
+                self.calls["get"] += 1
+                if key not in self.secrets:
+                    return 404, {"message": "Secret not found"}
+                return 200, {"secret": {"secretKey": key[1], "secretValue": self.secrets[key]}}
+            if method == "POST":
+                self.calls["create"] += 1
+                if key in self.secrets:
+                    return 400, {"message": "Secret already exists"}
+                self.secrets[key] = body.get("secretValue")
+                return 200, {}
+            if method == "PATCH":
+                self.calls["update"] += 1
+                if key not in self.secrets:
+                    return 404, {"message": "Secret not found"}
+                self.secrets[key] = body.get("secretValue")
+                return 200, {}
+            if method == "DELETE":
+                self.calls["delete"] += 1
+                if self.secrets.pop(key, None) is None:
+                    return 404, {"message": "Secret not found"}
+                return 200, {}
+        return 405, {"message": "method not allowed"}
+
+    def start(self, host: str = "127.0.0.1", port: int = 0) -> "FakeInfisical":
+        fake = self
+
+        class Handler(_JSONHandler):
+            def _dispatch(self):
+                _sleep_ms(fake.latency_ms)
+                body = self._body()
+                if self.headers.get("Authorization") != f"Bearer {fake.token}":
+                    self._send_json({"message": "unauthorized"}, 401)
+                    return
+                url = urlparse(self.path)
+                status, payload = fake._handle(self.command, url.path, parse_qs(url.query),
+                                               json.loads(body) if body else {})
+                self._send_json(payload, status)
+
+            do_GET = do_POST = do_PATCH = do_DELETE = _dispatch
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+
+class _UnixHTTPServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+class FakeDocker:
+    """Docker Engine API subset and Docker CLI executor sharing one state."""
+
+    def __init__(self, socket_path: str, gateway: FakeMCPJungle = None,
+                 gateway_container: str = "emcp-server", path_map: dict = None,
+                 cli_latency_ms: float = 0, api_latency_ms: float = 0,
+                 memory_total: int = 16 << 30):
+        self.socket_path = socket_path
+        self.memory_total = memory_total
+        self.gateway = gateway
+        self.gateway_container = gateway_container
+        self.path_map = path_map or {}
+        self.cli_latency_ms = cli_latency_ms
+        self.api_latency_ms = api_latency_ms
+        self.containers = {}  # name -> {"status", "image", "labels"}
+        self.images = set()
+        self.volumes = {}  # name -> size in bytes
+        self.image_size = 200 << 20
+        self.calls = {"cli": 0, "api": 0}
+        self._lock = threading.Lock()
+        self._server = None
+
+    def seed(self, names: list[str], image: str = "node:22-slim") -> None:
+        """Replace state with running containers of the given names."""
+        with self._lock:
+            self.containers = {
+                name: {"status": "running", "image": image, "labels": {}} for name in names
+            }
+            self.images = {image}
+
+    def read_gateway_file(self, path: str):
+        """Read a JSON file by its path inside the gateway container."""
+        for prefix, local in self.path_map.items():
+            if path.startswith(prefix.rstrip("/") + "/"):
+                path = os.path.join(local, path[len(prefix.rstrip("/")) + 1:])
+                break
+        with open(path, "r") as f:
+            return json.load(f)
+
+    # -- Docker CLI ---------------------------------------------------------
+
+    def cli(self, args: list[str], stdin: str = "") -> tuple[int, str, str]:
+        """Execute a docker CLI invocation; returns (returncode, stdout, stderr)."""
+        _sleep_ms(self.cli_latency_ms)
+        with self._lock:
+            self.calls["cli"] += 1
+        if not args:
+            return 1, "", "usage: docker COMMAND"
+
+        command, rest = args[0], args[1:]
+        handler = getattr(self, f"_cli_{command}", None)
+        if handler is None:
+            return 1, "", f"docker: '{command}' is not supported by the fake"
+        return handler(rest, stdin)
+
+    def _cli_inspect(self, args, stdin):
+        name = args[-1]
+        with self._lock:
+            container = self.containers.get(name)
+        if container is None:
+            return 1, "[]\n", f"Error: No such object: {name}\n"
+        if "--format" in args:
+            return 0, f"{container['status']}\n", ""
+        return 0, json.dumps([{"Name": name, "State": {"Status": container["status"]}}]), ""
+
+    def _cli_images(self, args, stdin):
+        image = args[-1]
+        with self._lock:
+            present = image in self.images
+        return 0, ("sha256:fake\n" if present else ""), ""
+
+    def _cli_pull(self, args, stdin):
+        with self._lock:
+            self.images.add(args[-1])
+        return 0, f"Pulled {args[-1]}\n", ""
+
+    def _cli_create(self, args, stdin):
+        name = args[args.index("--name") + 1]
+        with self._lock:
+            if name in self.containers:
+                return 1, "", f"Conflict. The container name \"/{name}\" is already in use\n"
+            self.containers[name] = {"status": "created", "image": "", "labels": {}}
+        return 0, "fakeid\n", ""
+
+    def _set_status(self, name, status, exit_code=None):
+        with self._lock:
+            if name not in self.containers:
+                return 1, "", f"Error: No such container: {name}\n"
+            self.containers[name]["status"] = status
+            self.containers[name]["exit_code"] = exit_code
+        return 0, f"{name}\n", ""
+
+    def _cli_start(self, args, stdin):
+        return self._set_status(args[-1], "running")
+
+    def _cli_restart(self, args, stdin):
+        return self._set_status(args[-1], "running")
+
+    def _cli_stop(self, args, stdin):
+        return self._set_status(args[-1], "exited", exit_code=143)
+
+    def _cli_rm(self, args, stdin):
+        name = args[-1]
+        with self._lock:
+            removed = self.containers.pop(name, None)
+        if removed is None:
+            return 1, "", f"Error: No such container: {name}\n"
+        return 0, f"{name}\n", ""
+
+    def _cli_build(self, args, stdin):
+        with self._lock:
+            self.images.add(args[args.index("-t") + 1])
+        return 0, "", ""
+
+    def _cli_exec(self, args, stdin):
+        flags = []
+        while args and args[0].startswith("-"):
+            flags.append(args.pop(0))
+        if not args:
+            return 1, "", "exec requires a container"
+        name, command = args[0], args[1:]
+
+        if name == self.gateway_container and command[:1] == ["/mcpjungle"] and self.gateway:
+            return self.gateway.cli(command[1:], self.read_gateway_file)
+
+        with self._lock:
+            container = self.containers.get(name)
+        if container is None or container["status"] != "running":
+            return 1, "", f"Error: container {name} is not running\n"
+        if '"initialize"' in stdin:
+            request_id = 1
+            match = re.search(r'"id"\s*:\s*(\d+)', stdin)
+            if match:
+                request_id = int(match.group(1))
+            return 0, json.dumps({
+                "jsonrpc": "2.0", "id": request_id,
+                "result": {"protocolVersion": "2024-11-05", "capabilities": {"tools": {}},
+                           "serverInfo": {"name": name, "version": "0.0.0"}},
+            }) + "\n", ""
+        return 0, "", ""
+
+    # -- Engine API ---------------------------------------------------------
+
+    def start(self) -> "FakeDocker":
+        fake = self
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+        class Handler(_JSONHandler):
+            def address_string(self):
+                return "fake-docker"
+
+            def _route(self, method):
+                _sleep_ms(fake.api_latency_ms)
+                with fake._lock:
+                    fake.calls["api"] += 1
+                parsed = urlparse(self.path)
+                # Strip the /v1.xx version prefix
+                path = re.sub(r"^/v\d+\.\d+", "", parsed.path)
+                query = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+                body = self._body()
+
+                if path == "/_ping":
+                    return self._send_text("OK")
+                if path == "/info" and method == "GET":
+                    return self._send_json({"MemTotal": fake.memory_total, "NCPU": 8,
+                                            "ServerVersion": "fake"})
+                if path == "/_fake/cli" and method == "POST":
+                    request = json.loads(body or b"{}")
+                    code, out, err = fake.cli(request.get("args", []), request.get("stdin", ""))
+                    return self._send_json({"returncode": code, "stdout": out, "stderr": err})
+                if path == "/containers/json" and method == "GET":
+                    with fake._lock:
+                        listing = [
+                            {"Names": [f"/{n}"], "State": c["status"], "Image": c["image"],
+                             "Status": "Up 1 minute" if c["status"] == "running"
+                             else f"Exited ({c.get('exit_code') or 0}) 1 minute ago",
+                             "Labels": c["labels"], "Ports": c.get("ports", [])}
+                            for n, c in fake.containers.items()
+                        ]
+                    return self._send_json(listing)
+                if path == "/containers/create" and method == "POST":
+                    spec = json.loads(body or b"{}")
+                    name = query.get("name", f"fake{len(fake.containers)}")
+                    with fake._lock:
+                        if name in fake.containers:
+                            return self._send_json({"message": f"Conflict: {name} in use"}, 409)
+                        bindings = (spec.get("HostConfig") or {}).get("PortBindings") or {}
+                        volumes = [bind.split(":", 1)[0] for bind in (spec.get("HostConfig") or {}).get("Binds") or []
+                                   if not bind.startswith("/")]
+                        for volume in volumes:
+                            fake.volumes.setdefault(volume, 1 << 20)
+                        fake.containers[name] = {
+                            "status": "created", "image": spec.get("Image", ""),
+                            "labels": spec.get("Labels") or {}, "cmd": spec.get("Cmd") or [],
+                            "ports": [{"IP": "0.0.0.0", "PublicPort": int(binding["HostPort"]),
+                                       "PrivatePort": int(private.split("/")[0]), "Type": "tcp"}
+                                      for private, bound in bindings.items() for binding in bound],
+                            "volumes": volumes,
+                        }
+                    return self._send_json({"Id": name, "Warnings": []}, 201)
+                match = re.match(r"^/containers/([^/]+)/json$", path)
+                if match and method == "GET":
+                    with fake._lock:
+                        container = fake.containers.get(match.group(1))
+                    if container is None:
+                        return self._send_json({"message": "No such container"}, 404)
+                    return self._send_json({
+                        "Name": f"/{match.group(1)}",
+                        "State": {"Status": container["status"],
+                                  "Running": container["status"] == "running"},
+                        "Config": {"Tty": True, "Image": container["image"],
+                                   "Labels": container["labels"]},
+                    })
+                match = re.match(r"^/containers/([^/]+)/(stats|update)$", path)
+                if match:
+                    with fake._lock:
+                        container = fake.containers.get(match.group(1))
+                        if container is None:
+                            return self._send_json({"message": "No such container"}, 404)
+                        if match.group(2) == "update":
+                            container["limits"] = json.loads(body or b"{}")
+                            return self._send_json({"Warnings": []})
+                        # Synthetic counters: ~5% of one CPU, memory growing slowly
+                        reads = container["stats_reads"] = container.get("stats_reads", 0) + 1
+                    return self._send_json({
+                        "cpu_stats": {"cpu_usage": {"total_usage": reads * 50_000_000},
+                                      "system_cpu_usage": reads * 1_000_000_000, "online_cpus": 1},
+                        "memory_stats": {"usage": (40 << 20) + reads * (1 << 20),
+                                         "limit": (container.get("limits") or {}).get("Memory") or (8 << 30),
+                                         "stats": {"inactive_file": 4 << 20}},
+                        "networks": {"eth0": {"rx_bytes": reads * 2048, "tx_bytes": reads * 1024}},
+                        "blkio_stats": {"io_service_bytes_recursive": []},
+                    })
+                if path == "/system/df" and method == "GET":
+                    with fake._lock:
+                        mounted = [v for c in fake.containers.values() for v in c.get("volumes", [])]
+                        return self._send_json({
+                            "Images": [{"Id": f"sha256:{abs(hash(image)):x}", "RepoTags": [image],
+                                        "Size": fake.image_size, "SharedSize": 0, "Labels": {},
+                                        "Created": 0} for image in fake.images],
+                            "Volumes": [{"Name": name, "UsageData": {"Size": size, "RefCount": mounted.count(name)}}
+                                        for name, size in fake.volumes.items()],
+                            "Containers": [{"Names": [f"/{n}"], "Image": c["image"],
+                                            "ImageID": f"sha256:{abs(hash(c['image'])):x}", "Labels": c["labels"],
+                                            "Mounts": [{"Type": "volume", "Name": v} for v in c.get("volumes", [])]}
+                                           for n, c in fake.containers.items()],
+                        })
+                match = re.match(r"^/(images|volumes)/(.+)$", path)
+                if match and method == "DELETE":
+                    kind, ref = match.groups()
+                    with fake._lock:
+                        store = fake.images if kind == "images" else fake.volumes
+                        if ref not in store:
+                            return self._send_json({"message": f"No such {kind[:-1]}: {ref}"}, 404)
+                        in_use = any(c["image"] == ref if kind == "images" else ref in c.get("volumes", [])
+                                     for c in fake.containers.values())
+                        if in_use:
+                            return self._send_json({"message": f"conflict: {ref} is in use"}, 409)
+                        if kind == "images":
+                            store.discard(ref)
+                        else:
+                            store.pop(ref)
+                    return self._send_json([{"Deleted": ref}])
+                if path == "/images/create" and method == "POST":
+                    image = f"{query.get('fromImage')}:{query.get('tag', 'latest')}"
+                    with fake._lock:
+                        fake.images.add(image)
+                    events = [
+                        {"status": f"Pulling from {query.get('fromImage')}", "id": query.get("tag")},
+                        {"status": "Downloading", "id": "layer1",
+                         "progressDetail": {"current": 1024, "total": 1024}},
+                        {"status": "Pull complete", "id": "layer1"},
+                        {"status": f"Status: Downloaded newer image for {image}"},
+                    ]
+                    return self._send_stream(events)
+                return self._send_json({"message": f"fake docker: unsupported {method} {path}"}, 404)
+
+            def _send_text(self, text):
+                body = text.encode()
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _send_stream(self, events):
+                body = b"".join(json.dumps(e).encode() + b"\r\n" for e in events)
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                self._route("GET")
+
+            def do_POST(self):
+                self._route("POST")
+
+            def do_DELETE(self):
+                self._route("DELETE")
+
+        self._server = _UnixHTTPServer(self.socket_path, Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+
+_SHIM = '''#!{python} -S
+# Fake docker CLI: forwards the invocation to the bench FakeDocker server.
+import json, os, socket, sys
+
+# Only `exec -i` and `build -` consume stdin; anything else must not block on it
+wants_stdin = "-i" in sys.argv[1:3] or sys.argv[-1] == "-"
+stdin = sys.stdin.read() if wants_stdin and sys.stdin is not None else ""
+payload = json.dumps({{"args": sys.argv[1:], "stdin": stdin}}).encode()
+sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+# Several fakes stand in for a pool of hosts: follow DOCKER_HOST like the real CLI
+host = os.environ.get("DOCKER_HOST", "")
+sock.connect(host[len("unix://"):] if host.startswith("unix://") else {socket_path!r})
+sock.sendall(b"POST /_fake/cli HTTP/1.0\\r\\nContent-Type: application/json\\r\\n"
+             + b"Content-Length: " + str(len(payload)).encode() + b"\\r\\n\\r\\n" + payload)
+raw = b""
+while True:
+    chunk = sock.recv(65536)
+    if not chunk:
+        break
+    raw += chunk
+result = json.loads(raw.split(b"\\r\\n\\r\\n", 1)[1])
+sys.stdout.write(result["stdout"])
+sys.stderr.write(result["stderr"])
+sys.exit(result["returncode"])
+'''
+
+
+def write_docker_shim(bin_dir: str, socket_path: str) -> str:
+    """Write an executable `docker` into bin_dir that talks to FakeDocker."""
+    os.makedirs(bin_dir, exist_ok=True)
+    path = os.path.join(bin_dir, "docker")
+    with open(path, "w") as f:
+        f.write(_SHIM.format(python=sys.executable, socket_path=socket_path))
+    os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    return path
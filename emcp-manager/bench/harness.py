@@ -0,0 +1,300 @@
+"""
+Benchmark Harness
+
+Drives the manager's hot paths against the stand-ins in bench.fakes at
+several scales and records latency statistics to JSON, so a later run can
+be compared against a saved baseline.
+
+Each scale N seeds N servers (configs, compose services and running
+containers) with N x --tools-per-server tools in the catalog, then times:
+
+- api_list_servers      GET /api/servers
+- api_get_tools         GET /api/tools (warm catalog cache)
+- api_get_tools_cold    GET /api/tools after invalidating the catalog
+- group_toggle          POST /api/groups/<group>/tools/toggle
+- add_remove_service    compose_manager.add_service + remove_service
+- wait_for_mcp_ready    readiness probe of a running server
+
+Everything runs in one process against a temporary directory; nothing
+touches Docker, the gateway or the real compose file.
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from bench.fakes import FakeDocker, FakeMCPJungle, write_docker_shim
+
+REPO_COMPOSE_FILE = os.path.join(os.path.dirname(__file__), "..", "..", "docker-compose.yaml")
+
+DEFAULT_SCALES = (10, 100, 1000)
+BENCH_GROUP = "bench"
+
+
+def summarize(samples: list[float]) -> dict:
+    """Latency statistics in milliseconds."""
+    ordered = sorted(samples)
+
+    def pct(q):
+        return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+    return {
+        "iterations": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "p50_ms": round(pct(0.50) * 1000, 3),
+        "p95_ms": round(pct(0.95) * 1000, 3),
+        "min_ms": round(ordered[0] * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+def measure(operation, min_iterations: int, max_iterations: int, budget: float,
+            setup=None) -> dict:
+    """
+    Time an operation repeatedly.
+
+    Runs one untimed warm-up, then at least min_iterations and at most
+    max_iterations timed runs, stopping early once budget seconds are spent.
+    """
+    if setup:
+        setup()
+    operation()
+
+    samples = []
+    started = time.perf_counter()
+    while len(samples) < max_iterations:
+        if setup:
+            setup()
+        t0 = time.perf_counter()
+        operation()
+        samples.append(time.perf_counter() - t0)
+        if len(samples) >= min_iterations and time.perf_counter() - started >= budget:
+            break
+    return summarize(samples)
+
+
+class BenchEnvironment:
+    """Temporary compose/config/group directories wired to the fakes."""
+
+    def __init__(self, gateway_latency_ms=0.0, gateway_cli_latency_ms=0.0,
+                 docker_cli_latency_ms=0.0, docker_api_latency_ms=0.0, tools_per_server=5):
+        self.root = tempfile.mkdtemp(prefix="emcp-bench-")
+        self.compose_dir = os.path.join(self.root, "emcp")
+        self.configs_dir = os.path.join(self.root, "configs")
+        self.groups_dir = os.path.join(self.root, "groups")
+        self.socket_path = os.path.join(self.root, "docker.sock")
+        self.tools_per_server = tools_per_server
+
+        self.gateway = FakeMCPJungle(
+            latency_ms=gateway_latency_ms,
+            cli_latency_ms=gateway_cli_latency_ms,
+            tools_per_server=tools_per_server,
+        ).start()
+        self.docker = FakeDocker(
+            self.socket_path,
+            gateway=self.gateway,
+            path_map={"/configs": self.configs_dir, "/groups": self.groups_dir},
+            cli_latency_ms=docker_cli_latency_ms,
+            api_latency_ms=docker_api_latency_ms,
+        ).start()
+        bin_dir = os.path.join(self.root, "bin")
+        write_docker_shim(bin_dir, self.socket_path)
+
+        # Manager modules read these at import time
+        os.environ.update({
+            "PATH": bin_dir + os.pathsep + os.environ.get("PATH", ""),
+            "DOCKER_HOST": f"unix://{self.socket_path}",
+            "MCPJUNGLE_API": self.gateway.url,
+            "COMPOSE_DIR": self.compose_dir,
+            "CONFIGS_DIR": self.configs_dir,
+            "GROUPS_DIR": self.groups_dir,
+            "EMCP_SECRETS_DIR": os.path.join(self.compose_dir, "secrets"),
+            "EMCP_USAGE_INGEST": "0",
+            "EMCP_USAGE_FILE": "",
+            "EMCP_IDLE_STATE_FILE": "",
+            "EMCP_GC_STATE_FILE": "",
+        })
+        os.environ.pop("INFISICAL_TOKEN", None)
+        os.environ.pop("EMCP_DOCKER_HOSTS", None)
+
+        import app
+        import compose_manager
+        self.app = app
+        self.compose = compose_manager
+        self.client = app.app.test_client()
+
+    def seed(self, scale: int) -> None:
+        """Reset all state to `scale` provisioned, running servers."""
+        for path in (self.compose_dir, self.configs_dir, self.groups_dir):
+            shutil.rmtree(path, ignore_errors=True)
+            os.makedirs(path)
+        os.makedirs(os.path.join(self.groups_dir, "presets"))
+        shutil.copy(REPO_COMPOSE_FILE, os.path.join(self.compose_dir, "docker-compose.yaml"))
+
+        names = [f"bench{i:04d}" for i in range(scale)]
+        self.gateway.seed(scale, self.tools_per_server)
+        self.docker.seed([f"{name}-mcp" for name in names] + ["emcp-server"])
+
+        # Compose services written in one save; add_service() per server
+        # would make seeding quadratic in the scale
+        data = self.compose.load_compose()
+        for name in names:
+            data["services"][f"{name}-mcp"] = {
+                "image": "node:22-slim",
+                "container_name": f"{name}-mcp",
+                "command": ["npx", "-y", f"@bench/{name}"],
+                "stdin_open": True,
+                "tty": True,
+                "labels": {self.compose.DYNAMIC_LABEL: "true",
+                           "emcp.description": f"Dynamic MCP server: {name}"},
+            }
+            self.compose.create_mcp_config(name, f"{name}-mcp", ["npx", "-y", f"@bench/{name}"])
+        self.compose.save_compose(data)
+
+        tools = [tool["name"] for tool in self.gateway.tools()][:max(scale, 1)]
+        with open(os.path.join(self.groups_dir, f"{BENCH_GROUP}.json"), "w") as f:
+            json.dump({"name": BENCH_GROUP, "description": "bench", "included_tools": tools}, f)
+        self.gateway.groups[BENCH_GROUP] = {"name": BENCH_GROUP, "included_tools": tools}
+        self.app.catalog.invalidate()
+
+    def close(self) -> None:
+        self.docker.stop()
+        self.gateway.stop()
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+def _check(response):
+    if response.status_code >= 400:
+        raise RuntimeError(f"{response.request.path} -> {response.status_code}: "
+                           f"{response.get_data(as_text=True)[:200]}")
+    return response
+
+
+def run_scale(env: BenchEnvironment, scale: int, args) -> dict:
+    """Run every benchmark at one scale."""
+    env.seed(scale)
+    client = env.client
+    results = {}
+
+    def timed(name, operation, setup=None, max_iterations=args.max_iterations):
+        results[name] = measure(operation, args.min_iterations, max_iterations,
+                                args.budget, setup=setup)
+        print(f"  {name:<22} p50 {results[name]['p50_ms']:>10.3f} ms  "
+              f"p95 {results[name]['p95_ms']:>10.3f} ms  n={results[name]['iterations']}",
+              flush=True)
+
+    timed("api_list_servers", lambda: _check(client.get("/api/servers")))
+    timed("api_get_tools", lambda: _check(client.get("/api/tools")))
+    timed("api_get_tools_cold", lambda: _check(client.get("/api/tools")),
+          setup=env.app.catalog.invalidate)
+
+    toggle_tool = env.gateway.tools()[0]["name"]
+    timed("group_toggle", lambda: _check(client.post(
+        f"/api/groups/{BENCH_GROUP}/tools/toggle", json={"tool": toggle_tool})))
+
+    def add_remove():
+        env.compose.add_service("benchextra", "node:22-slim", ["npx", "-y", "@bench/extra"], [])
+        env.compose.remove_service("benchextra")
+
+    timed("add_remove_service", add_remove)
+
+    container = "bench0000-mcp"
+    timed("wait_for_mcp_ready", lambda: env.compose.wait_for_mcp_ready(
+        container, ["npx", "-y", "@bench/bench0000"], timeout=9))
+
+    return results
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list[str]:
+    """
+    List regressions: benchmarks whose p50 grew by more than threshold
+    (a fraction, e.g. 0.25 = 25%) relative to the baseline.
+    """
+    regressions = []
+    for scale, benches in current["results"].items():
+        for name, stats in benches.items():
+            base = baseline.get("results", {}).get(scale, {}).get(name)
+            if not base or not base["p50_ms"]:
+                continue
+            ratio = stats["p50_ms"] / base["p50_ms"]
+            marker = "REGRESSION" if ratio > 1 + threshold else ""
+            print(f"  {scale:>5} {name:<22} {base['p50_ms']:>10.3f} -> "
+                  f"{stats['p50_ms']:>10.3f} ms  x{ratio:.2f} {marker}")
+            if marker:
+                regressions.append(f"{name} at scale {scale}: x{ratio:.2f}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark eMCP manager hot paths")
+    parser.add_argument("--scales", default=",".join(map(str, DEFAULT_SCALES)),
+                        help="Comma-separated server counts (default: 10,100,1000)")
+    parser.add_argument("--tools-per-server", type=int, default=5)
+    parser.add_argument("--gateway-latency-ms", type=float, default=0.0,
+                        help="Added latency of each MCPJungle REST call")
+    parser.add_argument("--gateway-cli-latency-ms", type=float, default=0.0,
+                        help="Added latency of each mcpjungle CLI call")
+    parser.add_argument("--docker-cli-latency-ms", type=float, default=0.0,
+                        help="Added latency of each docker CLI call")
+    parser.add_argument("--docker-api-latency-ms", type=float, default=0.0,
+                        help="Added latency of each Docker Engine API call")
+    parser.add_argument("--min-iterations", type=int, default=3)
+    parser.add_argument("--max-iterations", type=int, default=50)
+    parser.add_argument("--budget", type=float, default=2.0,
+                        help="Seconds per benchmark before stopping early")
+    parser.add_argument("--output", help="Write results JSON to this file")
+    parser.add_argument("--compare", help="Baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="Allowed p50 slowdown before flagging a regression")
+    args = parser.parse_args(argv)
+
+    scales = [int(s) for s in args.scales.split(",") if s.strip()]
+    env = BenchEnvironment(
+        gateway_latency_ms=args.gateway_latency_ms,
+        gateway_cli_latency_ms=args.gateway_cli_latency_ms,
+        docker_cli_latency_ms=args.docker_cli_latency_ms,
+        docker_api_latency_ms=args.docker_api_latency_ms,
+        tools_per_server=args.tools_per_server,
+    )
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "settings": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        },
+        "results": {},
+    }
+    try:
+        for scale in scales:
+            print(f"scale {scale}: {scale} servers, {scale * args.tools_per_server} tools", flush=True)
+            report["results"][str(scale)] = run_scale(env, scale, args)
+    finally:
+        env.close()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"Compared with {args.compare}:")
+        regressions = compare(baseline, report, args.threshold)
+        if regressions:
+            print("Regressions:\n  " + "\n  ".join(regressions))
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
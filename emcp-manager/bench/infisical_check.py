@@ -0,0 +1,121 @@
+"""
+Infisical Client Check
+
+Exercises infisical_client against the FakeInfisical stand-in and checks
+the call counts behind its batching and caching:
+
+- batch create of new keys, and the create-then-update fallback when some
+  keys already exist
+- batch get served by one list call, then entirely from cache
+- batch update, and invalidation of the written keys
+- TTL expiry of cached values and of cached misses (negative caching)
+
+Prints one line per check and exits non-zero if any fails.
+
+    python -m bench.infisical_check
+"""
+
+import argparse
+import sys
+import time
+
+import infisical_client as client
+from bench.fakes import FakeInfisical
+
+PATH = "/emcp/bench"
+
+
+class _Checks:
+    def __init__(self, fake: FakeInfisical):
+        self.fake = fake
+        self.failed = 0
+
+    def calls(self, operation) -> dict:
+        """Run operation; returns (its result, the non-zero calls it made)."""
+        self.fake.reset_calls()
+        result = operation()
+        return result, {name: count for name, count in self.fake.calls.items() if count}
+
+    def expect(self, label: str, actual, expected) -> None:
+        ok = actual == expected
+        self.failed += not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {label}" + ("" if ok else f": expected {expected!r}, got {actual!r}"))
+
+
+def run(checks: _Checks, ttl: float) -> None:
+    fake = checks.fake
+
+    _, calls = checks.calls(lambda: client.create_secrets({"A": "1", "B": "2"}, PATH))
+    checks.expect("create_secrets with new keys is one batch create", calls, {"batch_create": 1})
+
+    _, calls = checks.calls(lambda: client.create_secrets({"A": "10", "C": "3"}, PATH))
+    checks.expect("create_secrets with an existing key creates the new and updates the existing",
+                  calls, {"batch_create": 2, "list": 1, "batch_update": 1})
+    checks.expect("stored values", {k: v for (p, k), v in fake.secrets.items() if p == PATH},
+                  {"A": "10", "B": "2", "C": "3"})
+
+    values, calls = checks.calls(lambda: client.get_secrets(["A", "B", "C"], PATH))
+    checks.expect("get_secrets after writes returns the new values", values, {"A": "10", "B": "2", "C": "3"})
+    checks.expect("get_secrets of uncached keys is one list call", calls, {"list": 1})
+
+    _, calls = checks.calls(lambda: client.get_secrets(["A", "B", "C"], PATH))
+    checks.expect("get_secrets of cached keys makes no call", calls, {})
+
+    _, calls = checks.calls(lambda: client.update_secrets({"B": "20"}, PATH))
+    checks.expect("update_secrets is one batch update", calls, {"batch_update": 1})
+    value, calls = checks.calls(lambda: client.get_secret("B", PATH))
+    checks.expect("a written key is refetched", (value, calls), ("20", {"get": 1}))
+
+    value, calls = checks.calls(lambda: client.get_secret("MISSING", PATH))
+    checks.expect("a missing key is fetched once", (value, calls), (None, {"get": 1}))
+    value, calls = checks.calls(lambda: client.get_secret("MISSING", PATH))
+    checks.expect("a missing key is then served from the negative cache", (value, calls), (None, {}))
+    fake.secrets[(PATH, "MISSING")] = "late"
+    value, calls = checks.calls(lambda: client.get_secret("MISSING", PATH))
+    checks.expect("a cached miss holds until its TTL passes", (value, calls), (None, {}))
+
+    fake.secrets[(PATH, "A")] = "changed elsewhere"
+    value, calls = checks.calls(lambda: client.get_secret("A", PATH))
+    checks.expect("a cached value holds until its TTL passes", (value, calls), ("10", {}))
+
+    time.sleep(ttl * 1.5)
+    value, calls = checks.calls(lambda: client.get_secret("A", PATH))
+    checks.expect("an expired value is refetched", (value, calls), ("changed elsewhere", {"get": 1}))
+    value, calls = checks.calls(lambda: client.get_secret("MISSING", PATH))
+    checks.expect("an expired miss is refetched", (value, calls), ("late", {"get": 1}))
+
+    _, calls = checks.calls(lambda: client.create_secret("A", "11", PATH))
+    value, more = checks.calls(lambda: client.get_secret("A", PATH))
+    checks.expect("create_secret on an existing key updates it and invalidates the cache",
+                  (calls, value, more), ({"create": 1, "update": 1}, "11", {"get": 1}))
+
+    client.delete_secret("C", PATH)
+    value, calls = checks.calls(lambda: client.get_secret("C", PATH))
+    checks.expect("delete_secret invalidates the cache", (value, calls), (None, {"get": 1}))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Check infisical_client against a local Infisical stand-in")
+    parser.add_argument("--ttl", type=float, default=0.5,
+                        help="Cache and negative cache TTL in seconds used for the check")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Added latency of each API call")
+    args = parser.parse_args(argv)
+
+    fake = FakeInfisical(latency_ms=args.latency_ms).start()
+    client.INFISICAL_API_URL = fake.url
+    client.INFISICAL_TOKEN = fake.token
+    client.INFISICAL_WORKSPACE_ID = "bench-workspace"
+    client.CACHE_TTL = client.NEGATIVE_CACHE_TTL = args.ttl
+    client.invalidate_cache()
+    checks = _Checks(fake)
+    try:
+        run(checks, args.ttl)
+    finally:
+        fake.stop()
+
+    print(f"\n{checks.failed} failed" if checks.failed else "\nAll checks passed")
+    return 1 if checks.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,259 @@
+"""
+Load Generator
+
+Runs the manager on a real threaded HTTP server against the bench.fakes
+stand-ins and drives it with many concurrent clients:
+
+- UI sessions: load a group and the tool list, then enable/disable tools in
+  that group (each session owns a distinct set of tools)
+- automation clients: list servers, check the current selection and, with
+  --provision, provision and delete servers end to end
+
+Reports p50/p95/p99 latency, throughput and error rate per endpoint, and
+checks for lost updates: every session knows the final state it wrote for
+its own tools, so any tool whose membership in the group file disagrees
+was overwritten by a concurrent read-modify-write.
+
+    python -m bench.load --ui-sessions 32 --groups 4 --duration 30
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+
+import requests
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+from bench.harness import BenchEnvironment
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+def _percentile(ordered: list[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+class Recorder:
+    """Thread-safe per-endpoint latency and error collection."""
+
+    def __init__(self):
+        self._samples = defaultdict(list)
+        self._errors = defaultdict(int)
+        self._error_examples = {}
+        self._lock = threading.Lock()
+
+    def call(self, session: requests.Session, label: str, method: str, url: str, **kwargs):
+        """Perform a request, recording latency under label. Returns the response or None."""
+        started = time.perf_counter()
+        response, error = None, None
+        try:
+            response = session.request(method, url, timeout=120, **kwargs)
+            if response.status_code >= 400:
+                error = f"HTTP {response.status_code}: {response.text[:120]}"
+        except requests.RequestException as e:
+            error = str(e)
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self._samples[label].append(elapsed)
+            if error:
+                self._errors[label] += 1
+                self._error_examples.setdefault(label, error)
+        return None if error else response
+
+    def report(self, duration: float) -> dict:
+        with self._lock:
+            labels = sorted(self._samples)
+            result = {}
+            for label in labels:
+                ordered = sorted(self._samples[label])
+                count = len(ordered)
+                result[label] = {
+                    "requests": count,
+                    "errors": self._errors[label],
+                    "error_rate": round(self._errors[label] / count, 4) if count else 0.0,
+                    "throughput_rps": round(count / duration, 2) if duration else 0.0,
+                    "p50_ms": round(_percentile(ordered, 0.50) * 1000, 2),
+                    "p95_ms": round(_percentile(ordered, 0.95) * 1000, 2),
+                    "p99_ms": round(_percentile(ordered, 0.99) * 1000, 2),
+                }
+                if label in self._error_examples:
+                    result[label]["first_error"] = self._error_examples[label]
+            return result
+
+
+def ui_session(base: str, recorder: Recorder, group: str, tools: list[str],
+               expected: dict, stop: threading.Event, think: float) -> None:
+    """Simulated browser: view the group, then flip its own tools on and off."""
+    session = requests.Session()
+    rng = random.Random()
+    recorder.call(session, "GET /api/tools", "GET", f"{base}/api/tools",
+                  params={"fields": "name,description,tokens"})
+    while not stop.is_set():
+        recorder.call(session, "GET /api/groups/<name>", "GET", f"{base}/api/groups/{group}")
+        tool = rng.choice(tools)
+        action = "disable" if expected[tool] else "enable"
+        response = recorder.call(session, f"POST /api/groups/<name>/tools/{action}", "POST",
+                                 f"{base}/api/groups/{group}/tools/{action}", json={"tool": tool})
+        if response is not None:
+            expected[tool] = action == "enable"
+        if think:
+            stop.wait(rng.uniform(0, 2 * think))
+
+
+def automation_client(base: str, recorder: Recorder, index: int, provision: bool,
+                      stop: threading.Event, think: float) -> None:
+    """Scripted client: poll servers and, optionally, provision/delete one."""
+    session = requests.Session()
+    rng = random.Random()
+    cycle = 0
+    while not stop.is_set():
+        recorder.call(session, "GET /api/servers", "GET", f"{base}/api/servers")
+        recorder.call(session, "GET /api/current", "GET", f"{base}/api/current")
+        if provision:
+            name = f"load{index}x{cycle}"
+            created = recorder.call(session, "POST /api/servers/provision", "POST",
+                                    f"{base}/api/servers/provision", json={
+                                        "name": name,
+                                        "image": "node:22-slim",
+                                        "command": ["npx", "-y", f"@load/{name}"],
+                                    })
+            if created is not None:
+                recorder.call(session, "DELETE /api/servers/<name>", "DELETE",
+                              f"{base}/api/servers/{name}")
+            cycle += 1
+        if think:
+            stop.wait(rng.uniform(0, 2 * think))
+
+
+def check_lost_updates(env: BenchEnvironment, expectations: dict) -> dict:
+    """Compare each group's file with what its sessions last wrote."""
+    lost = {}
+    for group, sessions in expectations.items():
+        expected = {tool: enabled for session in sessions for tool, enabled in session.items()}
+        with open(os.path.join(env.groups_dir, f"{group}.json")) as f:
+            included = set(json.load(f).get("included_tools", []))
+        mismatched = sorted(t for t, enabled in expected.items() if (t in included) != enabled)
+        lost[group] = {"tools_tracked": len(expected), "lost_updates": len(mismatched),
+                       "examples": mismatched[:5]}
+    return lost
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Concurrent load test for the eMCP manager")
+    parser.add_argument("--scale", type=int, default=100, help="Seeded servers (default 100)")
+    parser.add_argument("--tools-per-server", type=int, default=5)
+    parser.add_argument("--groups", type=int, default=4, help="Groups toggled concurrently")
+    parser.add_argument("--ui-sessions", type=int, default=16)
+    parser.add_argument("--tools-per-session", type=int, default=4)
+    parser.add_argument("--automation-clients", type=int, default=2)
+    parser.add_argument("--provision", action="store_true",
+                        help="Automation clients also provision and delete servers")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds of load")
+    parser.add_argument("--think-ms", type=float, default=0.0,
+                        help="Mean pause between a client's actions")
+    parser.add_argument("--gateway-latency-ms", type=float, default=0.0)
+    parser.add_argument("--gateway-cli-latency-ms", type=float, default=0.0)
+    parser.add_argument("--docker-cli-latency-ms", type=float, default=0.0)
+    parser.add_argument("--docker-api-latency-ms", type=float, default=0.0)
+    parser.add_argument("--output", help="Write the report JSON to this file")
+    args = parser.parse_args(argv)
+
+    env = BenchEnvironment(
+        gateway_latency_ms=args.gateway_latency_ms,
+        gateway_cli_latency_ms=args.gateway_cli_latency_ms,
+        docker_cli_latency_ms=args.docker_cli_latency_ms,
+        docker_api_latency_ms=args.docker_api_latency_ms,
+        tools_per_server=args.tools_per_server,
+    )
+    server = None
+    try:
+        env.seed(args.scale)
+        all_tools = [tool["name"] for tool in env.gateway.tools()]
+        needed = args.ui_sessions * args.tools_per_session
+        if needed > len(all_tools):
+            parser.error(f"{needed} session tools requested but the catalog has {len(all_tools)}")
+
+        # Groups start empty of the tools sessions will flip
+        groups = [f"load{g}" for g in range(args.groups)]
+        for group in groups:
+            config = {"name": group, "description": "load test", "included_tools": []}
+            with open(os.path.join(env.groups_dir, f"{group}.json"), "w") as f:
+                json.dump(config, f)
+            env.gateway.groups[group] = config
+
+        server = make_server("127.0.0.1", 0, env.app.app, threaded=True,
+                             request_handler=_QuietHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{server.server_port}"
+
+        recorder = Recorder()
+        stop = threading.Event()
+        think = args.think_ms / 1000
+        expectations = {group: [] for group in groups}
+        threads = []
+        for i in range(args.ui_sessions):
+            group = groups[i % len(groups)]
+            tools = all_tools[i * args.tools_per_session:(i + 1) * args.tools_per_session]
+            expected = {tool: False for tool in tools}
+            expectations[group].append(expected)
+            threads.append(threading.Thread(
+                target=ui_session, args=(base, recorder, group, tools, expected, stop, think)))
+        for i in range(args.automation_clients):
+            threads.append(threading.Thread(
+                target=automation_client, args=(base, recorder, i, args.provision, stop, think)))
+
+        print(f"{len(threads)} clients for {args.duration:.0f}s against {args.scale} servers, "
+              f"{len(all_tools)} tools, {len(groups)} groups", flush=True)
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        time.sleep(args.duration)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        report = {
+            "settings": {k: v for k, v in vars(args).items() if k != "output"},
+            "duration_s": round(elapsed, 2),
+            "endpoints": recorder.report(elapsed),
+            "groups": check_lost_updates(env, expectations),
+        }
+    finally:
+        if server:
+            server.shutdown()
+        env.close()
+
+    print(f"\n{'endpoint':<44} {'reqs':>6} {'err%':>6} {'rps':>8} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for label, stats in report["endpoints"].items():
+        print(f"{label:<44} {stats['requests']:>6} {stats['error_rate'] * 100:>5.1f}% "
+              f"{stats['throughput_rps']:>8.1f} {stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f} "
+              f"{stats['p99_ms']:>9.1f}")
+        if "first_error" in stats:
+            print(f"    first error: {stats['first_error']}")
+    lost_total = sum(g["lost_updates"] for g in report["groups"].values())
+    print(f"\nLost updates: {lost_total}")
+    for group, stats in report["groups"].items():
+        if stats["lost_updates"]:
+            print(f"  {group}: {stats['lost_updates']}/{stats['tools_tracked']} "
+                  f"(e.g. {', '.join(stats['examples'])})")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,19 +7,32 @@ Uses ruamel.yaml to preserve comments and formatting.
 Container orchestration is handled directly via the Docker socket.
 The manager container has the socket mounted, so it can create/start/stop
 containers without needing systemd or docker-compose CLI on the host.
+Container functions take an optional host from the Docker host pool (see
+docker_hosts); without one they act on the local daemon.
 """
 
 import os
 import re
+import shlex
 import shutil
 import json
 import subprocess
+import tempfile
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 
+import requests
 from ruamel.yaml import YAML
 
+import docker_api
+import docker_hosts
+from deadline import Deadline, DeadlineExceeded
+from deadline import run as run_process
+from metrics import DOCKER_COMMAND_SECONDS
+
 # Configuration
 COMPOSE_DIR = os.getenv("COMPOSE_DIR", "/emcp")
 COMPOSE_FILE = os.path.join(COMPOSE_DIR, "docker-compose.yaml")
@@ -30,6 +43,36 @@ NETWORK_NAME = os.getenv("EMCP_NETWORK", "emcp_emcp-network")
 
 # Label used to identify dynamically added services
 DYNAMIC_LABEL = "emcp.dynamic"
+# Label naming the Docker host (see docker_hosts) a server runs on
+HOST_LABEL = "emcp.host"
+# Compose error for a secret variable left unset (see add_service require_env)
+REQUIRED_ENV_MESSAGE = "secret kept in Infisical - run compose under infisical run"
+
+# Shared, persistent package cache for npm/bun based servers. Every dynamic
+# server running a package runner mounts the same volume, so packages are
+# downloaded once per host rather than on every container start or exec.
+PACKAGE_CACHE_VOLUME = os.getenv("EMCP_PACKAGE_CACHE_VOLUME", "emcp_package-cache")
+PACKAGE_CACHE_MOUNT = "/cache"
+PACKAGE_CACHE_ENV = {
+    "npm_config_cache": f"{PACKAGE_CACHE_MOUNT}/npm",
+    "npm_config_prefer_offline": "true",
+    "BUN_INSTALL_CACHE_DIR": f"{PACKAGE_CACHE_MOUNT}/bun",
+}
+PACKAGE_RUNNERS = {"npx", "bunx"}
+
+# Readiness probes (wait_for_mcp_ready) back off from the first to the last
+# interval, in seconds
+READY_POLL_INITIAL = 0.25
+READY_POLL_MAX = 3.0
+
+# Repository for images built by bake_image()
+BAKED_IMAGE_REPO = "emcp-baked"
+
+# Serializes read-modify-write of the compose file (and its temp file)
+_compose_lock = threading.RLock()
+
+# Last read-only parse of the compose file: ((inode, mtime_ns, size), data)
+_compose_cache = {}
 
 
 class ComposeError(Exception):
@@ -46,24 +89,65 @@ def _get_yaml():
     return yaml
 
 
-def _run_docker(args, timeout=60):
+def _run_docker(args, timeout=60, input=None, host=None, deadline=None):
     """
     Run a docker command via the mounted socket.
 
     Args:
         args: List of arguments after 'docker'
         timeout: Timeout in seconds
+        input: Optional text written to the command's stdin
+        host: Docker host name from the pool (default: local)
+        deadline: Optional Deadline of the calling operation; the command is
+            killed when it passes or is cancelled
 
     Returns:
         subprocess.CompletedProcess
+
+    Raises:
+        subprocess.TimeoutExpired: If the command runs past timeout
+        DeadlineExceeded: If the deadline passes or is cancelled first
     """
     cmd = ["docker"] + args
-    return subprocess.run(
-        cmd,
-        capture_output=True,
-        text=True,
-        timeout=timeout
-    )
+    env = None
+    if host and host != docker_hosts.LOCAL_HOST:
+        env = {**os.environ, "DOCKER_HOST": docker_hosts.get_host(host).url}
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        result = run_process(cmd, timeout=timeout, input=input, env=env, deadline=deadline)
+        if result.returncode == 0:
+            outcome = "ok"
+        return result
+    finally:
+        DOCKER_COMMAND_SECONDS.observe(
+            time.perf_counter() - started,
+            subcommand=args[0] if args else "", outcome=outcome
+        )
+
+
+def uses_package_runner(command: list[str]) -> bool:
+    """Check whether a server command fetches its package at runtime (npx/bunx)."""
+    return bool(command) and os.path.basename(command[0]) in PACKAGE_RUNNERS
+
+
+def get_runner_package(command: list[str]):
+    """
+    Extract the package a runner command executes.
+
+    Examples:
+        ["npx", "-y", "@org/server", "/data"] -> "@org/server"
+        ["bunx", "some-mcp"] -> "some-mcp"
+
+    Returns:
+        str or None: Package spec, or None if the command has no runner
+    """
+    if not uses_package_runner(command):
+        return None
+    for arg in command[1:]:
+        if not arg.startswith("-"):
+            return arg
+    return None
 
 
 # ---------------------------------------------------------------------------
@@ -92,23 +176,36 @@ def backup_compose_file() -> str:
     return backup_path
 
 
-def load_compose() -> dict:
+def load_compose(read_only: bool = False) -> dict:
     """
     Load and parse the docker-compose.yaml file.
 
+    Args:
+        read_only: Use the much faster safe loader, cached until the file
+            changes. The result is shared between callers: do not modify
+            it or save it back.
+
     Returns:
         dict: Parsed compose configuration
 
     Raises:
         ComposeError: If file cannot be read or parsed
     """
-    yaml = _get_yaml()
+    yaml = YAML(typ="safe") if read_only else _get_yaml()
 
     try:
+        if read_only:
+            stat = os.stat(COMPOSE_FILE)
+            key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            cached = _compose_cache.get("parsed")
+            if cached and cached[0] == key:
+                return cached[1]
         with open(COMPOSE_FILE, 'r') as f:
             data = yaml.load(f)
             if data is None:
                 raise ComposeError("Empty compose file")
+            if read_only:
+                _compose_cache["parsed"] = (key, data)
             return data
     except FileNotFoundError:
         raise ComposeError(f"Compose file not found: {COMPOSE_FILE}")
@@ -203,7 +300,14 @@ def add_service(
     command: list[str],
     env_vars: list[str],
     description: str = "",
-    volumes: list[str] = None
+    volumes: list[str] = None,
+    env_file: str = None,
+    source_image: str = None,
+    limits: dict = None,
+    host: str = None,
+    ports: list[str] = None,
+    source_command: list[str] = None,
+    require_env: bool = False
 ) -> str:
     """
     Add a new MCP server service to docker-compose.yaml.
@@ -218,6 +322,15 @@ def add_service(
         env_vars: List of environment variable names (referenced as ${KEY})
         description: Optional description
         volumes: List of volume mounts (e.g., ["/host/path:/container/path:rw"])
+        env_file: Optional per-service env file, relative to the compose file
+        source_image: Image the service was built from, if image was baked
+        limits: Resource limits {"memory": bytes, "cpus": float} (see normalize_limits)
+        host: Docker host the server runs on (default: local). Services on
+            other hosts get a profile, so `docker compose up` skips them here
+        ports: Published ports (e.g., ["18000:8000"])
+        source_command: Server command, if command wraps it (in a bridge)
+        require_env: Reference env_vars as ${KEY:?...}, so compose refuses
+            to run with a variable unset instead of passing it empty
 
     Returns:
         str: Container name (same as service name)
@@ -227,55 +340,88 @@ def add_service(
     """
     service_name = f"{name}-mcp"
 
-    # Create backup first
-    backup_compose_file()
-
-    try:
-        data = load_compose()
+    with _compose_lock:
+        # Create backup first
+        backup_compose_file()
 
-        if 'services' not in data:
-            raise ComposeError("No services section in compose file")
-
-        if service_name in data['services']:
-            raise ComposeError(f"Service '{service_name}' already exists")
-
-        # Build service definition matching existing pattern
-        service = {
-            'image': image,
-            'container_name': service_name,
-            'stdin_open': True,
-            'tty': True,
-            'networks': ['emcp-network'],
-            'restart': 'unless-stopped',
-            'labels': {
-                DYNAMIC_LABEL: 'true',
-                'emcp.description': description or f'Dynamic MCP server: {name}'
+        try:
+            data = load_compose()
+
+            if 'services' not in data:
+                raise ComposeError("No services section in compose file")
+
+            if service_name in data['services']:
+                raise ComposeError(f"Service '{service_name}' already exists")
+
+            # Build service definition matching existing pattern
+            service = {
+                'image': image,
+                'container_name': service_name,
+                'stdin_open': True,
+                'tty': True,
+                'networks': ['emcp-network'],
+                'restart': 'unless-stopped',
+                'labels': {
+                    DYNAMIC_LABEL: 'true',
+                    'emcp.description': description or f'Dynamic MCP server: {name}'
+                }
             }
-        }
-
-        # Add command if specified
-        if command:
-            service['command'] = command
-
-        # Add environment variables (reference from .env)
-        if env_vars:
-            service['environment'] = [f"{var}=${{{var}}}" for var in env_vars]
-
-        # Add volume mounts
-        if volumes:
-            service['volumes'] = volumes
-
-        # Add to services
-        data['services'][service_name] = service
-
-        save_compose(data)
-
-        return service_name
-
-    except ComposeError:
-        raise
-    except Exception as e:
-        raise ComposeError(f"Failed to add service: {e}")
+            if source_image:
+                service['labels']['emcp.source-image'] = source_image
+            if source_command:
+                service['labels']['emcp.source-command'] = json.dumps(source_command)
+            if host and host != docker_hosts.LOCAL_HOST:
+                service['labels'][HOST_LABEL] = host
+                service['profiles'] = [f"host-{host}"]
+                del service['networks']
+            if ports:
+                service['ports'] = list(ports)
+
+            # Add command if specified
+            if command:
+                service['command'] = command
+
+            # Add environment variables (reference from .env)
+            if env_vars:
+                if require_env:
+                    service['environment'] = [
+                        f"{var}=${{{var}:?{REQUIRED_ENV_MESSAGE}}}" for var in env_vars
+                    ]
+                else:
+                    service['environment'] = [f"{var}=${{{var}}}" for var in env_vars]
+
+            # Or load them from the server's own env file
+            if env_file:
+                service['env_file'] = [env_file]
+
+            # Add volume mounts
+            if volumes:
+                service['volumes'] = list(volumes)
+
+            _set_compose_limits(service, limits)
+
+            # Mount the shared package cache for npx/bunx servers
+            if uses_package_runner(command):
+                service.setdefault('volumes', []).append(f"package-cache:{PACKAGE_CACHE_MOUNT}")
+                service.setdefault('environment', []).extend(
+                    f"{key}={value}" for key, value in PACKAGE_CACHE_ENV.items()
+                )
+                if not data.get('volumes'):
+                    data['volumes'] = {}
+                if 'package-cache' not in data['volumes']:
+                    data['volumes']['package-cache'] = {'name': PACKAGE_CACHE_VOLUME}
+
+            # Add to services
+            data['services'][service_name] = service
+
+            save_compose(data)
+
+            return service_name
+
+        except ComposeError:
+            raise
+        except Exception as e:
+            raise ComposeError(f"Failed to add service: {e}")
 
 
 def remove_service(name: str) -> bool:
@@ -296,136 +442,660 @@ def remove_service(name: str) -> bool:
     """
     service_name = f"{name}-mcp"
 
-    # Create backup first
-    backup_compose_file()
+    with _compose_lock:
+        # Create backup first
+        backup_compose_file()
 
-    try:
-        data = load_compose()
+        try:
+            data = load_compose()
 
-        if service_name not in data.get('services', {}):
-            return False
+            if service_name not in data.get('services', {}):
+                return False
 
-        del data['services'][service_name]
+            del data['services'][service_name]
 
-        save_compose(data)
+            save_compose(data)
 
-        return True
+            return True
+
+        except ComposeError:
+            raise
+        except Exception as e:
+            raise ComposeError(f"Failed to remove service: {e}")
+
+
+def server_host(name: str) -> str:
+    """
+    The Docker host a server runs on, from its compose entry.
+
+    Args:
+        name: Server name (without -mcp suffix)
 
+    Returns:
+        str: Host name (local for servers without a host label, or if the
+        compose file cannot be read)
+    """
+    try:
+        service = (load_compose(read_only=True).get('services') or {}).get(f"{name}-mcp") or {}
     except ComposeError:
-        raise
-    except Exception as e:
-        raise ComposeError(f"Failed to remove service: {e}")
+        return docker_hosts.LOCAL_HOST
+    labels = service.get('labels') or {}
+    if isinstance(labels, list):
+        labels = dict(label.split("=", 1) for label in labels if "=" in label)
+    return labels.get(HOST_LABEL) or docker_hosts.LOCAL_HOST
+
+
+def server_exists(name: str) -> bool:
+    """
+    Whether a server has a compose entry or an MCPJungle config.
+
+    Args:
+        name: Server name (without -mcp suffix)
+    """
+    if os.path.exists(os.path.join(CONFIGS_DIR, f"{name}.json")):
+        return True
+    return f"{name}-mcp" in (load_compose(read_only=True).get('services') or {})
+
+
+def host_reservations() -> dict:
+    """
+    Memory limits of the dynamic servers on each host, for placement.
+
+    Returns:
+        dict: {host name: {server name: memory limit in bytes or None}}
+    """
+    reserved = {}
+    for key, service in (load_compose(read_only=True).get('services') or {}).items():
+        labels = service.get('labels') or {}
+        if isinstance(labels, list):
+            labels = dict(label.split("=", 1) for label in labels if "=" in label)
+        if str(labels.get(DYNAMIC_LABEL)).lower() != "true":
+            continue
+        memory = parse_memory(service['mem_limit']) if service.get('mem_limit') else None
+        host = labels.get(HOST_LABEL) or docker_hosts.LOCAL_HOST
+        reserved.setdefault(host, {})[key[:-len("-mcp")] if key.endswith("-mcp") else key] = memory
+    return reserved
 
 
 # ---------------------------------------------------------------------------
 # Container lifecycle (direct docker commands via socket)
 # ---------------------------------------------------------------------------
 
-def pull_image(image: str, timeout: int = 600) -> bool:
+class PullProgress:
+    """
+    Progress of a single image pull, built from Docker's JSON events.
+
+    Shared between every provision that requests the same image while the
+    pull is in flight, so concurrent callers see one operation. The pull
+    itself belongs to no caller: it is aborted (through abort) only once
+    every caller attached to it has given up.
+    """
+
+    def __init__(self, image: str, host: str = None):
+        self.image = image
+        self.host = host or docker_hosts.LOCAL_HOST
+        self.status = "pulling"
+        self.error = None
+        self.layers = {}
+        self.started = time.monotonic()
+        self.finished = None
+        self.callers = 0  # Guarded by _pulls_lock
+        self.abort = Deadline()
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._listeners = []
+
+    def subscribe(self, callback) -> None:
+        """Register a callback invoked with a snapshot after every event."""
+        with self._lock:
+            self._listeners.append(callback)
+
+    def update(self, event: dict) -> None:
+        """Apply one Docker pull progress event."""
+        layer_id = event.get("id")
+        status = event.get("status", "")
+
+        with self._lock:
+            # Events without a layer id are image-level ("Pulling from ...",
+            # "Digest: ...", "Status: ..."); only layers carry progress.
+            if layer_id and not status.startswith(("Pulling from", "Digest:", "Status:")):
+                layer = self.layers.setdefault(
+                    layer_id, {"status": "", "current": 0, "total": 0, "reused": False}
+                )
+                layer["status"] = status
+                detail = event.get("progressDetail") or {}
+                if status == "Downloading" and detail.get("total"):
+                    layer["current"] = detail.get("current", 0)
+                    layer["total"] = detail["total"]
+                elif status in ("Download complete", "Verifying Checksum"):
+                    layer["current"] = layer["total"]
+                elif status == "Already exists":
+                    layer["reused"] = True
+            listeners = list(self._listeners)
+
+        self._notify(listeners)
+
+    def finish(self, error: str = None) -> None:
+        """Mark the pull as complete (or failed) and wake any waiters."""
+        with self._lock:
+            self.status = "failed" if error else "complete"
+            self.error = error
+            self.finished = time.monotonic()
+            listeners = list(self._listeners)
+        self._done.set()
+        self._notify(listeners)
+
+    def wait(self, timeout: float = None) -> bool:
+        """Block until the pull finishes. Returns False on timeout."""
+        return self._done.wait(timeout)
+
+    def snapshot(self) -> dict:
+        """Summarize progress: layers, reused layers, bytes and throughput."""
+        with self._lock:
+            layers = {k: dict(v) for k, v in self.layers.items()}
+            elapsed = (self.finished or time.monotonic()) - self.started
+            downloaded = sum(l["current"] for l in layers.values() if not l["reused"])
+            total = sum(l["total"] for l in layers.values() if not l["reused"])
+            return {
+                "image": self.image,
+                "host": self.host,
+                "status": self.status,
+                "error": self.error,
+                "layers": layers,
+                "layers_total": len(layers),
+                "layers_reused": sum(1 for l in layers.values() if l["reused"]),
+                "layers_done": sum(
+                    1 for l in layers.values()
+                    if l["reused"] or l["status"] == "Pull complete"
+                ),
+                "bytes_downloaded": downloaded,
+                "bytes_total": total,
+                "throughput_bps": int(downloaded / elapsed) if elapsed > 0 else 0,
+                "elapsed": round(elapsed, 2),
+            }
+
+    def _notify(self, listeners) -> None:
+        if not listeners:
+            return
+        snap = self.snapshot()
+        for callback in listeners:
+            try:
+                callback(snap)
+            except Exception:
+                pass  # Progress reporting must never break the pull
+
+
+# In-flight pulls keyed by (host, image reference)
+_pulls = {}
+_pulls_lock = threading.Lock()
+
+
+def _split_image_ref(image: str) -> tuple[str, str]:
+    """Split an image reference into (name, tag-or-digest), defaulting to latest."""
+    if "@" in image:
+        name, _, digest = image.partition("@")
+        return name, digest
+    last = image.rsplit("/", 1)[-1]
+    if ":" in last:
+        name, _, tag = image.rpartition(":")
+        return name, tag
+    return image, "latest"
+
+
+def image_exists(image: str, host: str = None) -> bool:
+    """Whether an image is present on a Docker host (default: local)."""
+    check = _run_docker(["images", "-q", image], host=host)
+    return check.returncode == 0 and bool(check.stdout.strip())
+
+
+def _pull_via_api(progress: PullProgress, timeout: int, deadline=None) -> None:
+    """Stream a pull through the Engine API, feeding events into progress."""
+    name, tag = _split_image_ref(progress.image)
+    give_up_at = time.monotonic() + timeout
+    auth = docker_api.registry_auth(progress.image)
+    events = docker_api.stream(
+        "POST", "/images/create",
+        params={"fromImage": name, "tag": tag},
+        timeout=min(timeout, 120),
+        endpoint=docker_hosts.get_host(progress.host).endpoint,
+        deadline=deadline,
+        headers={"X-Registry-Auth": auth} if auth else None
+    )
+    for event in events:
+        if event.get("error"):
+            raise ComposeError(event["error"])
+        progress.update(event)
+        if time.monotonic() > give_up_at:
+            events.close()
+            raise subprocess.TimeoutExpired(["pull", progress.image], timeout)
+        if deadline is not None and deadline.done:
+            events.close()
+            raise deadline.error()
+
+
+def _pull_via_cli(progress: PullProgress, timeout: int, deadline=None) -> None:
+    """Fallback when the Engine API is unreachable: plain `docker pull`."""
+    result = _run_docker(["pull", progress.image], timeout=timeout, host=progress.host, deadline=deadline)
+    if result.returncode != 0:
+        raise ComposeError(result.stderr.strip())
+
+
+def get_pull_progress(image: str = None, host: str = None):
     """
-    Pull a Docker image.
+    Get progress snapshots for in-flight pulls.
+
+    Args:
+        image: Optional image reference; if omitted, all pulls are returned
+        host: Docker host of the pull (default: local); only used with image
+
+    Returns:
+        dict snapshot for one image (or None), or list of snapshots
+    """
+    with _pulls_lock:
+        pulls = dict(_pulls)
+    if image is not None:
+        pull = pulls.get((host or docker_hosts.LOCAL_HOST, image))
+        return pull.snapshot() if pull else None
+    return [p.snapshot() for p in pulls.values()]
+
+
+def pull_image(image: str, timeout: int = 600, on_progress=None, host: str = None,
+               deadline=None) -> dict:
+    """
+    Pull a Docker image, streaming layer progress.
+
+    Concurrent calls for the same image (on the same host) attach to the
+    in-flight pull instead of starting another one. The pull runs in the
+    background; each caller waits for it under its own timeout and
+    deadline, and the pull is only aborted once every caller gave up.
 
     Args:
         image: Image name with optional tag
         timeout: Timeout in seconds (default 10 min for large images)
+        on_progress: Optional callback receiving progress snapshots
+        host: Docker host to pull on (default: local)
+        deadline: Optional Deadline of the calling operation; caps timeout,
+            and cancelling it stops this caller's wait
 
     Returns:
-        True if pull succeeded or image exists locally
+        dict: Final progress snapshot (layers, reused layers, bytes, throughput)
 
     Raises:
         ComposeError: If image cannot be obtained
+        DeadlineExceeded: If the deadline passes or is cancelled first
     """
+    # The pull gets the full timeout; only this caller's wait is capped by its deadline
+    pull_timeout = timeout
+    if deadline is not None:
+        timeout = deadline.remaining(timeout)
+    host = host or docker_hosts.LOCAL_HOST
+    with _pulls_lock:
+        progress = _pulls.get((host, image))
+        start = progress is None
+        if start:
+            progress = _pulls[(host, image)] = PullProgress(image, host)
+        progress.callers += 1
+
+    if on_progress:
+        progress.subscribe(on_progress)
+    if start:
+        threading.Thread(target=_run_pull, args=(progress, pull_timeout), daemon=True,
+                         name=f"pull-{image}").start()
+
+    finished = False
     try:
-        result = _run_docker(["pull", image], timeout=timeout)
-        if result.returncode == 0:
-            return True
+        give_up_at = time.monotonic() + timeout
+        while not finished and time.monotonic() < give_up_at:
+            if deadline is not None:
+                deadline.check()
+            # Short slices so a cancelled caller does not wait out the pull
+            finished = progress.wait(min(0.25, max(0, give_up_at - time.monotonic())))
+    finally:
+        with _pulls_lock:
+            progress.callers -= 1
+            abandoned = not finished and progress.callers == 0
+            if abandoned and _pulls.get((host, image)) is progress:
+                # A later request for the image starts a fresh pull
+                del _pulls[(host, image)]
+        if abandoned:
+            progress.abort.cancel(f"Pull of '{image}' abandoned by every caller")
+
+    if not finished:
+        raise ComposeError(
+            f"Timed out pulling image '{image}' ({_describe_progress(progress.snapshot())})"
+        )
+    if progress.status == "failed":
+        raise ComposeError(progress.error)
+    return progress.snapshot()
 
+
+def _run_pull(progress: PullProgress, timeout: int) -> None:
+    """Run one shared pull to completion, recording the outcome in progress."""
+    image, host = progress.image, progress.host
+    error = None
+    try:
+        if docker_api.is_available(docker_hosts.get_host(host).endpoint):
+            _pull_via_api(progress, timeout, progress.abort)
+        else:
+            _pull_via_cli(progress, timeout, progress.abort)
+
+    except DeadlineExceeded as e:
+        # Aborted on purpose: never fall back to a stale local image
+        error = str(e)
+    except Exception as e:
+        timed_out = isinstance(e, (subprocess.TimeoutExpired, docker_api.DockerAPITimeout))
         # Pull failed — check if image exists locally
-        check = _run_docker(["images", "-q", image])
-        if check.returncode == 0 and check.stdout.strip():
-            return True
+        if not image_exists(image, host):
+            if timed_out:
+                error = (
+                    f"Timed out pulling image '{image}' "
+                    f"({_describe_progress(progress.snapshot())})"
+                )
+            else:
+                error = f"Failed to pull image '{image}' and not found locally: {e}"
+
+    finally:
+        progress.finish(error)
+        with _pulls_lock:
+            if _pulls.get((host, image)) is progress:
+                del _pulls[(host, image)]
+
+
+def _describe_progress(snap: dict) -> str:
+    """One-line human summary of a pull snapshot, used in error messages."""
+    return (
+        f"{snap['layers_done']}/{snap['layers_total']} layers, "
+        f"{snap['layers_reused']} already present, "
+        f"{snap['bytes_downloaded']}/{snap['bytes_total']} bytes"
+    )
 
-        raise ComposeError(
-            f"Failed to pull image '{image}' and not found locally: "
-            f"{result.stderr.strip()}"
-        )
 
-    except subprocess.TimeoutExpired:
-        # Check local
-        check = _run_docker(["images", "-q", image])
-        if check.returncode == 0 and check.stdout.strip():
-            return True
-        raise ComposeError(f"Timed out pulling image '{image}'")
+# ---------------------------------------------------------------------------
+# Resource limits
+# ---------------------------------------------------------------------------
 
+_MEMORY_UNITS = {"": 1, "b": 1, "k": 1024, "m": 1024 ** 2, "g": 1024 ** 3}
 
-def start_service(service_name: str, image: str, command: list[str],
-                  env_vars: dict = None, volumes: list[str] = None,
-                  timeout: int = 60) -> bool:
+# Docker refuses memory limits below 6 MiB
+MIN_MEMORY_LIMIT = 6 * 1024 ** 2
+
+
+def parse_memory(value) -> int:
     """
-    Start a container using direct docker commands.
+    Parse a memory size like Docker does ("512m", "1g", "1.5g" or bytes).
 
-    Creates and starts the container, connecting it to the eMCP network.
+    Raises:
+        ComposeError: If the value is not a size
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return int(value)
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([bkmg]?)i?b?\s*", str(value).lower())
+    if not match:
+        raise ComposeError(f"Invalid memory size: {value}")
+    return int(float(match.group(1)) * _MEMORY_UNITS[match.group(2)])
+
+
+def format_memory(size: int) -> str:
+    """Format bytes as a compose-style size ("512m"), rounding up to a whole unit."""
+    for unit in ("g", "m", "k"):
+        if size >= _MEMORY_UNITS[unit] and size % _MEMORY_UNITS[unit] == 0:
+            return f"{size // _MEMORY_UNITS[unit]}{unit}"
+    return f"{-(-size // _MEMORY_UNITS['m'])}m" if size >= _MEMORY_UNITS["m"] else str(size)
+
+
+def normalize_limits(limits) -> dict:
+    """
+    Validate resource limits.
 
     Args:
-        service_name: Container/service name (e.g., "myserver-mcp")
-        image: Docker image to use
-        command: Command + args to run
-        env_vars: Dict of environment variable key=value pairs
-        volumes: List of volume mount strings
-        timeout: Seconds to wait for container to start
+        limits: {"memory": size, "cpus": number}; either may be omitted
 
     Returns:
-        True if container started successfully
+        dict: {"memory": bytes or None, "cpus": float or None}
 
     Raises:
-        ComposeError: If container fails to start
+        ComposeError: If a limit is invalid
     """
-    # Build docker create command
+    if not limits:
+        return {"memory": None, "cpus": None}
+    if not isinstance(limits, dict):
+        raise ComposeError("limits must be an object with 'memory' and/or 'cpus'")
+    memory = parse_memory(limits["memory"]) if limits.get("memory") not in (None, "") else None
+    if memory is not None and memory < MIN_MEMORY_LIMIT:
+        raise ComposeError(f"Memory limit must be at least {format_memory(MIN_MEMORY_LIMIT)}")
+    cpus = limits.get("cpus")
+    if cpus not in (None, ""):
+        try:
+            cpus = round(float(cpus), 2)
+        except (TypeError, ValueError):
+            raise ComposeError(f"Invalid cpus: {limits['cpus']}")
+        if cpus <= 0:
+            raise ComposeError("cpus must be greater than 0")
+    else:
+        cpus = None
+    return {"memory": memory, "cpus": cpus}
+
+
+def _limits_host_config(limits: dict) -> dict:
+    """Engine API HostConfig fields for limits (swap capped at the memory limit)."""
+    config = {}
+    if limits and limits.get("memory"):
+        config["Memory"] = limits["memory"]
+        config["MemorySwap"] = limits["memory"]
+    if limits and limits.get("cpus"):
+        config["NanoCpus"] = int(limits["cpus"] * 1e9)
+    return config
+
+
+def _limits_cli_args(limits: dict) -> list[str]:
+    args = []
+    if limits and limits.get("memory"):
+        args += ["--memory", str(limits["memory"]), "--memory-swap", str(limits["memory"])]
+    if limits and limits.get("cpus"):
+        args += ["--cpus", str(limits["cpus"])]
+    return args
+
+
+def _set_compose_limits(service: dict, limits: dict) -> None:
+    if limits and limits.get("memory"):
+        service["mem_limit"] = service["memswap_limit"] = format_memory(limits["memory"])
+    if limits and limits.get("cpus"):
+        service["cpus"] = limits["cpus"]
+
+
+def update_limits(name: str, limits: dict) -> dict:
+    """
+    Change a server's resource limits in place: on its container (no
+    restart) and in its docker-compose.yaml entry.
+
+    Docker cannot remove a limit from an existing container, so a limit
+    left out (None) is kept as it is.
+
+    Args:
+        name: Server name (service is <name>-mcp)
+        limits: {"memory": size, "cpus": number}; either may be omitted
+
+    Returns:
+        dict: The limits applied, normalized (see normalize_limits)
+
+    Raises:
+        ComposeError: If the limits are invalid or the container or service
+            cannot be updated
+    """
+    limits = normalize_limits(limits)
+    if limits["memory"] is None and limits["cpus"] is None:
+        raise ComposeError("No limits given")
+    container_name = f"{name}-mcp"
+    host = server_host(name)
+    endpoint = docker_hosts.get_host(host).endpoint
+    if docker_api.is_available(endpoint):
+        try:
+            docker_api.request("POST", f"/containers/{container_name}/update",
+                               body=_limits_host_config(limits), endpoint=endpoint)
+        except docker_api.DockerAPIError as e:
+            if e.status == 404:
+                raise ComposeError(f"Container '{container_name}' not found")
+            raise ComposeError(f"Failed to update limits of '{container_name}': {e}")
+    else:
+        result = _run_docker(["update"] + _limits_cli_args(limits) + [container_name], timeout=30,
+                             host=host)
+        if result.returncode != 0:
+            raise ComposeError(f"Failed to update limits of '{container_name}': {result.stderr.strip()}")
+
+    with _compose_lock:
+        data = load_compose()
+        service = (data.get('services') or {}).get(container_name)
+        if service is not None:
+            backup_compose_file()
+            _set_compose_limits(service, limits)
+            save_compose(data)
+    return limits
+
+
+def _create_container_via_api(service_name: str, image: str, command: list[str],
+                              env: dict, binds: list[str], limits: dict = None,
+                              host: docker_hosts.DockerHost = None, port: int = None,
+                              deadline=None) -> None:
+    """Create a container through the Engine API."""
+    host = host or docker_hosts.get_host()
+    body = {
+        "Image": image,
+        "Cmd": command or None,
+        "Env": [f"{key}={value}" for key, value in env.items()],
+        "Tty": True,
+        "OpenStdin": True,
+        "Labels": {DYNAMIC_LABEL: "true", HOST_LABEL: host.name},
+        "HostConfig": {
+            "NetworkMode": NETWORK_NAME if host.local else host.network,
+            "RestartPolicy": {"Name": "unless-stopped"},
+            "Binds": binds,
+            **_limits_host_config(limits),
+        },
+    }
+    if port:
+        bridge = f"{docker_hosts.BRIDGE_PORT}/tcp"
+        body["ExposedPorts"] = {bridge: {}}
+        body["HostConfig"]["PortBindings"] = {bridge: [{"HostPort": str(port)}]}
+    try:
+        docker_api.request("POST", "/containers/create", params={"name": service_name}, body=body,
+                           timeout=deadline.remaining(60) if deadline else 60, endpoint=host.endpoint)
+    except docker_api.DockerAPIError as e:
+        raise ComposeError(f"Failed to create container '{service_name}': {e}")
+
+
+def _create_container_via_cli(service_name: str, image: str, command: list[str],
+                              env: dict, binds: list[str], limits: dict = None,
+                              host: docker_hosts.DockerHost = None, port: int = None,
+                              deadline=None) -> None:
+    """Create a container with `docker create`, passing env via a temp file."""
+    host = host or docker_hosts.get_host()
     create_args = [
         "create",
         "--name", service_name,
-        "--network", NETWORK_NAME,
+        "--network", NETWORK_NAME if host.local else host.network,
         "--restart", "unless-stopped",
         "--interactive",
         "--tty",
         "--label", f"{DYNAMIC_LABEL}=true",
+        "--label", f"{HOST_LABEL}={host.name}",
     ]
+    for vol in binds:
+        create_args.extend(["-v", vol])
+    create_args.extend(_limits_cli_args(limits))
+    if port:
+        create_args.extend(["-p", f"{port}:{docker_hosts.BRIDGE_PORT}"])
 
-    # Add environment variables with actual values
-    if env_vars:
-        for key, value in env_vars.items():
-            create_args.extend(["-e", f"{key}={value}"])
-
-    # Add volume mounts
-    if volumes:
-        for vol in volumes:
-            create_args.extend(["-v", vol])
+    env_file = None
+    try:
+        if env:
+            fd, env_file = tempfile.mkstemp(prefix="emcp-env-")
+            with os.fdopen(fd, 'w') as f:
+                for key, value in env.items():
+                    f.write(f"{key}={value}\n")
+            create_args.extend(["--env-file", env_file])
+
+        create_args.append(image)
+        if command:
+            create_args.extend(command)
 
-    # Image and command
-    create_args.append(image)
-    if command:
-        create_args.extend(command)
+        result = _run_docker(create_args, host=host.name, deadline=deadline)
+    finally:
+        if env_file:
+            os.remove(env_file)
 
-    # Create
-    result = _run_docker(create_args)
     if result.returncode != 0:
         raise ComposeError(
             f"Failed to create container '{service_name}': {result.stderr.strip()}"
         )
 
+
+def start_service(service_name: str, image: str, command: list[str],
+                  env_vars: dict = None, volumes: list[str] = None,
+                  timeout: int = 60, package_cache: bool = None,
+                  limits: dict = None, host: str = None, port: int = None,
+                  deadline=None) -> bool:
+    """
+    Start a container using direct docker commands.
+
+    Creates and starts the container, connecting it to the eMCP network
+    (on the local host) or the host's network.
+
+    Args:
+        service_name: Container/service name (e.g., "myserver-mcp")
+        image: Docker image to use
+        command: Command + args to run
+        env_vars: Dict of environment variable key=value pairs (injected
+            through the Engine API, not the command line)
+        volumes: List of volume mount strings
+        timeout: Seconds to wait for container to start
+        package_cache: Mount the shared package cache volume
+            (default: only for npx/bunx commands)
+        limits: Resource limits {"memory": bytes, "cpus": float} (see normalize_limits)
+        host: Docker host to run on (default: local)
+        port: Host port to publish the bridge port on (remote hosts)
+        deadline: Optional Deadline of the calling operation; a container
+            it leaves behind is the caller's to remove (stop_service)
+
+    Returns:
+        True if container started successfully
+
+    Raises:
+        ComposeError: If container fails to start
+        DeadlineExceeded: If the deadline passes or is cancelled first
+    """
+    env = dict(env_vars or {})
+    binds = list(volumes or [])
+
+    if package_cache is None:
+        package_cache = uses_package_runner(command)
+    if package_cache:
+        binds.append(f"{PACKAGE_CACHE_VOLUME}:{PACKAGE_CACHE_MOUNT}")
+        env.update(PACKAGE_CACHE_ENV)
+
+    # Secrets are passed in the API request body (or an ephemeral env file),
+    # never as -e arguments visible in the process list.
+    docker_host = docker_hosts.get_host(host)
+    if docker_api.is_available(docker_host.endpoint):
+        _create_container_via_api(service_name, image, command, env, binds, limits, docker_host, port, deadline)
+    else:
+        _create_container_via_cli(service_name, image, command, env, binds, limits, docker_host, port, deadline)
+
     # Start
-    result = _run_docker(["start", service_name])
+    result = _run_docker(["start", service_name], host=host, deadline=deadline)
     if result.returncode != 0:
         # Clean up created container
-        _run_docker(["rm", "-f", service_name])
+        _run_docker(["rm", "-f", service_name], host=host)
         raise ComposeError(
             f"Failed to start container '{service_name}': {result.stderr.strip()}"
         )
 
     # Wait for running
     for _ in range(timeout // 2):
-        time.sleep(2)
-        status = get_container_status(service_name)
+        if deadline is not None:
+            deadline.sleep(2)
+        else:
+            time.sleep(2)
+        status = get_container_status(service_name, host=host)
         if status.get("running"):
             return True
 
@@ -434,20 +1104,75 @@ def start_service(service_name: str, image: str, command: list[str],
     )
 
 
-def stop_service(service_name: str) -> bool:
+def bake_image(name: str, image: str, command: list[str],
+               timeout: int = 600, host: str = None, deadline=None) -> str:
+    """
+    Build a local image with the server's npm package pre-installed.
+
+    The package is installed into /opt/emcp (the image's working directory),
+    where npx and bunx resolve it locally instead of downloading it. The
+    server command does not change.
+
+    Args:
+        name: Server name (used for the image tag)
+        image: Base image (must provide npm or bun)
+        command: Server command (e.g., ["npx", "-y", "@org/server"])
+        timeout: Build timeout in seconds
+        host: Docker host to build on (default: local)
+        deadline: Optional Deadline of the calling operation
+
+    Returns:
+        str: Tag of the baked image
+
+    Raises:
+        ComposeError: If the command has no package to bake or the build fails
+        DeadlineExceeded: If the deadline passes or is cancelled first
+    """
+    package = get_runner_package(command)
+    if not package:
+        raise ComposeError("Only npx/bunx servers can be baked")
+
+    if os.path.basename(command[0]) == "bunx":
+        install = f"bun add {shlex.quote(package)}"
+    else:
+        install = f"npm install --no-audit --no-fund {shlex.quote(package)}"
+
+    tag = f"{BAKED_IMAGE_REPO}/{name}:latest"
+    dockerfile = (
+        f"FROM {image}\n"
+        f"LABEL emcp.baked=true emcp.base-image={json.dumps(image)}\n"
+        f"WORKDIR /opt/emcp\n"
+        f"RUN {install}\n"
+    )
+
+    try:
+        result = _run_docker(["build", "-t", tag, "-"], timeout=timeout, input=dockerfile, host=host,
+                             deadline=deadline)
+    except subprocess.TimeoutExpired:
+        raise ComposeError(f"Timed out baking image for '{name}'")
+
+    if result.returncode != 0:
+        raise ComposeError(
+            f"Failed to bake image for '{name}': {result.stderr.strip()[-500:]}"
+        )
+    return tag
+
+
+def stop_service(service_name: str, host: str = None) -> bool:
     """
-    Stop and remove a container.
+    Stop and remove a container and its anonymous volumes.
 
     Args:
         service_name: Container name
+        host: Docker host it runs on (default: local)
 
     Returns:
         True if container was stopped/removed
     """
     # Stop first (graceful shutdown)
-    _run_docker(["stop", service_name], timeout=30)
-    # Then remove
-    result = _run_docker(["rm", "-f", service_name], timeout=15)
+    _run_docker(["stop", service_name], timeout=30, host=host)
+    # Then remove, with its anonymous volumes
+    result = _run_docker(["rm", "-f", "-v", service_name], timeout=15, host=host)
     return result.returncode == 0
 
 
@@ -455,22 +1180,41 @@ def stop_service(service_name: str) -> bool:
 # MCP readiness check
 # ---------------------------------------------------------------------------
 
-def wait_for_mcp_ready(container_name: str, command: list[str],
-                       timeout: int = 90) -> bool:
+def _probe_url(url: str, init_request: str, timeout: int) -> tuple[bool, str]:
+    """Send initialize to a Streamable HTTP endpoint (JSON or SSE response)."""
+    try:
+        response = requests.post(url, data=init_request, timeout=timeout, headers={
+            "Content-Type": "application/json",
+            "Accept": "application/json, text/event-stream",
+        })
+    except requests.Timeout:
+        return False, f"No response within {timeout}s"
+    except requests.RequestException as e:
+        return False, str(e)[-200:]
+    if response.status_code < 400 and '"result"' in response.text and '"protocolVersion"' in response.text:
+        return True, ""
+    return False, f"HTTP {response.status_code}: {response.text.strip()[-200:]}"
+
+
+def probe_mcp(container_name: str, command: list[str], timeout: int = 10,
+              host: str = None, url: str = None, deadline=None) -> tuple[bool, str]:
     """
-    Wait for the MCP server inside a container to respond to initialize.
-
-    Sends a JSON-RPC initialize request to the server's stdin and checks
-    for a valid response. This ensures the server is actually ready to
-    handle tool registration, not just that the container is running.
+    Send one JSON-RPC initialize request to an MCP server in a container.
 
     Args:
         container_name: Docker container name
         command: The MCP server command to exec (e.g., ["npx", "..."])
-        timeout: Max seconds to wait
+        timeout: Seconds to wait for the response
+        host: Docker host the container runs on (default: local)
+        url: Streamable HTTP endpoint of a bridged server; probed instead
+            of exec'ing the command
+        deadline: Optional Deadline of the calling operation; caps timeout
 
     Returns:
-        True if MCP server responded to initialize
+        tuple: (responded, error message or "")
+
+    Raises:
+        DeadlineExceeded: If the deadline passes or is cancelled first
     """
     init_request = json.dumps({
         "jsonrpc": "2.0",
@@ -483,26 +1227,76 @@ def wait_for_mcp_ready(container_name: str, command: list[str],
         }
     }) + "\n"
 
-    interval = 3
-    attempts = timeout // interval
+    if url:
+        return _probe_url(url, init_request, deadline.remaining(timeout) if deadline else timeout)
 
-    for attempt in range(attempts):
-        try:
-            result = subprocess.run(
-                ["docker", "exec", "-i", container_name] + command,
-                input=init_request,
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
-            if '"result"' in result.stdout and '"protocolVersion"' in result.stdout:
-                return True
-        except (subprocess.TimeoutExpired, Exception):
-            pass
+    try:
+        result = _run_docker(
+            ["exec", "-i", container_name] + command,
+            timeout=timeout,
+            input=init_request,
+            host=host,
+            deadline=deadline
+        )
+    except subprocess.TimeoutExpired:
+        return False, f"No response within {timeout}s"
+    except DeadlineExceeded:
+        raise
+    except Exception as e:
+        return False, str(e)
 
-        time.sleep(interval)
+    if '"result"' in result.stdout and '"protocolVersion"' in result.stdout:
+        return True, ""
+    detail = result.stderr.strip() or result.stdout.strip() or f"exit code {result.returncode}"
+    return False, detail[-200:]
 
-    return False
+
+def wait_for_mcp_ready(container_name: str, command: list[str],
+                       timeout: float = 90, host: str = None, url: str = None,
+                       deadline=None) -> tuple[bool, str]:
+    """
+    Wait for the MCP server inside a container to respond to initialize.
+
+    Sends a JSON-RPC initialize request to the server's stdin and checks
+    for a valid response. This ensures the server is actually ready to
+    handle tool registration, not just that the container is running.
+    Probes start READY_POLL_INITIAL seconds apart and back off to
+    READY_POLL_MAX, so a server that comes up quickly is seen quickly.
+
+    Args:
+        container_name: Docker container name
+        command: The MCP server command to exec (e.g., ["npx", "..."])
+        timeout: Max seconds to wait
+        host: Docker host the container runs on (default: local)
+        url: Streamable HTTP endpoint of a bridged server (see probe_mcp)
+        deadline: Optional Deadline of the calling operation
+
+    Returns:
+        tuple: (True if the MCP server responded to initialize, last probe
+        error or "")
+
+    Raises:
+        DeadlineExceeded: If the deadline passes or is cancelled first
+            (running out of timeout just returns False)
+    """
+    give_up = time.monotonic() + timeout
+    delay = READY_POLL_INITIAL
+    error = ""
+    while True:
+        remaining = give_up - time.monotonic()
+        if remaining <= 0:
+            return False, error
+        ready, error = probe_mcp(container_name, command, timeout=max(1, int(min(remaining, 10))),
+                                 host=host, url=url, deadline=deadline)
+        if ready:
+            return True, ""
+
+        pause = min(delay, max(0, give_up - time.monotonic()))
+        if deadline is not None:
+            deadline.sleep(pause)
+        else:
+            time.sleep(pause)
+        delay = min(delay * 2, READY_POLL_MAX)
 
 
 # ---------------------------------------------------------------------------
@@ -513,7 +1307,8 @@ def create_mcp_config(
     name: str,
     container_name: str,
     command: list[str],
-    description: str = ""
+    description: str = "",
+    url: str = None
 ) -> str:
     """
     Create an MCP config file for MCPJungle.
@@ -523,6 +1318,8 @@ def create_mcp_config(
         container_name: Docker container name
         command: Command to run inside container
         description: Optional description
+        url: Streamable HTTP endpoint for a server on another Docker host;
+            the gateway connects to it instead of running `docker exec`
 
     Returns:
         str: Path to created config file
@@ -535,13 +1332,21 @@ def create_mcp_config(
     if os.path.exists(config_path):
         raise ComposeError(f"Config file already exists: {config_path}")
 
-    config = {
-        "name": name,
-        "transport": "stdio",
-        "description": description or f"Dynamic MCP server: {name}",
-        "command": "docker",
-        "args": ["exec", "-i", container_name] + command
-    }
+    if url:
+        config = {
+            "name": name,
+            "transport": "streamable_http",
+            "description": description or f"Dynamic MCP server: {name}",
+            "url": url
+        }
+    else:
+        config = {
+            "name": name,
+            "transport": "stdio",
+            "description": description or f"Dynamic MCP server: {name}",
+            "command": "docker",
+            "args": ["exec", "-i", container_name] + command
+        }
 
     try:
         with open(config_path, 'w') as f:
@@ -573,12 +1378,13 @@ def delete_mcp_config(name: str) -> bool:
 # Container status
 # ---------------------------------------------------------------------------
 
-def get_container_status(container_name: str) -> dict:
+def get_container_status(container_name: str, host: str = None) -> dict:
     """
     Get status of a container via docker inspect.
 
     Args:
         container_name: Name of the container
+        host: Docker host it runs on (default: local)
 
     Returns:
         dict: {exists, running, status}
@@ -586,7 +1392,8 @@ def get_container_status(container_name: str) -> dict:
     try:
         result = _run_docker(
             ["inspect", "--format", "{{.State.Status}}", container_name],
-            timeout=10
+            timeout=10,
+            host=host
         )
 
         if result.returncode == 0:
@@ -609,3 +1416,108 @@ def get_container_status(container_name: str) -> dict:
             "running": False,
             "status": "error"
         }
+
+
+def _parse_cli_ports(ports: str) -> list[dict]:
+    """Parse `docker ps` port text, e.g. "0.0.0.0:3700->8080/tcp, :::3700->8080/tcp"."""
+    published = []
+    for entry in filter(None, (part.strip() for part in ports.split(","))):
+        host, arrow, container = entry.partition("->")
+        if not arrow:
+            continue
+        host_ip, _, host_port = host.rpartition(":")
+        private, _, protocol = container.partition("/")
+        if host_port.isdigit() and private.isdigit():
+            published.append({"ip": host_ip, "host_port": int(host_port),
+                              "container_port": int(private), "protocol": protocol or "tcp"})
+    return published
+
+
+def _list_host_containers(host: docker_hosts.DockerHost) -> dict:
+    """Every container on one host (see list_containers)."""
+    if docker_api.is_available(host.endpoint):
+        try:
+            containers = docker_api.request("GET", "/containers/json", params={"all": "1"},
+                                            endpoint=host.endpoint) or []
+            listing = {}
+            for container in containers:
+                ports = [
+                    {"ip": port.get("IP", ""), "host_port": port["PublicPort"],
+                     "container_port": port.get("PrivatePort"), "protocol": port.get("Type", "tcp")}
+                    for port in container.get("Ports") or [] if port.get("PublicPort")
+                ]
+                for name in container.get("Names", []):
+                    listing[name.lstrip("/")] = {
+                        "state": container.get("State", "unknown"),
+                        "status": container.get("Status", ""),
+                        "ports": ports,
+                        "host": host.name,
+                        "dynamic": (container.get("Labels") or {}).get(DYNAMIC_LABEL) == "true",
+                    }
+            return listing
+        except docker_api.DockerAPIError:
+            pass
+
+    fields = ["{{.Names}}", "{{.State}}", "{{.Status}}", "{{.Ports}}", f'{{{{.Label "{DYNAMIC_LABEL}"}}}}']
+    result = _run_docker(["ps", "-a", "--format", "\t".join(fields)], timeout=15, host=host.name)
+    if result.returncode != 0:
+        raise ComposeError(f"Failed to list containers on '{host.name}': {result.stderr.strip()}")
+    listing = {}
+    for line in result.stdout.splitlines():
+        name, state, status, ports, dynamic = (line.split("\t") + ["", "", "", ""])[:5]
+        if name:
+            listing[name] = {"state": state or "unknown", "status": status,
+                             "ports": _parse_cli_ports(ports), "host": host.name,
+                             "dynamic": dynamic == "true"}
+    return listing
+
+
+def list_containers(host: str = None) -> dict:
+    """
+    Get every container with its state and published ports, in one call
+    per Docker host.
+
+    Without a host, every host in the pool is listed (in parallel). Of the
+    other hosts, only containers created by the manager are included; an
+    unreachable other host is skipped.
+
+    Args:
+        host: Only list this Docker host
+
+    Returns:
+        dict: {container_name: {"state", "status", "host", "dynamic", "ports":
+        [{"ip", "host_port", "container_port", "protocol"}]}}; "status" is
+        Docker's status text (e.g., "Up 2 hours", "Exited (1) 5 minutes ago")
+
+    Raises:
+        ComposeError: If the (local) host cannot be listed
+    """
+    if host:
+        return _list_host_containers(docker_hosts.get_host(host))
+    pool = docker_hosts.hosts()
+    listing = _list_host_containers(pool[0])
+    if len(pool) == 1:
+        return listing
+
+    def remote(other):
+        try:
+            return _list_host_containers(other)
+        except ComposeError:
+            return {}
+
+    with ThreadPoolExecutor(max_workers=len(pool) - 1, thread_name_prefix="list-hosts") as executor:
+        for containers in executor.map(remote, pool[1:]):
+            for name, container in containers.items():
+                if container["dynamic"]:
+                    listing.setdefault(name, container)
+    return listing
+
+
+def list_container_states() -> dict:
+    """
+    Get the state of every container in one call.
+
+    Returns:
+        dict: {container_name: status} (e.g., "running", "exited")
+    """
+    return {name: container["state"] for name, container in list_containers().items()}
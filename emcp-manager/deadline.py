@@ -0,0 +1,164 @@
+"""
+Deadlines and Cancellation
+
+A Deadline is the overall time budget of one operation (a provision
+request), passed down to every blocking call it makes. Each call waits at
+most the smaller of its own timeout and what is left of the budget, so
+the per-step timeouts can no longer add up past the deadline.
+
+A Deadline can also be cancelled from another thread. Cancelling kills
+child processes started through run() and shuts the sockets of API
+streams registered with on_cancel(), so the blocked call returns at once
+and the caller can roll back. Either way the caller sees
+DeadlineExceeded (with cancelled=True for a cancel).
+"""
+
+import socket
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+
+
+class DeadlineExceeded(Exception):
+    """Raised when an operation runs past its deadline or is cancelled."""
+
+    def __init__(self, message, cancelled=False):
+        super().__init__(message)
+        self.cancelled = cancelled
+
+
+class Deadline:
+    """Time budget of an operation, with cooperative cancellation."""
+
+    def __init__(self, seconds: float = None):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds if seconds else None
+        self.reason = None
+        self._cancelled = threading.Event()
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    @property
+    def expired(self) -> bool:
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+    @property
+    def done(self) -> bool:
+        """Cancelled or expired."""
+        return self.cancelled or self.expired
+
+    def check(self) -> None:
+        """
+        Raises:
+            DeadlineExceeded: If cancelled or past the deadline
+        """
+        if self.cancelled:
+            raise DeadlineExceeded(self.reason, cancelled=True)
+        if self.expired:
+            raise DeadlineExceeded(f"Deadline of {self.seconds:g}s exceeded")
+
+    def error(self) -> DeadlineExceeded:
+        """The DeadlineExceeded for the current state (cancelled or expired)."""
+        try:
+            self.check()
+        except DeadlineExceeded as e:
+            return e
+        return DeadlineExceeded("Deadline not reached")
+
+    def remaining(self, cap: float = None):
+        """
+        Seconds left, capped at a step's own timeout.
+
+        Returns:
+            float: min(cap, time left); None with neither a cap nor a deadline
+
+        Raises:
+            DeadlineExceeded: If nothing is left
+        """
+        self.check()
+        if self.expires_at is None:
+            return cap
+        left = self.expires_at - time.monotonic()
+        return left if cap is None else min(cap, left)
+
+    def sleep(self, seconds: float) -> None:
+        """
+        Sleep, waking early on cancel.
+
+        Raises:
+            DeadlineExceeded: If cancelled or past the deadline afterwards
+        """
+        self._cancelled.wait(self.remaining(seconds))
+        self.check()
+
+    def cancel(self, reason: str = "Cancelled") -> None:
+        """Cancel the operation and run its cancel callbacks."""
+        with self._lock:
+            if self._cancelled.is_set():
+                return
+            self.reason = reason
+            self._cancelled.set()
+            callbacks = list(self._callbacks)
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass  # Cancelling must never fail halfway
+
+    @contextmanager
+    def on_cancel(self, callback):
+        """Run callback if the operation is cancelled while in this block."""
+        with self._lock:
+            self._callbacks.append(callback)
+            cancelled = self._cancelled.is_set()
+        if cancelled:
+            callback()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._callbacks.remove(callback)
+
+
+def shutdown_socket(conn) -> None:
+    """Cancel callback for an HTTP connection: unblocks a pending read."""
+    sock = getattr(conn, "sock", None)
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+def run(cmd: list[str], timeout: float = None, input: str = None, env: dict = None,
+        deadline: Deadline = None) -> subprocess.CompletedProcess:
+    """
+    subprocess.run(capture_output=True, text=True) bounded by a deadline.
+
+    The process is killed when timeout passes (raising TimeoutExpired, as
+    subprocess.run does), or when the deadline passes or is cancelled
+    (raising DeadlineExceeded).
+    """
+    if deadline is None:
+        return subprocess.run(cmd, input=input, capture_output=True, text=True, timeout=timeout, env=env)
+
+    budget = deadline.remaining(timeout)
+    with subprocess.Popen(cmd, stdin=subprocess.PIPE if input is not None else None,
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, env=env) as process:
+        with deadline.on_cancel(process.kill):
+            try:
+                stdout, stderr = process.communicate(input, timeout=budget)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.communicate()
+                if deadline.done:
+                    raise deadline.error()
+                raise
+        if deadline.cancelled:
+            raise deadline.error()
+    return subprocess.CompletedProcess(cmd, process.returncode, stdout, stderr)
@@ -0,0 +1,516 @@
+#!/usr/bin/env python3
+"""
+Desired-State Apply
+
+One declarative spec of servers and groups, applied as a minimal plan:
+
+    servers:
+      github:
+        image: node:22-slim
+        command: [npx, -y, "@modelcontextprotocol/server-github"]
+        env_vars: {GITHUB_TOKEN: "..."}
+        description: GitHub tools
+        bake: false
+        limits: {memory: 256m, cpus: 0.5}
+        host: gpu1            # optional, see docker_hosts
+    groups:
+      dev:
+        description: Tools for dev
+        tools: [github__search_code, filesystem__read_file]
+
+The spec is compared with the dynamic servers in docker-compose.yaml (their
+image, command, description, declared secrets, limits and host) and with
+the group files, and only the differences become steps:
+
+- pull:<server>          pull (and bake) the image of a new or changed server
+- remove:<server>        remove a changed server before re-provisioning it,
+                         once its new image is pulled
+- provision:<server>     run the provisioning pipeline (with its rollback);
+                         if a changed server's replacement fails, its
+                         previous definition is provisioned again
+- limits:<server>        update the memory/CPU limits of a server in place
+                         when nothing else about it changed
+- create-group/update-group:<group>
+                         after the servers whose tools the group names
+- delete-group/deprovision:<name>
+                         with prune only: groups and dynamic servers missing
+                         from the spec; servers go after every group step
+
+Steps form a DAG and run in parallel, at most EMCP_APPLY_CONCURRENCY at a
+time; when a step fails, the steps that depend on it are skipped. Applying
+the same spec again only retries what did not converge.
+
+Servers not created dynamically (e.g. the demo filesystem server) are
+neither compared nor pruned. Secrets listed in env_vars are compared by
+value; removing a key from the spec does not remove the stored secret.
+
+The CLI posts a spec to a running manager (POST /api/apply):
+
+    python desired_state.py spec.yaml [--dry-run] [--prune]
+    python desired_state.py - < spec.yaml
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from io import StringIO
+
+from compose_manager import (
+    DYNAMIC_LABEL, HOST_LABEL, ComposeError, load_compose, normalize_limits, parse_memory,
+    update_limits
+)
+from docker_hosts import LOCAL_HOST, DockerHostError, get_host, release
+from deadline import Deadline
+from provisioner import (
+    PROVISION_DEADLINE, ProvisionError, deprovision_server, install_server, place_server,
+    prepare_image, server_name
+)
+from secret_resolver import SecretError, resolve_secrets
+
+RESTORE_NOTE = "previous definition restored if the replacement fails"
+
+# Configuration
+APPLY_CONCURRENCY = int(os.getenv("EMCP_APPLY_CONCURRENCY", "4"))
+MANAGER_URL = os.getenv("EMCP_MANAGER_URL", "http://localhost:5000")
+
+SERVER_FIELDS = ("image", "command", "env_vars", "description", "bake", "limits", "host")
+GROUP_FIELDS = ("tools", "description")
+
+
+class DesiredStateError(Exception):
+    """Raised for an invalid spec."""
+    pass
+
+
+def load_spec(text: str) -> dict:
+    """Parse a spec from JSON or YAML text."""
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+    try:
+        from ruamel.yaml import YAML
+        return YAML(typ="safe").load(StringIO(text)) or {}
+    except Exception as e:
+        raise DesiredStateError(f"Spec is neither valid JSON nor YAML: {e}")
+
+
+def validate_spec(spec: dict, group_name=None) -> dict:
+    """
+    Check a spec and fill in defaults.
+
+    Args:
+        spec: Parsed spec
+        group_name: Optional group name sanitizer; names must already be
+            in sanitized form
+
+    Returns:
+        dict: {"servers": {name: {...}}, "groups": {name: {...}}}
+
+    Raises:
+        DesiredStateError: Describing every problem found
+    """
+    if not isinstance(spec, dict):
+        raise DesiredStateError("Spec must be a mapping with 'servers' and/or 'groups'")
+    errors = []
+    unknown = set(spec) - {"servers", "groups"}
+    if unknown:
+        errors.append(f"Unknown top-level keys: {', '.join(sorted(unknown))}")
+
+    servers = {}
+    for name, server in (spec.get("servers") or {}).items():
+        where = f"servers.{name}"
+        try:
+            if server_name(name) != name:
+                errors.append(f"{where}: use the sanitized name '{server_name(name)}'")
+        except ProvisionError as e:
+            errors.append(f"{where}: {e}")
+        if not isinstance(server, dict):
+            errors.append(f"{where}: must be a mapping")
+            continue
+        extra = set(server) - set(SERVER_FIELDS)
+        if extra:
+            errors.append(f"{where}: unknown fields {', '.join(sorted(extra))}")
+        image = server.get("image")
+        command = server.get("command") or []
+        env_vars = server.get("env_vars") or {}
+        if not isinstance(image, str) or not image.strip():
+            errors.append(f"{where}.image is required")
+        if not isinstance(command, list) or not all(isinstance(arg, str) for arg in command):
+            errors.append(f"{where}.command must be a list of strings")
+        if not isinstance(env_vars, dict):
+            errors.append(f"{where}.env_vars must be a mapping")
+            env_vars = {}
+        try:
+            limits = normalize_limits(server.get("limits"))
+        except ComposeError as e:
+            errors.append(f"{where}.limits: {e}")
+            limits = normalize_limits(None)
+        host = server.get("host")
+        if host is not None:
+            try:
+                get_host(host)
+            except DockerHostError as e:
+                errors.append(f"{where}.host: {e}")
+        servers[name] = {
+            "image": (image or "").strip() if isinstance(image, str) else image,
+            "command": list(command) if isinstance(command, list) else command,
+            "env_vars": {str(k): str(v) for k, v in env_vars.items()},
+            "description": server.get("description") or f"Dynamic MCP server: {name}",
+            "bake": bool(server.get("bake", False)),
+            "limits": limits,
+            "host": host,
+        }
+
+    groups = {}
+    for name, group in (spec.get("groups") or {}).items():
+        where = f"groups.{name}"
+        if group_name:
+            try:
+                if group_name(name) != name:
+                    errors.append(f"{where}: use the sanitized name '{group_name(name)}'")
+            except ValueError as e:
+                errors.append(f"{where}: {e}")
+        if not isinstance(group, dict):
+            errors.append(f"{where}: must be a mapping")
+            continue
+        extra = set(group) - set(GROUP_FIELDS)
+        if extra:
+            errors.append(f"{where}: unknown fields {', '.join(sorted(extra))}")
+        tools = group.get("tools") or []
+        if not isinstance(tools, list) or not all(isinstance(tool, str) for tool in tools):
+            errors.append(f"{where}.tools must be a list of tool names")
+            tools = []
+        groups[name] = {"tools": list(dict.fromkeys(tools)), "description": group.get("description")}
+
+    if errors:
+        raise DesiredStateError("; ".join(errors))
+    return {"servers": servers, "groups": groups}
+
+
+def current_servers() -> dict:
+    """
+    Dynamic servers as recorded in docker-compose.yaml.
+
+    Returns:
+        dict: {name: {"image", "command", "description", "limits", "host",
+        "run_image", "env_var_names", "env_file"}}; run_image is the image
+        the container runs (baked or not), env_var_names the secrets its
+        compose entry references, env_file whether it loads an env file
+
+    Raises:
+        ComposeError: If the compose file cannot be read
+    """
+    services = load_compose(read_only=True).get("services") or {}
+    servers = {}
+    for service_name, service in services.items():
+        labels = service.get("labels") or {}
+        if isinstance(labels, list):
+            labels = dict(label.partition("=")[::2] for label in labels)
+        if str(labels.get(DYNAMIC_LABEL, "")).lower() != "true" or not service_name.endswith("-mcp"):
+            continue
+        name = service_name[:-len("-mcp")]
+        servers[name] = {
+            "image": labels.get("emcp.source-image") or service.get("image"),
+            # Servers on other hosts run their command inside a bridge
+            "command": (json.loads(labels["emcp.source-command"]) if labels.get("emcp.source-command")
+                        else [str(arg) for arg in (service.get("command") or [])]),
+            "description": labels.get("emcp.description", ""),
+            "host": labels.get(HOST_LABEL) or LOCAL_HOST,
+            "limits": {
+                "memory": parse_memory(service["mem_limit"]) if service.get("mem_limit") else None,
+                "cpus": float(service["cpus"]) if service.get("cpus") else None,
+            },
+            "run_image": service.get("image"),
+            # Secrets are referenced as KEY=${KEY}; other entries are literal
+            "env_var_names": [str(entry).partition("=")[0] for entry in service.get("environment") or []
+                              if str(entry).partition("=")[2].startswith("${")],
+            "env_file": bool(service.get("env_file")),
+        }
+    return servers
+
+
+def _server_changes(name: str, desired: dict, current: dict) -> list[str]:
+    """Fields of a server that differ from its desired definition."""
+    changes = [field for field in ("image", "command", "description")
+               if desired[field] != current.get(field)]
+    # Without a host in the spec, a server stays where it was placed
+    if desired["host"] and desired["host"] != current.get("host"):
+        changes.append("host")
+    if desired["env_vars"]:
+        try:
+            stored = resolve_secrets(name, list(desired["env_vars"]))
+        except SecretError:
+            stored = {}
+        if stored != desired["env_vars"]:
+            changes.append("env_vars")
+    return changes
+
+
+def _step(action: str, target: str, after=(), reason: str = "") -> dict:
+    return {"id": f"{action}:{target}", "action": action, "target": target,
+            "after": sorted(after), "reason": reason}
+
+
+def plan(spec: dict, servers: dict, groups: dict, prune: bool = False,
+         protected_groups=()) -> dict:
+    """
+    Compute the steps that take the current state to the spec.
+
+    Args:
+        spec: Validated spec (see validate_spec)
+        servers: Current dynamic servers (see current_servers)
+        groups: Current groups {name: config}
+        prune: Also remove dynamic servers and groups missing from the spec
+        protected_groups: Groups never deleted by prune
+
+    Returns:
+        dict: {"steps": [...], "unchanged": {"servers": [...], "groups": [...]}}
+    """
+    steps = []
+    unchanged = {"servers": [], "groups": []}
+    provisioned = {}
+
+    for name, desired in sorted(spec["servers"].items()):
+        if name not in servers:
+            steps.append(_step("pull", name, reason="new server"))
+            steps.append(_step("provision", name, [f"pull:{name}"], "new server"))
+        else:
+            changes = _server_changes(name, desired, servers[name])
+            # Limits set in the spec are changed in place; unset ones are left alone
+            limits = [key for key, value in desired["limits"].items()
+                      if value is not None and value != (servers[name].get("limits") or {}).get(key)]
+            if not changes and limits:
+                steps.append(_step("limits", name, reason=f"changed: {', '.join(limits)} limit"))
+                continue
+            if not changes:
+                unchanged["servers"].append(name)
+                continue
+            reason = f"changed: {', '.join(changes)}"
+            steps.append(_step("pull", name, reason=reason))
+            steps.append(_step("remove", name, [f"pull:{name}"], f"{reason}; {RESTORE_NOTE}"))
+            steps.append(_step("provision", name, [f"remove:{name}"], reason))
+        provisioned[name] = f"provision:{name}"
+
+    group_steps = []
+    for name, desired in sorted(spec["groups"].items()):
+        needs = {provisioned[tool.split("__", 1)[0]] for tool in desired["tools"]
+                 if tool.split("__", 1)[0] in provisioned}
+        current = groups.get(name)
+        if current is None:
+            group_steps.append(_step("create-group", name, needs, "new group"))
+        elif set(current.get("included_tools", [])) != set(desired["tools"]):
+            have = set(current.get("included_tools", []))
+            added, removed = set(desired["tools"]) - have, have - set(desired["tools"])
+            group_steps.append(_step("update-group", name, needs,
+                                     f"+{len(added)} -{len(removed)} tools"))
+        else:
+            unchanged["groups"].append(name)
+
+    if prune:
+        for name in sorted(set(groups) - set(spec["groups"]) - set(protected_groups)):
+            group_steps.append(_step("delete-group", name, reason="not in spec"))
+    steps.extend(group_steps)
+
+    if prune:
+        group_ids = [step["id"] for step in group_steps]
+        for name in sorted(set(servers) - set(spec["servers"])):
+            steps.append(_step("deprovision", name, group_ids, "not in spec"))
+
+    return {"steps": steps, "unchanged": unchanged}
+
+
+def execute(steps: list[dict], handlers: dict, concurrency: int = APPLY_CONCURRENCY) -> list[dict]:
+    """
+    Run plan steps in dependency order, independent steps in parallel.
+
+    Args:
+        steps: Steps from plan()
+        handlers: {action: callable(step) -> dict or None}
+        concurrency: Maximum steps in flight
+
+    Returns:
+        list[dict]: One result per step, in plan order, with "status"
+        ("ok", "failed", "skipped"), "error", "elapsed_ms" and "detail"
+    """
+    results = {step["id"]: {**step, "status": "pending"} for step in steps}
+    waiting = {step["id"]: set(step["after"]) & set(results) for step in steps}
+    lock = threading.Lock()
+
+    def run(step_id):
+        started = time.perf_counter()
+        step = results[step_id]
+        try:
+            detail = handlers[step["action"]](step)
+            outcome = {"status": "ok", "detail": detail or {}}
+        except Exception as e:
+            outcome = {"status": "failed", "error": str(e)}
+        outcome["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        with lock:
+            step.update(outcome)
+        return step_id
+
+    def skip_dependents(failed_id):
+        for step_id, deps in waiting.items():
+            if failed_id in deps and results[step_id]["status"] == "pending":
+                results[step_id]["status"] = "skipped"
+                results[step_id]["error"] = f"{failed_id} did not complete"
+                skip_dependents(step_id)
+
+    running = set()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="apply") as pool:
+        while True:
+            for step_id, deps in waiting.items():
+                if (results[step_id]["status"] == "pending" and step_id not in running
+                        and all(results[dep]["status"] == "ok" for dep in deps)):
+                    results[step_id]["status"] = "running"
+                    running.add(pool.submit(run, step_id))
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                running.discard(future)
+                step_id = future.result()
+                if results[step_id]["status"] != "ok":
+                    skip_dependents(step_id)
+
+    return [results[step["id"]] for step in steps]
+
+
+def server_handlers(spec: dict, servers: dict = None) -> dict:
+    """
+    Step handlers for server actions, sharing pulled images between steps.
+
+    A server's pull and provision steps share one EMCP_PROVISION_DEADLINE.
+    The remove step of a changed server keeps its previous definition
+    (including its secrets); if provisioning the replacement fails, that
+    definition is installed again and the step fails with both outcomes.
+
+    Args:
+        spec: Validated spec
+        servers: Current dynamic servers (see current_servers); a changed
+            server without a host in the spec stays on its current host
+    """
+    prepared = {}
+    previous = {}
+
+    def pull(step):
+        name = step["target"]
+        server = spec["servers"][name]
+        host = server["host"] or (servers or {}).get(name, {}).get("host")
+        placement = place_server(name, server["limits"], host)
+        deadline = Deadline(PROVISION_DEADLINE)
+        try:
+            result = prepare_image(name, server["image"], server["command"], bake=server["bake"],
+                                   host=placement["host"], deadline=deadline)
+        except ProvisionError:
+            release(name)
+            raise
+        prepared[name] = {**result, "host": placement["host"], "deadline": deadline}
+        return {"image": result["image"], "host": placement["host"], "warnings": result["warnings"]}
+
+    def remove(step):
+        name = step["target"]
+        current = (servers or {}).get(name)
+        if current is not None:
+            # Read before the secrets are dropped, so the server can be restored
+            keys = current["env_var_names"] or (None if current["env_file"] else [])
+            try:
+                env_vars = resolve_secrets(name, keys) if keys != [] else {}
+            except SecretError as e:
+                raise ProvisionError(f"Kept '{name}': its secrets cannot be read to restore it "
+                                     f"if the replacement fails: {e}")
+            previous[name] = {**current, "env_vars": env_vars}
+        deprovision_server(name)
+
+    def restore(name, error):
+        """Install a replaced server's previous definition after error."""
+        old = previous.pop(name)
+        try:
+            install_server(name, old["run_image"], old["command"], old["env_vars"], old["description"],
+                           source_image=old["image"], limits=old["limits"], host=old["host"],
+                           deadline=Deadline(PROVISION_DEADLINE))
+        except ProvisionError as e:
+            return ProvisionError(f"{error}; restoring the previous definition also failed: {e}",
+                                  status=error.status, step=error.step)
+        return ProvisionError(f"{error}; restored the previous definition", status=error.status,
+                              step=error.step)
+
+    def provision(step):
+        name = step["target"]
+        server = spec["servers"][name]
+        # Rolls back its own completed steps on failure
+        try:
+            result = install_server(name, prepared[name]["image"], server["command"],
+                                    server["env_vars"], server["description"],
+                                    source_image=server["image"], limits=server["limits"],
+                                    host=prepared[name]["host"], deadline=prepared[name]["deadline"])
+        except ProvisionError as e:
+            if name not in previous:
+                raise
+            raise restore(name, e)
+        finally:
+            release(name)
+        previous.pop(name, None)
+        return {"container_name": result["container_name"], "host": result["host"],
+                "mcp_ready": result["mcp_ready"]}
+
+    def limits(step):
+        update_limits(step["target"], spec["servers"][step["target"]]["limits"])
+
+    def deprovision(step):
+        deprovision_server(step["target"])
+
+    return {"pull": pull, "remove": remove, "provision": provision, "limits": limits,
+            "deprovision": deprovision}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Apply a desired-state spec to a running eMCP manager")
+    parser.add_argument("spec", help="Spec file (JSON or YAML), or - for stdin")
+    parser.add_argument("--dry-run", action="store_true", help="Only show the plan")
+    parser.add_argument("--prune", action="store_true",
+                        help="Remove dynamic servers and groups missing from the spec")
+    parser.add_argument("--url", default=MANAGER_URL, help=f"Manager URL (default {MANAGER_URL})")
+    args = parser.parse_args(argv)
+
+    import requests
+
+    text = sys.stdin.read() if args.spec == "-" else open(args.spec).read()
+    try:
+        spec = load_spec(text)
+    except DesiredStateError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    try:
+        response = requests.post(f"{args.url}/api/apply", json={
+            "spec": spec, "dry_run": args.dry_run, "prune": args.prune
+        }, timeout=3600)
+        result = response.json()
+    except (requests.RequestException, ValueError) as e:
+        print(f"Error: manager unreachable at {args.url}: {e}", file=sys.stderr)
+        return 1
+    if "steps" not in result:
+        print(f"Error: {result.get('error', response.text)}", file=sys.stderr)
+        return 1
+
+    for step in result["steps"]:
+        status = step.get("status", "planned")
+        line = f"  {status:<8} {step['id']:<32} {step['reason']}"
+        if step.get("error"):
+            line += f"  ({step['error']})"
+        print(line)
+    unchanged = result["unchanged"]
+    print(f"{len(result['steps'])} steps, {len(unchanged['servers'])} servers and "
+          f"{len(unchanged['groups'])} groups unchanged"
+          + (" (dry run)" if args.dry_run else f", {result.get('elapsed_ms', 0) / 1000:.1f}s"))
+    return 0 if result.get("success") else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
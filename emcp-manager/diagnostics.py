@@ -0,0 +1,479 @@
+#!/usr/bin/env python3
+"""
+Diagnostics
+
+The checks behind skill/scripts/*.sh, run from inside the manager:
+
+- containers    every compose service's container is running
+- gateway       MCPJungle answers /api/v0/tools, and with tools
+- handshake     every running server answers an MCP initialize request
+- ports         published ports are free and held by the right container
+- group_tools   group files only name tools the gateway serves
+- drift         docker-compose.yaml, configs/ and MCPJungle registrations agree
+
+All checks start at once and share each data source (the container list,
+the compose file, the tool catalog, ...), which is fetched once, on first
+use. A check still running at the deadline is reported as "timeout"
+instead of holding up the report. Handshakes run at most
+EMCP_DIAGNOSTICS_CONCURRENCY at a time and reuse recent health monitor
+results, so only servers without a fresh result are probed.
+
+Each check reports a status ("ok", "warn", "fail", "timeout" or "error"),
+a one-line summary, details and, when something is wrong, a fix.
+
+    python diagnostics.py [--check NAME ...] [--timeout SECONDS] [--fresh] [--json]
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import requests
+
+from compose_manager import (
+    COMPOSE_DIR, CONFIGS_DIR, DYNAMIC_LABEL, HOST_LABEL, ComposeError,
+    _run_docker, list_containers, load_compose, probe_mcp
+)
+from docker_hosts import LOCAL_HOST
+from health_monitor import read_server_configs
+from mcpjungle_client import EMCP_CONTAINER, MCPJUNGLE_API, list_servers, list_tools
+from reconciler import load_configs, plan as plan_registrations
+
+# Configuration
+DIAGNOSTICS_TIMEOUT = float(os.getenv("EMCP_DIAGNOSTICS_TIMEOUT", "5"))
+DIAGNOSTICS_CONCURRENCY = int(os.getenv("EMCP_DIAGNOSTICS_CONCURRENCY", "16"))
+PROBE_TIMEOUT = int(os.getenv("EMCP_DIAGNOSTICS_PROBE_TIMEOUT", "4"))
+
+# Health monitor results younger than this are used instead of a new probe
+HANDSHAKE_MAX_AGE = float(os.getenv("EMCP_DIAGNOSTICS_HANDSHAKE_MAX_AGE", "120"))
+
+# Findings listed per check before the rest are only counted
+MAX_DETAILS = 50
+
+STATUS_ORDER = ("ok", "warn", "timeout", "error", "fail")
+
+_VARIABLE = re.compile(r"\$\{([A-Za-z_][A-Za-z0-9_]*)(?::?-([^}]*))?\}")
+_PORT_IN_USE = ("port is already allocated", "address already in use")
+
+
+class DiagnosticsError(Exception):
+    """Raised for an unknown check name."""
+    pass
+
+
+def _result(status: str, summary: str, details=None, fix: str = None) -> dict:
+    result = {"status": status, "summary": summary}
+    if details:
+        if isinstance(details, list) and len(details) > MAX_DETAILS:
+            details = details[:MAX_DETAILS] + [f"... and {len(details) - MAX_DETAILS} more"]
+        result["details"] = details
+    if fix:
+        result["fix"] = fix
+    return result
+
+
+def _read_env_file(path: str) -> dict:
+    env = {}
+    try:
+        with open(path) as f:
+            for line in f:
+                key, sep, value = line.strip().partition("=")
+                if sep and key and not key.startswith("#"):
+                    env[key.strip()] = value.strip().strip('"').strip("'")
+    except OSError:
+        pass
+    return env
+
+
+def _expand(value: str, env: dict) -> str:
+    """Expand ${VAR}, ${VAR:-default} and ${VAR-default} like docker compose."""
+    return _VARIABLE.sub(lambda m: env.get(m.group(1)) or m.group(2) or "", str(value))
+
+
+def _service_host(service: dict) -> str:
+    """Docker host a compose service runs on."""
+    labels = service.get("labels") or {}
+    if isinstance(labels, list):
+        labels = dict(label.partition("=")[::2] for label in labels)
+    return labels.get(HOST_LABEL) or LOCAL_HOST
+
+
+def _declared_ports(service: dict, env: dict) -> list[dict]:
+    """Host ports a compose service publishes ("[ip:]host:container[/proto]" or long form)."""
+    ports = []
+    for entry in service.get("ports") or []:
+        if isinstance(entry, dict):
+            host, private = entry.get("published"), entry.get("target")
+            protocol = entry.get("protocol", "tcp")
+        else:
+            spec, _, protocol = _expand(entry, env).partition("/")
+            parts = spec.rsplit(":", 2)
+            if len(parts) < 2:
+                continue  # container port only, no host binding
+            host, private = parts[-2], parts[-1]
+        host = _expand(host, env) if host is not None else ""
+        if str(host).isdigit():
+            ports.append({"host_port": int(host), "container_port": str(private),
+                          "protocol": protocol or "tcp"})
+    return ports
+
+
+class _Sources:
+    """Lazily fetched data shared by the checks; each source is fetched at most once."""
+
+    def __init__(self, configs_dir: str, groups_dir: str, api_url: str, tools=None, health=None):
+        self.configs_dir = configs_dir
+        self.groups_dir = groups_dir
+        self.api_url = api_url
+        self.health = health
+        self._fetchers = {
+            "containers": list_containers,
+            "compose": lambda: load_compose(read_only=True).get("services") or {},
+            "env": lambda: {**_read_env_file(os.path.join(COMPOSE_DIR, ".env")), **os.environ},
+            "configs": lambda: load_configs(self.configs_dir),
+            "server_configs": lambda: read_server_configs(self.configs_dir),
+            "registered": lambda: list_servers(self.api_url, timeout=DIAGNOSTICS_TIMEOUT),
+            "tools": tools or (lambda: list_tools(self.api_url, timeout=DIAGNOSTICS_TIMEOUT)),
+            "groups": self._read_groups,
+        }
+        self._values = {}
+        self._locks = {name: threading.Lock() for name in self._fetchers}
+
+    def get(self, name: str):
+        """Fetch a source (or re-raise the error from its one fetch)."""
+        with self._locks[name]:
+            if name not in self._values:
+                started = time.perf_counter()
+                try:
+                    self._values[name] = (True, self._fetchers[name](), time.perf_counter() - started)
+                except Exception as e:
+                    self._values[name] = (False, e, time.perf_counter() - started)
+            ok, value, _ = self._values[name]
+        if not ok:
+            raise value
+        return value
+
+    def elapsed(self, name: str):
+        entry = self._values.get(name)
+        return round(entry[2] * 1000, 1) if entry else None
+
+    def _read_groups(self) -> dict:
+        groups = {}
+        if not os.path.isdir(self.groups_dir):
+            return groups
+        for filename in sorted(os.listdir(self.groups_dir)):
+            path = os.path.join(self.groups_dir, filename)
+            if filename.endswith('.json') and os.path.isfile(path):
+                try:
+                    with open(path) as f:
+                        groups[filename[:-5]] = json.load(f)
+                except (OSError, ValueError):
+                    groups[filename[:-5]] = None
+        return groups
+
+
+# -- Checks ----------------------------------------------------------------
+
+def check_containers(sources: _Sources, deadline: float, fresh: bool) -> dict:
+    containers = sources.get("containers")
+    services = sources.get("compose")
+    problems = []
+    for service_name, service in sorted(services.items()):
+        container = service.get("container_name") or service_name
+        state = containers.get(container, {}).get("state", "not found")
+        if state != "running":
+            status = containers.get(container, {}).get("status") or state
+            problems.append(f"{container}: {status}")
+    if not problems:
+        return _result("ok", f"All {len(services)} containers running")
+    core = [p for p in problems if not p.split(":")[0].endswith("-mcp")]
+    return _result(
+        "fail" if core else "warn",
+        f"{len(problems)} of {len(services)} containers not running",
+        problems,
+        "Run: make up" if core else "Restart with POST /api/servers/{name}/restart, or run ./skill/scripts/fix-unhealthy.sh"
+    )
+
+
+def check_gateway(sources: _Sources, deadline: float, fresh: bool) -> dict:
+    try:
+        tools = sources.get("tools")
+    except (requests.RequestException, ValueError) as e:
+        return _result("fail", "Gateway not responding", [str(e)],
+                       f"Check `docker logs {EMCP_CONTAINER}`, then run ./skill/scripts/no-tools.sh")
+    details = {"tools": len(tools), "response_ms": sources.elapsed("tools")}
+    if not tools:
+        return _result("warn", "Gateway responding with no tools", details,
+                       "Run: make register REGISTER_ARGS=--force")
+    return _result("ok", f"Gateway responding with {len(tools)} tools", details)
+
+
+def check_handshake(sources: _Sources, deadline: float, fresh: bool) -> dict:
+    servers = sources.get("server_configs")
+    containers = sources.get("containers")
+    cached = {}
+    if sources.health is not None and not fresh:
+        now = time.time()
+        for entry in sources.health.servers():
+            checked = entry["health"].get("last_checked")
+            if checked and now - checked <= HANDSHAKE_MAX_AGE and entry["health"]["health"] in ("healthy", "unhealthy"):
+                cached[entry["name"]] = (entry["health"]["health"] == "healthy", entry["health"].get("last_error") or "")
+
+    results = {}
+    to_probe = []
+    for name, server in sorted(servers.items()):
+        if server["command"] is None and not server["url"]:
+            continue  # neither run through docker exec nor a bridged endpoint
+        if containers.get(server["container"], {}).get("state") != "running":
+            results[name] = "not running"
+        elif name in cached:
+            ok, error = cached[name]
+            results[name] = None if ok else (error or "unhealthy")
+        else:
+            to_probe.append((name, server))
+
+    # Leave time to report: probes that cannot finish before the deadline are skipped
+    probe_timeout = max(1, min(PROBE_TIMEOUT, int(deadline - time.monotonic() - 0.5)))
+    pool = ThreadPoolExecutor(max_workers=max(1, min(DIAGNOSTICS_CONCURRENCY, len(to_probe) or 1)),
+                              thread_name_prefix="diagnostics-probe")
+    futures = {pool.submit(probe_mcp, server["container"], server["command"], probe_timeout,
+                           url=server["url"]): name
+               for name, server in to_probe}
+    done, _ = wait(futures, timeout=max(0, deadline - time.monotonic() - 0.2))
+    pool.shutdown(wait=False, cancel_futures=True)
+    skipped = 0
+    for future, name in futures.items():
+        if future in done:
+            ok, error = future.result()
+            results[name] = None if ok else (error or "no response")
+        else:
+            skipped += 1
+
+    failed = [f"{name}: {error}" for name, error in sorted(results.items()) if error]
+    summary = (f"{len(results) - len(failed)} of {len(results)} servers answered"
+               f" ({len(to_probe) - skipped} probed, {len(results) - len(to_probe) + skipped} from cache or not running)")
+    if skipped:
+        summary += f"; {skipped} not probed before the deadline"
+    if failed:
+        return _result("fail", summary, failed,
+                       "Check `docker logs <server>-mcp`; restart with POST /api/servers/{name}/restart")
+    return _result("warn" if skipped else "ok", summary)
+
+
+def _port_error(container: str, host: str = None) -> str:
+    result = _run_docker(["inspect", "--format", "{{.State.Error}}", container], timeout=5, host=host)
+    error = result.stdout.strip() if result.returncode == 0 else ""
+    return error if any(marker in error for marker in _PORT_IN_USE) else ""
+
+
+def check_ports(sources: _Sources, deadline: float, fresh: bool) -> dict:
+    services = sources.get("compose")
+    containers = sources.get("containers")
+    env = sources.get("env")
+
+    # Ports are per Docker host; the local host is left out of the labels
+    holders = {}
+    for name, container in containers.items():
+        for port in container["ports"]:
+            key = (container.get("host", LOCAL_HOST), port["host_port"], port["protocol"])
+            holders.setdefault(key, set()).add(name)
+
+    def label(key):
+        host, host_port, protocol = key
+        return f"{host_port}/{protocol}" + ("" if host == LOCAL_HOST else f" on {host}")
+
+    declared = {}
+    problems = []
+    for service_name, service in sorted(services.items()):
+        container = service.get("container_name") or service_name
+        host = _service_host(service)
+        for port in _declared_ports(service, env):
+            key = (host, port["host_port"], port["protocol"])
+            declared.setdefault(key, []).append(container)
+            others = holders.get(key, set()) - {container}
+            state = containers.get(container, {}).get("state")
+            if others:
+                problems.append(f"{label(key)} ({container}) is held by {', '.join(sorted(others))}")
+            elif state and state != "running":
+                error = _port_error(container, host)
+                if error:
+                    problems.append(f"{label(key)} ({container}): {error}")
+            elif state == "running" and container not in holders.get(key, set()):
+                problems.append(f"{label(key)} ({container}) is not published; recreate the container")
+
+    for key, owners in sorted(declared.items()):
+        if len(owners) > 1:
+            problems.append(f"{label(key)} is declared by {', '.join(owners)}")
+
+    if problems:
+        return _result("fail", f"{len(problems)} port problem(s)", problems,
+                       "Set EMCP_GATEWAY_PORT / EMCP_MANAGER_PORT in .env to free ports, then run: make up")
+    return _result("ok", f"{len(declared)} published ports free and bound", [
+        f"{label(key)} -> {', '.join(owners)}" for key, owners in sorted(declared.items())
+    ])
+
+
+def check_group_tools(sources: _Sources, deadline: float, fresh: bool) -> dict:
+    groups = sources.get("groups")
+    try:
+        served = {tool.get("name") for tool in sources.get("tools")}
+    except (requests.RequestException, ValueError) as e:
+        return _result("error", "Cannot compare groups without the tool catalog", [str(e)])
+
+    problems = []
+    for name, config in groups.items():
+        if config is None:
+            problems.append(f"{name}: unreadable group file")
+            continue
+        dangling = sorted(set(config.get("included_tools") or []) - served)
+        if dangling:
+            problems.append(f"{name}: {len(dangling)} missing tool(s): {', '.join(dangling[:10])}"
+                            + (" ..." if len(dangling) > 10 else ""))
+    if problems:
+        return _result("warn", f"{len(problems)} of {len(groups)} groups name tools the gateway does not serve",
+                       problems, "Re-register the tools' servers (make register), or deselect the tools in the web UI")
+    return _result("ok", f"All tools in {len(groups)} groups are served")
+
+
+def check_drift(sources: _Sources, deadline: float, fresh: bool) -> dict:
+    services = sources.get("compose")
+    configs = sources.get("configs")
+    server_configs = sources.get("server_configs")
+
+    problems = []
+    compose_containers = {service.get("container_name") or name for name, service in services.items()}
+    for service_name, service in sorted(services.items()):
+        labels = service.get("labels") or {}
+        dynamic = (labels.get(DYNAMIC_LABEL) == "true" if isinstance(labels, dict)
+                   else f"{DYNAMIC_LABEL}=true" in labels)
+        name = service.get("container_name") or service_name
+        name = name[:-len("-mcp")] if name.endswith("-mcp") else name
+        if dynamic and name not in configs:
+            problems.append(f"{name}: in docker-compose.yaml but has no config")
+    for name, server in sorted(server_configs.items()):
+        if server["command"] is not None and server["container"] not in compose_containers:
+            problems.append(f"{name}: config runs {server['container']}, which is not in docker-compose.yaml")
+
+    try:
+        registered = sources.get("registered")
+    except (requests.RequestException, ValueError) as e:
+        problems.append(f"Cannot compare registrations: {e}")
+        return _result("error", f"{len(problems)} drift finding(s)", problems)
+
+    actions = plan_registrations(configs, registered)
+    problems += [f"{name}: config not registered" for name in actions["register"]]
+    problems += [f"{name}: registration differs from config" for name in actions["reregister"]]
+    problems += [f"{name}: registered without a config" for name in actions["deregister"]]
+
+    if problems:
+        return _result("warn", f"{len(problems)} drift finding(s)", problems,
+                       "Run: make register (or POST /api/servers/reconcile)")
+    return _result("ok", f"{len(configs)} configs, compose services and registrations agree")
+
+
+CHECKS = {
+    "containers": check_containers,
+    "gateway": check_gateway,
+    "handshake": check_handshake,
+    "ports": check_ports,
+    "group_tools": check_group_tools,
+    "drift": check_drift,
+}
+
+
+def run_diagnostics(checks=None, timeout: float = DIAGNOSTICS_TIMEOUT, fresh: bool = False,
+                    configs_dir: str = CONFIGS_DIR, groups_dir: str = None,
+                    api_url: str = MCPJUNGLE_API, tools=None, health=None) -> dict:
+    """
+    Run checks concurrently and collect a report.
+
+    Args:
+        checks: Names of checks to run (default: all)
+        timeout: Seconds until unfinished checks are reported as "timeout"
+        fresh: Probe every server instead of reusing health monitor results
+        configs_dir: Directory of server configs
+        groups_dir: Directory of group files
+        api_url: MCPJungle REST API base URL
+        tools: Callable returning the tool catalog (default: fetch from api_url)
+        health: HealthMonitor whose recent probe results may be reused
+
+    Returns:
+        dict: {"status": worst status, "checks": {name: {"status", "summary",
+        "details", "fix", "elapsed_ms"}}, "elapsed_ms"}
+
+    Raises:
+        DiagnosticsError: If a check name is unknown
+    """
+    names = list(checks or CHECKS)
+    unknown = [name for name in names if name not in CHECKS]
+    if unknown:
+        raise DiagnosticsError(f"Unknown check(s): {', '.join(unknown)}. Available: {', '.join(CHECKS)}")
+
+    started = time.monotonic()
+    deadline = started + timeout
+    sources = _Sources(configs_dir, groups_dir or os.getenv("GROUPS_DIR", "/groups"), api_url,
+                       tools=tools, health=health)
+    finished_at = {}
+
+    def run(name):
+        try:
+            return CHECKS[name](sources, deadline, fresh)
+        except ComposeError as e:
+            return _result("error", str(e))
+        except Exception as e:
+            return _result("error", f"{type(e).__name__}: {e}")
+        finally:
+            finished_at[name] = time.monotonic()
+
+    pool = ThreadPoolExecutor(max_workers=len(names), thread_name_prefix="diagnostics")
+    futures = {name: pool.submit(run, name) for name in names}
+    wait(futures.values(), timeout=timeout)
+    pool.shutdown(wait=False)
+
+    report = {}
+    for name, future in futures.items():
+        if future.done():
+            result = future.result()
+            result["elapsed_ms"] = round((finished_at[name] - started) * 1000, 1)
+        else:
+            result = _result("timeout", f"No result within {timeout:g}s")
+        report[name] = result
+
+    return {
+        "status": max((r["status"] for r in report.values()), key=STATUS_ORDER.index, default="ok"),
+        "checks": report,
+        "elapsed_ms": round((time.monotonic() - started) * 1000, 1),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run eMCP diagnostics")
+    parser.add_argument("--check", action="append", choices=list(CHECKS),
+                        help="Run only this check (repeatable)")
+    parser.add_argument("--timeout", type=float, default=DIAGNOSTICS_TIMEOUT)
+    parser.add_argument("--fresh", action="store_true", help="Probe every server now")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args(argv)
+
+    report = run_diagnostics(args.check, timeout=args.timeout, fresh=args.fresh)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for name, result in report["checks"].items():
+            print(f"{result['status'].upper():8} {name}: {result['summary']}")
+            details = result.get("details")
+            for line in details if isinstance(details, list) else []:
+                print(f"         - {line}")
+            if result.get("fix"):
+                print(f"         FIX: {result['fix']}")
+        print(f"\n{report['status'].upper()} in {report['elapsed_ms'] / 1000:.1f}s")
+    return 0 if report["status"] in ("ok", "warn") else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,396 @@
+"""
+Docker Engine API Client
+
+Minimal client for the Docker Engine HTTP API over the mounted socket.
+
+The Docker CLI is fine for one-shot commands, but some operations need the
+structured, streaming responses that only the Engine API provides (e.g. the
+per-layer JSON progress events emitted while pulling an image). This module
+speaks HTTP directly over the unix socket using only the standard library.
+
+Pulls through the API carry the registry credentials of the Docker CLI
+config (DOCKER_CONFIG, default ~/.docker): its `auths` entries and
+credential helpers (`credsStore`, `credHelpers`), so private images pull as
+they did with `docker login` and `docker pull`.
+"""
+
+import base64
+import http.client
+import json
+import os
+import socket
+import subprocess
+import time
+from contextlib import nullcontext
+from urllib.parse import urlencode, urlparse
+
+from deadline import shutdown_socket
+from metrics import DOCKER_API_SECONDS
+
+# Configuration
+DOCKER_HOST = os.getenv("DOCKER_HOST", "unix:///var/run/docker.sock")
+DOCKER_API_VERSION = os.getenv("DOCKER_API_VERSION", "v1.41")
+DOCKER_CONFIG = os.getenv("DOCKER_CONFIG", os.path.expanduser("~/.docker"))
+
+DOCKER_HUB = "docker.io"
+DOCKER_HUB_AUTH_KEY = "https://index.docker.io/v1/"
+
+
+class DockerAPIError(Exception):
+    """Exception raised for Docker Engine API errors."""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+class DockerAPITimeout(DockerAPIError):
+    """Raised when the daemon does not answer within the socket timeout."""
+    pass
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTPConnection that connects to a unix domain socket."""
+
+    def __init__(self, socket_path: str, timeout: float = None):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        self.sock = sock
+
+
+def _connection(timeout: float = None, endpoint: str = None) -> http.client.HTTPConnection:
+    """
+    Open a connection to a Docker daemon (default: DOCKER_HOST).
+
+    Supports unix:// sockets and tcp:// (plain HTTP) endpoints.
+    """
+    endpoint = endpoint or DOCKER_HOST
+    parsed = urlparse(endpoint)
+    if parsed.scheme == "unix":
+        return _UnixHTTPConnection(parsed.path, timeout=timeout)
+    if parsed.scheme in ("tcp", "http"):
+        return http.client.HTTPConnection(parsed.hostname, parsed.port or 2375, timeout=timeout)
+    raise DockerAPIError(f"Unsupported Docker endpoint: {endpoint}")
+
+
+def _path(path: str, params: dict = None) -> str:
+    """Build a versioned API path with an optional query string."""
+    url = f"/{DOCKER_API_VERSION}{path}"
+    if params:
+        url += "?" + urlencode({k: v for k, v in params.items() if v is not None})
+    return url
+
+
+def _error_message(raw: bytes) -> str:
+    """Extract the daemon's error message from a response body."""
+    try:
+        return json.loads(raw).get("message", "") or raw.decode(errors="replace")
+    except (ValueError, AttributeError):
+        return raw.decode(errors="replace").strip()
+
+
+def _endpoint(path: str) -> str:
+    """Metrics label for an API path, without object IDs or names."""
+    parts = path.strip("/").split("/")
+    if len(parts) > 2:
+        return f"/{parts[0]}/{{id}}/{parts[-1]}"
+    return "/" + "/".join(parts)
+
+
+def is_available(endpoint: str = None) -> bool:
+    """Check whether the Docker Engine API (default: DOCKER_HOST) is reachable."""
+    try:
+        conn = _connection(timeout=2, endpoint=endpoint)
+        try:
+            conn.request("GET", "/_ping")
+            return conn.getresponse().status == 200
+        finally:
+            conn.close()
+    except (OSError, http.client.HTTPException, DockerAPIError):
+        return False
+
+
+def request(method: str, path: str, params: dict = None, body=None,
+            timeout: float = 60, endpoint: str = None):
+    """
+    Perform a single (non-streaming) API request.
+
+    Args:
+        method: HTTP method
+        path: API path without version prefix (e.g., "/containers/json")
+        params: Optional query parameters
+        body: Optional JSON-serializable request body
+        timeout: Socket timeout in seconds
+        endpoint: Daemon URL (default: DOCKER_HOST)
+
+    Returns:
+        Parsed JSON response, raw text for non-JSON bodies, or None if empty
+
+    Raises:
+        DockerAPIError: If the daemon returns an error status or is unreachable
+    """
+    headers = {}
+    payload = None
+    if body is not None:
+        payload = json.dumps(body)
+        headers["Content-Type"] = "application/json"
+
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        conn = _connection(timeout=timeout, endpoint=endpoint)
+        try:
+            conn.request(method, _path(path, params), body=payload, headers=headers)
+            response = conn.getresponse()
+            raw = response.read()
+        finally:
+            conn.close()
+        if response.status < 400:
+            outcome = "ok"
+    except socket.timeout as e:
+        raise DockerAPITimeout(f"Docker API request timed out: {e}")
+    except (OSError, http.client.HTTPException) as e:
+        raise DockerAPIError(f"Docker API request failed: {e}")
+    finally:
+        DOCKER_API_SECONDS.observe(time.perf_counter() - started, method=method,
+                                   endpoint=_endpoint(path), outcome=outcome)
+
+    if response.status >= 400:
+        raise DockerAPIError(_error_message(raw), status=response.status)
+    if not raw:
+        return None
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return raw.decode(errors="replace")
+
+
+def stream(method: str, path: str, params: dict = None, body=None,
+           timeout: float = 60, endpoint: str = None, deadline=None, headers: dict = None):
+    """
+    Perform a request whose response is a stream of JSON objects.
+
+    Yields each decoded object as soon as its line arrives. The timeout is
+    applied per socket read, so it bounds idle time rather than total time.
+    endpoint selects the daemon (default: DOCKER_HOST). Cancelling the
+    optional deadline (see deadline.Deadline) closes the stream at once.
+    headers are sent with the request (e.g. X-Registry-Auth).
+
+    Raises:
+        DockerAPIError: If the daemon returns an error status or is unreachable
+        DockerAPITimeout: If the daemon stays silent for longer than timeout
+        DeadlineExceeded: If the deadline is cancelled mid-stream
+    """
+    headers = dict(headers or {})
+    payload = None
+    if body is not None:
+        payload = json.dumps(body)
+        headers["Content-Type"] = "application/json"
+
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        conn = _connection(timeout=timeout, endpoint=endpoint)
+        conn.request(method, _path(path, params), body=payload, headers=headers)
+        response = conn.getresponse()
+    except (OSError, http.client.HTTPException) as e:
+        DOCKER_API_SECONDS.observe(time.perf_counter() - started, method=method,
+                                   endpoint=_endpoint(path), outcome=outcome)
+        if isinstance(e, socket.timeout):
+            raise DockerAPITimeout(f"Docker API request timed out: {e}")
+        raise DockerAPIError(f"Docker API request failed: {e}")
+
+    try:
+        if response.status >= 400:
+            raise DockerAPIError(_error_message(response.read()), status=response.status)
+
+        cancel = deadline.on_cancel(lambda: shutdown_socket(conn)) if deadline else nullcontext()
+        with cancel:
+            while True:
+                try:
+                    line = response.readline()
+                except (OSError, http.client.HTTPException) as e:
+                    if deadline is not None and deadline.cancelled:
+                        break
+                    if isinstance(e, socket.timeout):
+                        raise DockerAPITimeout(f"Docker API stream timed out: {e}")
+                    raise DockerAPIError(f"Docker API stream interrupted: {e}")
+                if not line:
+                    break
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+        if deadline is not None and deadline.cancelled:
+            raise deadline.error()
+        outcome = "ok"
+    finally:
+        conn.close()
+        DOCKER_API_SECONDS.observe(time.perf_counter() - started, method=method,
+                                   endpoint=_endpoint(path), outcome=outcome)
+
+
+def registry_of(image: str) -> str:
+    """Registry host of an image reference (docker.io for Docker Hub images)."""
+    first, sep, _ = image.partition("/")
+    if sep and ("." in first or ":" in first or first == "localhost"):
+        return first
+    return DOCKER_HUB
+
+
+def _auth_server(key: str) -> str:
+    """Registry host named by a config `auths` key (which may be a URL)."""
+    host = key.split("://", 1)[-1].split("/", 1)[0]
+    return DOCKER_HUB if host in ("index.docker.io", "registry-1.docker.io") else host
+
+
+def _helper_credentials(helper: str, server: str):
+    """Ask a docker-credential-<helper> for a registry's credentials."""
+    try:
+        result = subprocess.run([f"docker-credential-{helper}", "get"], input=server,
+                                capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if result.returncode != 0:
+        return None
+    try:
+        creds = json.loads(result.stdout)
+    except ValueError:
+        return None
+    if creds.get("Username") == "<token>":
+        return {"identitytoken": creds.get("Secret", "")}
+    return {"username": creds.get("Username", ""), "password": creds.get("Secret", "")}
+
+
+def registry_auth(image: str, config_dir: str = None):
+    """
+    X-Registry-Auth header value for pulling an image, from the Docker CLI config.
+
+    Args:
+        image: Image reference
+        config_dir: Docker config directory (default: DOCKER_CONFIG)
+
+    Returns:
+        str or None: base64url-encoded auth config, or None without credentials
+    """
+    try:
+        with open(os.path.join(config_dir or DOCKER_CONFIG, "config.json")) as f:
+            config = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    registry = registry_of(image)
+    server = DOCKER_HUB_AUTH_KEY if registry == DOCKER_HUB else registry
+    creds = None
+    helper = (config.get("credHelpers") or {}).get(registry) or config.get("credsStore")
+    if helper:
+        creds = _helper_credentials(helper, server)
+    if creds is None:
+        for key, entry in (config.get("auths") or {}).items():
+            if _auth_server(key) != registry:
+                continue
+            if entry.get("identitytoken"):
+                creds = {"identitytoken": entry["identitytoken"]}
+            elif entry.get("auth"):
+                try:
+                    username, _, password = base64.b64decode(entry["auth"]).decode().partition(":")
+                except (ValueError, UnicodeDecodeError):
+                    continue
+                creds = {"username": username, "password": password}
+            if creds:
+                break
+    if not creds:
+        return None
+    payload = json.dumps({**creds, "serveraddress": server})
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def _inspect_tty(container: str) -> bool:
+    """Whether a container was created with a TTY (logs are then not multiplexed)."""
+    info = request("GET", f"/containers/{container}/json", timeout=10)
+    return bool(info.get("Config", {}).get("Tty"))
+
+
+def follow_logs(container: str, since: float = None, timeout: float = 300,
+                max_line: int = 65536):
+    """
+    Follow a container's logs, yielding (timestamp, line) as they arrive.
+
+    Handles both raw (TTY) and multiplexed (stdout/stderr framed) streams.
+    Memory is bounded: lines longer than max_line are truncated.
+
+    Args:
+        container: Container name or ID
+        since: Only return lines after this UNIX timestamp (default: from now)
+        timeout: Idle timeout in seconds; the caller reconnects after it
+        max_line: Maximum bytes kept for a single line
+
+    Yields:
+        tuple: (timestamp str (RFC3339), line str)
+
+    Raises:
+        DockerAPIError: If the daemon is unreachable or the container is missing
+    """
+    tty = _inspect_tty(container)
+    params = {
+        "follow": 1, "stdout": 1, "stderr": 1, "timestamps": 1,
+        "since": f"{since:.9f}" if since is not None else None,
+        "tail": 0 if since is None else None,
+    }
+
+    try:
+        conn = _connection(timeout=timeout)
+        conn.request("GET", _path(f"/containers/{container}/logs", params))
+        response = conn.getresponse()
+    except (OSError, http.client.HTTPException) as e:
+        raise DockerAPIError(f"Docker API request failed: {e}")
+
+    def chunks():
+        # Yield raw payload bytes, stripping the 8-byte frame headers of
+        # multiplexed streams.
+        while True:
+            if tty:
+                data = response.read1(8192)
+                if not data:
+                    return
+                yield data
+                continue
+            header = response.read(8)
+            if len(header) < 8:
+                return
+            size = int.from_bytes(header[4:8], "big")
+            remaining = size
+            while remaining > 0:
+                data = response.read(min(remaining, 8192))
+                if not data:
+                    return
+                remaining -= len(data)
+                yield data
+
+    try:
+        if response.status >= 400:
+            raise DockerAPIError(_error_message(response.read()), status=response.status)
+
+        buffer = b""
+        try:
+            for data in chunks():
+                buffer += data
+                while b"\n" in buffer:
+                    raw, buffer = buffer.split(b"\n", 1)
+                    text = raw[:max_line].decode(errors="replace").rstrip("\r")
+                    timestamp, _, line = text.partition(" ")
+                    yield timestamp, line
+                if len(buffer) > max_line:
+                    buffer = buffer[:max_line]
+        except (OSError, http.client.HTTPException) as e:
+            raise DockerAPIError(f"Docker API stream interrupted: {e}")
+    finally:
+        conn.close()
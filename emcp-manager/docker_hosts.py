@@ -0,0 +1,321 @@
+"""
+Docker Host Pool
+
+The Docker daemons MCP servers are placed on. The manager's own daemon
+(DOCKER_HOST) is always in the pool as "local"; EMCP_DOCKER_HOSTS adds
+more, as comma-separated name=URL pairs with optional query options:
+
+    EMCP_DOCKER_HOSTS="gpu1=tcp://10.0.0.5:2375,edge=unix:///run/edge.sock?address=10.0.0.9"
+
+- address:      where the gateway reaches ports published on the host
+                (default: the URL's host name, localhost for unix sockets)
+- max_servers:  cap on the servers placed on the host
+- network:      network of new containers (default: bridge)
+- ports:        host ports for server endpoints (default: 18000-18999)
+
+Servers on the local host join the eMCP network and the gateway runs them
+through `docker exec`, as before. Servers on any other host run behind a
+stdio-to-Streamable-HTTP bridge (EMCP_REMOTE_BRIDGE) with its port
+published, and their MCPJungle config points at that URL.
+
+New servers go to the reachable host with the most free memory: its total
+memory (times EMCP_PLACEMENT_MEMORY_RATIO) minus the memory limits of the
+servers already placed on it, counting EMCP_PLACEMENT_DEFAULT_MEMORY for a
+server without a limit. Placements still being provisioned are counted
+until they are released.
+
+That default is only an estimate, so it ranks hosts but does not refuse a
+server without a limit: only a server with a memory limit is refused (503)
+when no host has that much free. EMCP_PLACEMENT_STRICT=1 checks the
+default against free memory as well.
+"""
+
+import os
+import shlex
+import threading
+import time
+from urllib.parse import parse_qsl, urlparse
+
+import docker_api
+
+# Configuration
+DOCKER_HOSTS = os.getenv("EMCP_DOCKER_HOSTS", "")
+LOCAL_HOST = "local"
+PLACEMENT_MEMORY_RATIO = float(os.getenv("EMCP_PLACEMENT_MEMORY_RATIO", "0.8"))
+PLACEMENT_DEFAULT_MEMORY = int(os.getenv("EMCP_PLACEMENT_DEFAULT_MEMORY", str(256 * 1024 ** 2)))
+PLACEMENT_STRICT = os.getenv("EMCP_PLACEMENT_STRICT", "0") == "1"
+HOST_INFO_TTL = float(os.getenv("EMCP_HOST_INFO_TTL", "30"))
+
+# Stdio servers on remote hosts are wrapped in this bridge; {command} is
+# the server command (one shell-quoted argument), {port} the bridge port
+REMOTE_BRIDGE = os.getenv(
+    "EMCP_REMOTE_BRIDGE",
+    "npx -y supergateway --stdio {command} --outputTransport streamableHttp --port {port}",
+)
+BRIDGE_PORT = 8000
+BRIDGE_PATH = "/mcp"
+
+DEFAULT_PORTS = (18000, 18999)
+
+# Placements and ports are held this long unless released first
+PENDING_TTL = 600
+
+
+class DockerHostError(Exception):
+    """Raised for unknown hosts and when no host can take a server."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class DockerHost:
+    """One Docker daemon in the pool."""
+
+    __slots__ = ("name", "url", "address", "max_servers", "network", "ports")
+
+    def __init__(self, name: str, url: str, address: str = None, max_servers: int = None,
+                 network: str = "bridge", ports: tuple = DEFAULT_PORTS):
+        self.name = name
+        self.url = url
+        self.address = address or urlparse(url).hostname or "localhost"
+        self.max_servers = max_servers
+        self.network = network
+        self.ports = ports
+
+    @property
+    def local(self) -> bool:
+        return self.name == LOCAL_HOST
+
+    @property
+    def endpoint(self):
+        """Engine API endpoint for docker_api (None: the default DOCKER_HOST)."""
+        return None if self.local else self.url
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "url": self.url,
+            "address": self.address,
+            "local": self.local,
+            "max_servers": self.max_servers,
+            "network": self.network,
+            "ports": list(self.ports),
+        }
+
+
+def parse_hosts(spec: str) -> dict:
+    """
+    Parse an EMCP_DOCKER_HOSTS value.
+
+    Returns:
+        dict: {name: DockerHost}, always including "local"
+
+    Raises:
+        DockerHostError: If an entry is malformed
+    """
+    hosts = {LOCAL_HOST: DockerHost(LOCAL_HOST, docker_api.DOCKER_HOST)}
+    for entry in filter(None, (part.strip() for part in (spec or "").split(","))):
+        name, sep, url = entry.partition("=")
+        name = name.strip()
+        if not sep or not name or not url:
+            raise DockerHostError(f"Invalid Docker host entry (expected name=url): {entry}")
+        if name in hosts:
+            raise DockerHostError(f"Duplicate Docker host: {name}")
+        url, _, query = url.partition("?")
+        if urlparse(url).scheme not in ("unix", "tcp", "http"):
+            raise DockerHostError(f"Unsupported Docker host URL for '{name}': {url}")
+        options = dict(parse_qsl(query))
+        try:
+            ports = DEFAULT_PORTS
+            if "ports" in options:
+                ports = tuple(int(p) for p in options["ports"].split("-", 1))
+            if len(ports) != 2 or ports[0] > ports[1]:
+                raise ValueError(options["ports"])
+            max_servers = int(options["max_servers"]) if "max_servers" in options else None
+        except ValueError as e:
+            raise DockerHostError(f"Invalid options for Docker host '{name}': {e}")
+        hosts[name] = DockerHost(name, url, address=options.get("address"), max_servers=max_servers,
+                                 network=options.get("network", "bridge"), ports=ports)
+    return hosts
+
+
+_hosts = parse_hosts(DOCKER_HOSTS)
+_info_cache = {}
+_lock = threading.RLock()
+# {server: (host name, memory, expires)}
+_pending = {}
+# {(host name, port): (server, expires)}
+_claimed_ports = {}
+
+
+def hosts() -> list:
+    """Every host in the pool, local first."""
+    return list(_hosts.values())
+
+
+def get_host(name: str = None) -> DockerHost:
+    """
+    Look up a host by name (default: local).
+
+    Raises:
+        DockerHostError: If the host is not in the pool
+    """
+    host = _hosts.get(name or LOCAL_HOST)
+    if host is None:
+        raise DockerHostError(f"Unknown Docker host '{name}' (known: {', '.join(_hosts)})")
+    return host
+
+
+def host_info(host: DockerHost, max_age: float = HOST_INFO_TTL):
+    """
+    Total memory and CPUs of a host, cached for max_age seconds.
+
+    Returns:
+        dict: {"memory", "cpus", "version"}, or None if unreachable
+    """
+    now = time.monotonic()
+    cached = _info_cache.get(host.name)
+    if cached and now - cached[0] < max_age:
+        return cached[1]
+    try:
+        info = docker_api.request("GET", "/info", timeout=5, endpoint=host.endpoint) or {}
+        result = {"memory": info.get("MemTotal", 0), "cpus": info.get("NCPU", 0),
+                  "version": info.get("ServerVersion")}
+    except docker_api.DockerAPIError:
+        result = None
+    _info_cache[host.name] = (now, result)
+    return result
+
+
+def _expire(now: float) -> None:
+    for server in [s for s, p in _pending.items() if p[2] < now]:
+        del _pending[server]
+    for key in [k for k, claim in _claimed_ports.items() if claim[1] < now]:
+        del _claimed_ports[key]
+
+
+def capacity(reserved: dict) -> list[dict]:
+    """
+    Free capacity of every host.
+
+    Args:
+        reserved: {host name: {server: memory limit or None}} of the servers
+            already placed (see compose_manager.host_reservations)
+
+    Returns:
+        list[dict]: {"host", "reachable", "memory_total", "memory_reserved",
+        "memory_free", "servers", "max_servers"} per host
+    """
+    now = time.monotonic()
+    with _lock:
+        _expire(now)
+        pending = dict(_pending)
+    report = []
+    for host in hosts():
+        placed = dict(reserved.get(host.name) or {})
+        for server, (name, memory, _) in pending.items():
+            if name == host.name:
+                placed.setdefault(server, memory)
+        used = sum(memory or PLACEMENT_DEFAULT_MEMORY for memory in placed.values())
+        info = host_info(host)
+        total = int(info["memory"] * PLACEMENT_MEMORY_RATIO) if info else 0
+        report.append({
+            "host": host.name,
+            "reachable": info is not None,
+            "memory_total": info["memory"] if info else None,
+            "memory_reserved": used,
+            "memory_free": total - used if info else None,
+            "servers": len(placed),
+            "max_servers": host.max_servers,
+        })
+    return report
+
+
+def place(server: str, memory: int = None, reserved: dict = None, requested: str = None) -> dict:
+    """
+    Choose the host for a new server and hold its capacity until release().
+
+    Args:
+        server: Server name
+        memory: The server's memory limit in bytes, if any
+        reserved: Current placements (see capacity)
+        requested: Host name to use instead of choosing one
+
+    Returns:
+        dict: The chosen host's capacity entry (see capacity)
+
+    Raises:
+        DockerHostError: 400 for an unknown host, 503 if no host has room
+            (memory is only checked for a server with a limit, unless
+            EMCP_PLACEMENT_STRICT is set)
+    """
+    candidates = [get_host(requested).name] if requested else [h.name for h in hosts()]
+    need = memory or PLACEMENT_DEFAULT_MEMORY
+    check_memory = memory is not None or PLACEMENT_STRICT
+    with _lock:
+        report = [entry for entry in capacity(reserved or {}) if entry["host"] in candidates]
+        reasons = []
+        fits = []
+        for entry in report:
+            if not entry["reachable"]:
+                reasons.append(f"{entry['host']}: unreachable")
+            elif entry["max_servers"] is not None and entry["servers"] >= entry["max_servers"]:
+                reasons.append(f"{entry['host']}: {entry['servers']}/{entry['max_servers']} servers")
+            elif check_memory and entry["memory_free"] < need:
+                reasons.append(f"{entry['host']}: {entry['memory_free'] // 1024 ** 2}MiB free")
+            else:
+                fits.append(entry)
+        if not fits:
+            raise DockerHostError(
+                f"No Docker host can take '{server}' ({need // 1024 ** 2}MiB): {'; '.join(reasons)}",
+                status=503,
+            )
+        # Most free memory first; then fewest servers, the local host, name
+        chosen = min(fits, key=lambda e: (-e["memory_free"], e["servers"],
+                                          e["host"] != LOCAL_HOST, e["host"]))
+        _pending[server] = (chosen["host"], memory, time.monotonic() + PENDING_TTL)
+    return chosen
+
+
+def release(server: str) -> None:
+    """Drop a server's pending placement and port claims (once provisioned or failed)."""
+    with _lock:
+        _pending.pop(server, None)
+        for key in [k for k, claim in _claimed_ports.items() if claim[0] == server]:
+            del _claimed_ports[key]
+
+
+def claim_port(server: str, host: DockerHost, used: set) -> int:
+    """
+    Claim a free host port for a server endpoint until release().
+
+    Args:
+        server: Server name
+        host: Host the server runs on
+        used: Ports already published on the host
+
+    Raises:
+        DockerHostError: If the host's port range is exhausted
+    """
+    now = time.monotonic()
+    with _lock:
+        _expire(now)
+        for port in range(host.ports[0], host.ports[1] + 1):
+            if port not in used and (host.name, port) not in _claimed_ports:
+                _claimed_ports[(host.name, port)] = (server, now + PENDING_TTL)
+                return port
+    raise DockerHostError(f"No free port in {host.ports[0]}-{host.ports[1]} on '{host.name}'", status=503)
+
+
+def bridge_command(command: list[str]) -> list[str]:
+    """Wrap a stdio server command in the Streamable HTTP bridge."""
+    return [
+        shlex.join(command) if arg == "{command}" else arg.replace("{port}", str(BRIDGE_PORT))
+        for arg in shlex.split(REMOTE_BRIDGE)
+    ]
+
+
+def endpoint_url(host: DockerHost, port: int) -> str:
+    """URL the gateway uses to reach a bridged server."""
+    return f"http://{host.address}:{port}{BRIDGE_PATH}"
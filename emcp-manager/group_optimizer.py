@@ -0,0 +1,173 @@
+"""
+Token-Budget Group Optimizer
+
+Chooses which tools a group should include so that its estimated token
+footprint fits a budget while keeping as much value as possible — a 0/1
+knapsack where a tool's weight is its token estimate and its value comes
+from priority hints.
+
+Small problems are solved exactly with dynamic programming. Larger
+budgets are solved by the same DP over token weights bucketed by a common
+scale (rounded up, so the selection always fits), which keeps the table
+under DP_CELL_LIMIT cells; the tokens left over by the rounding are then
+filled by value density, and the result is never worse than the greedy
+fill. Only when there are too many candidates for even one bucket per
+tool does it fall back to the density-ordered greedy fill alone, which is
+exact when all tools have the same priority and otherwise guaranteed to
+reach at least half of the optimal value.
+"""
+
+import math
+import time
+
+# Exact DP is used when (candidates x budget) stays under this many cells
+DP_CELL_LIMIT = 250_000
+
+DEFAULT_PRIORITY = 1.0
+
+
+class OptimizerError(Exception):
+    """Exception raised when a selection request cannot be satisfied."""
+    pass
+
+
+def _priority(name: str, priorities: dict) -> float:
+    """Tool-level hint wins over a server-level hint ("server" or "server__*")."""
+    if name in priorities:
+        return float(priorities[name])
+    server = name.split("__", 1)[0]
+    for key in (server, f"{server}__*"):
+        if key in priorities:
+            return float(priorities[key])
+    return DEFAULT_PRIORITY
+
+
+def _fill(items: list[tuple], capacity: int, chosen: set) -> set:
+    """Add items to chosen by value density while they fit."""
+    chosen = set(chosen)
+    used = sum(weight for name, weight, _ in items if name in chosen)
+    for name, weight, _ in sorted(items, key=lambda it: (-(it[2] / it[1]), it[1], it[0])):
+        if name not in chosen and used + weight <= capacity:
+            chosen.add(name)
+            used += weight
+    return chosen
+
+
+def _value(items: list[tuple], chosen: set) -> float:
+    return sum(value for name, _, value in items if name in chosen)
+
+
+def _greedy(items: list[tuple], capacity: int) -> set:
+    """Fill by value density; compare against the best single item."""
+    chosen = _fill(items, capacity, set())
+    value = _value(items, chosen)
+
+    fitting = [it for it in items if it[1] <= capacity]
+    if fitting:
+        best = max(fitting, key=lambda it: (it[2], -it[1]))
+        if best[2] > value:
+            return {best[0]}
+    return chosen
+
+
+def _dp(items: list[tuple], capacity: int) -> set:
+    """Exact 0/1 knapsack over integer token weights."""
+    best = [0.0] * (capacity + 1)
+    taken = []
+    for name, weight, value in items:
+        row = bytearray(capacity + 1)
+        for c in range(capacity, weight - 1, -1):
+            candidate = best[c - weight] + value
+            if candidate > best[c]:
+                best[c] = candidate
+                row[c] = 1
+        taken.append(row)
+
+    chosen = set()
+    c = capacity
+    for i in range(len(items) - 1, -1, -1):
+        if taken[i][c]:
+            name, weight, _ = items[i]
+            chosen.add(name)
+            c -= weight
+    return chosen
+
+
+def _scaled_dp(items: list[tuple], capacity: int, scale: int) -> set:
+    """
+    DP over weights divided by scale (rounded up), then a density fill of
+    the remaining tokens; the better of that and the greedy fill.
+    """
+    scaled = [(name, math.ceil(weight / scale), value) for name, weight, value in items]
+    chosen = _fill(items, capacity, _dp(scaled, capacity // scale))
+    greedy = _greedy(items, capacity)
+    return chosen if _value(items, chosen) >= _value(items, greedy) else greedy
+
+
+def optimize_selection(tool_tokens: dict, candidates: list[str], budget: int,
+                       must_keep: list[str] = None, priorities: dict = None) -> dict:
+    """
+    Pick the subset of candidate tools that fits a token budget.
+
+    Args:
+        tool_tokens: {tool name: token estimate} for the catalog
+        candidates: Tools eligible for selection
+        budget: Maximum total tokens
+        must_keep: Tools that must be included regardless of value
+        priorities: {tool name | server name | "server__*": weight}; default 1.0.
+            A weight of 0 or less excludes the tool unless it is must-keep.
+
+    Returns:
+        dict: {"selected": [...], "total_tokens": int, "value": float, "method": str,
+               "elapsed_ms": float}
+
+    Raises:
+        OptimizerError: If must-keep tools are unknown or exceed the budget
+    """
+    started = time.perf_counter()
+    priorities = priorities or {}
+    must_keep = list(dict.fromkeys(must_keep or []))
+
+    unknown = [t for t in must_keep if t not in tool_tokens]
+    if unknown:
+        raise OptimizerError(f"Unknown must-keep tools: {', '.join(unknown)}")
+
+    kept_tokens = sum(tool_tokens[t] for t in must_keep)
+    if kept_tokens > budget:
+        raise OptimizerError(
+            f"Must-keep tools need {kept_tokens} tokens, over the budget of {budget}"
+        )
+
+    capacity = budget - kept_tokens
+    kept = set(must_keep)
+    selected = set(must_keep)
+    items = []
+    for name in dict.fromkeys(candidates):
+        if name in kept or name not in tool_tokens:
+            continue
+        value = _priority(name, priorities)
+        if value <= 0:
+            continue
+        weight = tool_tokens[name]
+        if weight <= 0:
+            selected.add(name)  # Free tools are always worth including
+        elif weight <= capacity:
+            items.append((name, weight, value))
+
+    # Largest DP capacity that keeps the table under the cell limit
+    columns = DP_CELL_LIMIT // len(items) - 1 if items else 0
+    if items and capacity <= columns:
+        chosen, method = _dp(items, capacity), "dp"
+    elif columns >= 1:
+        chosen, method = _scaled_dp(items, capacity, math.ceil(capacity / columns)), "dp_scaled"
+    else:
+        chosen, method = _greedy(items, capacity), "greedy"
+    selected |= chosen
+
+    return {
+        "selected": sorted(selected),
+        "total_tokens": sum(tool_tokens[t] for t in selected),
+        "value": round(sum(_priority(t, priorities) for t in selected - kept), 4),
+        "method": method,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
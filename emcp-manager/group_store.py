@@ -0,0 +1,171 @@
+"""
+Group Write Coordination
+
+Per-group locks and optimistic concurrency for group config files.
+
+Every group write (read -> modify -> write -> `mcpjungle update group`) runs
+under that group's own lock, so edits to different groups proceed in
+parallel while edits to the same group are serialized.
+
+Each group has a content version, exposed as an ETag. A client that sends
+If-Match with a stale version either gets a 409, or — with the "merge"
+policy — has its change rebased onto the current tool list: tools it added
+relative to the version it saw are added, tools it removed are removed, and
+everyone else's changes are kept. Recent versions are remembered so the
+base of a stale request can be found.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# What to do when If-Match does not match the current version
+CONFLICT_POLICIES = ("merge", "reject")
+DEFAULT_CONFLICT_POLICY = os.getenv("EMCP_GROUP_CONFLICT_POLICY", "merge")
+
+# Versions remembered per group as merge bases
+HISTORY_SIZE = 32
+
+
+class VersionConflict(Exception):
+    """Raised when a conditional group write cannot be applied."""
+
+    def __init__(self, message, current_version=None):
+        super().__init__(message)
+        self.current_version = current_version
+
+
+def group_version(config: dict) -> str:
+    """Content version of a group config (stable across key order)."""
+    payload = json.dumps(
+        {"description": config.get("description"), "included_tools": config.get("included_tools", [])},
+        sort_keys=True, separators=(",", ":")
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def parse_if_match(header: str):
+    """
+    Parse an If-Match header into a list of versions.
+
+    Returns:
+        list[str] or None: Versions without quotes or W/ prefixes; ["*"] for
+        a wildcard; None if the header is absent
+    """
+    if not header:
+        return None
+    versions = []
+    for part in header.split(","):
+        part = part.strip()
+        if part.startswith("W/"):
+            part = part[2:]
+        part = part.strip('"')
+        if part:
+            versions.append(part)
+    return versions or None
+
+
+def version_matches(if_match, version: str) -> bool:
+    return if_match is None or "*" in if_match or version in if_match
+
+
+def merge_tools(base: list[str], current: list[str], desired: list[str]) -> list[str]:
+    """
+    Three-way merge of tool lists.
+
+    Applies the client's changes (desired relative to base) to current,
+    keeping current's order and appending new tools in the client's order.
+    """
+    base_set, desired_set = set(base), set(desired)
+    removed = base_set - desired_set
+    merged = [tool for tool in current if tool not in removed]
+    present = set(merged)
+    for tool in desired:
+        if tool not in base_set and tool not in present:
+            merged.append(tool)
+            present.add(tool)
+    return merged
+
+
+def write_json_atomic(path: str, data: dict) -> None:
+    """Write JSON via a temp file and rename, so readers never see a partial file."""
+    temp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(temp_path, path)
+
+
+class GroupLocks:
+    """
+    One re-entrant lock per group name.
+
+    Locks are never dropped, even for deleted groups: a writer may still
+    hold or wait on one, and a new lock for the same name would let two
+    writers in at once. The dict grows by one small entry per group name
+    ever written.
+    """
+
+    def __init__(self):
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def hold(self, name: str):
+        with self._lock:
+            lock = self._locks.setdefault(name, threading.RLock())
+        with lock:
+            yield
+
+
+class VersionHistory:
+    """Recently seen tool lists per group, keyed by version."""
+
+    def __init__(self, size: int = HISTORY_SIZE):
+        self.size = size
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def remember(self, name: str, version: str, tools: list[str]) -> None:
+        with self._lock:
+            versions = self._versions.setdefault(name, OrderedDict())
+            versions[version] = list(tools)
+            versions.move_to_end(version)
+            while len(versions) > self.size:
+                versions.popitem(last=False)
+
+    def get(self, name: str, version: str):
+        with self._lock:
+            tools = self._versions.get(name, {}).get(version)
+            return list(tools) if tools is not None else None
+
+    def forget(self, name: str) -> None:
+        with self._lock:
+            self._versions.pop(name, None)
+
+
+def resolve_conflict(name: str, history: VersionHistory, if_match: list[str],
+                     current_version: str, current_tools: list[str],
+                     desired: list[str], policy: str) -> list[str]:
+    """
+    Rebase a stale write onto the current tools, or refuse it.
+
+    Raises:
+        VersionConflict: With the reject policy, or when no base version is known
+    """
+    if policy not in CONFLICT_POLICIES:
+        raise ValueError(f"on_conflict must be one of {', '.join(CONFLICT_POLICIES)}")
+    if policy == "reject":
+        raise VersionConflict(
+            f"Group '{name}' has changed (current version {current_version})", current_version
+        )
+    for version in if_match:
+        base = history.get(name, version)
+        if base is not None:
+            return merge_tools(base, current_tools, desired)
+    raise VersionConflict(
+        f"Group '{name}' has changed and version {', '.join(if_match)} is too old to merge",
+        current_version
+    )
@@ -0,0 +1,402 @@
+"""
+Server Health Monitor
+
+Background scheduler that probes every registered MCP server on a fixed
+cadence and keeps the results in memory, so /api/servers can answer from
+cache instead of inspecting each container per request.
+
+Each cycle lists all containers in one call, then sends an MCP initialize
+request to every running server through `docker exec`, at most
+EMCP_HEALTH_CONCURRENCY at a time. The last EMCP_HEALTH_HISTORY results per
+server are kept for success rate and latency figures.
+
+A server that fails EMCP_HEALTH_FAILURE_THRESHOLD consecutive checks, or
+whose container crashed, is restarted, with exponential backoff between
+restarts of the same server; the backoff resets once it is healthy again.
+A container counts as crashed when it died or exited with a code other
+than those in EMCP_HEALTH_STOP_EXIT_CODES (0 and 143, the SIGTERM of
+`docker stop`); one an operator stopped stays stopped. Restarts go through
+rolling_restart.restart_server: the restart counts once the server answers
+MCP again, and the server is then re-registered with MCPJungle so the
+gateway serves its tools again.
+
+Servers stopped by the idle policy (see idle_scaler) are reported as
+"idle" and are neither probed nor restarted.
+
+Note that a probe starts a second copy of the server's command inside the
+container (stdio servers have no other way in), so keep the interval
+generous for heavy servers.
+"""
+
+import json
+import os
+import re
+import subprocess
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from compose_manager import CONFIGS_DIR, ComposeError, list_containers, probe_mcp, server_host
+from metrics import HEALTH_PROBE_SECONDS, HEALTH_RESTARTS, SERVERS_BY_HEALTH
+from rolling_restart import restart_server
+
+# Configuration
+HEALTH_INTERVAL = float(os.getenv("EMCP_HEALTH_INTERVAL", "60"))
+HEALTH_CONCURRENCY = int(os.getenv("EMCP_HEALTH_CONCURRENCY", "4"))
+PROBE_TIMEOUT = int(os.getenv("EMCP_HEALTH_PROBE_TIMEOUT", "15"))
+HISTORY_SIZE = int(os.getenv("EMCP_HEALTH_HISTORY", "20"))
+FAILURE_THRESHOLD = int(os.getenv("EMCP_HEALTH_FAILURE_THRESHOLD", "3"))
+AUTO_RESTART = os.getenv("EMCP_HEALTH_AUTO_RESTART", "1") != "0"
+RESTART_BACKOFF = float(os.getenv("EMCP_HEALTH_RESTART_BACKOFF", "30"))
+RESTART_BACKOFF_MAX = float(os.getenv("EMCP_HEALTH_RESTART_BACKOFF_MAX", "1800"))
+
+# Exit codes of a deliberately stopped container (not restarted)
+STOP_EXIT_CODES = {
+    int(code) for code in os.getenv("EMCP_HEALTH_STOP_EXIT_CODES", "0,143").split(",") if code.strip()
+}
+
+# Container states are re-listed when older than this (seconds)
+STATUS_TTL = float(os.getenv("EMCP_HEALTH_STATUS_TTL", "5"))
+
+HEALTH_STATES = ("healthy", "unhealthy", "stopped", "idle", "missing", "unknown")
+
+_EXIT_CODE = re.compile(r"^Exited \((-?\d+)\)")
+
+
+def exit_code_of(status: str):
+    """Exit code in Docker's status text ("Exited (1) 5 minutes ago"), or None."""
+    match = _EXIT_CODE.match(status or "")
+    return int(match.group(1)) if match else None
+
+
+def read_server_configs(configs_dir: str = CONFIGS_DIR) -> dict:
+    """
+    Read MCPJungle server configs.
+
+    Returns:
+        dict: {name: {"container", "command", "url", "description", "file"}};
+        command is None for servers not run through `docker exec`, url is
+        set for Streamable HTTP servers (probed over HTTP instead), file is
+        the config's file name
+    """
+    servers = {}
+    if not os.path.exists(configs_dir):
+        return servers
+    for filename in os.listdir(configs_dir):
+        if not filename.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(configs_dir, filename)) as f:
+                config = json.load(f)
+        except (OSError, ValueError):
+            continue
+        name = config.get("name", filename[:-5])
+        container, command = None, None
+        args = config.get("args") or []
+        if config.get("command") == "docker" and args[:1] == ["exec"]:
+            rest = list(args[1:])
+            while rest and rest[0].startswith("-"):
+                rest.pop(0)
+            if rest:
+                container, command = rest[0], rest[1:]
+        servers[name] = {
+            "container": container or f"{name}-mcp",
+            "command": command,
+            "url": config.get("url") if config.get("transport") == "streamable_http" else None,
+            "description": config.get("description", ""),
+            "file": filename,
+        }
+    return servers
+
+
+class _ServerHealth:
+    """Rolling health state of one server."""
+
+    def __init__(self, name: str, container: str, command, description: str, url: str = None,
+                 file: str = None):
+        self.name = name
+        self.file = file
+        self.container = container
+        self.command = command
+        self.url = url
+        self.description = description
+        self.host = None
+        self.container_status = "unknown"
+        self.exit_code = None
+        self.health = "unknown"
+        self.results = deque(maxlen=HISTORY_SIZE)
+        self.consecutive_failures = 0
+        self.last_checked = None
+        self.last_healthy = None
+        self.last_error = None
+        self.restarts = 0
+        self.last_restart = None
+        self.next_restart_at = 0.0
+        self.backoff = RESTART_BACKOFF
+        self.probing = False
+
+    def record(self, ok: bool, latency: float, error: str) -> None:
+        now = time.time()
+        self.results.append((now, ok, latency))
+        self.last_checked = now
+        if ok:
+            self.health = "healthy"
+            self.consecutive_failures = 0
+            self.last_healthy = now
+            self.last_error = None
+            self.backoff = RESTART_BACKOFF
+        else:
+            self.health = "unhealthy"
+            self.consecutive_failures += 1
+            self.last_error = error
+
+    def set_container_status(self, status: str, sleeping: bool = False, exit_code: int = None) -> None:
+        self.container_status = status
+        self.exit_code = exit_code if status != "running" else None
+        if status == "not found":
+            self.health = "missing"
+        elif status != "running":
+            self.health = "idle" if sleeping else "stopped"
+        elif self.health in ("stopped", "idle", "missing"):
+            self.health = "unknown"
+
+    def crashed(self) -> bool:
+        """True if the container died or exited unexpectedly (not stopped on purpose)."""
+        if self.health != "stopped":
+            return False
+        if self.container_status == "dead":
+            return True
+        return self.exit_code is not None and self.exit_code not in STOP_EXIT_CODES
+
+    def snapshot(self) -> dict:
+        ok_latencies = sorted(latency for _, ok, latency in self.results if ok)
+        checks = len(self.results)
+        return {
+            "health": self.health,
+            "checks": checks,
+            "success_rate": round(sum(1 for _, ok, _ in self.results if ok) / checks, 3) if checks else None,
+            "latency_ms": {
+                "last": round(self.results[-1][2] * 1000, 1) if self.results else None,
+                "p50": round(ok_latencies[len(ok_latencies) // 2] * 1000, 1) if ok_latencies else None,
+                "max": round(ok_latencies[-1] * 1000, 1) if ok_latencies else None,
+            },
+            "consecutive_failures": self.consecutive_failures,
+            "last_checked": self.last_checked,
+            "last_healthy": self.last_healthy,
+            "last_error": self.last_error,
+            "exit_code": self.exit_code,
+            "restarts": self.restarts,
+            "last_restart": self.last_restart,
+        }
+
+
+class HealthMonitor:
+    """Background prober with cached per-server status."""
+
+    def __init__(self, configs_dir: str = CONFIGS_DIR, interval: float = HEALTH_INTERVAL,
+                 concurrency: int = HEALTH_CONCURRENCY, auto_restart: bool = AUTO_RESTART):
+        self.configs_dir = configs_dir
+        self.interval = interval
+        self.concurrency = max(1, concurrency)
+        self.auto_restart = auto_restart
+        self._servers = {}
+        self._sleeping = set()
+        self._refreshed_at = 0.0
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._stats = {"cycles": 0, "last_cycle": None, "last_cycle_seconds": None, "last_error": None}
+
+    def start(self) -> None:
+        """Start probing in the background."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="health-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def status(self) -> dict:
+        with self._lock:
+            counts = {state: 0 for state in HEALTH_STATES}
+            for server in self._servers.values():
+                counts[server.health] += 1
+        return {
+            "running": bool(self._thread and self._thread.is_alive()),
+            "interval": self.interval,
+            "concurrency": self.concurrency,
+            "auto_restart": self.auto_restart,
+            "servers": counts,
+            **self._stats,
+        }
+
+    def set_sleeping(self, names) -> None:
+        """Mark the servers stopped on purpose (idle), so they are not restarted."""
+        with self._lock:
+            self._sleeping = set(names)
+            for name, server in self._servers.items():
+                if server.container_status != "running":
+                    server.set_container_status(server.container_status, sleeping=name in self._sleeping,
+                                                exit_code=server.exit_code)
+            self._update_gauges()
+
+    def invalidate(self) -> None:
+        """Force the next read to re-list configs and containers."""
+        self._refreshed_at = 0.0
+
+    def refresh(self, max_age: float = 0) -> None:
+        """
+        Re-read server configs and container states (no probes).
+
+        Args:
+            max_age: Skip the refresh if the cached state is younger than this
+        """
+        with self._refresh_lock:
+            if time.monotonic() - self._refreshed_at < max_age:
+                return
+            configs = read_server_configs(self.configs_dir)
+            try:
+                containers = list_containers()
+            except (ComposeError, subprocess.TimeoutExpired) as e:
+                self._stats["last_error"] = str(e)
+                containers = None
+
+            with self._lock:
+                for name in list(self._servers):
+                    if name not in configs:
+                        del self._servers[name]
+                for name, config in configs.items():
+                    server = self._servers.get(name)
+                    if server is None or server.container != config["container"]:
+                        server = _ServerHealth(name, config["container"], config["command"],
+                                               config["description"], config["url"], config["file"])
+                        self._servers[name] = server
+                    server.command = config["command"]
+                    server.url = config["url"]
+                    server.description = config["description"]
+                    server.file = config["file"]
+                    if containers is not None:
+                        container = containers.get(server.container) or {}
+                        server.host = container.get("host")
+                        server.set_container_status(container.get("state", "not found"),
+                                                    sleeping=name in self._sleeping,
+                                                    exit_code=exit_code_of(container.get("status")))
+                self._update_gauges()
+            self._refreshed_at = time.monotonic()
+
+    def servers(self, max_age: float = STATUS_TTL) -> list[dict]:
+        """
+        Cached status of every server, sorted by name.
+
+        Returns:
+            list[dict]: {name, container_name, description, running, status, health}
+        """
+        self.refresh(max_age=max_age)
+        with self._lock:
+            return [self._describe(server) for _, server in sorted(self._servers.items())]
+
+    def server(self, name: str, probe: bool = False):
+        """Cached status of one server (probed first if probe=True), or None."""
+        self.refresh(max_age=STATUS_TTL)
+        with self._lock:
+            server = self._servers.get(name)
+        if server is None:
+            return None
+        if probe:
+            self._check(server)
+        with self._lock:
+            return self._describe(server, history=True)
+
+    def check_all(self) -> None:
+        """Run one probe cycle over every server."""
+        started = time.monotonic()
+        self.refresh()
+        with self._lock:
+            servers = list(self._servers.values())
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="health-probe") as pool:
+            list(pool.map(self._check, servers))
+        with self._lock:
+            self._update_gauges()
+        self._stats["cycles"] += 1
+        self._stats["last_cycle"] = time.time()
+        self._stats["last_cycle_seconds"] = round(time.monotonic() - started, 3)
+
+    def _check(self, server: _ServerHealth) -> None:
+        with self._lock:
+            if server.probing:
+                return
+            server.probing = True
+        try:
+            if server.container_status == "running" and (server.command is not None or server.url):
+                started = time.perf_counter()
+                ok, error = probe_mcp(server.container, server.command, timeout=PROBE_TIMEOUT,
+                                      url=server.url)
+                latency = time.perf_counter() - started
+                HEALTH_PROBE_SECONDS.observe(latency, outcome="ok" if ok else "error")
+                with self._lock:
+                    server.record(ok, latency, error)
+            if self.auto_restart and self._needs_restart(server):
+                self._restart(server)
+        finally:
+            server.probing = False
+
+    def _needs_restart(self, server: _ServerHealth) -> bool:
+        if time.monotonic() < server.next_restart_at:
+            return False
+        if server.crashed():
+            return True
+        return server.health == "unhealthy" and server.consecutive_failures >= FAILURE_THRESHOLD
+
+    def _restart(self, server: _ServerHealth) -> None:
+        config = {"container": server.container, "command": server.command, "url": server.url,
+                  "file": server.file}
+        result = restart_server(server.name, config, host=server.host or server_host(server.name))
+        outcome = "ok" if result["status"] == "ready" else "error"
+        HEALTH_RESTARTS.inc(outcome=outcome)
+        with self._lock:
+            server.restarts += 1
+            server.last_restart = time.time()
+            server.next_restart_at = time.monotonic() + server.backoff
+            server.backoff = min(server.backoff * 2, RESTART_BACKOFF_MAX)
+            server.consecutive_failures = 0
+            if result["error"]:
+                server.last_error = result["error"]
+            if result["status"] != "failed":
+                server.set_container_status("running")
+        self.invalidate()
+
+    def _describe(self, server: _ServerHealth, history: bool = False) -> dict:
+        health = server.snapshot()
+        if history:
+            health["results"] = [
+                {"at": at, "ok": ok, "latency_ms": round(latency * 1000, 1)}
+                for at, ok, latency in server.results
+            ]
+        return {
+            "name": server.name,
+            "container_name": server.container,
+            "host": server.host,
+            "description": server.description,
+            "running": server.container_status == "running",
+            "status": server.container_status,
+            "health": health,
+        }
+
+    def _update_gauges(self) -> None:
+        counts = {state: 0 for state in HEALTH_STATES}
+        for server in self._servers.values():
+            counts[server.health] += 1
+        for state, count in counts.items():
+            SERVERS_BY_HEALTH.labels(health=state).set(count)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.check_all()
+            except Exception as e:
+                self._stats["last_error"] = str(e)
+            self._stop.wait(self.interval)
@@ -0,0 +1,144 @@
+"""
+Idempotency Keys
+
+Lets a client retry a non-idempotent request (POST /api/servers/provision)
+safely by sending an `Idempotency-Key` header. The first request with a key
+runs; the response is kept for EMCP_IDEMPOTENCY_TTL seconds, and a retry
+with the same key and body gets that response back (with an
+`Idempotent-Replayed: true` header) instead of running again. A retry that
+arrives while the first request is still running waits for it.
+
+The store is bounded (EMCP_IDEMPOTENCY_MAX keys, oldest evicted first) and
+in memory, so keys do not survive a manager restart. Only a hash of the
+request body is kept. Only final outcomes are kept: server errors (5xx)
+and retryable failures (a cancelled run, or a clash with another run of
+the same server) release the key, so retrying those runs the request
+again.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Configuration
+IDEMPOTENCY_TTL = float(os.getenv("EMCP_IDEMPOTENCY_TTL", "86400"))
+IDEMPOTENCY_MAX = int(os.getenv("EMCP_IDEMPOTENCY_MAX", "1000"))
+# How long a retry waits for the request it duplicates
+IDEMPOTENCY_WAIT = float(os.getenv("EMCP_IDEMPOTENCY_WAIT", "900"))
+
+HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+
+
+class IdempotencyError(Exception):
+    """Raised for an invalid key or a key reused with a different request."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class _Entry:
+    __slots__ = ("fingerprint", "done", "status", "payload", "expires")
+
+    def __init__(self, fingerprint: str, expires: float):
+        self.fingerprint = fingerprint
+        self.done = threading.Event()
+        self.status = None
+        self.payload = None
+        self.expires = expires
+
+
+def fingerprint(body) -> str:
+    """Hash of a JSON request body, independent of key order."""
+    canonical = json.dumps(body, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class IdempotencyStore:
+    """Bounded, expiring store of responses by idempotency key."""
+
+    def __init__(self, max_entries: int = IDEMPOTENCY_MAX, ttl: float = IDEMPOTENCY_TTL):
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"stored": 0, "replayed": 0, "evicted": 0}
+
+    def begin(self, key: str, body_hash: str):
+        """
+        Claim a key for a request, or find the request that already has it.
+
+        Args:
+            key: Idempotency key from the client
+            body_hash: fingerprint() of the request body
+
+        Returns:
+            tuple: (entry, owner); the owner runs the request and calls
+            finish(), anyone else calls wait()
+
+        Raises:
+            IdempotencyError: 400 for an invalid key, 422 if the key was
+                used with a different request body
+        """
+        if not key or len(key) > MAX_KEY_LENGTH:
+            raise IdempotencyError(f"{HEADER} must be 1-{MAX_KEY_LENGTH} characters")
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.fingerprint != body_hash:
+                    raise IdempotencyError(
+                        f"{HEADER} '{key}' was already used with a different request", status=422
+                    )
+                return entry, False
+            entry = self._entries[key] = _Entry(body_hash, now + self.ttl)
+            while len(self._entries) > self.max_entries:
+                # Never evict a request still running; it is the oldest otherwise
+                oldest, candidate = next(iter(self._entries.items()))
+                if not candidate.done.is_set():
+                    break
+                del self._entries[oldest]
+                self._stats["evicted"] += 1
+            return entry, True
+
+    def finish(self, key: str, entry, payload: dict, status: int, retryable: bool = False) -> None:
+        """
+        Store the owner's response; 5xx and retryable responses release the
+        key instead (requests waiting on it still get this response).
+        """
+        entry.payload = payload
+        entry.status = status
+        with self._lock:
+            if status >= 500 or retryable:
+                if self._entries.get(key) is entry:
+                    del self._entries[key]
+            else:
+                self._stats["stored"] += 1
+        entry.done.set()
+
+    def wait(self, entry, timeout: float = IDEMPOTENCY_WAIT):
+        """
+        Wait for the request holding a key to finish.
+
+        Returns:
+            tuple: (payload, status), or None if it is still running
+        """
+        if not entry.done.wait(timeout):
+            return None
+        with self._lock:
+            self._stats["replayed"] += 1
+        return entry.payload, entry.status
+
+    def status(self) -> dict:
+        with self._lock:
+            return {"keys": len(self._entries), "max_keys": self.max_entries, "ttl": self.ttl, **self._stats}
+
+    def _expire(self, now: float) -> None:
+        for key in [k for k, e in self._entries.items() if e.expires < now and e.done.is_set()]:
+            del self._entries[key]
@@ -0,0 +1,387 @@
+"""
+Idle Scale-to-Zero
+
+Stops dynamic MCP server containers nobody is using and starts them again
+on demand, so memory follows what is actually in use.
+
+EMCP_IDLE_POLICY selects what counts as idle:
+
+- off        (default) never stop anything
+- ungrouped  the server has no tool in any group
+- unused     ungrouped, or none of its tools called within EMCP_IDLE_WINDOW
+
+A sweep runs every EMCP_IDLE_INTERVAL seconds. Servers seen running,
+called or woken within EMCP_IDLE_GRACE seconds are left alone, as are
+servers named in EMCP_IDLE_EXEMPT and servers not created dynamically.
+Sleeping containers are stopped, not removed, so waking them is a plain
+`docker start` followed by a readiness gate: MCP initialize probes at
+short, growing intervals until the server answers (EMCP_WAKE_TIMEOUT).
+
+A server is woken when:
+
+- a group that references one of its tools is created or updated
+- the gateway logs a call to one of its tools (needs the usage ingester;
+  MCPJungle runs `docker exec` per call, so that first call fails and
+  the client's retry reaches the started server)
+- POST /api/servers/{name}/wake is called (waits for readiness)
+
+Sleeping servers are recorded in EMCP_IDLE_STATE_FILE so a manager
+restart neither forgets them nor mistakes them for crashed containers;
+the health monitor reports them as "idle" instead of restarting them.
+"""
+
+import json
+import os
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from compose_manager import ComposeError, _run_docker, list_container_states, server_host, wait_for_mcp_ready
+from desired_state import current_servers
+from health_monitor import read_server_configs
+from metrics import IDLE_TRANSITIONS, SERVERS_ASLEEP, WAKE_SECONDS
+from tool_catalog import split_tool_name
+
+# Configuration
+IDLE_POLICIES = ("off", "ungrouped", "unused")
+IDLE_POLICY = os.getenv("EMCP_IDLE_POLICY", "off")
+IDLE_WINDOW = float(os.getenv("EMCP_IDLE_WINDOW", "3600"))
+IDLE_INTERVAL = float(os.getenv("EMCP_IDLE_INTERVAL", "60"))
+IDLE_GRACE = float(os.getenv("EMCP_IDLE_GRACE", "600"))
+IDLE_EXEMPT = {name.strip() for name in os.getenv("EMCP_IDLE_EXEMPT", "").split(",") if name.strip()}
+IDLE_STATE_FILE = os.getenv("EMCP_IDLE_STATE_FILE", "/data/idle-state.json")
+WAKE_TIMEOUT = float(os.getenv("EMCP_WAKE_TIMEOUT", "30"))
+WAKE_CONCURRENCY = int(os.getenv("EMCP_WAKE_CONCURRENCY", "4"))
+
+
+class IdleError(Exception):
+    """Raised for an invalid policy or a server that cannot be woken."""
+
+    def __init__(self, message, status=500):
+        super().__init__(message)
+        self.status = status
+
+
+class IdleScaler:
+    """Stops idle dynamic servers and wakes them on demand."""
+
+    def __init__(self, configs_dir: str, groups_dir: str, usage, health=None,
+                 policy: str = IDLE_POLICY, window: float = IDLE_WINDOW,
+                 interval: float = IDLE_INTERVAL, grace: float = IDLE_GRACE,
+                 exempt=IDLE_EXEMPT, state_file: str = IDLE_STATE_FILE):
+        if policy not in IDLE_POLICIES:
+            raise IdleError(f"Unknown idle policy '{policy}'. Use one of: {', '.join(IDLE_POLICIES)}", status=400)
+        self.configs_dir = configs_dir
+        self.groups_dir = groups_dir
+        self.usage = usage
+        self.health = health
+        self.policy = policy
+        self.window = window
+        self.interval = interval
+        self.grace = grace
+        self.exempt = set(exempt)
+        self.state_file = state_file
+        self._asleep = {}   # name -> {"since", "reason"}
+        self._active = {}   # name -> last time seen running, called or woken
+        self._waking = {}   # name -> (Event set when its wake finishes, its result)
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max(1, WAKE_CONCURRENCY), thread_name_prefix="idle-wake")
+        self._stop = threading.Event()
+        self._thread = None
+        self._stats = {"sweeps": 0, "last_sweep": None, "stopped": 0, "woken": 0, "last_error": None}
+        self._load()
+
+    def start(self) -> None:
+        """Start sweeping in the background (no-op with the "off" policy)."""
+        if self.policy == "off" or (self._thread and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="idle-scaler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def status(self) -> dict:
+        with self._lock:
+            asleep = {name: dict(entry) for name, entry in sorted(self._asleep.items())}
+        return {
+            "policy": self.policy,
+            "running": bool(self._thread and self._thread.is_alive()),
+            "window": self.window,
+            "interval": self.interval,
+            "grace": self.grace,
+            "exempt": sorted(self.exempt),
+            "asleep": asleep,
+            **self._stats,
+        }
+
+    def is_asleep(self, name: str) -> bool:
+        with self._lock:
+            return name in self._asleep
+
+    def forget(self, name: str) -> None:
+        """Drop a server's idle state (after it was removed or restarted)."""
+        with self._lock:
+            self._active.pop(name, None)
+            changed = self._asleep.pop(name, None) is not None
+        if changed:
+            self._changed()
+
+    # -- Policy ------------------------------------------------------------
+
+    def candidates(self) -> dict:
+        """
+        Running dynamic servers the policy would stop now.
+
+        Returns:
+            dict: {name: reason}
+        """
+        if self.policy == "off":
+            return {}
+        now = time.time()
+        configs = read_server_configs(self.configs_dir)
+        states = list_container_states()
+        dynamic = current_servers()
+        grouped = self._grouped_servers()
+        last_calls = {}
+        if self.policy == "unused":
+            for tool, ts in self.usage.last_called().items():
+                server = split_tool_name(tool)
+                last_calls[server] = max(ts, last_calls.get(server, 0))
+
+        found = {}
+        with self._lock:
+            for name, config in configs.items():
+                if name not in dynamic or name in self.exempt:
+                    continue
+                if config["command"] is None and not config["url"]:
+                    continue
+                if states.get(config["container"]) != "running":
+                    continue
+                # The first sighting starts the grace period
+                last_active = max(self._active.setdefault(name, now), last_calls.get(name, 0))
+                if now - last_active < self.grace:
+                    continue
+                if name not in grouped:
+                    found[name] = "in no group"
+                elif self.policy == "unused" and now - last_active >= self.window:
+                    found[name] = f"no calls in {self.window:g}s"
+        return found
+
+    def sweep(self) -> list[str]:
+        """Stop every current candidate; returns the servers stopped."""
+        self._settle()
+        stopped = []
+        configs = read_server_configs(self.configs_dir)
+        for name, reason in sorted(self.candidates().items()):
+            if self._sleep(name, configs[name]["container"], reason):
+                stopped.append(name)
+        self._stats["sweeps"] += 1
+        self._stats["last_sweep"] = time.time()
+        return stopped
+
+    def _grouped_servers(self) -> set:
+        servers = set()
+        if not os.path.isdir(self.groups_dir):
+            return servers
+        for filename in os.listdir(self.groups_dir):
+            path = os.path.join(self.groups_dir, filename)
+            if not filename.endswith('.json') or not os.path.isfile(path):
+                continue
+            try:
+                with open(path) as f:
+                    tools = json.load(f).get("included_tools") or []
+            except (OSError, ValueError):
+                continue
+            servers.update(split_tool_name(tool) for tool in tools)
+        return servers
+
+    def _settle(self) -> None:
+        """Forget sleeping servers that were started or removed behind our back."""
+        configs = read_server_configs(self.configs_dir)
+        states = list_container_states()
+        with self._lock:
+            gone = [
+                name for name in self._asleep
+                if name not in configs or states.get(configs[name]["container"]) in ("running", None)
+            ]
+            for name in gone:
+                del self._asleep[name]
+                self._active[name] = time.time()
+        if gone:
+            self._changed()
+
+    # -- Transitions -------------------------------------------------------
+
+    def _sleep(self, name: str, container: str, reason: str) -> bool:
+        # Marked asleep before stopping, so the health monitor never sees a
+        # stopped container it would restart
+        with self._lock:
+            if name in self._waking:
+                return False
+            self._asleep[name] = {"since": time.time(), "reason": reason}
+        self._changed()
+
+        outcome = "error"
+        try:
+            result = _run_docker(["stop", container], timeout=30, host=server_host(name))
+            if result.returncode == 0:
+                outcome = "ok"
+            else:
+                self._stats["last_error"] = f"{name}: {result.stderr.strip() or 'failed to stop'}"
+        except subprocess.TimeoutExpired:
+            self._stats["last_error"] = f"{name}: timeout stopping container"
+        IDLE_TRANSITIONS.inc(action="sleep", trigger="policy", outcome=outcome)
+
+        if outcome != "ok":
+            self.forget(name)
+            return False
+        self._stats["stopped"] += 1
+        return True
+
+    def wake(self, name: str, trigger: str = "manual", timeout: float = WAKE_TIMEOUT) -> dict:
+        """
+        Start a server's container and wait until it answers MCP requests.
+
+        Concurrent wakes of the same server share one start.
+
+        Args:
+            name: Server name
+            trigger: What caused the wake ("manual", "group", "call")
+            timeout: Seconds to wait for readiness
+
+        Returns:
+            dict: {"name", "woken": bool, "ready": bool, "elapsed_ms"}
+
+        Raises:
+            IdleError: If the server is unknown or its container cannot start
+        """
+        config = read_server_configs(self.configs_dir).get(name)
+        if config is None:
+            raise IdleError(f"Server '{name}' not found", status=404)
+
+        started = time.perf_counter()
+        with self._lock:
+            self._active[name] = time.time()
+            waking = self._waking.get(name)
+            owner = waking is None
+            if owner:
+                waking = self._waking[name] = (threading.Event(), {"ready": False})
+        event, shared = waking
+        if not owner:
+            event.wait(timeout)
+            return {"name": name, "woken": False, "ready": shared["ready"],
+                    "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)}
+
+        try:
+            woken = self._start(name, config["container"], trigger)
+            probeable = config["command"] is not None or config["url"]
+            if probeable:
+                remaining = max(0, started + timeout - time.perf_counter())
+                ready, _ = wait_for_mcp_ready(config["container"], config["command"] or [], timeout=remaining,
+                                              host=server_host(name), url=config["url"])
+            else:
+                ready = True
+            shared["ready"] = ready
+            WAKE_SECONDS.observe(time.perf_counter() - started, outcome="ok" if ready else "timeout")
+            return {"name": name, "woken": woken, "ready": ready,
+                    "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)}
+        finally:
+            with self._lock:
+                self._waking.pop(name, None)
+            event.set()
+
+    def wake_for_tools(self, tools, trigger: str = "group") -> list[str]:
+        """Wake, in the background, every sleeping server owning one of the tools."""
+        servers = {split_tool_name(tool) for tool in tools or []}
+        with self._lock:
+            sleeping = sorted(server for server in servers if server in self._asleep)
+        for server in sleeping:
+            self._pool.submit(self._wake_quietly, server, trigger)
+        return sleeping
+
+    def notify_call(self, call: dict, ts: float = None) -> None:
+        """Usage ingester hook: a call keeps a server awake, or wakes it."""
+        server = split_tool_name(call["tool"])
+        with self._lock:
+            self._active[server] = max(ts or time.time(), self._active.get(server, 0))
+            asleep = server in self._asleep
+        if asleep:
+            self._pool.submit(self._wake_quietly, server, "call")
+
+    def _wake_quietly(self, name: str, trigger: str) -> None:
+        try:
+            self.wake(name, trigger)
+        except IdleError as e:
+            self._stats["last_error"] = f"{name}: {e}"
+
+    def _start(self, name: str, container: str, trigger: str) -> bool:
+        states = list_container_states()
+        if states.get(container) == "running":
+            self.forget(name)
+            with self._lock:
+                self._active[name] = time.time()
+            return False
+        if container not in states:
+            raise IdleError(f"Container '{container}' does not exist; re-provision the server", status=409)
+
+        outcome = "error"
+        try:
+            result = _run_docker(["start", container], timeout=30, host=server_host(name))
+            if result.returncode != 0:
+                raise IdleError(f"Failed to start '{container}': {result.stderr.strip()}")
+            outcome = "ok"
+        except subprocess.TimeoutExpired:
+            raise IdleError(f"Timeout starting '{container}'")
+        finally:
+            IDLE_TRANSITIONS.inc(action="wake", trigger=trigger, outcome=outcome)
+
+        self.forget(name)
+        with self._lock:
+            self._active[name] = time.time()
+        self._stats["woken"] += 1
+        return True
+
+    # -- State -------------------------------------------------------------
+
+    def _changed(self) -> None:
+        with self._lock:
+            asleep = dict(self._asleep)
+        SERVERS_ASLEEP.labels().set(len(asleep))
+        if self.health is not None:
+            self.health.set_sleeping(asleep)
+            self.health.invalidate()
+        self._save(asleep)
+
+    def _save(self, asleep: dict) -> None:
+        if not self.state_file:
+            return
+        try:
+            temp_path = f"{self.state_file}.tmp"
+            with open(temp_path, "w") as f:
+                json.dump({"asleep": asleep}, f)
+            os.replace(temp_path, self.state_file)
+        except OSError as e:
+            self._stats["last_error"] = f"Failed to save idle state: {e}"
+
+    def _load(self) -> None:
+        if not self.state_file or not os.path.exists(self.state_file):
+            return
+        try:
+            with open(self.state_file) as f:
+                self._asleep = json.load(f).get("asleep") or {}
+        except (OSError, ValueError):
+            return
+        SERVERS_ASLEEP.labels().set(len(self._asleep))
+        if self.health is not None:
+            self.health.set_sleeping(self._asleep)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.sweep()
+            except (ComposeError, OSError, subprocess.TimeoutExpired) as e:
+                self._stats["last_error"] = str(e)
+            self._stop.wait(self.interval)
@@ -0,0 +1,419 @@
+"""
+Image and Volume Garbage Collection
+
+Removes the Docker images and volumes that dynamic MCP servers left
+behind, so provisioning experiments do not fill the disk.
+
+Only what eMCP brought in is ever collected. A ledger (EMCP_GC_STATE_FILE)
+records, per Docker host, every image a provision downloaded (one already
+on the host is left out) or baked for a server, and every volume mounted
+by a container labelled emcp.dynamic, together with when it was last in
+use. Images labelled emcp.baked are picked up too. Anything else on the
+host, including the images of the static services and base images the
+operator pulled, is never touched.
+
+A ledger entry is referenced while any container on its host (running or
+not) uses it, or while a compose service names it (as image or source
+image). Unreferenced entries are reclaimed when:
+
+- age:   they have been unreferenced for EMCP_GC_MAX_AGE seconds
+- size:  the unreferenced entries on a host exceed EMCP_GC_MAX_BYTES;
+         the longest unused go first until the rest fit
+
+Nothing unreferenced for less than EMCP_GC_GRACE seconds is removed, so an
+image pulled for a provision still in progress survives until its
+container exists. The shared package cache volume is never collected.
+
+A sweep runs every EMCP_GC_INTERVAL seconds in the background and can be
+requested through POST /api/gc; sizes come from one `system df` call per
+host. Removal goes through the Engine API without force, so Docker still
+refuses to remove anything in use.
+"""
+
+import json
+import os
+import threading
+import time
+
+import docker_api
+import docker_hosts
+from compose_manager import (
+    ComposeError, DYNAMIC_LABEL, HOST_LABEL, PACKAGE_CACHE_VOLUME, _split_image_ref, load_compose,
+    parse_memory
+)
+from metrics import GC_RECLAIMABLE_BYTES, GC_RECLAIMED_BYTES
+
+# Configuration
+GC_INTERVAL = float(os.getenv("EMCP_GC_INTERVAL", "3600"))
+GC_MAX_AGE = float(os.getenv("EMCP_GC_MAX_AGE", str(7 * 24 * 3600)))
+GC_MAX_BYTES = parse_memory(os.getenv("EMCP_GC_MAX_BYTES") or "0")
+GC_GRACE = float(os.getenv("EMCP_GC_GRACE", "600"))
+GC_STATE_FILE = os.getenv("EMCP_GC_STATE_FILE", "/data/gc-state.json")
+
+KINDS = ("image", "volume")
+BAKED_LABEL = "emcp.baked"
+
+
+class GCError(Exception):
+    """Raised when a host's disk usage cannot be read."""
+    pass
+
+
+# {"host|kind|ref": {"host", "kind", "ref", "servers", "tracked_at", "last_used"}}
+_ledger = {}
+_ledger_lock = threading.Lock()
+
+
+def _key(host: str, kind: str, ref: str) -> str:
+    return f"{host}|{kind}|{ref}"
+
+
+def normalize_ref(ref: str) -> str:
+    """
+    An image reference as Docker reports it: name:tag (latest if omitted),
+    or name@digest. Image IDs are returned unchanged.
+    """
+    if not ref or ref.startswith("sha256:"):
+        return ref
+    name, tag = _split_image_ref(ref)
+    return f"{name}@{tag}" if "@" in ref else f"{name}:{tag}"
+
+
+def _load_ledger() -> None:
+    if not GC_STATE_FILE or not os.path.exists(GC_STATE_FILE):
+        return
+    try:
+        with open(GC_STATE_FILE) as f:
+            entries = json.load(f).get("tracked") or []
+    except (OSError, ValueError):
+        return
+    with _ledger_lock:
+        for entry in entries:
+            if entry["kind"] == "image":
+                entry["ref"] = normalize_ref(entry["ref"])
+            _ledger[_key(entry["host"], entry["kind"], entry["ref"])] = entry
+
+
+def _save_ledger() -> None:
+    if not GC_STATE_FILE:
+        return
+    with _ledger_lock:
+        entries = sorted(_ledger.values(), key=lambda e: (e["host"], e["kind"], e["ref"]))
+        temp_path = f"{GC_STATE_FILE}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"tracked": entries}, f)
+        os.replace(temp_path, GC_STATE_FILE)
+
+
+_load_ledger()
+
+
+def track(host: str, kind: str, ref: str, server: str = None, now: float = None,
+          save: bool = True) -> None:
+    """
+    Record an image or volume as brought in for a dynamic server.
+
+    Args:
+        host: Docker host name (default: local)
+        kind: "image" or "volume"
+        ref: Image reference (normalized to name:tag, see normalize_ref)
+            or volume name
+        server: Server it was used for
+        save: Write the ledger to EMCP_GC_STATE_FILE (errors are ignored;
+            the next sweep saves again)
+    """
+    now = now or time.time()
+    host = host or docker_hosts.LOCAL_HOST
+    if kind == "image":
+        ref = normalize_ref(ref)
+    with _ledger_lock:
+        entry = _ledger.setdefault(_key(host, kind, ref), {
+            "host": host, "kind": kind, "ref": ref, "servers": [], "tracked_at": now, "last_used": now,
+        })
+        entry["last_used"] = max(entry["last_used"], now)
+        if server and server not in entry["servers"]:
+            entry["servers"].append(server)
+    if save:
+        try:
+            _save_ledger()
+        except OSError:
+            pass
+
+
+def tracked() -> list[dict]:
+    """Every ledger entry."""
+    with _ledger_lock:
+        return [dict(entry, servers=list(entry["servers"])) for entry in _ledger.values()]
+
+
+def _compose_references() -> dict:
+    """{host: set of image references} named by compose services."""
+    references = {}
+    for service in (load_compose(read_only=True).get('services') or {}).values():
+        labels = service.get('labels') or {}
+        if isinstance(labels, list):
+            labels = dict(label.split("=", 1) for label in labels if "=" in label)
+        host = labels.get(HOST_LABEL) or docker_hosts.LOCAL_HOST
+        refs = references.setdefault(host, set())
+        for image in (service.get('image'), labels.get('emcp.source-image')):
+            if image:
+                refs.add(normalize_ref(image))
+    return references
+
+
+def _disk_usage(host) -> dict:
+    """
+    Images, volumes and containers of a host from `system df`.
+
+    Raises:
+        GCError: If the host cannot be reached
+    """
+    try:
+        df = docker_api.request("GET", "/system/df", timeout=60, endpoint=host.endpoint) or {}
+    except docker_api.DockerAPIError as e:
+        raise GCError(f"{host.name}: {e}")
+    return {
+        "images": df.get("Images") or [],
+        "volumes": df.get("Volumes") or [],
+        "containers": df.get("Containers") or [],
+    }
+
+
+def _image_size(image: dict) -> int:
+    """Bytes freed by removing an image: its layers not shared with others."""
+    shared = image.get("SharedSize", -1)
+    size = image.get("Size") or 0
+    return max(0, size - shared) if shared is not None and shared >= 0 else size
+
+
+class GarbageCollector:
+    """Background reclaiming of unreferenced images and volumes."""
+
+    def __init__(self, interval: float = GC_INTERVAL, max_age: float = GC_MAX_AGE,
+                 max_bytes: int = GC_MAX_BYTES, grace: float = GC_GRACE):
+        self.interval = interval
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.grace = grace
+        self._report = {"hosts": {}, "candidates": [], "removed": [], "reclaimable_bytes": 0}
+        self._sweep_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._dry_run = False
+        self._stop = threading.Event()
+        self._thread = None
+        self._stats = {"cycles": 0, "last_cycle": None, "last_cycle_seconds": None, "last_error": None,
+                       "reclaimed_bytes": 0, "removed": 0}
+
+    def start(self) -> None:
+        """Start sweeping in the background."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="image-gc", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+
+    def trigger(self, dry_run: bool = False) -> bool:
+        """
+        Sweep now, in the background thread (or a one-off thread if the
+        collector is not started).
+
+        Returns:
+            bool: False if a sweep is already running (it is not queued again)
+        """
+        if self._sweep_lock.locked():
+            return False
+        if not (self._thread and self._thread.is_alive()):
+            threading.Thread(target=self._sweep_quietly, args=(dry_run,), name="image-gc", daemon=True).start()
+            return True
+        self._dry_run = dry_run
+        self._wake.set()
+        return True
+
+    def status(self) -> dict:
+        return {
+            "running": bool(self._thread and self._thread.is_alive()),
+            "sweeping": self._sweep_lock.locked(),
+            "interval": self.interval,
+            "max_age": self.max_age,
+            "max_bytes": self.max_bytes or None,
+            "grace": self.grace,
+            "tracked": len(_ledger),
+            **self._stats,
+        }
+
+    def report(self) -> dict:
+        """Result of the last sweep: per-host and per-entry reclaimable bytes."""
+        return dict(self._report)
+
+    def sweep(self, dry_run: bool = False, now: float = None) -> dict:
+        """
+        Refresh the ledger from every host and reclaim what the policies allow.
+
+        Args:
+            dry_run: Only report what would be removed
+
+        Returns:
+            dict: {"hosts": {host: {"reclaimable_bytes", "error"}},
+            "candidates": [...], "removed": [...], "reclaimable_bytes"}
+        """
+        with self._sweep_lock:
+            started = time.monotonic()
+            now = now or time.time()
+            try:
+                compose_refs = _compose_references()
+            except ComposeError as e:
+                # Without the compose file nothing can be shown unreferenced
+                self._stats["last_error"] = str(e)
+                return self.report()
+
+            hosts, candidates, removed = {}, [], []
+            for host in docker_hosts.hosts():
+                try:
+                    usage = _disk_usage(host)
+                except GCError as e:
+                    hosts[host.name] = {"reclaimable_bytes": None, "error": str(e)}
+                    continue
+                entries = self._evaluate(host, usage, compose_refs.get(host.name, set()), now)
+                if not dry_run:
+                    for entry in [e for e in entries if e["action"] == "remove"]:
+                        removed.append(self._remove(host, entry))
+                hosts[host.name] = {
+                    "reclaimable_bytes": sum(e["size"] for e in entries),
+                    "error": None,
+                }
+                candidates.extend(entries)
+
+            with _ledger_lock:
+                for entry in removed:
+                    if entry["removed"]:
+                        _ledger.pop(_key(entry["host"], entry["kind"], entry["ref"]), None)
+            try:
+                _save_ledger()
+            except OSError as e:
+                self._stats["last_error"] = f"Failed to save GC state: {e}"
+
+            remaining = [c for c in candidates
+                         if not any(r["removed"] and r["ref"] == c["ref"] and r["host"] == c["host"]
+                                    for r in removed)]
+            for kind in KINDS:
+                GC_RECLAIMABLE_BYTES.labels(kind=kind).set(
+                    sum(c["size"] for c in remaining if c["kind"] == kind))
+            self._report = {
+                "at": now,
+                "dry_run": dry_run,
+                "hosts": hosts,
+                "candidates": remaining,
+                "removed": removed,
+                "reclaimable_bytes": sum(c["size"] for c in remaining),
+            }
+            self._stats["cycles"] += 1
+            self._stats["last_cycle"] = now
+            self._stats["last_cycle_seconds"] = round(time.monotonic() - started, 3)
+            return self.report()
+
+    def _evaluate(self, host, usage: dict, compose_refs: set, now: float) -> list[dict]:
+        """Update the ledger for one host and list its unreferenced entries."""
+        images_by_ref = {}
+        for image in usage["images"]:
+            images_by_ref[image.get("Id")] = image
+            for ref in (image.get("RepoTags") or []) + (image.get("RepoDigests") or []):
+                images_by_ref[normalize_ref(ref)] = image
+            if (image.get("Labels") or {}).get(BAKED_LABEL) == "true":
+                for tag in image.get("RepoTags") or []:
+                    track(host.name, "image", tag, now=image.get("Created") or now, save=False)
+        volumes = {volume["Name"]: volume for volume in usage["volumes"]}
+
+        used_images, used_volumes = set(compose_refs), set()
+        for container in usage["containers"]:
+            used_images.update(normalize_ref(ref) for ref in (container.get("Image"), container.get("ImageID"))
+                               if ref)
+            mounted = {m["Name"] for m in container.get("Mounts") or [] if m.get("Type") == "volume"}
+            used_volumes.update(mounted)
+            if (container.get("Labels") or {}).get(DYNAMIC_LABEL) != "true":
+                continue
+            name = (container.get("Names") or ["/"])[0].lstrip("/")
+            server = name[:-len("-mcp")] if name.endswith("-mcp") else name
+            if _key(host.name, "image", normalize_ref(container.get("Image") or "")) in _ledger:
+                # Only images already tracked; a base image it runs may predate eMCP
+                track(host.name, "image", container.get("Image"), server, now=now, save=False)
+            for volume in mounted - {PACKAGE_CACHE_VOLUME}:
+                track(host.name, "volume", volume, server, now=now, save=False)
+
+        entries = []
+        with _ledger_lock:
+            for key, entry in list(_ledger.items()):
+                if entry["host"] != host.name:
+                    continue
+                if entry["kind"] == "image":
+                    image = images_by_ref.get(entry["ref"])
+                    if image is None:
+                        del _ledger[key]  # Removed outside eMCP
+                        continue
+                    in_use = entry["ref"] in used_images or image.get("Id") in used_images
+                    # Removing one of several tags frees nothing
+                    size = _image_size(image) if len(image.get("RepoTags") or []) <= 1 else 0
+                else:
+                    volume = volumes.get(entry["ref"])
+                    if volume is None:
+                        del _ledger[key]
+                        continue
+                    in_use = entry["ref"] in used_volumes or (volume.get("UsageData") or {}).get("RefCount", 0) > 0
+                    size = max(0, (volume.get("UsageData") or {}).get("Size", 0))
+                if in_use:
+                    entry["last_used"] = now
+                    continue
+                entries.append({
+                    "host": host.name, "kind": entry["kind"], "ref": entry["ref"],
+                    "servers": list(entry["servers"]), "size": size,
+                    "unused_for": now - entry["last_used"], "action": "keep", "reason": None,
+                })
+
+        # Age policy, then the size budget over what is left (longest unused first)
+        entries.sort(key=lambda e: -e["unused_for"])
+        kept = 0
+        for entry in entries:
+            if entry["unused_for"] < self.grace:
+                entry["reason"] = "grace"
+            elif self.max_age and entry["unused_for"] >= self.max_age:
+                entry["action"], entry["reason"] = "remove", "age"
+            else:
+                kept += entry["size"]
+        for entry in entries:
+            if self.max_bytes and kept > self.max_bytes and entry["action"] == "keep" and entry["reason"] is None:
+                entry["action"], entry["reason"] = "remove", "size"
+                kept -= entry["size"]
+        for entry in entries:
+            entry["unused_for"] = round(entry["unused_for"])
+        return entries
+
+    def _remove(self, host, entry: dict) -> dict:
+        path = f"/images/{entry['ref']}" if entry["kind"] == "image" else f"/volumes/{entry['ref']}"
+        result = {"host": host.name, "kind": entry["kind"], "ref": entry["ref"], "size": entry["size"],
+                  "reason": entry["reason"], "removed": False, "error": None}
+        try:
+            docker_api.request("DELETE", path, timeout=60, endpoint=host.endpoint)
+        except docker_api.DockerAPIError as e:
+            result["error"] = str(e)
+            return result
+        result["removed"] = True
+        self._stats["removed"] += 1
+        self._stats["reclaimed_bytes"] += entry["size"]
+        GC_RECLAIMED_BYTES.inc(entry["size"], kind=entry["kind"])
+        return result
+
+    def _sweep_quietly(self, dry_run: bool = False) -> None:
+        try:
+            self.sweep(dry_run=dry_run)
+        except (ComposeError, OSError) as e:
+            self._stats["last_error"] = str(e)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            dry_run, self._dry_run = self._dry_run, False
+            self._sweep_quietly(dry_run)
+            self._wake.wait(self.interval)
+            self._wake.clear()
@@ -6,6 +6,8 @@ access token (Token Auth or Service Token).
 """
 
 import os
+import threading
+import time
 import requests
 from typing import Optional
 
@@ -15,6 +17,17 @@ INFISICAL_TOKEN = os.getenv("EMCP_INFISICAL_SECRET", "") or os.getenv("INFISICAL
 INFISICAL_WORKSPACE_ID = os.getenv("INFISICAL_WORKSPACE_ID", "")
 INFISICAL_ENVIRONMENT = os.getenv("INFISICAL_ENVIRONMENT", "prod")
 
+# Read-through cache: values live for CACHE_TTL seconds, known-missing keys
+# for NEGATIVE_CACHE_TTL seconds. Writes through this module invalidate.
+CACHE_TTL = float(os.getenv("INFISICAL_CACHE_TTL", "60"))
+NEGATIVE_CACHE_TTL = float(os.getenv("INFISICAL_NEGATIVE_CACHE_TTL", "15"))
+
+# Sentinel for cached "secret does not exist"
+_MISSING = object()
+
+_cache = {}
+_cache_lock = threading.Lock()
+
 
 class InfisicalError(Exception):
     """Exception raised for Infisical API errors."""
@@ -41,6 +54,50 @@ def get_access_token() -> str:
     return INFISICAL_TOKEN
 
 
+# ---------------------------------------------------------------------------
+# Cache
+# ---------------------------------------------------------------------------
+
+def _cache_get(key: str, path: str):
+    """Return cached value, _MISSING for a cached miss, or None if not cached."""
+    with _cache_lock:
+        entry = _cache.get((path, key))
+        if entry is None:
+            return None
+        value, expires = entry
+        if expires < time.monotonic():
+            del _cache[(path, key)]
+            return None
+        return value
+
+
+def _cache_put(key: str, path: str, value) -> None:
+    """Cache a value, or a miss when value is None."""
+    if value is None:
+        entry = (_MISSING, time.monotonic() + NEGATIVE_CACHE_TTL)
+    else:
+        entry = (value, time.monotonic() + CACHE_TTL)
+    with _cache_lock:
+        _cache[(path, key)] = entry
+
+
+def invalidate_cache(keys: list[str] = None, path: str = None) -> None:
+    """
+    Drop cached secrets.
+
+    Args:
+        keys: Keys to drop (default: all keys)
+        path: Restrict to one secret path (default: all paths)
+    """
+    with _cache_lock:
+        for cached_path, cached_key in list(_cache):
+            if path is not None and cached_path != path:
+                continue
+            if keys is not None and cached_key not in keys:
+                continue
+            del _cache[(cached_path, cached_key)]
+
+
 def create_secret(key: str, value: str, path: str = "/emcp") -> bool:
     """
     Create a new secret in Infisical.
@@ -87,6 +144,9 @@ def create_secret(key: str, value: str, path: str = "/emcp") -> bool:
     except requests.exceptions.RequestException as e:
         raise InfisicalError(f"Failed to create secret '{key}': {e}")
 
+    finally:
+        invalidate_cache([key], path)
+
 
 def update_secret(key: str, value: str, path: str = "/emcp") -> bool:
     """
@@ -128,11 +188,16 @@ def update_secret(key: str, value: str, path: str = "/emcp") -> bool:
     except requests.exceptions.RequestException as e:
         raise InfisicalError(f"Failed to update secret '{key}': {e}")
 
+    finally:
+        invalidate_cache([key], path)
+
 
 def get_secret(key: str, path: str = "/emcp") -> Optional[str]:
     """
     Retrieve a secret value from Infisical.
 
+    Served from the read-through cache when possible; misses are cached too.
+
     Args:
         key: Secret key name
         path: Secret path (default: /emcp)
@@ -143,6 +208,10 @@ def get_secret(key: str, path: str = "/emcp") -> Optional[str]:
     Raises:
         InfisicalError: If retrieval fails (other than not found)
     """
+    cached = _cache_get(key, path)
+    if cached is not None:
+        return None if cached is _MISSING else cached
+
     token = get_access_token()
 
     url = f"{INFISICAL_API_URL}/api/v3/secrets/raw/{key}"
@@ -162,13 +231,16 @@ def get_secret(key: str, path: str = "/emcp") -> Optional[str]:
         )
 
         if response.status_code == 404:
+            _cache_put(key, path, None)
             return None
 
         response.raise_for_status()
 
         data = response.json()
         secret = data.get("secret", {})
-        return secret.get("secretValue")
+        value = secret.get("secretValue")
+        _cache_put(key, path, value)
+        return value
 
     except requests.exceptions.RequestException as e:
         raise InfisicalError(f"Failed to get secret '{key}': {e}")
@@ -216,6 +288,9 @@ def delete_secret(key: str, path: str = "/emcp") -> bool:
     except requests.exceptions.RequestException as e:
         raise InfisicalError(f"Failed to delete secret '{key}': {e}")
 
+    finally:
+        invalidate_cache([key], path)
+
 
 def list_secrets(path: str = "/emcp") -> list[str]:
     """
@@ -269,3 +344,179 @@ def secret_exists(key: str, path: str = "/emcp") -> bool:
         bool: True if secret exists
     """
     return get_secret(key, path) is not None
+
+
+# ---------------------------------------------------------------------------
+# Batch operations
+# ---------------------------------------------------------------------------
+
+def get_secrets(keys: list[str] = None, path: str = "/emcp") -> dict[str, Optional[str]]:
+    """
+    Retrieve several secrets with at most one API call.
+
+    Cached keys are served locally; the rest are resolved with a single
+    list request for the path, which also primes the cache for every
+    secret at that path.
+
+    Args:
+        keys: Secret key names (default: every secret at the path)
+        path: Secret path (default: /emcp)
+
+    Returns:
+        dict: {key: value or None if not found}
+
+    Raises:
+        InfisicalError: If retrieval fails
+    """
+    if keys is None:
+        return _fetch_all(path)
+
+    result = {}
+    missing = []
+    for key in keys:
+        cached = _cache_get(key, path)
+        if cached is None:
+            missing.append(key)
+        else:
+            result[key] = None if cached is _MISSING else cached
+
+    if not missing:
+        return result
+
+    fetched = _fetch_all(path)
+    for key in missing:
+        value = fetched.get(key)
+        _cache_put(key, path, value)
+        result[key] = value
+    return result
+
+
+def create_secrets(secrets: dict[str, str], path: str = "/emcp") -> bool:
+    """
+    Create or update several secrets using Infisical's batch endpoints.
+
+    Issues one batch create. If any key already exists (HTTP 400), looks up
+    which keys exist with one list call, then batch-creates the new keys and
+    batch-updates the existing ones.
+
+    Args:
+        secrets: {key: value}
+        path: Secret path (default: /emcp)
+
+    Returns:
+        bool: True if all secrets were written
+
+    Raises:
+        InfisicalError: If any batch call fails
+    """
+    if not secrets:
+        return True
+
+    try:
+        response = _batch("post", secrets, path, include_type=True)
+        if response.status_code == 400:
+            existing = set(_fetch_all(path))
+            new = {k: v for k, v in secrets.items() if k not in existing}
+            changed = {k: v for k, v in secrets.items() if k in existing}
+            if new:
+                _batch("post", new, path, include_type=True).raise_for_status()
+            if changed:
+                _batch("patch", changed, path).raise_for_status()
+            return True
+
+        response.raise_for_status()
+        return True
+
+    except requests.exceptions.RequestException as e:
+        raise InfisicalError(f"Failed to create secrets {sorted(secrets)}: {e}")
+
+    finally:
+        invalidate_cache(list(secrets), path)
+
+
+def update_secrets(secrets: dict[str, str], path: str = "/emcp") -> bool:
+    """
+    Update several existing secrets with one batch call.
+
+    Args:
+        secrets: {key: new value}
+        path: Secret path (default: /emcp)
+
+    Returns:
+        bool: True if updated successfully
+
+    Raises:
+        InfisicalError: If the batch update fails
+    """
+    if not secrets:
+        return True
+
+    try:
+        _batch("patch", secrets, path).raise_for_status()
+        return True
+
+    except requests.exceptions.RequestException as e:
+        raise InfisicalError(f"Failed to update secrets {sorted(secrets)}: {e}")
+
+    finally:
+        invalidate_cache(list(secrets), path)
+
+
+def _batch(method: str, secrets: dict[str, str], path: str,
+           include_type: bool = False) -> requests.Response:
+    """Send a batch create/update request for the given secrets."""
+    items = []
+    for key, value in secrets.items():
+        item = {"secretKey": key, "secretValue": value}
+        if include_type:
+            item["type"] = "shared"
+        items.append(item)
+
+    return requests.request(
+        method,
+        f"{INFISICAL_API_URL}/api/v3/secrets/batch/raw",
+        json={
+            "workspaceId": INFISICAL_WORKSPACE_ID,
+            "environment": INFISICAL_ENVIRONMENT,
+            "secretPath": path,
+            "secrets": items
+        },
+        headers={
+            "Authorization": f"Bearer {get_access_token()}",
+            "Content-Type": "application/json"
+        },
+        timeout=30
+    )
+
+
+def _fetch_all(path: str) -> dict[str, str]:
+    """Fetch every secret (key and value) at a path with one list call."""
+    token = get_access_token()
+
+    try:
+        response = requests.get(
+            f"{INFISICAL_API_URL}/api/v3/secrets/raw",
+            params={
+                "workspaceId": INFISICAL_WORKSPACE_ID,
+                "environment": INFISICAL_ENVIRONMENT,
+                "secretPath": path
+            },
+            headers={
+                "Authorization": f"Bearer {token}"
+            },
+            timeout=30
+        )
+        response.raise_for_status()
+
+        secrets = {
+            s["secretKey"]: s.get("secretValue")
+            for s in response.json().get("secrets", [])
+            if s.get("secretKey")
+        }
+
+    except requests.exceptions.RequestException as e:
+        raise InfisicalError(f"Failed to list secrets: {e}")
+
+    for key, value in secrets.items():
+        _cache_put(key, path, value)
+    return secrets
@@ -12,12 +12,20 @@ import requests
 from typing import Optional
 from urllib.parse import urlparse
 
+from metrics import DETECTOR_FETCH_SECONDS, track
+
 
 class DetectionError(Exception):
     """Exception raised when detection fails."""
     pass
 
 
+def _fetch(url: str, source: str) -> requests.Response:
+    """GET a metadata URL, timed per source for /metrics."""
+    with track(DETECTOR_FETCH_SECONDS, source=source):
+        return requests.get(url, timeout=10)
+
+
 def parse_mcp_url(url: str) -> dict:
     """
     Parse a URL and determine the source type.
@@ -154,7 +162,7 @@ def fetch_github_metadata(repo: str) -> dict:
     pkg_data = None
     for pkg_url in pkg_urls:
         try:
-            response = requests.get(pkg_url, timeout=10)
+            response = _fetch(pkg_url, "github_package_json")
             if response.ok:
                 pkg_data = response.json()
                 result["detected_from"] = "package.json"
@@ -202,7 +210,7 @@ def fetch_github_metadata(repo: str) -> dict:
 
     for readme_url in readme_urls:
         try:
-            response = requests.get(readme_url, timeout=10)
+            response = _fetch(readme_url, "github_readme")
             if response.ok:
                 readme_text = response.text
                 result["required_env_vars"] = detect_env_vars(readme_text)
@@ -238,7 +246,7 @@ def fetch_npm_metadata(package_name: str) -> dict:
     url = f"https://registry.npmjs.org/{encoded_name}"
 
     try:
-        response = requests.get(url, timeout=10)
+        response = _fetch(url, "npm")
         if response.status_code == 404:
             raise DetectionError(f"npm package not found: {package_name}")
         response.raise_for_status()
@@ -0,0 +1,115 @@
+"""
+MCPJungle Client
+
+Thin wrappers around the two ways the manager talks to the gateway: the
+`mcpjungle` CLI inside the gateway container (writes, groups) and its
+REST API (reads).
+"""
+
+import os
+import subprocess
+import time
+
+import requests
+
+from deadline import run as run_process
+from metrics import EXEC_EMCP_SECONDS, MCPJUNGLE_REQUEST_SECONDS, track
+
+EMCP_CONTAINER = "emcp-server"
+MCPJUNGLE_API = os.getenv("MCPJUNGLE_API", "http://emcp-server:8080")
+# Seconds a single mcpjungle CLI call may take before it is killed
+EXEC_TIMEOUT = float(os.getenv("EMCP_EXEC_TIMEOUT", "120"))
+
+# Where the gateway container sees the configs directory
+GATEWAY_CONFIGS_DIR = "/configs"
+
+
+def exec_emcp(cmd, timeout: float = EXEC_TIMEOUT, deadline=None):
+    """
+    Execute command in eMCP container.
+
+    A call that runs past timeout is killed and reported as a failed
+    command (returncode -9) rather than raised, so callers keep treating it
+    like any other CLI failure.
+
+    Args:
+        cmd: Arguments after `mcpjungle`
+        timeout: Seconds before the command is killed
+        deadline: Optional Deadline of the calling operation
+
+    Returns:
+        subprocess.CompletedProcess
+
+    Raises:
+        DeadlineExceeded: If the deadline passes or is cancelled first
+    """
+    full_cmd = ["docker", "exec", "-t", EMCP_CONTAINER, "/mcpjungle"] + cmd
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        try:
+            result = run_process(full_cmd, timeout=timeout, deadline=deadline)
+        except subprocess.TimeoutExpired:
+            return subprocess.CompletedProcess(full_cmd, -9, "", f"Timed out after {timeout:g}s")
+        if result.returncode == 0:
+            outcome = "ok"
+        return result
+    finally:
+        EXEC_EMCP_SECONDS.observe(
+            time.perf_counter() - started,
+            subcommand=cmd[0] if cmd else "", outcome=outcome
+        )
+
+
+def register_config(name: str, filename: str, replace: bool = False):
+    """
+    Register a server with MCPJungle from its config file.
+
+    Args:
+        name: Server name
+        filename: Config file name in the configs directory
+        replace: Deregister the server first, so a changed config (or a
+            restarted container) takes effect
+
+    Returns:
+        str: Error message, or None on success
+    """
+    if replace:
+        exec_emcp(["deregister", name])
+        # A failed deregister surfaces as a register conflict below
+    result = exec_emcp(["register", "-c", f"{GATEWAY_CONFIGS_DIR}/{filename}"])
+    if result.returncode != 0:
+        return result.stderr.strip() or result.stdout.strip() or "Unknown error"
+    return None
+
+
+def list_servers(api_url: str = MCPJUNGLE_API, timeout: float = 10) -> list[dict]:
+    """
+    Get the servers registered with MCPJungle.
+
+    Returns:
+        list[dict]: Server definitions as reported by GET /api/v0/servers
+
+    Raises:
+        requests.RequestException: If the gateway is unreachable or errors
+    """
+    with track(MCPJUNGLE_REQUEST_SECONDS, endpoint="/api/v0/servers"):
+        response = requests.get(f"{api_url}/api/v0/servers", timeout=timeout)
+        response.raise_for_status()
+    return response.json() or []
+
+
+def list_tools(api_url: str = MCPJUNGLE_API, timeout: float = 10) -> list[dict]:
+    """
+    Get the tools MCPJungle serves, bypassing the manager's catalog cache.
+
+    Returns:
+        list[dict]: Tools as reported by GET /api/v0/tools
+
+    Raises:
+        requests.RequestException: If the gateway is unreachable or errors
+    """
+    with track(MCPJUNGLE_REQUEST_SECONDS, endpoint="/api/v0/tools"):
+        response = requests.get(f"{api_url}/api/v0/tools", timeout=timeout)
+        response.raise_for_status()
+    return response.json() or []
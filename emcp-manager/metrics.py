@@ -0,0 +1,340 @@
+"""
+Prometheus Metrics
+
+Minimal, dependency-free metrics registry rendering the Prometheus text
+exposition format (served at /metrics).
+
+Metrics used across the manager are defined here so every module records
+into the same registry:
+
+    from metrics import DOCKER_COMMAND_SECONDS, track
+
+    with track(DOCKER_COMMAND_SECONDS, subcommand="inspect"):
+        ...
+
+track() adds an "outcome" label ("ok" or "error") based on whether the
+block raised.
+"""
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets in seconds; long tail covers image pulls and provisioning
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple, values: tuple, extra: dict = None) -> str:
+    pairs = list(zip(names, values)) + list((extra or {}).items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """Base class: a named family of labelled children."""
+
+    type = None
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, **labels):
+        """Get the child for a label set (created on first use)."""
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            child = self._children.get(key)
+            if child is None:
+                child = self._children[key] = self._new_child()
+            return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type}",
+        ]
+        with self._lock:
+            children = sorted(self._children.items())
+        for key, child in children:
+            lines.extend(self._render_child(key, child))
+        return lines
+
+
+class _Value:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        self.inc(-amount)
+
+    def set(self, value: float) -> None:
+        with self._lock:
+            self.value = value
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    type = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        self.labels(**labels).inc(amount)
+
+    def _render_child(self, key, child):
+        return [f"{self.name}_total{_format_labels(self.labelnames, key)} {_format_value(child.value)}"]
+
+
+class Gauge(_Metric):
+    """Value that can go up and down."""
+
+    type = "gauge"
+
+    def _new_child(self):
+        return _Value()
+
+    def _render_child(self, key, child):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}"]
+
+
+class _HistogramValue:
+    __slots__ = ("bounds", "counts", "sum", "_lock")
+
+    def __init__(self, bounds: tuple):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = len(self.bounds)
+        for i, bound in enumerate(self.bounds):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets."""
+
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (),
+                 buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float, **labels) -> None:
+        self.labels(**labels).observe(value)
+
+    def _render_child(self, key, child):
+        with child._lock:
+            counts = list(child.counts)
+            total_sum = child.sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (math.inf,), counts):
+            cumulative += count
+            le = {"le": _format_value(bound)}
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total_sum)}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Collection of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric already registered: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text format (version 0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@contextmanager
+def track(histogram: Histogram, **labels):
+    """Time a block into a histogram with an "outcome" label of ok/error."""
+    started = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        histogram.observe(time.perf_counter() - started, outcome=outcome, **labels)
+
+
+# =============================================================================
+# Manager metrics
+# =============================================================================
+
+HTTP_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "emcp_http_request_duration_seconds",
+    "Manager HTTP request latency by route.",
+    ("method", "route", "status"),
+))
+
+HTTP_REQUESTS_IN_FLIGHT = REGISTRY.register(Gauge(
+    "emcp_http_requests_in_flight",
+    "Manager HTTP requests currently being served.",
+))
+
+EXEC_EMCP_SECONDS = REGISTRY.register(Histogram(
+    "emcp_exec_emcp_duration_seconds",
+    "Duration of mcpjungle CLI invocations (docker exec) by subcommand.",
+    ("subcommand", "outcome"),
+))
+
+DOCKER_COMMAND_SECONDS = REGISTRY.register(Histogram(
+    "emcp_docker_command_duration_seconds",
+    "Duration of docker CLI invocations by subcommand.",
+    ("subcommand", "outcome"),
+))
+
+DOCKER_API_SECONDS = REGISTRY.register(Histogram(
+    "emcp_docker_api_request_duration_seconds",
+    "Duration of Docker Engine API requests by endpoint.",
+    ("method", "endpoint", "outcome"),
+))
+
+MCPJUNGLE_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "emcp_mcpjungle_request_duration_seconds",
+    "Duration of MCPJungle HTTP API requests.",
+    ("endpoint", "outcome"),
+))
+
+DETECTOR_FETCH_SECONDS = REGISTRY.register(Histogram(
+    "emcp_detector_fetch_duration_seconds",
+    "Duration of server detection metadata fetches by source.",
+    ("source", "outcome"),
+))
+
+CATALOG_LOOKUPS = REGISTRY.register(Counter(
+    "emcp_catalog_lookups",
+    "Tool catalog reads by result (hit, miss, refresh).",
+    ("result",),
+))
+
+PROVISION_STEP_SECONDS = REGISTRY.register(Histogram(
+    "emcp_provision_step_duration_seconds",
+    "Duration of server provisioning steps.",
+    ("step", "outcome"),
+))
+
+PROVISION_ROLLBACKS = REGISTRY.register(Counter(
+    "emcp_provision_rollbacks",
+    "Provisioning rollbacks by the step that failed.",
+    ("step",),
+))
+
+HEALTH_PROBE_SECONDS = REGISTRY.register(Histogram(
+    "emcp_health_probe_duration_seconds",
+    "Duration of background MCP health probes.",
+    ("outcome",),
+))
+
+HEALTH_RESTARTS = REGISTRY.register(Counter(
+    "emcp_health_restarts",
+    "Automatic restarts of unhealthy server containers.",
+    ("outcome",),
+))
+
+SERVERS_BY_HEALTH = REGISTRY.register(Gauge(
+    "emcp_servers",
+    "Monitored MCP servers by health state.",
+    ("health",),
+))
+
+IDLE_TRANSITIONS = REGISTRY.register(Counter(
+    "emcp_idle_transitions",
+    "Idle scale-to-zero stops and wakes of server containers.",
+    ("action", "trigger", "outcome"),
+))
+
+WAKE_SECONDS = REGISTRY.register(Histogram(
+    "emcp_wake_duration_seconds",
+    "Time from starting a sleeping server to a passing readiness probe.",
+    ("outcome",),
+))
+
+RESTART_SECONDS = REGISTRY.register(Histogram(
+    "emcp_restart_duration_seconds",
+    "Time from restarting a server container to a passing readiness probe.",
+    ("outcome",),
+))
+
+SERVERS_ASLEEP = REGISTRY.register(Gauge(
+    "emcp_servers_asleep",
+    "Server containers stopped by the idle policy.",
+))
+
+GC_RECLAIMABLE_BYTES = REGISTRY.register(Gauge(
+    "emcp_gc_reclaimable_bytes",
+    "Bytes held by unreferenced images and volumes of dynamic servers.",
+    ("kind",),
+))
+
+GC_RECLAIMED_BYTES = REGISTRY.register(Counter(
+    "emcp_gc_reclaimed_bytes",
+    "Bytes freed by removing unreferenced images and volumes.",
+    ("kind",),
+))
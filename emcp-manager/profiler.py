@@ -0,0 +1,294 @@
+"""
+Per-Request Profiler
+
+Opt-in profiling of individual manager requests, for finding out why a
+specific endpoint is slow without redeploying.
+
+Profiling is off by default and costs one attribute check per request.
+Once enabled (EMCP_PROFILING=1 or the admin toggle), a request is profiled
+when it carries the X-EMCP-Profile header, or is picked by the configured
+sample rate. A per-minute budget caps how many requests are profiled.
+
+Two modes:
+- cprofile: deterministic profile of the request (downloadable as pstats);
+  one at a time, since the interpreter allows a single active profiler
+- sample: periodic stack samples of the request thread (downloadable as
+  folded stacks for flamegraph.pl / speedscope)
+
+The last N profiles are kept in memory.
+"""
+
+import cProfile
+import io
+import itertools
+import marshal
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+# Configuration
+PROFILING_ENABLED = os.getenv("EMCP_PROFILING", "0") == "1"
+PROFILE_KEEP = int(os.getenv("EMCP_PROFILE_KEEP", "20"))
+PROFILE_MAX_PER_MINUTE = int(os.getenv("EMCP_PROFILE_MAX_PER_MINUTE", "10"))
+SAMPLE_INTERVAL = float(os.getenv("EMCP_PROFILE_SAMPLE_INTERVAL", "0.005"))
+
+PROFILE_HEADER = "X-EMCP-Profile"
+PROFILE_MODES = ("cprofile", "sample")
+PROFILE_FORMATS = {
+    "cprofile": ("pstats", "text"),
+    "sample": ("folded", "text"),
+}
+
+
+class ProfilerError(Exception):
+    """Exception raised for invalid profiler settings or requests."""
+    pass
+
+
+class _LoadedStats:
+    """Adapter letting pstats.Stats load a stored stats dict."""
+
+    def __init__(self, stats: dict):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+class _StackSampler:
+    """Samples one thread's Python stack on a timer."""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+
+
+class _ActiveProfile:
+    """A profile being recorded for one request."""
+
+    def __init__(self, mode: str, release=None):
+        self.mode = mode
+        self.started = time.perf_counter()
+        self.started_at = time.time()
+        self._release = release
+        if mode == "cprofile":
+            self._profiler = cProfile.Profile()
+            try:
+                self._profiler.enable()
+            except ValueError:
+                # Another profiling tool (e.g. a debugger) is active
+                release()
+                raise ProfilerError("cProfile is unavailable")
+        else:
+            self._sampler = _StackSampler(threading.get_ident(), SAMPLE_INTERVAL)
+            self._sampler.start()
+
+    def finish(self):
+        """Stop recording; returns the raw profile data."""
+        try:
+            if self.mode == "cprofile":
+                self._profiler.disable()
+                self._profiler.create_stats()
+                return marshal.dumps(self._profiler.stats)
+            return dict(self._sampler.stop())
+        finally:
+            if self._release:
+                self._release()
+
+
+class RequestProfiler:
+    """Profiling state, rate limit and the ring of recent profiles."""
+
+    def __init__(self, enabled: bool = PROFILING_ENABLED, keep: int = PROFILE_KEEP,
+                 max_per_minute: int = PROFILE_MAX_PER_MINUTE):
+        self.enabled = enabled
+        self.sample_rate = 0.0
+        self.mode = "cprofile"
+        self.route_prefix = None
+        self.max_per_minute = max_per_minute
+        self._profiles = deque(maxlen=keep)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._cprofile_lock = threading.Lock()
+        self._window_start = 0.0
+        self._window_count = 0
+
+    def configure(self, enabled=None, sample_rate=None, mode=None, route_prefix=None,
+                  max_per_minute=None, keep=None) -> dict:
+        """Update settings (admin toggle); returns the new settings."""
+        if mode is not None and mode not in PROFILE_MODES:
+            raise ProfilerError(f"mode must be one of {', '.join(PROFILE_MODES)}")
+        if sample_rate is not None and not 0 <= float(sample_rate) <= 1:
+            raise ProfilerError("sample_rate must be between 0 and 1")
+
+        with self._lock:
+            if enabled is not None:
+                self.enabled = bool(enabled)
+            if sample_rate is not None:
+                self.sample_rate = float(sample_rate)
+            if mode is not None:
+                self.mode = mode
+            if route_prefix is not None:
+                self.route_prefix = route_prefix or None
+            if max_per_minute is not None:
+                self.max_per_minute = max(0, int(max_per_minute))
+            if keep is not None:
+                self._profiles = deque(self._profiles, maxlen=max(1, int(keep)))
+        return self.settings()
+
+    def settings(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "mode": self.mode,
+            "route_prefix": self.route_prefix,
+            "max_per_minute": self.max_per_minute,
+            "keep": self._profiles.maxlen,
+            "header": PROFILE_HEADER,
+        }
+
+    def start(self, path: str, header: str = None):
+        """
+        Decide whether to profile a request and start recording if so.
+
+        Args:
+            path: Request path
+            header: Value of the X-EMCP-Profile header, if any
+
+        Returns:
+            _ActiveProfile or None
+        """
+        if not self.enabled:
+            return None
+
+        if header:
+            mode = header if header in PROFILE_MODES else self.mode
+        elif self.sample_rate and random.random() < self.sample_rate:
+            if self.route_prefix and not path.startswith(self.route_prefix):
+                return None
+            mode = self.mode
+        else:
+            return None
+
+        if not self._take_budget():
+            return None
+
+        if mode == "cprofile":
+            # Only one deterministic profiler can be active; sample instead
+            if self._cprofile_lock.acquire(blocking=False):
+                try:
+                    return _ActiveProfile(mode, release=self._cprofile_lock.release)
+                except ProfilerError:
+                    pass
+            mode = "sample"
+        return _ActiveProfile(mode)
+
+    def finish(self, active: _ActiveProfile, method: str, path: str, route: str,
+               status: int) -> int:
+        """Stop a profile and store it; returns its id."""
+        data = active.finish()
+        entry = {
+            "id": next(self._ids),
+            "mode": active.mode,
+            "method": method,
+            "path": path,
+            "route": route,
+            "status": status,
+            "started_at": active.started_at,
+            "duration_ms": round((time.perf_counter() - active.started) * 1000, 2),
+            "data": data,
+        }
+        with self._lock:
+            self._profiles.append(entry)
+        return entry["id"]
+
+    def profiles(self) -> list[dict]:
+        """Metadata of stored profiles, newest first."""
+        with self._lock:
+            profiles = list(self._profiles)
+        return [
+            {k: v for k, v in p.items() if k != "data"} | {"formats": list(PROFILE_FORMATS[p["mode"]])}
+            for p in reversed(profiles)
+        ]
+
+    def export(self, profile_id: int, fmt: str = None) -> tuple[bytes, str, str]:
+        """
+        Render a stored profile.
+
+        Returns:
+            tuple: (body, content type, download filename)
+
+        Raises:
+            KeyError: If the profile is no longer in the ring
+            ProfilerError: If the format does not apply to the profile's mode
+        """
+        with self._lock:
+            entry = next((p for p in self._profiles if p["id"] == profile_id), None)
+        if entry is None:
+            raise KeyError(profile_id)
+
+        formats = PROFILE_FORMATS[entry["mode"]]
+        fmt = fmt or formats[0]
+        if fmt not in formats:
+            raise ProfilerError(f"{entry['mode']} profiles support: {', '.join(formats)}")
+
+        name = f"profile-{profile_id}"
+        if fmt == "pstats":
+            return entry["data"], "application/octet-stream", f"{name}.pstats"
+        if fmt == "folded":
+            body = "".join(f"{stack} {count}\n" for stack, count in sorted(entry["data"].items()))
+            return body.encode(), "text/plain; charset=utf-8", f"{name}.folded"
+
+        header = (f"{entry['method']} {entry['path']} -> {entry['status']} "
+                  f"in {entry['duration_ms']} ms ({entry['mode']})\n\n")
+        if entry["mode"] == "cprofile":
+            out = io.StringIO()
+            stats = pstats.Stats(_LoadedStats(marshal.loads(entry["data"])), stream=out)
+            stats.sort_stats("cumulative").print_stats(60)
+            text = out.getvalue()
+        else:
+            total = sum(entry["data"].values()) or 1
+            top = sorted(entry["data"].items(), key=lambda kv: -kv[1])[:40]
+            text = "".join(
+                f"{count:6d} {count / total:6.1%}  {stack.rsplit(';', 1)[-1]}\n    {stack}\n"
+                for stack, count in top
+            )
+        return (header + text).encode(), "text/plain; charset=utf-8", f"{name}.txt"
+
+    def _take_budget(self) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            if now - self._window_start >= 60:
+                self._window_start = now
+                self._window_count = 0
+            if self._window_count >= self.max_per_minute:
+                return False
+            self._window_count += 1
+            return True
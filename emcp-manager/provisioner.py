@@ -0,0 +1,513 @@
+"""
+Server Provisioning
+
+The provisioning pipeline shared by POST /api/servers/provision and the
+desired-state apply:
+
+1. Place the server on a Docker host and pull the image there (and
+   optionally bake the npm package into it)
+2. Store secrets with the secret provider (Infisical or per-server file)
+3. Add the service to docker-compose.yaml (for persistence)
+4. Create the MCPJungle config file
+5. Resolve secrets and start the container via the Engine API
+6. Wait for MCP server readiness (not just container running)
+7. Register with MCPJungle
+
+A failure at steps 4-7 rolls back the steps before it.
+
+Each run has an overall deadline (EMCP_PROVISION_DEADLINE, or the
+request's timeout) that every step's blocking calls are bounded by, and
+can be cancelled while it runs (cancel_provision). Either way the step in
+progress is stopped at once (its docker process killed, its API stream
+closed), the completed steps are rolled back, and the error names the
+step: 504 for a deadline, 409 for a cancel.
+
+A server that already exists is refused before any step runs. Concurrent
+requests for the same server with the same spec share one run: the later
+ones wait for it and get its result (or error). A different spec for a
+server being provisioned is refused with 409.
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+from compose_manager import (
+    add_service, remove_service,
+    create_mcp_config, delete_mcp_config,
+    ComposeError, pull_image, start_service, stop_service,
+    wait_for_mcp_ready, bake_image, uses_package_runner, normalize_limits,
+    host_reservations, list_containers, server_host, server_exists, image_exists
+)
+from deadline import Deadline, DeadlineExceeded
+from docker_hosts import (
+    BRIDGE_PORT, DockerHostError, bridge_command, claim_port, endpoint_url,
+    get_host, place, release
+)
+import image_gc
+from mcpjungle_client import exec_emcp
+from metrics import PROVISION_STEP_SECONDS, PROVISION_ROLLBACKS, track
+from secret_resolver import (
+    store_secrets, resolve_secrets, forget_secrets, get_provider, SecretError
+)
+
+# Configuration
+# Overall seconds a provisioning run may take, from pull to registration
+PROVISION_DEADLINE = float(os.getenv("EMCP_PROVISION_DEADLINE", "900"))
+
+# Paths in a command that are not mounted into the container
+_SKIP_PATHS = {'/dev/null', '/dev/stdin', '/dev/stdout', '/dev/stderr'}
+
+# Provisions in progress: {server name: _ProvisionJob}
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+class ProvisionError(Exception):
+    """
+    Raised when a server cannot be provisioned (after rolling back).
+
+    retryable is set when the request never reached an outcome of its own
+    (it was cancelled, or clashed with another run of the same server), so
+    repeating it later may succeed.
+    """
+
+    def __init__(self, message, status=500, step=None, retryable=False):
+        super().__init__(message)
+        self.status = status
+        self.step = step
+        self.retryable = retryable
+
+
+class _ProvisionJob:
+    """One provisioning run, shared by identical concurrent requests."""
+
+    __slots__ = ("fingerprint", "deadline", "done", "result", "error")
+
+    def __init__(self, fingerprint: str, deadline: Deadline):
+        self.fingerprint = fingerprint
+        self.deadline = deadline
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def request_fingerprint(spec: dict) -> str:
+    """Stable hash of a provisioning spec; only the hash of secret values is kept."""
+    canonical = json.dumps(spec, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _step_error(step: str, message: str, deadline: Deadline = None, status: int = 500) -> ProvisionError:
+    """ProvisionError for a failed step, or for the deadline or cancel that stopped it."""
+    if deadline is not None and deadline.done:
+        if deadline.cancelled:
+            return ProvisionError(f"Provisioning cancelled during {step}: {deadline.reason}",
+                                  status=409, step=step, retryable=True)
+        return ProvisionError(f"Provisioning deadline of {deadline.seconds:g}s exceeded during {step}",
+                              status=504, step=step)
+    return ProvisionError(message, status=status, step=step)
+
+
+def server_name(name: str) -> str:
+    """
+    Sanitize a server name.
+
+    Raises:
+        ProvisionError: If nothing valid remains or the name is too long
+    """
+    safe_name = "".join(c for c in (name or "").lower() if c.isalnum() or c == '-').strip('-')
+    if not safe_name or len(safe_name) > 50:
+        raise ProvisionError("Invalid server name", status=400)
+    return safe_name
+
+
+def host_volumes(command: list[str]) -> list[str]:
+    """Bind mounts for host paths named in a command."""
+    return [
+        f"{arg}:{arg}:rw" for arg in command
+        if arg.startswith('/') and not arg.startswith('//') and arg not in _SKIP_PATHS
+    ]
+
+
+def place_server(name: str, limits: dict = None, host: str = None) -> dict:
+    """
+    Choose the Docker host for a new server (see docker_hosts.place).
+
+    The placement is held until docker_hosts.release(name).
+
+    Args:
+        name: Sanitized server name
+        limits: Normalized resource limits, or None
+        host: Host requested by the user, if any
+
+    Returns:
+        dict: Capacity entry of the chosen host ({"host", "memory_free", ...})
+
+    Raises:
+        ProvisionError: 400 for an unknown host, 503 if no host has room
+    """
+    try:
+        with track(PROVISION_STEP_SECONDS, step="placement"):
+            return place(name, (limits or {}).get("memory"), host_reservations(), requested=host)
+    except DockerHostError as e:
+        raise ProvisionError(str(e), status=e.status, step="placement")
+    except ComposeError as e:
+        raise ProvisionError(str(e), step="placement")
+
+
+def prepare_image(name: str, image: str, command: list[str], bake: bool = False,
+                  host: str = None, deadline: Deadline = None) -> dict:
+    """
+    Pull a server's image on its Docker host and optionally bake its
+    package into it.
+
+    Concurrent callers pulling the same image share one in-flight pull;
+    live layer progress is available from get_pull_progress().
+
+    Returns:
+        dict: {"image": image to run, "pull": pull summary, "warnings": [...]}
+
+    Raises:
+        ProvisionError: If the pull fails, or the deadline passes or is
+            cancelled during the pull or bake
+    """
+    try:
+        with track(PROVISION_STEP_SECONDS, step="pull"):
+            present = image_exists(image, host)
+            pull = pull_image(image, host=host, deadline=deadline)
+    except (ComposeError, DeadlineExceeded) as e:
+        raise _step_error("pull", str(e), deadline)
+    # Recorded even if provisioning fails later, so the image can be
+    # collected; an image that was already on the host is not eMCP's to remove
+    if not present:
+        image_gc.track(host, "image", image, name)
+
+    # Optional: pre-install the npm package so container start and every
+    # exec session run locally. Falls back to the base image on failure.
+    warnings = []
+    run_image = image
+    if bake and uses_package_runner(command):
+        try:
+            with track(PROVISION_STEP_SECONDS, step="bake"):
+                run_image = bake_image(name, image, command, host=host, deadline=deadline)
+            image_gc.track(host, "image", run_image, name)
+        except DeadlineExceeded as e:
+            raise _step_error("bake", str(e), deadline)
+        except ComposeError as e:
+            warnings.append(f"Bake skipped, using base image: {e}")
+
+    return {"image": run_image, "pull": pull, "warnings": warnings}
+
+
+def install_server(name: str, image: str, command: list[str], env_vars: dict = None,
+                   description: str = "", source_image: str = None, limits: dict = None,
+                   host: str = None, deadline: Deadline = None) -> dict:
+    """
+    Install a server from a pulled image: secrets, compose entry, config,
+    container, readiness and registration.
+
+    On a host other than the local one, the command runs behind the
+    Streamable HTTP bridge on a published port, and the MCPJungle config
+    points at that endpoint.
+
+    Args:
+        name: Sanitized server name
+        image: Image to run (as returned by prepare_image)
+        command: Command + args
+        env_vars: Secrets {KEY: value}
+        description: Optional description
+        source_image: Image named by the user, if image was baked from it
+        limits: Resource limits {"memory": bytes, "cpus": float}, or None
+        host: Docker host to run on (default: local)
+        deadline: Optional Deadline bounding the remaining steps
+
+    Returns:
+        dict: {"container_name", "env_var_names", "mcp_ready", "host", "url"}
+
+    Raises:
+        ProvisionError: If a step fails, or the deadline passes or is
+            cancelled; completed steps are rolled back
+    """
+    container_name = f"{name}-mcp"
+    volumes = host_volumes(command)
+
+    # --- Endpoint on a remote host ---
+    run_command, url, port = command, None, None
+    try:
+        docker_host = get_host(host)
+        if not docker_host.local:
+            used = {p["host_port"] for c in list_containers(docker_host.name).values() for p in c["ports"]}
+            port = claim_port(name, docker_host, used)
+            run_command = bridge_command(command)
+            url = endpoint_url(docker_host, port)
+    except DockerHostError as e:
+        raise ProvisionError(str(e), status=e.status, step="placement")
+    except ComposeError as e:
+        raise ProvisionError(str(e), step="placement")
+
+    # --- Store secrets ---
+    env_var_names = []
+    if env_vars:
+        try:
+            with track(PROVISION_STEP_SECONDS, step="secrets"):
+                env_var_names = store_secrets(name, env_vars)
+        except SecretError as e:
+            raise ProvisionError(str(e), step="secrets")
+
+    # --- Add service to docker-compose.yaml ---
+    env_file = get_provider().compose_env_file(name) if env_var_names else None
+    try:
+        if deadline is not None:
+            deadline.check()
+        with track(PROVISION_STEP_SECONDS, step="compose"):
+            add_service(
+                name=name,
+                image=image,
+                command=run_command if run_command else [],
+                env_vars=[] if env_file else env_var_names,
+                description=description,
+                volumes=volumes if volumes else None,
+                env_file=env_file,
+                source_image=source_image if source_image != image else None,
+                limits=limits,
+                host=docker_host.name,
+                ports=[f"{port}:{BRIDGE_PORT}"] if port else None,
+                source_command=command if run_command != command else None,
+                # Secrets kept off disk: compose must get them from `infisical run`
+                require_env=bool(env_var_names) and not env_file
+            )
+    except (ComposeError, DeadlineExceeded) as e:
+        raise _step_error("compose", f"Failed to add service: {str(e)}", deadline)
+
+    # --- Create MCP config file ---
+    try:
+        if deadline is not None:
+            deadline.check()
+        with track(PROVISION_STEP_SECONDS, step="config"):
+            create_mcp_config(
+                name=name,
+                container_name=container_name,
+                command=command if command else ["stdio"],
+                description=description,
+                url=url
+            )
+    except (ComposeError, DeadlineExceeded) as e:
+        PROVISION_ROLLBACKS.inc(step="config")
+        remove_service(name)
+        raise _step_error("config", f"Failed to create config: {str(e)}", deadline)
+
+    # --- Resolve secrets and start the container directly ---
+    try:
+        with track(PROVISION_STEP_SECONDS, step="start"):
+            start_service(
+                service_name=container_name,
+                image=image,
+                command=run_command if run_command else [],
+                env_vars=resolve_secrets(name, env_var_names) if env_var_names else None,
+                volumes=volumes if volumes else None,
+                timeout=60,
+                limits=limits,
+                host=docker_host.name,
+                port=port,
+                deadline=deadline
+            )
+    except (ComposeError, SecretError, DeadlineExceeded) as e:
+        PROVISION_ROLLBACKS.inc(step="start")
+        # The container may have been created before the step failed
+        stop_service(container_name, host=docker_host.name)
+        delete_mcp_config(name)
+        remove_service(name)
+        raise _step_error("start", f"Container failed to start: {str(e)}", deadline)
+
+    # --- Wait for MCP server readiness ---
+    # Not fatal: the container is running and the server might still come up.
+    # Running out of the overall deadline is, though.
+    try:
+        with track(PROVISION_STEP_SECONDS, step="ready"):
+            mcp_ready, _ = wait_for_mcp_ready(
+                container_name=container_name,
+                command=command if command else [],
+                timeout=90,
+                host=docker_host.name,
+                url=url,
+                deadline=deadline
+            )
+    except DeadlineExceeded as e:
+        PROVISION_ROLLBACKS.inc(step="ready")
+        stop_service(container_name, host=docker_host.name)
+        delete_mcp_config(name)
+        remove_service(name)
+        raise _step_error("ready", str(e), deadline)
+
+    # --- Register with MCPJungle ---
+    try:
+        with track(PROVISION_STEP_SECONDS, step="register"):
+            register_result = exec_emcp(["register", "-c", f"/configs/{name}.json"], deadline=deadline)
+        error_msg = register_result.stderr.strip() or register_result.stdout.strip()
+    except DeadlineExceeded as e:
+        register_result, error_msg = None, str(e)
+        # A register killed halfway may still have gone through
+        exec_emcp(["deregister", name])
+    if register_result is None or register_result.returncode != 0:
+        # Rollback everything
+        PROVISION_ROLLBACKS.inc(step="register")
+        stop_service(container_name, host=docker_host.name)
+        delete_mcp_config(name)
+        remove_service(name)
+        raise _step_error("register", f"Failed to register with MCPJungle: {error_msg}", deadline)
+
+    return {"container_name": container_name, "env_var_names": env_var_names, "mcp_ready": mcp_ready,
+            "host": docker_host.name, "url": url}
+
+
+def provision_server(name: str, image: str, command: list[str], env_vars: dict = None,
+                     description: str = "", bake: bool = False, limits: dict = None,
+                     host: str = None, timeout: float = None) -> dict:
+    """
+    Run the full provisioning pipeline for one server.
+
+    Args:
+        limits: Resource limits {"memory": size, "cpus": number}, or None
+        host: Docker host to run on; by default the host with the most
+            free capacity is chosen
+        timeout: Overall deadline in seconds (default:
+            EMCP_PROVISION_DEADLINE); a request joining an identical run
+            shares that run's deadline
+
+    Returns:
+        dict: {"name", "container_name", "image", "pull", "env_var_names",
+        "mcp_ready", "warnings", "limits", "host", "url", "placement",
+        "deduplicated"}; deduplicated is True for a request that joined an
+        identical one already running
+
+    Raises:
+        ProvisionError: With an HTTP-style status (400 for invalid input,
+            409 if the server exists, is being provisioned differently or
+            the run was cancelled, 504 if the deadline passed)
+    """
+    if not (name or "").strip():
+        raise ProvisionError("Server name is required", status=400)
+    if not (image or "").strip():
+        raise ProvisionError("Docker image is required", status=400)
+    safe_name = server_name(name.strip())
+    image = image.strip()
+    try:
+        limits = normalize_limits(limits)
+    except ComposeError as e:
+        raise ProvisionError(str(e), status=400)
+    if timeout is not None and not (isinstance(timeout, (int, float)) and not isinstance(timeout, bool)
+                                    and timeout > 0):
+        raise ProvisionError("timeout must be a positive number of seconds", status=400)
+
+    fingerprint = request_fingerprint({
+        "image": image, "command": command, "env_vars": env_vars or {}, "description": description,
+        "bake": bool(bake), "limits": limits, "host": host,
+    })
+    with _inflight_lock:
+        job = _inflight.get(safe_name)
+        owner = job is None
+        if owner:
+            job = _inflight[safe_name] = _ProvisionJob(fingerprint, Deadline(timeout or PROVISION_DEADLINE))
+        elif job.fingerprint != fingerprint:
+            raise ProvisionError(
+                f"Server '{safe_name}' is already being provisioned with a different spec", status=409,
+                retryable=True
+            )
+
+    if not owner:
+        job.done.wait()
+        if job.error is not None:
+            raise job.error
+        return {**job.result, "deduplicated": True}
+
+    try:
+        job.result = _provision(safe_name, image, command, env_vars, description, bake, limits, host,
+                                job.deadline)
+        return job.result
+    except ProvisionError as e:
+        job.error = e
+        raise
+    except Exception as e:
+        job.error = ProvisionError(str(e))
+        raise
+    finally:
+        with _inflight_lock:
+            del _inflight[safe_name]
+        job.done.set()
+
+
+def cancel_provision(name: str, reason: str = "Cancelled by request") -> bool:
+    """
+    Cancel a provisioning run in progress.
+
+    The run stops its current step and rolls back; it (and every request
+    waiting on it) then fails with a 409 ProvisionError.
+
+    Returns:
+        bool: False if no provisioning of the server is in progress
+    """
+    with _inflight_lock:
+        job = _inflight.get(name)
+    if job is None:
+        return False
+    job.deadline.cancel(reason)
+    return True
+
+
+def _provision(safe_name: str, image: str, command: list[str], env_vars: dict, description: str,
+               bake: bool, limits: dict, host: str, deadline: Deadline) -> dict:
+    try:
+        exists = server_exists(safe_name)
+    except ComposeError as e:
+        raise ProvisionError(str(e))
+    if exists:
+        raise ProvisionError(f"Server '{safe_name}' already exists", status=409)
+
+    placement = place_server(safe_name, limits, host)
+    try:
+        prepared = prepare_image(safe_name, image, command, bake=bake, host=placement["host"],
+                                 deadline=deadline)
+        installed = install_server(safe_name, prepared["image"], command, env_vars, description,
+                                   source_image=image, limits=limits, host=placement["host"],
+                                   deadline=deadline)
+    finally:
+        release(safe_name)
+    return {
+        "name": safe_name,
+        "image": prepared["image"],
+        "pull": prepared["pull"],
+        "warnings": prepared["warnings"],
+        "limits": limits,
+        "placement": placement,
+        "deduplicated": False,
+        **installed,
+    }
+
+
+def deprovision_server(name: str) -> bool:
+    """
+    Deregister a server, remove its container, config, compose entry and
+    stored secrets.
+
+    Returns:
+        bool: False if the server had no compose entry
+    """
+    # Deregister from MCPJungle first
+    exec_emcp(["deregister", name])
+    # Ignore errors - server might not be registered
+
+    # Stop and remove the container directly, on the host it runs on
+    stop_service(f"{name}-mcp", host=server_host(name))
+
+    # Delete config file
+    delete_mcp_config(name)
+
+    # Remove from docker-compose.yaml
+    removed = remove_service(name)
+
+    # Drop the server's stored and cached secrets
+    forget_secrets(name)
+
+    return removed
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Registration Reconciler
+
+Brings the servers registered with MCPJungle in line with the configs
+directory, touching only what differs:
+
+- configs with no registered server are registered
+- configs whose content differs from what MCPJungle reports are
+  re-registered (deregister + register)
+- registered servers with no config are deregistered (unless prune is off)
+- everything else is left alone, so unchanged servers never go offline
+
+Registrations run in parallel, at most EMCP_RECONCILE_CONCURRENCY at a time.
+--force re-registers every server, for when the gateway still lists a
+server but no longer serves its tools (e.g. after its container restarted).
+
+    python reconciler.py [--dry-run] [--force] [--no-prune] [--concurrency N]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from compose_manager import CONFIGS_DIR
+from mcpjungle_client import exec_emcp, list_servers, register_config, MCPJUNGLE_API
+
+# Configuration
+RECONCILE_CONCURRENCY = int(os.getenv("EMCP_RECONCILE_CONCURRENCY", "8"))
+
+# Server definition fields compared between a config and the gateway
+HASHED_FIELDS = ("transport", "description", "url", "command", "args", "env", "bearer_token")
+
+
+class ReconcileError(Exception):
+    """Raised when the registered servers cannot be read."""
+    pass
+
+
+def config_hash(config: dict, fields=HASHED_FIELDS) -> str:
+    """
+    Content hash of a server definition.
+
+    Empty values are dropped so a field omitted in the config and reported
+    empty by the gateway compare equal.
+    """
+    normalized = {
+        field: config[field] for field in fields
+        if config.get(field) not in (None, "", [], {})
+    }
+    normalized.setdefault("transport", "stdio")
+    payload = json.dumps(normalized, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def load_configs(configs_dir: str = CONFIGS_DIR) -> dict:
+    """
+    Read every server config.
+
+    Returns:
+        dict: {name: {"file": filename, "config": dict}}
+    """
+    configs = {}
+    if not os.path.exists(configs_dir):
+        return configs
+    for filename in sorted(os.listdir(configs_dir)):
+        if not filename.endswith('.json'):
+            continue
+        with open(os.path.join(configs_dir, filename)) as f:
+            config = json.load(f)
+        configs[config.get("name", filename[:-5])] = {"file": filename, "config": config}
+    return configs
+
+
+def plan(configs: dict, registered: list[dict], prune: bool = True, force: bool = False) -> dict:
+    """
+    Decide what to register, re-register and deregister.
+
+    Only fields the gateway reports for at least one server are compared,
+    so a gateway that never returns e.g. env does not force every server to
+    be re-registered.
+
+    Returns:
+        dict: {"register": [...], "reregister": [...], "deregister": [...], "unchanged": [...]}
+    """
+    remote = {server.get("name"): server for server in registered if server.get("name")}
+    actions = {"register": [], "reregister": [], "deregister": [], "unchanged": []}
+    fields = [field for field in HASHED_FIELDS
+              if any(field in server for server in remote.values())] or HASHED_FIELDS
+
+    for name, entry in configs.items():
+        server = remote.get(name)
+        if server is None:
+            actions["register"].append(name)
+            continue
+        if not force and config_hash(entry["config"], fields) == config_hash(server, fields):
+            actions["unchanged"].append(name)
+        else:
+            actions["reregister"].append(name)
+
+    if prune:
+        actions["deregister"] = sorted(name for name in remote if name not in configs)
+    return actions
+
+
+def _deregister(name: str):
+    result = exec_emcp(["deregister", name])
+    if result.returncode != 0:
+        return result.stderr.strip() or result.stdout.strip() or "Unknown error"
+    return None
+
+
+def reconcile(configs_dir: str = CONFIGS_DIR, prune: bool = True, dry_run: bool = False,
+              force: bool = False, concurrency: int = RECONCILE_CONCURRENCY,
+              api_url: str = MCPJUNGLE_API) -> dict:
+    """
+    Reconcile MCPJungle registrations with the configs directory.
+
+    Args:
+        configs_dir: Directory of server configs
+        prune: Deregister servers that have no config
+        dry_run: Only report what would change
+        force: Re-register servers even if unchanged
+        concurrency: Maximum registrations in flight
+        api_url: MCPJungle REST API base URL
+
+    Returns:
+        dict: The plan ("register", "reregister", "deregister", "unchanged"),
+        "failed" ({name: error}), "dry_run" and "elapsed_ms"
+
+    Raises:
+        ReconcileError: If the registered servers cannot be listed
+    """
+    started = time.perf_counter()
+    configs = load_configs(configs_dir)
+    try:
+        registered = list_servers(api_url)
+    except (requests.RequestException, ValueError) as e:
+        raise ReconcileError(f"Failed to list MCPJungle servers: {e}")
+
+    actions = plan(configs, registered, prune=prune, force=force)
+    failed = {}
+
+    if not dry_run:
+        tasks = (
+            [(name, register_config, (name, configs[name]["file"], False)) for name in actions["register"]]
+            + [(name, register_config, (name, configs[name]["file"], True)) for name in actions["reregister"]]
+            + [(name, _deregister, (name,)) for name in actions["deregister"]]
+        )
+        if tasks:
+            with ThreadPoolExecutor(max_workers=max(1, concurrency),
+                                    thread_name_prefix="reconcile") as pool:
+                futures = {name: pool.submit(fn, *args) for name, fn, args in tasks}
+            for name, future in futures.items():
+                error = future.result()
+                if error:
+                    failed[name] = error
+
+    return {
+        **actions,
+        "failed": failed,
+        "dry_run": dry_run,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Reconcile MCPJungle registrations with server configs")
+    parser.add_argument("--configs-dir", default=CONFIGS_DIR)
+    parser.add_argument("--dry-run", action="store_true", help="Only show what would change")
+    parser.add_argument("--force", action="store_true",
+                        help="Re-register every server, changed or not")
+    parser.add_argument("--no-prune", action="store_true",
+                        help="Keep registered servers that have no config")
+    parser.add_argument("--concurrency", type=int, default=RECONCILE_CONCURRENCY)
+    args = parser.parse_args(argv)
+
+    try:
+        result = reconcile(args.configs_dir, prune=not args.no_prune, dry_run=args.dry_run,
+                           force=args.force, concurrency=args.concurrency)
+    except ReconcileError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    prefix = "Would " if args.dry_run else ""
+    for action in ("register", "reregister", "deregister"):
+        for name in result[action]:
+            status = f"  FAILED: {result['failed'][name]}" if name in result["failed"] else ""
+            print(f"  {prefix}{action} {name}{status}")
+    print(f"{len(result['unchanged'])} unchanged, "
+          f"{len(result['register']) + len(result['reregister']) + len(result['deregister'])} changed, "
+          f"{len(result['failed'])} failed in {result['elapsed_ms'] / 1000:.1f}s")
+    return 1 if result["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,257 @@
+"""
+Resource Usage Sampler
+
+Background thread that samples CPU, memory, network and block I/O of every
+running `*-mcp` container on every Docker host through the Engine API stats
+endpoint (one-shot, so a sample costs one short request per container) and
+keeps the last EMCP_RESOURCE_HISTORY samples per server in a ring buffer.
+
+CPU percentages and I/O rates are computed from the difference between
+consecutive samples, so a server needs two samples before they appear.
+Memory is reported like `docker stats`: usage minus inactive page cache.
+
+The percentiles feed limit recommendations for provisioning and
+POST /api/servers/{name}/limits: memory gets EMCP_LIMIT_MEMORY_HEADROOM
+times its observed peak, CPU the same factor on its 95th percentile, each
+with a floor, once a server has EMCP_LIMIT_MIN_SAMPLES samples.
+"""
+
+import math
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import docker_api
+import docker_hosts
+from compose_manager import ComposeError, list_containers
+
+# Configuration
+RESOURCE_INTERVAL = float(os.getenv("EMCP_RESOURCE_INTERVAL", "30"))
+RESOURCE_HISTORY = int(os.getenv("EMCP_RESOURCE_HISTORY", "120"))
+RESOURCE_CONCURRENCY = int(os.getenv("EMCP_RESOURCE_CONCURRENCY", "8"))
+LIMIT_MEMORY_HEADROOM = float(os.getenv("EMCP_LIMIT_MEMORY_HEADROOM", "1.5"))
+LIMIT_CPU_HEADROOM = float(os.getenv("EMCP_LIMIT_CPU_HEADROOM", "2"))
+LIMIT_MIN_SAMPLES = int(os.getenv("EMCP_LIMIT_MIN_SAMPLES", "10"))
+LIMIT_MIN_MEMORY = 64 * 1024 ** 2
+LIMIT_MIN_CPUS = 0.1
+
+CONTAINER_SUFFIX = "-mcp"
+
+# Recommended memory limits are rounded up to a multiple of this
+MEMORY_STEP = 16 * 1024 ** 2
+
+
+def _percentile(values: list, q: float):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(math.ceil(q * len(ordered))) - 1)]
+
+
+def _parse_stats(stats: dict) -> dict:
+    """Raw counters from one Engine API stats document."""
+    cpu = stats.get("cpu_stats") or {}
+    memory = stats.get("memory_stats") or {}
+    mem_stats = memory.get("stats") or {}
+    # cgroup v2 reports inactive_file, v1 total_inactive_file
+    cache = mem_stats.get("inactive_file", mem_stats.get("total_inactive_file", 0))
+    networks = (stats.get("networks") or {}).values()
+    blkio = (stats.get("blkio_stats") or {}).get("io_service_bytes_recursive") or []
+    return {
+        "cpu_total": (cpu.get("cpu_usage") or {}).get("total_usage", 0),
+        "cpu_system": cpu.get("system_cpu_usage", 0),
+        "online_cpus": cpu.get("online_cpus") or len((cpu.get("cpu_usage") or {}).get("percpu_usage") or []) or 1,
+        "memory": max(0, memory.get("usage", 0) - cache),
+        "memory_limit": memory.get("limit", 0),
+        "net_rx": sum(n.get("rx_bytes", 0) for n in networks),
+        "net_tx": sum(n.get("tx_bytes", 0) for n in networks),
+        "blk_read": sum(e.get("value", 0) for e in blkio if str(e.get("op", "")).lower() == "read"),
+        "blk_write": sum(e.get("value", 0) for e in blkio if str(e.get("op", "")).lower() == "write"),
+    }
+
+
+class _Series:
+    """Ring buffer of samples for one server."""
+
+    __slots__ = ("container", "samples", "last_raw", "last_at")
+
+    def __init__(self, container: str):
+        self.container = container
+        # (timestamp, cpu_percent or None, memory bytes, memory limit, rx/s, tx/s, read/s, write/s)
+        self.samples = deque(maxlen=RESOURCE_HISTORY)
+        self.last_raw = None
+        self.last_at = None
+
+    def add(self, at: float, raw: dict) -> None:
+        cpu = None
+        rates = (None, None, None, None)
+        previous = self.last_raw
+        if previous is not None:
+            elapsed = at - self.last_at
+            system_delta = raw["cpu_system"] - previous["cpu_system"]
+            cpu_delta = raw["cpu_total"] - previous["cpu_total"]
+            if system_delta > 0 and cpu_delta >= 0:
+                cpu = round(cpu_delta / system_delta * raw["online_cpus"] * 100, 2)
+            if elapsed > 0:
+                rates = tuple(
+                    max(0, round((raw[key] - previous[key]) / elapsed, 1))
+                    for key in ("net_rx", "net_tx", "blk_read", "blk_write")
+                )
+        self.last_raw = raw
+        self.last_at = at
+        self.samples.append((at, cpu, raw["memory"], raw["memory_limit"]) + rates)
+
+    def summary(self, history: bool = False) -> dict:
+        cpus = [s[1] for s in self.samples if s[1] is not None]
+        memory = [s[2] for s in self.samples]
+        last = self.samples[-1] if self.samples else None
+        summary = {
+            "samples": len(self.samples),
+            "last_sampled": last[0] if last else None,
+            "cpu_percent": {
+                "last": last[1] if last else None,
+                "p50": _percentile(cpus, 0.5),
+                "p95": _percentile(cpus, 0.95),
+                "max": max(cpus) if cpus else None,
+            },
+            "memory_bytes": {
+                "last": last[2] if last else None,
+                "p50": _percentile(memory, 0.5),
+                "p95": _percentile(memory, 0.95),
+                "max": max(memory) if memory else None,
+            },
+            "memory_limit": last[3] if last else None,
+            "io_bytes_per_second": dict(zip(("net_rx", "net_tx", "block_read", "block_write"),
+                                            last[4:] if last else (None,) * 4)),
+        }
+        if history:
+            summary["series"] = [
+                {"at": s[0], "cpu_percent": s[1], "memory_bytes": s[2],
+                 "net_rx": s[4], "net_tx": s[5], "block_read": s[6], "block_write": s[7]}
+                for s in self.samples
+            ]
+        return summary
+
+
+class ResourceSampler:
+    """Periodic per-container resource sampling with bounded history."""
+
+    def __init__(self, interval: float = RESOURCE_INTERVAL, concurrency: int = RESOURCE_CONCURRENCY):
+        self.interval = interval
+        self.concurrency = max(1, concurrency)
+        self._series = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._stats = {"cycles": 0, "last_cycle": None, "last_cycle_seconds": None, "last_error": None}
+
+    def start(self) -> None:
+        """Start sampling in the background."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="resource-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def status(self) -> dict:
+        return {
+            "running": bool(self._thread and self._thread.is_alive()),
+            "interval": self.interval,
+            "history": RESOURCE_HISTORY,
+            "servers": len(self._series),
+            **self._stats,
+        }
+
+    def sample_all(self) -> None:
+        """Take one sample of every running *-mcp container."""
+        started = time.monotonic()
+        if not docker_api.is_available():
+            self._stats["last_error"] = "Docker Engine API not available"
+            return
+        containers = {
+            name: container.get("host") for name, container in list_containers().items()
+            if container["state"] == "running" and name.endswith(CONTAINER_SUFFIX)
+        }
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="resource-sample") as pool:
+            list(pool.map(self._sample, containers, containers.values()))
+
+        # Forget servers not seen running for a whole history window
+        running = {name[:-len(CONTAINER_SUFFIX)] for name in containers}
+        with self._lock:
+            for name in [n for n, s in self._series.items() if n not in running and s.last_at
+                         and time.time() - s.last_at > self.interval * RESOURCE_HISTORY]:
+                del self._series[name]
+
+        self._stats["cycles"] += 1
+        self._stats["last_cycle"] = time.time()
+        self._stats["last_cycle_seconds"] = round(time.monotonic() - started, 3)
+
+    def _sample(self, container: str, host: str = None) -> None:
+        try:
+            stats = docker_api.request("GET", f"/containers/{container}/stats",
+                                       params={"stream": "false", "one-shot": "true"}, timeout=10,
+                                       endpoint=docker_hosts.get_host(host).endpoint)
+        except (docker_api.DockerAPIError, docker_hosts.DockerHostError) as e:
+            self._stats["last_error"] = f"{container}: {e}"
+            return
+        if not stats:
+            return
+        name = container[:-len(CONTAINER_SUFFIX)]
+        raw = _parse_stats(stats)
+        with self._lock:
+            series = self._series.get(name)
+            if series is None:
+                series = self._series[name] = _Series(container)
+            series.add(time.time(), raw)
+
+    def summary(self, name: str, history: bool = False):
+        """Usage summary of one server, or None if it was never sampled."""
+        with self._lock:
+            series = self._series.get(name)
+            return series.summary(history=history) if series else None
+
+    def summaries(self) -> dict:
+        """{server name: usage summary} for every sampled server."""
+        with self._lock:
+            return {name: series.summary() for name, series in self._series.items()}
+
+    def recommend(self, name: str):
+        """
+        Limits derived from a server's observed usage.
+
+        Returns:
+            dict: {"memory": bytes, "cpus": float, "basis": {...}}, or None
+            with fewer than EMCP_LIMIT_MIN_SAMPLES samples
+        """
+        summary = self.summary(name)
+        if not summary or summary["samples"] < LIMIT_MIN_SAMPLES:
+            return None
+        peak_memory = summary["memory_bytes"]["max"] or 0
+        memory = max(LIMIT_MIN_MEMORY, peak_memory * LIMIT_MEMORY_HEADROOM)
+        memory = int(math.ceil(memory / MEMORY_STEP) * MEMORY_STEP)
+        cpu_p95 = summary["cpu_percent"]["p95"] or 0
+        cpus = max(LIMIT_MIN_CPUS, math.ceil(cpu_p95 / 100 * LIMIT_CPU_HEADROOM * 20) / 20)
+        return {
+            "memory": memory,
+            "cpus": round(cpus, 2),
+            "basis": {
+                "samples": summary["samples"],
+                "memory_max": peak_memory,
+                "cpu_p95": cpu_p95,
+                "memory_headroom": LIMIT_MEMORY_HEADROOM,
+                "cpu_headroom": LIMIT_CPU_HEADROOM,
+            },
+        }
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.sample_all()
+            except (ComposeError, OSError) as e:
+                self._stats["last_error"] = str(e)
+            self._stop.wait(self.interval)
@@ -0,0 +1,202 @@
+"""
+Rolling Restart
+
+Restarts MCP server containers in batches and gates every batch on MCP
+readiness, so a config change can be rolled out to many servers in one
+call without taking them all offline at once.
+
+A restart counts as done only once the server answers an MCP initialize
+probe again (short, growing intervals up to EMCP_RESTART_READY_TIMEOUT),
+not when `docker restart` returns. The server is then re-registered with
+MCPJungle, because the gateway stops serving the tools of a server whose
+container restarted underneath it.
+
+Batches hold at most EMCP_RESTART_BATCH_SIZE servers, and never every
+selected server: with more than one target, at least one stays up while
+the others restart. A batch in which a server fails to come back stops
+the rollout (unless stop_on_failure is off); the remaining servers are
+reported as skipped and keep running the old container.
+
+Selectors:
+
+- "all"        every server with a config, except those the idle policy
+               put to sleep
+- "unhealthy"  servers the health monitor reports unhealthy or stopped
+- [names]      the named servers, in that order
+"""
+
+import os
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from compose_manager import _run_docker, wait_for_mcp_ready
+from mcpjungle_client import register_config
+from metrics import RESTART_SECONDS
+
+# Configuration
+RESTART_BATCH_SIZE = int(os.getenv("EMCP_RESTART_BATCH_SIZE", "4"))
+RESTART_READY_TIMEOUT = float(os.getenv("EMCP_RESTART_READY_TIMEOUT", "90"))
+
+# Seconds to wait for `docker restart` itself (includes the stop timeout)
+RESTART_TIMEOUT = 60
+
+SELECTORS = ("all", "unhealthy")
+UNHEALTHY_STATES = ("unhealthy", "stopped")
+
+
+class RestartError(Exception):
+    """Raised for an invalid selector or unknown servers."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def select_servers(selector, servers: list[dict]) -> tuple[list[str], list[dict]]:
+    """
+    Resolve a selector against the monitored servers.
+
+    Args:
+        selector: "all", "unhealthy", or a list of server names
+        servers: Server entries from HealthMonitor.servers()
+
+    Returns:
+        tuple: (names to restart, [{"name", "reason"}] skipped)
+
+    Raises:
+        RestartError: 400 for an invalid selector, 404 for unknown names
+    """
+    by_name = {server["name"]: server for server in servers}
+    if isinstance(selector, list):
+        names = list(dict.fromkeys(str(name) for name in selector))
+        if not names:
+            raise RestartError("No servers selected")
+        unknown = [name for name in names if name not in by_name]
+        if unknown:
+            raise RestartError(f"Unknown servers: {', '.join(unknown)}", status=404)
+        return names, []
+    if selector == "all":
+        names = [s["name"] for s in servers if s["health"]["health"] != "idle"]
+        skipped = [{"name": s["name"], "reason": "idle"} for s in servers if s["health"]["health"] == "idle"]
+        return names, skipped
+    if selector == "unhealthy":
+        return [s["name"] for s in servers if s["health"]["health"] in UNHEALTHY_STATES], []
+    raise RestartError(f"Invalid selector. Use one of: {', '.join(SELECTORS)}, or a list of names")
+
+
+def restart_server(name: str, config: dict, host: str = None,
+                   ready_timeout: float = RESTART_READY_TIMEOUT, reregister: bool = True) -> dict:
+    """
+    Restart one server's container and wait until it answers MCP requests.
+
+    Args:
+        name: Server name
+        config: {"container", "command", "url", "file"} (see
+            read_server_configs); file is only needed to re-register
+        host: Docker host the container runs on (default: local)
+        ready_timeout: Seconds to wait for readiness after the restart
+        reregister: Re-register the server with MCPJungle once ready
+
+    Returns:
+        dict: {"name", "status" ("ready", "not_ready" or "failed"),
+        "restart_ms", "time_to_ready_ms", "error"}
+    """
+    result = {"name": name, "status": "failed", "restart_ms": None, "time_to_ready_ms": None, "error": None}
+    started = time.perf_counter()
+    try:
+        restarted = _run_docker(["restart", config["container"]], timeout=RESTART_TIMEOUT, host=host)
+    except subprocess.TimeoutExpired:
+        restarted = None
+    result["restart_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    if restarted is None or restarted.returncode != 0:
+        result["error"] = (restarted.stderr.strip() if restarted else "") or "Failed to restart container"
+        RESTART_SECONDS.observe(time.perf_counter() - started, outcome="error")
+        return result
+
+    if config["command"] is None and not config["url"]:
+        # Nothing to probe (not run through `docker exec`); the container is up
+        ready, error = True, ""
+    else:
+        ready, error = wait_for_mcp_ready(config["container"], config["command"] or [], timeout=ready_timeout,
+                                          host=host, url=config["url"])
+    elapsed = time.perf_counter() - started
+    RESTART_SECONDS.observe(elapsed, outcome="ok" if ready else "timeout")
+    if not ready:
+        result["status"] = "not_ready"
+        result["error"] = f"No MCP response within {ready_timeout:g}s" + (f": {error}" if error else "")
+        return result
+
+    result["time_to_ready_ms"] = round(elapsed * 1000, 1)
+    if reregister:
+        error = register_config(name, config["file"], replace=True)
+        if error:
+            result["error"] = f"Failed to re-register with MCPJungle: {error}"
+            return result
+    result["status"] = "ready"
+    return result
+
+
+def batch_size_for(count: int, batch_size: int = RESTART_BATCH_SIZE) -> int:
+    """Batch size for count targets: at least 1, and below count if count > 1."""
+    return max(1, min(batch_size, count - 1 if count > 1 else 1))
+
+
+def rolling_restart(names: list[str], configs: dict, hosts: dict = None,
+                    batch_size: int = RESTART_BATCH_SIZE, ready_timeout: float = RESTART_READY_TIMEOUT,
+                    stop_on_failure: bool = True, reregister: bool = True) -> dict:
+    """
+    Restart servers batch by batch, waiting for readiness between batches.
+
+    Args:
+        names: Servers to restart, in order
+        configs: {name: {"container", "command", "url", "file"}} (see read_server_configs)
+        hosts: {name: Docker host} of each server (default: local)
+        batch_size: Most servers restarted at once
+        ready_timeout: Seconds each server gets to answer after its restart
+        stop_on_failure: Skip the remaining batches once a server fails
+        reregister: Re-register each server with MCPJungle once ready
+
+    Returns:
+        dict: {"servers": [per-server results in order], "batch_size",
+        "batches", "aborted", "elapsed_ms", "time_to_ready_ms": {"p50", "max"}}
+    """
+    hosts = hosts or {}
+    size = batch_size_for(len(names), batch_size)
+    batches = [names[i:i + size] for i in range(0, len(names), size)]
+    started = time.perf_counter()
+    results = {}
+    aborted = False
+
+    def restart(name):
+        config = configs.get(name)
+        if config is None:
+            return {"name": name, "status": "failed", "restart_ms": None, "time_to_ready_ms": None,
+                    "error": f"No config found for '{name}'"}
+        return restart_server(name, config, host=hosts.get(name), ready_timeout=ready_timeout,
+                              reregister=reregister)
+
+    with ThreadPoolExecutor(max_workers=size, thread_name_prefix="rolling-restart") as pool:
+        for index, batch in enumerate(batches, start=1):
+            if aborted:
+                for name in batch:
+                    results[name] = {"name": name, "status": "skipped", "restart_ms": None, "time_to_ready_ms": None,
+                                     "error": "Rollout stopped after a failed batch", "batch": index}
+                continue
+            for result in pool.map(restart, batch):
+                results[result["name"]] = {**result, "batch": index}
+            if stop_on_failure and any(results[name]["status"] != "ready" for name in batch):
+                aborted = True
+
+    ready_times = sorted(r["time_to_ready_ms"] for r in results.values() if r["time_to_ready_ms"] is not None)
+    return {
+        "servers": [results[name] for name in names],
+        "batch_size": size,
+        "batches": len(batches),
+        "aborted": aborted,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        "time_to_ready_ms": {
+            "p50": ready_times[len(ready_times) // 2] if ready_times else None,
+            "max": ready_times[-1] if ready_times else None,
+        },
+    }
@@ -0,0 +1,265 @@
+"""
+Secret Resolver for eMCP Manager
+
+Resolves a server's secrets when its container starts, with one bulk fetch
+per server, and keeps them in memory for a short TTL.
+
+Two providers are supported:
+- Infisical, when configured (secrets live under /emcp/<server>)
+- A per-server env file in the compose directory (secrets/<server>.env),
+  which docker compose can also consume via env_file
+
+With Infisical, a copy of each server's secrets is also kept in its env
+file (mode 0600) and refreshed on every resolve, so `docker compose up`
+outside `infisical run` still starts the server with its secrets. Set
+EMCP_INFISICAL_COMPOSE_ENV=0 to keep secrets off disk; the compose entry
+then only references ${KEY}, and compose must run under `infisical run`.
+
+Secrets are handed to start_service() as a dict and injected through the
+Docker Engine API, so they never pass through the shared .env file or the
+docker command line.
+"""
+
+import os
+import threading
+import time
+
+from compose_manager import COMPOSE_DIR, ENV_FILE
+
+# Infisical is optional — only used if configured via env vars
+try:
+    from infisical_client import (
+        create_secrets, get_secrets, invalidate_cache,
+        is_configured as infisical_configured,
+        InfisicalError
+    )
+except ImportError:
+    def infisical_configured(): return False
+    class InfisicalError(Exception): pass
+
+# Configuration
+SECRETS_DIR = os.getenv("EMCP_SECRETS_DIR", os.path.join(COMPOSE_DIR, "secrets"))
+INFISICAL_PATH_PREFIX = os.getenv("EMCP_INFISICAL_PATH", "/emcp")
+CACHE_TTL = float(os.getenv("EMCP_SECRET_CACHE_TTL", "300"))
+INFISICAL_COMPOSE_ENV = os.getenv("EMCP_INFISICAL_COMPOSE_ENV", "1") == "1"
+
+
+class SecretError(Exception):
+    """Exception raised when secrets cannot be stored or resolved."""
+    pass
+
+
+def _parse_env_file(path: str) -> dict:
+    """Parse KEY=value lines, ignoring blanks and comments."""
+    values = {}
+    with open(path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#') and '=' in line:
+                key, _, value = line.partition('=')
+                values[key.strip()] = value.strip()
+    return values
+
+
+class FileProvider:
+    """Per-server env files, with the shared .env as a read-only fallback."""
+
+    name = "env_file"
+
+    def __init__(self):
+        self._shared = None
+        self._shared_mtime = None
+        self._lock = threading.Lock()
+
+    def path_for(self, server: str) -> str:
+        return os.path.join(SECRETS_DIR, f"{server}.env")
+
+    def compose_env_file(self, server: str) -> str:
+        """Path of the server's env file relative to the compose file."""
+        return os.path.relpath(self.path_for(server), COMPOSE_DIR)
+
+    def store(self, server: str, values: dict) -> None:
+        path = self.path_for(server)
+        os.makedirs(SECRETS_DIR, exist_ok=True)
+
+        existing = _parse_env_file(path) if os.path.exists(path) else {}
+        existing.update(values)
+
+        # Atomic write, readable only by the manager
+        temp_path = f"{path}.tmp"
+        fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            for key, value in existing.items():
+                f.write(f"{key}={value}\n")
+        os.rename(temp_path, path)
+
+    def fetch(self, server: str, keys: list[str] = None) -> dict:
+        path = self.path_for(server)
+        values = _parse_env_file(path) if os.path.exists(path) else {}
+
+        if keys is None:
+            return values
+
+        # Servers provisioned before per-server files existed keep their
+        # secrets in the shared .env; it is parsed once per change.
+        if any(key not in values for key in keys):
+            shared = self._shared_env()
+            for key in keys:
+                if key not in values and key in shared:
+                    values[key] = shared[key]
+
+        return {key: values[key] for key in keys if key in values}
+
+    def forget(self, server: str) -> None:
+        path = self.path_for(server)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def _shared_env(self) -> dict:
+        try:
+            mtime = os.path.getmtime(ENV_FILE)
+        except OSError:
+            return {}
+        with self._lock:
+            if self._shared is None or mtime != self._shared_mtime:
+                self._shared = _parse_env_file(ENV_FILE)
+                self._shared_mtime = mtime
+            return self._shared
+
+
+class InfisicalProvider:
+    """Secrets stored in Infisical under a per-server path."""
+
+    name = "infisical"
+
+    def __init__(self, env_files: FileProvider):
+        # Compose-usable copies (see INFISICAL_COMPOSE_ENV)
+        self._env_files = env_files
+
+    def path_for(self, server: str) -> str:
+        return f"{INFISICAL_PATH_PREFIX.rstrip('/')}/{server}"
+
+    def compose_env_file(self, server: str):
+        if INFISICAL_COMPOSE_ENV:
+            return self._env_files.compose_env_file(server)
+        # Compose resolves ${KEY} from the environment, e.g. `infisical run`
+        return None
+
+    def store(self, server: str, values: dict) -> None:
+        create_secrets(values, self.path_for(server))
+        if INFISICAL_COMPOSE_ENV:
+            self._env_files.store(server, values)
+
+    def fetch(self, server: str, keys: list[str] = None) -> dict:
+        values = get_secrets(keys, self.path_for(server))
+        values = {k: v for k, v in values.items() if v is not None}
+        if INFISICAL_COMPOSE_ENV and values:
+            # Keep the compose copy in step with values changed in Infisical
+            path = self._env_files.path_for(server)
+            current = _parse_env_file(path) if os.path.exists(path) else {}
+            if any(current.get(k) != v for k, v in values.items()):
+                try:
+                    self._env_files.store(server, values)
+                except OSError:
+                    pass  # A stale copy must not keep the container from starting
+        return values
+
+    def forget(self, server: str) -> None:
+        # Secrets in Infisical are left in place; only drop local copies
+        invalidate_cache(path=self.path_for(server))
+        self._env_files.forget(server)
+
+
+_file_provider = FileProvider()
+_infisical_provider = InfisicalProvider(_file_provider)
+
+# Resolved secrets per server: {server: (values, keys, expires_at)}
+_resolved = {}
+_resolved_lock = threading.Lock()
+
+
+def get_provider():
+    """Get the active secret provider (Infisical if configured, else env files)."""
+    return _infisical_provider if infisical_configured() else _file_provider
+
+
+def store_secrets(server: str, values: dict) -> list[str]:
+    """
+    Store a server's secrets with the active provider.
+
+    Args:
+        server: Server name
+        values: {KEY: value}
+
+    Returns:
+        list[str]: Names of the stored keys
+
+    Raises:
+        SecretError: If the provider rejects the write
+    """
+    if not values:
+        return []
+
+    try:
+        get_provider().store(server, values)
+    except (InfisicalError, OSError) as e:
+        raise SecretError(f"Failed to store secrets for '{server}': {e}")
+
+    invalidate(server)
+    return list(values.keys())
+
+
+def resolve_secrets(server: str, keys: list[str] = None) -> dict:
+    """
+    Resolve a server's secrets for container start.
+
+    One bulk fetch per server; results are cached for CACHE_TTL seconds so
+    restarts and retries do not hit the provider again.
+
+    Args:
+        server: Server name
+        keys: Keys the server needs (default: all keys stored for it)
+
+    Returns:
+        dict: {KEY: value}
+
+    Raises:
+        SecretError: If the provider cannot be reached or keys are missing
+    """
+    wanted = tuple(sorted(keys)) if keys is not None else None
+
+    with _resolved_lock:
+        entry = _resolved.get(server)
+        if entry and entry[2] > time.monotonic() and entry[1] == wanted:
+            return dict(entry[0])
+
+    try:
+        values = get_provider().fetch(server, keys)
+    except (InfisicalError, OSError) as e:
+        raise SecretError(f"Failed to resolve secrets for '{server}': {e}")
+
+    if keys is not None:
+        missing = [key for key in keys if key not in values]
+        if missing:
+            raise SecretError(
+                f"Missing secrets for '{server}': {', '.join(sorted(missing))}"
+            )
+
+    with _resolved_lock:
+        _resolved[server] = (dict(values), wanted, time.monotonic() + CACHE_TTL)
+    return values
+
+
+def invalidate(server: str = None) -> None:
+    """Drop resolved secrets for one server (or all servers)."""
+    with _resolved_lock:
+        if server is None:
+            _resolved.clear()
+        else:
+            _resolved.pop(server, None)
+
+
+def forget_secrets(server: str) -> None:
+    """Remove locally stored secrets for a deleted server."""
+    invalidate(server)
+    get_provider().forget(server)
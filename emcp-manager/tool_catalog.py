@@ -0,0 +1,199 @@
+"""
+Tool Catalog
+
+Short-lived cache of the MCPJungle tool catalog (GET /api/v0/tools).
+
+Every manager view of the catalog — the tool list, validation, per-server
+tool counts and the search index — reads through one cached copy instead
+of fetching the full catalog per request. Concurrent misses share a single
+fetch. A content version is derived from the catalog so callers can detect
+changes cheaply.
+"""
+
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+
+import requests
+
+from metrics import CATALOG_LOOKUPS, MCPJUNGLE_REQUEST_SECONDS, track
+from tool_index import ToolIndex
+
+# Seconds a fetched catalog is served before refetching
+CATALOG_TTL = float(os.getenv("EMCP_CATALOG_TTL", "5"))
+
+
+# Fixed per-tool cost of the tool-list framing (name key, braces, type field)
+TOOL_OVERHEAD_TOKENS = 8
+
+
+def split_tool_name(name: str) -> str:
+    """Get the server part of a "server__tool_name" tool name."""
+    parts = name.split("__", 1)
+    return parts[0] if len(parts) > 1 else "unknown"
+
+
+def get_input_schema(tool: dict) -> dict:
+    """Get a tool's JSON input schema, whichever key MCPJungle used."""
+    return tool.get("input_schema") or tool.get("inputSchema") or {}
+
+
+def estimate_tokens(tool: dict) -> int:
+    """
+    Estimate how many context tokens a tool costs an agent.
+
+    Counts the name, description and compact JSON input schema using the
+    usual ~4 characters per token for prose and ~3 for JSON, whose
+    punctuation tokenizes densely. It is an estimate, not a tokenizer.
+    """
+    schema = json.dumps(get_input_schema(tool), separators=(",", ":"))
+    prose = len(tool.get("name", "")) + len(tool.get("description") or "")
+    return TOOL_OVERHEAD_TOKENS + math.ceil(prose / 4) + math.ceil(len(schema) / 3)
+
+
+class ToolCatalog:
+    """Cached MCPJungle tool catalog with an incrementally synced search index."""
+
+    def __init__(self, api_url: str, ttl: float = CATALOG_TTL):
+        self.api_url = api_url
+        self.ttl = ttl
+        self.index = ToolIndex()
+        self._tokens = {}  # tool name -> (content fingerprint, token estimate)
+        self._tools = None
+        self._version = None
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+        self._fetch_lock = threading.Lock()
+
+    @property
+    def version(self) -> str:
+        """Content version of the catalog (changes whenever any tool changes)."""
+        self.tools()
+        return self._version
+
+    def tools(self, refresh: bool = False) -> list[dict]:
+        """
+        Get the raw tool list.
+
+        Args:
+            refresh: Bypass the cache
+
+        Returns:
+            list[dict]: Tools as returned by MCPJungle
+
+        Raises:
+            requests.RequestException: If the catalog cannot be fetched
+        """
+        if not refresh:
+            cached = self._cached()
+            if cached is not None:
+                CATALOG_LOOKUPS.inc(result="hit")
+                return cached
+
+        # Single flight: concurrent misses wait for one fetch
+        with self._fetch_lock:
+            if not refresh:
+                cached = self._cached()
+                if cached is not None:
+                    CATALOG_LOOKUPS.inc(result="hit")
+                    return cached
+
+            CATALOG_LOOKUPS.inc(result="refresh" if refresh else "miss")
+            with track(MCPJUNGLE_REQUEST_SECONDS, endpoint="/api/v0/tools"):
+                response = requests.get(f"{self.api_url}/api/v0/tools", timeout=10)
+                response.raise_for_status()
+            tools = response.json()
+            self._store(tools)
+            return tools
+
+    def snapshot(self) -> tuple[list[dict], str]:
+        """Get the tool list together with its matching version."""
+        self.tools()
+        with self._lock:
+            return self._tools, self._version
+
+    def tool_tokens(self) -> dict[str, int]:
+        """Token estimate per tool name for the current catalog."""
+        self.tools()
+        with self._lock:
+            return {name: tokens for name, (_, tokens) in self._tokens.items()}
+
+    def footprint(self, tool_names: list[str]) -> dict:
+        """
+        Token footprint of a set of tools (e.g. a group's included_tools).
+
+        Returns:
+            dict: {"total", "tool_count", "by_server": {server: {"tokens", "tools"}},
+                   "unknown_tools": [names not in the catalog]}
+        """
+        tokens = self.tool_tokens()
+        by_server = {}
+        unknown = []
+        total = 0
+        for name in tool_names:
+            if name not in tokens:
+                unknown.append(name)
+                continue
+            server = by_server.setdefault(split_tool_name(name), {"tokens": 0, "tools": 0})
+            server["tokens"] += tokens[name]
+            server["tools"] += 1
+            total += tokens[name]
+        return {
+            "total": total,
+            "tool_count": len(tool_names) - len(unknown),
+            "by_server": by_server,
+            "unknown_tools": unknown,
+        }
+
+    def invalidate(self) -> None:
+        """Force the next read to refetch (e.g. after register/deregister)."""
+        with self._lock:
+            self._fetched_at = 0.0
+
+    def _cached(self):
+        with self._lock:
+            if self._tools is not None and time.monotonic() - self._fetched_at < self.ttl:
+                return self._tools
+        return None
+
+    def _store(self, tools: list[dict]) -> None:
+        digest = hashlib.sha256(
+            json.dumps(tools, sort_keys=True, separators=(",", ":")).encode()
+        ).hexdigest()[:16]
+
+        with self._lock:
+            changed = digest != self._version
+            self._tools = tools
+            self._version = digest
+            self._fetched_at = time.monotonic()
+
+        if changed:
+            self._update_tokens(tools)
+            self.index.update([
+                {
+                    "name": tool["name"],
+                    "server": split_tool_name(tool["name"]),
+                    "description": tool.get("description", ""),
+                }
+                for tool in tools
+            ])
+
+    def _update_tokens(self, tools: list[dict]) -> None:
+        """Re-estimate only tools whose description or schema changed."""
+        previous = self._tokens
+        updated = {}
+        for tool in tools:
+            fingerprint = hashlib.sha1(json.dumps(
+                [tool.get("description") or "", get_input_schema(tool)],
+                sort_keys=True
+            ).encode()).digest()
+            cached = previous.get(tool["name"])
+            if cached and cached[0] == fingerprint:
+                updated[tool["name"]] = cached
+            else:
+                updated[tool["name"]] = (fingerprint, estimate_tokens(tool))
+        with self._lock:
+            self._tokens = updated
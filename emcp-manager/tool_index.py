@@ -0,0 +1,254 @@
+"""
+Tool Search Index
+
+Inverted index over tool names, server names and descriptions, supporting
+prefix, fuzzy and ranked (TF-IDF style) matching.
+
+The index is updated incrementally: only tools whose content changed are
+re-tokenized, so keeping it in sync with a large catalog is cheap.
+"""
+
+import bisect
+import math
+import re
+import threading
+
+# Relative weight of a term depending on the field it came from
+FIELD_WEIGHTS = {"name": 3.0, "server": 2.0, "description": 1.0}
+
+# Score multipliers for non-exact term matches
+PREFIX_FACTOR = 0.6
+FUZZY_FACTOR = 0.4
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in",
+    "is", "it", "of", "on", "or", "the", "this", "to", "with",
+}
+
+SEARCH_MODES = ("ranked", "prefix", "fuzzy")
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Split text into lowercase search terms.
+
+    Handles snake_case, kebab-case and camelCase, so "listPullRequests" and
+    "list_pull_requests" produce the same terms.
+    """
+    if not text:
+        return []
+    text = re.sub(r'([a-z0-9])([A-Z])', r'\1 \2', text)
+    return [t for t in re.split(r'[^a-z0-9]+', text.lower()) if t and t not in STOPWORDS]
+
+
+def _within_distance(a: str, b: str, limit: int) -> bool:
+    """Bounded Levenshtein check: is edit distance(a, b) <= limit?"""
+    if abs(len(a) - len(b)) > limit:
+        return False
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        row_min = i
+        for j, cb in enumerate(b, 1):
+            cost = 0 if ca == cb else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            current.append(value)
+            row_min = min(row_min, value)
+        if row_min > limit:
+            return False
+        previous = current
+    return previous[-1] <= limit
+
+
+def _fuzzy_limit(term: str) -> int:
+    """Allowed edit distance, scaled with term length."""
+    if len(term) <= 3:
+        return 0
+    if len(term) <= 6:
+        return 1
+    return 2
+
+
+class ToolIndex:
+    """Thread-safe inverted index over the tool catalog."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._docs = {}        # tool name -> {"server", "description", "terms", "fingerprint"}
+        self._postings = {}    # term -> {tool name: weight}
+        self._vocab = []       # sorted terms, for prefix lookups
+        self._vocab_dirty = False
+
+    def __len__(self):
+        return len(self._docs)
+
+    def update(self, tools: list[dict]) -> dict:
+        """
+        Sync the index with the current catalog.
+
+        Args:
+            tools: List of {"name", "server", "description"} dicts
+
+        Returns:
+            dict: {"added": n, "updated": n, "removed": n}
+        """
+        stats = {"added": 0, "updated": 0, "removed": 0}
+        seen = set()
+
+        with self._lock:
+            for tool in tools:
+                name = tool["name"]
+                seen.add(name)
+                fingerprint = (tool.get("server", ""), tool.get("description") or "")
+                doc = self._docs.get(name)
+                if doc and doc["fingerprint"] == fingerprint:
+                    continue
+                if doc:
+                    self._remove(name)
+                    stats["updated"] += 1
+                else:
+                    stats["added"] += 1
+                self._add(name, fingerprint)
+
+            for name in [n for n in self._docs if n not in seen]:
+                self._remove(name)
+                stats["removed"] += 1
+
+        return stats
+
+    def search(self, query: str, mode: str = "ranked", server: str = None,
+               offset: int = 0, limit: int = 50) -> tuple[int, list[dict]]:
+        """
+        Search the index.
+
+        Every query term must match (AND semantics):
+        - prefix: terms starting with the query term
+        - fuzzy: terms within a small edit distance of the query term
+        - ranked: exact matches, falling back to prefix then fuzzy matches
+
+        Results are ranked by summed IDF x field weight; exact matches score
+        above prefix matches, which score above fuzzy matches.
+
+        Args:
+            query: Free-text query
+            mode: One of SEARCH_MODES
+            server: Optional server name to restrict results to
+            offset: Pagination offset
+            limit: Page size
+
+        Returns:
+            tuple: (total_matches, page of {"name", "server", "description", "score"})
+        """
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode: {mode}")
+
+        terms = tokenize(query)
+        if not terms:
+            return 0, []
+
+        with self._lock:
+            self._refresh_vocab()
+            total_docs = max(len(self._docs), 1)
+            scores = None
+
+            for term in terms:
+                matches = self._expand(term, mode)
+                term_scores = {}
+                for vocab_term, factor in matches.items():
+                    postings = self._postings[vocab_term]
+                    idf = math.log(1 + total_docs / len(postings))
+                    for name, weight in postings.items():
+                        score = idf * weight * factor
+                        if score > term_scores.get(name, 0):
+                            term_scores[name] = score
+
+                if scores is None:
+                    scores = term_scores
+                else:
+                    scores = {n: s + term_scores[n] for n, s in scores.items() if n in term_scores}
+                if not scores:
+                    return 0, []
+
+            phrase = query.strip().lower()
+            results = []
+            for name, score in scores.items():
+                doc = self._docs[name]
+                if server and doc["server"] != server:
+                    continue
+                if phrase and phrase in name.lower():
+                    score *= 1.5
+                results.append({
+                    "name": name,
+                    "server": doc["server"],
+                    "description": doc["description"],
+                    "score": round(score, 4),
+                })
+
+        results.sort(key=lambda r: (-r["score"], r["name"]))
+        return len(results), results[offset:offset + limit]
+
+    def _expand(self, term: str, mode: str) -> dict:
+        """Map a query term to {vocabulary term: score factor}."""
+        if mode == "prefix":
+            return {t: (1.0 if t == term else PREFIX_FACTOR) for t in self._prefixed(term)}
+        if mode == "fuzzy":
+            return {t: (1.0 if t == term else FUZZY_FACTOR) for t in self._fuzzy(term)}
+
+        if term in self._postings:
+            matches = {term: 1.0}
+            # Also let "read" find "reader", at a lower score
+            for t in self._prefixed(term):
+                matches.setdefault(t, PREFIX_FACTOR)
+            return matches
+        matches = {t: PREFIX_FACTOR for t in self._prefixed(term)}
+        if not matches:
+            matches = {t: FUZZY_FACTOR for t in self._fuzzy(term)}
+        return matches
+
+    def _prefixed(self, term: str) -> list[str]:
+        start = bisect.bisect_left(self._vocab, term)
+        end = bisect.bisect_left(self._vocab, term + "\uffff")
+        return self._vocab[start:end]
+
+    def _fuzzy(self, term: str) -> list[str]:
+        limit = _fuzzy_limit(term)
+        if limit == 0:
+            return [term] if term in self._postings else []
+        return [t for t in self._vocab if _within_distance(term, t, limit)]
+
+    def _add(self, name: str, fingerprint: tuple) -> None:
+        server, description = fingerprint
+        tool_part = name.split("__", 1)[-1]
+
+        weights = {}
+        for field, text in (("name", tool_part), ("server", server), ("description", description)):
+            for term in tokenize(text):
+                weights[term] = weights.get(term, 0) + FIELD_WEIGHTS[field]
+
+        for term, weight in weights.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                self._vocab_dirty = True
+            postings[name] = weight
+
+        self._docs[name] = {
+            "server": server,
+            "description": description,
+            "terms": list(weights),
+            "fingerprint": fingerprint,
+        }
+
+    def _remove(self, name: str) -> None:
+        doc = self._docs.pop(name)
+        for term in doc["terms"]:
+            postings = self._postings[term]
+            postings.pop(name, None)
+            if not postings:
+                del self._postings[term]
+                self._vocab_dirty = True
+
+    def _refresh_vocab(self) -> None:
+        if self._vocab_dirty:
+            self._vocab = sorted(self._postings)
+            self._vocab_dirty = False
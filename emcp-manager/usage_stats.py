@@ -0,0 +1,423 @@
+"""
+Tool Usage Statistics
+
+Follows the MCPJungle gateway's container logs through the Docker Engine API
+and turns tool-invocation lines into per-tool and per-group usage counters:
+call counts, error counts, latency histograms and hourly call counts over the
+last week, kept in fixed-size ring buffers.
+
+Memory is bounded regardless of traffic: each tracked tool costs a few
+hundred bytes, the number of tracked tools and groups is capped, and log
+lines are parsed one at a time as they stream in.
+
+The gateway's log format is not a stable interface, so parsing is
+configurable. Set EMCP_CALL_LOG_PATTERN to a regex with a named group
+"tool" (and optionally "group", "duration_ms" and "error") to match your
+gateway's output; otherwise JSON log lines and common text formats are
+recognised heuristically.
+"""
+
+import calendar
+import json
+import os
+import re
+import threading
+import time
+from array import array
+
+import docker_api
+from docker_api import DockerAPIError
+
+# Configuration
+USAGE_CONTAINER = os.getenv("EMCP_USAGE_CONTAINER", "emcp-server")
+USAGE_FILE = os.getenv("EMCP_USAGE_FILE", "/data/usage-stats.json")
+SAVE_INTERVAL = float(os.getenv("EMCP_USAGE_SAVE_INTERVAL", "60"))
+MAX_TRACKED = int(os.getenv("EMCP_USAGE_MAX_TRACKED", "10000"))
+CALL_LOG_PATTERN = os.getenv("EMCP_CALL_LOG_PATTERN")
+
+# Latency histogram bucket upper bounds in milliseconds (plus an overflow bucket)
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# Hourly call counts for the last week
+SLOT_SECONDS = 3600
+SLOT_COUNT = 168
+
+# Default window for "calls in window" / cold-tool queries
+DEFAULT_WINDOW = 7 * 24 * 3600
+
+# Heuristics used when no EMCP_CALL_LOG_PATTERN is configured
+_CALL_MARKER = re.compile(r'(?i)tools/call|tool[ _-]?call|call(?:ing|ed)? tool|invok(?:e|ed|ing) tool')
+_TOOL_NAME = re.compile(r'(?<![\w.-])(?P<tool>[A-Za-z0-9][\w.-]*__[\w.-]*\w)')
+_GROUP_NAME = re.compile(r'(?:/groups/|\bgroup["\']?\s*[=:]\s*["\']?)(?P<group>[A-Za-z0-9][\w-]*)')
+_DURATION = re.compile(
+    r'(?i)\b(?:duration|latency|took|elapsed)(?:_ms)?["\']?\s*[=:]?\s*'
+    r'(?P<value>\d+(?:\.\d+)?)\s*(?P<unit>ms|µs|us|ns|s)?\b'
+)
+_ERROR = re.compile(r'\bERROR\b|level=error|"level"\s*:\s*"error"|\bfailed\b|isError"?\s*[:=]\s*true')
+
+_UNIT_MS = {"ns": 1e-6, "us": 1e-3, "µs": 1e-3, "ms": 1.0, "s": 1000.0}
+
+
+def _parse_timestamp(value: str) -> float:
+    """Parse a Docker RFC3339Nano log timestamp into a UNIX timestamp."""
+    value = value.rstrip("Z")
+    whole, _, fraction = value.partition(".")
+    seconds = calendar.timegm(time.strptime(whole, "%Y-%m-%dT%H:%M:%S"))
+    return seconds + (float(f"0.{fraction}") if fraction else 0.0)
+
+
+def _to_ms(value, unit: str = None):
+    try:
+        return float(value) * _UNIT_MS.get(unit or "ms", 1.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class CallLogParser:
+    """Extract tool invocations from gateway log lines."""
+
+    def __init__(self, pattern: str = None):
+        self.pattern = re.compile(pattern) if pattern else None
+
+    def parse(self, line: str):
+        """
+        Parse one log line.
+
+        Returns:
+            dict or None: {"tool", "group", "error", "duration_ms"} for a tool call
+        """
+        if self.pattern:
+            match = self.pattern.search(line)
+            if not match or not match.groupdict().get("tool"):
+                return None
+            fields = match.groupdict()
+            return {
+                "tool": fields["tool"],
+                "group": fields.get("group"),
+                "error": bool(fields.get("error")),
+                "duration_ms": _to_ms(fields.get("duration_ms")),
+            }
+
+        stripped = line.lstrip()
+        if stripped.startswith("{"):
+            return self._parse_json(stripped)
+        return self._parse_text(line)
+
+    def _parse_json(self, line: str):
+        try:
+            record = json.loads(line)
+        except ValueError:
+            return None
+        if not isinstance(record, dict):
+            return None
+
+        tool = record.get("tool") or record.get("tool_name") or record.get("toolName")
+        if not isinstance(tool, str) or "__" not in tool:
+            return None
+
+        duration = None
+        for key, unit in (("duration_ms", "ms"), ("latency_ms", "ms"), ("duration", "ms"), ("latency", "ms")):
+            if key in record:
+                duration = _to_ms(record[key], unit)
+                break
+
+        return {
+            "tool": tool,
+            "group": record.get("group") or record.get("tool_group"),
+            "error": bool(record.get("error") or record.get("isError")
+                          or str(record.get("level", "")).lower() == "error"),
+            "duration_ms": duration,
+        }
+
+    def _parse_text(self, line: str):
+        if not _CALL_MARKER.search(line):
+            return None
+        tool = _TOOL_NAME.search(line)
+        if not tool:
+            return None
+        group = _GROUP_NAME.search(line)
+        duration = _DURATION.search(line)
+        return {
+            "tool": tool.group("tool"),
+            "group": group.group("group") if group else None,
+            "error": bool(_ERROR.search(line)),
+            "duration_ms": _to_ms(duration.group("value"), duration.group("unit")) if duration else None,
+        }
+
+
+class _Series:
+    """Counters for one tool or group."""
+
+    __slots__ = ("calls", "errors", "latency", "latency_sum", "last_called", "head", "hourly")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.latency = array("I", [0] * (len(LATENCY_BUCKETS_MS) + 1))
+        self.latency_sum = 0.0
+        self.last_called = None
+        self.head = None  # hour number of the newest ring slot
+        self.hourly = array("I", [0] * SLOT_COUNT)
+
+    def record(self, ts: float, error: bool, duration_ms) -> None:
+        self.calls += 1
+        if error:
+            self.errors += 1
+        if duration_ms is not None:
+            bucket = next((i for i, bound in enumerate(LATENCY_BUCKETS_MS) if duration_ms <= bound),
+                          len(LATENCY_BUCKETS_MS))
+            self.latency[bucket] += 1
+            self.latency_sum += duration_ms
+        if self.last_called is None or ts > self.last_called:
+            self.last_called = ts
+
+        hour = int(ts // SLOT_SECONDS)
+        if self.head is None:
+            self.head = hour
+        elif hour > self.head:
+            # Clear the slots the ring rotates past
+            for h in range(self.head + 1, min(hour, self.head + SLOT_COUNT) + 1):
+                self.hourly[h % SLOT_COUNT] = 0
+            self.head = hour
+        elif hour <= self.head - SLOT_COUNT:
+            return  # Older than the ring covers
+        self.hourly[hour % SLOT_COUNT] += 1
+
+    def calls_since(self, since: float) -> int:
+        """Calls recorded at or after a timestamp (hour resolution, up to a week back)."""
+        if self.head is None or self.last_called is None or self.last_called < since:
+            return 0
+        first = max(int(since // SLOT_SECONDS), self.head - SLOT_COUNT + 1)
+        return sum(self.hourly[h % SLOT_COUNT] for h in range(first, self.head + 1))
+
+    def percentile(self, q: float):
+        total = sum(self.latency)
+        if not total:
+            return None
+        target = q * total
+        seen = 0
+        for i, count in enumerate(self.latency):
+            seen += count
+            if seen >= target:
+                return LATENCY_BUCKETS_MS[min(i, len(LATENCY_BUCKETS_MS) - 1)]
+        return LATENCY_BUCKETS_MS[-1]
+
+    def to_dict(self, since: float) -> dict:
+        timed = sum(self.latency)
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "calls_in_window": self.calls_since(since),
+            "last_called": self.last_called,
+            "latency_ms": {
+                "mean": round(self.latency_sum / timed, 2) if timed else None,
+                "p50": self.percentile(0.5),
+                "p95": self.percentile(0.95),
+                "p99": self.percentile(0.99),
+            },
+        }
+
+    def dump(self) -> dict:
+        return {
+            "calls": self.calls, "errors": self.errors,
+            "latency": list(self.latency), "latency_sum": self.latency_sum,
+            "last_called": self.last_called, "head": self.head,
+            "hourly": list(self.hourly),
+        }
+
+    @classmethod
+    def load(cls, data: dict):
+        series = cls()
+        series.calls = data.get("calls", 0)
+        series.errors = data.get("errors", 0)
+        series.latency_sum = data.get("latency_sum", 0.0)
+        series.last_called = data.get("last_called")
+        series.head = data.get("head")
+        if len(data.get("latency", [])) == len(series.latency):
+            series.latency = array("I", data["latency"])
+        if len(data.get("hourly", [])) == SLOT_COUNT:
+            series.hourly = array("I", data["hourly"])
+        return series
+
+
+class UsageStore:
+    """Thread-safe per-tool and per-group usage counters."""
+
+    def __init__(self, max_tracked: int = MAX_TRACKED):
+        self.max_tracked = max_tracked
+        self._tools = {}
+        self._groups = {}
+        self._dropped = 0
+        self._lock = threading.Lock()
+
+    def record(self, tool: str, group: str = None, error: bool = False,
+               duration_ms: float = None, ts: float = None) -> None:
+        """Record one tool call."""
+        ts = ts if ts is not None else time.time()
+        with self._lock:
+            for table, key in ((self._tools, tool), (self._groups, group)):
+                if not key:
+                    continue
+                series = table.get(key)
+                if series is None:
+                    if len(table) >= self.max_tracked:
+                        self._dropped += 1
+                        continue
+                    series = table[key] = _Series()
+                series.record(ts, error, duration_ms)
+
+    def tools(self, window: float = DEFAULT_WINDOW, names=None) -> dict:
+        """Usage per tool; with names, unseen tools are reported with zero calls."""
+        since = time.time() - window
+        with self._lock:
+            keys = names if names is not None else list(self._tools)
+            return {
+                name: (self._tools[name].to_dict(since) if name in self._tools
+                       else _Series().to_dict(since))
+                for name in keys
+            }
+
+    def groups(self, window: float = DEFAULT_WINDOW) -> dict:
+        since = time.time() - window
+        with self._lock:
+            return {name: series.to_dict(since) for name, series in self._groups.items()}
+
+    def calls_in_window(self, names, window: float = DEFAULT_WINDOW) -> dict:
+        """{tool: calls within the window} for the given tool names."""
+        since = time.time() - window
+        with self._lock:
+            return {
+                name: (self._tools[name].calls_since(since) if name in self._tools else 0)
+                for name in names
+            }
+
+    def last_called(self) -> dict:
+        """{tool: timestamp of its latest call} for every tracked tool."""
+        with self._lock:
+            return {name: s.last_called for name, s in self._tools.items() if s.last_called}
+
+    def cold_tools(self, names, window: float = DEFAULT_WINDOW) -> list[str]:
+        """Tools from names with no calls within the window."""
+        return [name for name, calls in self.calls_in_window(names, window).items() if calls == 0]
+
+    @property
+    def dropped(self) -> int:
+        return self._dropped
+
+    def dump(self) -> dict:
+        with self._lock:
+            return {
+                "tools": {name: s.dump() for name, s in self._tools.items()},
+                "groups": {name: s.dump() for name, s in self._groups.items()},
+            }
+
+    def load(self, data: dict) -> None:
+        with self._lock:
+            self._tools = {n: _Series.load(d) for n, d in data.get("tools", {}).items()}
+            self._groups = {n: _Series.load(d) for n, d in data.get("groups", {}).items()}
+
+
+class LogIngester:
+    """Background thread following the gateway logs into a UsageStore."""
+
+    def __init__(self, store: UsageStore, container: str = USAGE_CONTAINER,
+                 parser: CallLogParser = None, state_file: str = USAGE_FILE, on_call=None):
+        self.store = store
+        self.on_call = on_call  # called with each parsed call (and its timestamp)
+        self.container = container
+        self.parser = parser or CallLogParser(CALL_LOG_PATTERN)
+        self.state_file = state_file
+        self._last_ts = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._saved_at = time.monotonic()
+        self._stats = {"lines": 0, "calls": 0, "reconnects": 0, "last_error": None, "connected": False}
+
+    def start(self) -> None:
+        """Load saved statistics and start following logs."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._load()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="usage-ingester", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self.save()
+
+    def status(self) -> dict:
+        return {
+            "running": bool(self._thread and self._thread.is_alive()),
+            "container": self.container,
+            "pattern": self.parser.pattern.pattern if self.parser.pattern else None,
+            "last_timestamp": self._last_ts,
+            "dropped": self.store.dropped,
+            **self._stats,
+        }
+
+    def handle(self, timestamp: str, line: str) -> None:
+        """Process one log line (timestamp as emitted by Docker)."""
+        try:
+            ts = _parse_timestamp(timestamp)
+        except ValueError:
+            ts = time.time()
+        if self._last_ts is not None and ts <= self._last_ts:
+            return  # Already seen before a reconnect
+        self._last_ts = ts
+        self._stats["lines"] += 1
+
+        call = self.parser.parse(line)
+        if call:
+            self._stats["calls"] += 1
+            self.store.record(call["tool"], call["group"], call["error"], call["duration_ms"], ts)
+            if self.on_call:
+                self.on_call(call, ts)
+
+    def save(self) -> None:
+        """Persist statistics so restarts keep history and do not re-count lines."""
+        if not self.state_file:
+            return
+        try:
+            temp_path = f"{self.state_file}.tmp"
+            with open(temp_path, "w") as f:
+                json.dump({"last_timestamp": self._last_ts, **self.store.dump()}, f)
+            os.replace(temp_path, self.state_file)
+        except OSError as e:
+            self._stats["last_error"] = f"Failed to save usage statistics: {e}"
+        self._saved_at = time.monotonic()
+
+    def _load(self) -> None:
+        if not self.state_file or not os.path.exists(self.state_file):
+            return
+        try:
+            with open(self.state_file, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        self.store.load(data)
+        self._last_ts = data.get("last_timestamp")
+
+    def _run(self) -> None:
+        backoff = 1
+        while not self._stop.is_set():
+            try:
+                since = self._last_ts
+                for timestamp, line in docker_api.follow_logs(self.container, since=since,
+                                                              timeout=SAVE_INTERVAL):
+                    self._stats["connected"] = True
+                    backoff = 1
+                    self.handle(timestamp, line)
+                    if time.monotonic() - self._saved_at >= SAVE_INTERVAL:
+                        self.save()
+                    if self._stop.is_set():
+                        return
+            except DockerAPIError as e:
+                # Idle timeouts land here too; they simply reconnect
+                self._stats["last_error"] = str(e)
+            self._stats["connected"] = False
+            self._stats["reconnects"] += 1
+            if time.monotonic() - self._saved_at >= SAVE_INTERVAL:
+                self.save()
+            self._stop.wait(backoff)
+            backoff = min(backoff * 2, 60)
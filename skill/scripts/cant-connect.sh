@@ -20,13 +20,13 @@ if [[ "$RUNNING" -eq 0 ]]; then
 fi
 
 # 2. Gateway responding locally?
-if ! curl -sf "http://localhost:${GATEWAY_PORT}/api/v0/tools" >/dev/null 2>&1; then
+if ! TOOLS=$(curl -sf "http://localhost:${GATEWAY_PORT}/api/v0/tools" 2>/dev/null); then
     echo "FOUND: Gateway not responding on localhost:${GATEWAY_PORT}."
     echo "FIX:   Run: ./skill/scripts/no-tools.sh"
     exit 1
 fi
 
-TOOL_COUNT=$(curl -sf "http://localhost:${GATEWAY_PORT}/api/v0/tools" | jq 'length' 2>/dev/null || echo 0)
+TOOL_COUNT=$(echo "$TOOLS" | jq 'length' 2>/dev/null || echo 0)
 
 # 3. Detect host IPs for remote access
 echo "Gateway is healthy with ${TOOL_COUNT} tools."
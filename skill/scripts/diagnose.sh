@@ -17,6 +17,19 @@ echo "eMCP Diagnostics"
 echo "================"
 echo ""
 
+# Manager-side checks (containers, gateway, MCP handshakes, ports, group
+# tools, drift) run concurrently in one request when the manager is up
+REPORT=$(curl -sf --max-time 15 "http://localhost:${MANAGER_PORT}/api/diagnostics" 2>/dev/null || true)
+if [[ -n "$REPORT" ]] && command -v jq &>/dev/null; then
+    echo "## Checks"
+    echo "$REPORT" | jq -r '
+        .checks | to_entries[] |
+        "\(.value.status | ascii_upcase)\t\(.key): \(.value.summary)",
+        (.value.details | if type == "array" then .[] | "\t  - \(.)" else empty end),
+        (.value.fix // empty | "\t  FIX: \(.)")'
+    echo ""
+fi
+
 # System info
 echo "## System"
 echo "OS: $(uname -s) $(uname -m)"
@@ -32,8 +45,8 @@ echo ""
 
 # Gateway health
 echo "## Gateway (port ${GATEWAY_PORT})"
-if curl -sf "http://localhost:${GATEWAY_PORT}/api/v0/tools" >/dev/null 2>&1; then
-    TOOL_COUNT=$(curl -sf "http://localhost:${GATEWAY_PORT}/api/v0/tools" | jq 'length' 2>/dev/null || echo "?")
+if TOOLS=$(curl -sf "http://localhost:${GATEWAY_PORT}/api/v0/tools" 2>/dev/null); then
+    TOOL_COUNT=$(echo "$TOOLS" | jq 'length' 2>/dev/null || echo "?")
     echo "Status: responding"
     echo "Tools: ${TOOL_COUNT}"
 else
@@ -64,7 +64,7 @@ if [[ ${#UNHEALTHY[@]} -gt 0 ]]; then
         echo "       Waiting for gateway..."
         until curl -sf "http://localhost:${GATEWAY_PORT}/api/v0/tools" >/dev/null 2>&1; do sleep 2; done
         echo "FIX:   Re-registering configs..."
-        make register
+        make register REGISTER_ARGS=--force
     fi
 
     exit 0
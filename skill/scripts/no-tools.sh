@@ -20,21 +20,21 @@ if ! docker compose ps emcp-server --format '{{.State}}' 2>/dev/null | grep -q r
 fi
 
 # 2. Is the gateway responding?
-if ! curl -sf "${GATEWAY}/api/v0/tools" >/dev/null 2>&1; then
+if ! TOOLS=$(curl -sf "${GATEWAY}/api/v0/tools" 2>/dev/null); then
     echo "FOUND: Gateway is running but not responding on port ${GATEWAY_PORT}."
     echo "FIX:   Restarting gateway and re-registering..."
     docker restart emcp-server
     sleep 10
-    make register
+    make register REGISTER_ARGS=--force
     exit 0
 fi
 
 # 3. Are any tools registered?
-TOOL_COUNT=$(curl -sf "${GATEWAY}/api/v0/tools" | jq 'length' 2>/dev/null || echo 0)
+TOOL_COUNT=$(echo "$TOOLS" | jq 'length' 2>/dev/null || echo 0)
 if [[ "$TOOL_COUNT" -eq 0 ]]; then
     echo "FOUND: Gateway is healthy but zero tools registered."
     echo "FIX:   Registering all configs..."
-    make register
+    make register REGISTER_ARGS=--force
     AFTER=$(curl -sf "${GATEWAY}/api/v0/tools" | jq 'length' 2>/dev/null || echo 0)
     echo "RESULT: ${AFTER} tools now registered."
     exit 0